@@ -0,0 +1,74 @@
+"""
+Review-history query latency at scale.
+
+    python benchmarks/bench_history.py --reviews 50000 --comments-per-review 20   # 1M comment rows
+
+Fills a throwaway history database, then times the `/api/history` queries (first and deep pages).
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from prreviewbot.core.types import PullRequestInfo, ReviewComment, ReviewResult
+from prreviewbot.storage.history import ReviewHistory
+
+SEVERITIES = ("info", "warn", "error")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--reviews", type=int, default=50_000)
+    ap.add_argument("--comments-per-review", type=int, default=20)
+    ap.add_argument("--repos", type=int, default=200)
+    ap.add_argument("--iterations", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ReviewHistory(data_dir=Path(tmp), prune_interval_s=float("inf"))
+        t0 = time.perf_counter()
+        now = time.time()
+        for n in range(args.reviews):
+            repo = f"org/repo{n % args.repos}"
+            url = f"https://github.com/{repo}/pull/{n}"
+            pr = PullRequestInfo(provider="github", host="github.com", pr_url=url, title="", description="")
+            comments = [
+                ReviewComment(file_path=f"src/f{i}.py", severity=SEVERITIES[(n + i) % 3], message=f"comment {i}")
+                for i in range(args.comments_per_review)
+            ]
+            result = ReviewResult(pr_url=url, language="python", model="m", summary="s", comments=comments)
+            history.record(pr, result, now=now - (args.reviews - n))
+        print(f"inserted {args.reviews} reviews / {args.reviews * args.comments_per_review} comments "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+        _, deep = history.reviews(limit=500)
+        queries = {
+            "reviews by repo": lambda: history.reviews(repo="github.com/org/repo7"),
+            "reviews by pr": lambda: history.reviews(pr_url="https://github.com/org/repo7/pull/7"),
+            "reviews severity>=error": lambda: history.reviews(severity="error"),
+            "reviews since 1h": lambda: history.reviews(since=now - 3600),
+            "reviews deep page": lambda: history.reviews(cursor=deep),
+            "reviews repo since 1h": lambda: history.reviews(repo="github.com/org/repo7", since=now - 3600),
+            "comments repo": lambda: history.comments(repo="github.com/org/repo7"),
+            "comments repo+error": lambda: history.comments(repo="github.com/org/repo7", severity="error"),
+            "comments by file": lambda: history.comments(file_path="src/f3.py"),
+            "review detail": lambda: history.get(args.reviews // 2),
+        }
+        for name, query in queries.items():
+            samples = []
+            for _ in range(args.iterations):
+                t = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - t) * 1000)
+            print(f"  {name:28s} p50 {statistics.median(samples):7.2f} ms   max {max(samples):7.2f} ms")
+        history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
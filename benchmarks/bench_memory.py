@@ -0,0 +1,85 @@
+"""
+Memory held per review of a large PR.
+
+    python benchmarks/bench_memory.py --files 5000 --reviews 5 --budget-bytes-per-file 2048
+
+Reviews a synthetic PR against the local fake provider and keeps every fetched `PullRequestInfo` and
+`ReviewResult` alive (as concurrent reviews and the result cache do). Reports the RSS growth per review, and the
+bytes a fetched PR retains (tracemalloc); exits non-zero if the retained size exceeds the budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.review_service import ReviewService
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux: peak RSS is the best we have
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--discussion", type=int, default=500)
+    ap.add_argument("--reviews", type=int, default=5)
+    ap.add_argument("--provider", default="gitlab")  # GitHub lists at most 2000 files here
+    ap.add_argument(
+        "--budget-bytes-per-file", type=float, default=2048.0, help="Max bytes a fetched PR retains per file"
+    )
+    args = ap.parse_args()
+
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=args.files, hunks=2, hunk_lines=4, discussion=args.discussion))
+        service = ReviewService.from_config(bench_app_config(server.url))
+        link = pr_link(args.provider, 1)
+        service.review(pr_link=link, llm_provider="heuristic")  # warm-up: imports, pools, caches
+
+        held = []
+        gc.collect()
+        rss0 = rss_bytes()
+        t0 = time.perf_counter()
+        for _ in range(args.reviews):
+            held.append((service.fetch_pr(link), service.review(pr_link=link, llm_provider="heuristic")))
+        elapsed = time.perf_counter() - t0
+        gc.collect()
+        per_review = (rss_bytes() - rss0) / args.reviews
+
+        held.clear()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        pr = service.fetch_pr(link)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+    mib = 1024 * 1024
+    files = max(1, len(pr.changed_files))
+    print(f"{files} files, {len(pr.existing_discussion)} discussion comments, {args.reviews} reviews held "
+          f"({elapsed / args.reviews:.2f}s each)")
+    print(f"RSS growth per review: {per_review / mib:.1f} MiB")
+    print(f"retained per fetched PR: {retained / mib:.1f} MiB ({retained / files:.0f} B/file)")
+    if retained > args.budget_bytes_per_file * files:
+        print("FAIL: fetched PR over memory budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
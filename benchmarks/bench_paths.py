@@ -0,0 +1,59 @@
+"""
+Path classification throughput on a monorepo-sized PR (language + category per changed file).
+
+    python benchmarks/bench_paths.py --paths 50000 --budget-ms 300
+
+Classifies a synthetic mix of source, test, config, vendored and generated paths twice: cold (rules only) and
+warm (memoized), and exits non-zero if the cold pass exceeds the budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from prreviewbot.core.paths import PathClassifier
+
+_NAMES = [
+    "handler.go", "handler_test.go", "service.py", "test_service.py", "index.ts", "index.test.ts", "App.java",
+    "AppTest.java", "values.yaml", "README.md", "Dockerfile", "Makefile", "bundle.min.js", "api.pb.go",
+    "package-lock.json", "schema.sql", "main.rs", "notes.txt",
+]  # fmt: skip
+_DIRS = ["services/{n}/src", "services/{n}/tests", "libs/{n}", "vendor/github.com/x{n}", "web/{n}/node_modules/pkg",
+         "deploy/{n}/charts", "docs/{n}"]  # fmt: skip
+
+
+def _paths(n: int, rng: random.Random):
+    return [f"{rng.choice(_DIRS).format(n=i % 997)}/{i}_{rng.choice(_NAMES)}" for i in range(n)]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--paths", type=int, default=50_000)
+    ap.add_argument("--budget-ms", type=float, default=300.0)
+    args = ap.parse_args()
+
+    paths = _paths(args.paths, random.Random(0))
+    classifier = PathClassifier(cache_size=args.paths)
+    t0 = time.perf_counter()
+    classes = classifier.classify_all(paths)
+    cold_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    classifier.classify_all(paths)
+    warm_ms = (time.perf_counter() - t0) * 1000
+
+    by_category = {}
+    for c in classes:
+        by_category[c.category] = by_category.get(c.category, 0) + 1
+    print(f"{len(paths)} paths: cold {cold_ms:.1f} ms, warm {warm_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("  " + ", ".join(f"{k}={v}" for k, v in sorted(by_category.items())))
+    if cold_ms > args.budget_ms:
+        print("FAIL: path classification over budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Pipelined vs fetch-first reviews of a large PR.
+
+    python benchmarks/bench_pipeline.py --files 2000 --api-latency-ms 50 --llm-ms-per-1k-tokens 100
+
+Both modes review the same chunks (`PRREVIEWBOT_PIPELINE_CHUNK_TOKENS`) against the local fake GitHub and
+OpenAI-compatible endpoints. "fetch-first" waits for every file page before the first LLM call (the old behaviour);
+"pipelined" sends each chunk as soon as its files are in. Prints end-to-end latency next to the fetch and LLM spans.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.review_service import PIPELINE_CHUNK_TOKENS_ENV, ReviewService
+from prreviewbot.providers.base import PullRequestStream
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--iterations", type=int, default=3)
+    ap.add_argument("--chunk-tokens", type=int, default=8000)
+    ap.add_argument("--api-latency-ms", type=float, default=50.0)
+    ap.add_argument("--llm-latency-ms", type=float, default=200.0)
+    ap.add_argument("--llm-ms-per-1k-tokens", type=float, default=100.0)
+    args = ap.parse_args()
+
+    os.environ[PIPELINE_CHUNK_TOKENS_ENV] = str(args.chunk_tokens)
+    with FakeServer(llm_latency_s=args.llm_latency_ms / 1000, api_latency_s=args.api_latency_ms / 1000) as server:
+        server.llm_s_per_1k_tokens = args.llm_ms_per_1k_tokens / 1000
+        server.add_pr(generate_pr(number=1, files=args.files, hunks=2, hunk_lines=4, discussion=50))
+        with redirect_provider_apis(server.url):
+            service = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+            link = pr_link("github", 1)
+            provider, ctx = service._provider_and_context(link)
+
+            async def fetch_first(ctx):
+                return PullRequestStream.ready(await provider.afetch_pr(ctx))
+
+            modes = {
+                "fetch-first": lambda _: (SimpleNamespace(astream_pr=fetch_first, posted=provider.posted), ctx),
+                "pipelined": lambda _: (provider, ctx),
+            }
+            for mode, resolve in modes.items():
+                service._provider_and_context = resolve  # type: ignore[method-assign]
+                runs = []
+                for _ in range(args.iterations):
+                    t0 = time.perf_counter()
+                    result = asyncio.run(service.areview(pr_link=link, llm_provider="openai"))
+                    runs.append((time.perf_counter() - t0, result.timings))
+                e2e = statistics.median(r[0] for r in runs) * 1000
+                fetch = statistics.median(r[1]["fetch"] for r in runs) * 1000
+                llm = statistics.median(r[1]["llm"] for r in runs) * 1000
+                print(f"{mode:<12} e2e={e2e:8.0f}ms  fetch={fetch:8.0f}ms  llm={llm:8.0f}ms  "
+                      f"({len(result.comments)} comments)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
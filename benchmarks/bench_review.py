@@ -0,0 +1,77 @@
+"""
+Standard review benchmark matrix (small / medium / large PRs across all providers).
+
+    python benchmarks/bench_review.py --output bench/HEAD.json
+    python benchmarks/bench_review.py --output bench/new.json --baseline bench/HEAD.json
+
+Each scenario is named "<size>/<provider>" so reports from different commits can be compared with
+`prreviewbot bench --baseline` or `compare_reports()`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from prreviewbot.bench.runner import (
+    BenchConfig,
+    compare_reports,
+    load_report,
+    run_benchmark,
+    write_report,
+)
+
+SIZES = {
+    "small": dict(files=5, hunks=2, hunk_lines=4, discussion=5),
+    "medium": dict(files=50, hunks=4, hunk_lines=8, discussion=40),
+    "large": dict(files=300, hunks=6, hunk_lines=10, discussion=200),
+}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(SIZES), help="Comma-separated subset of: " + ", ".join(SIZES))
+    ap.add_argument("--iterations", type=int, default=5)
+    ap.add_argument("--llm", default="heuristic", choices=["heuristic", "openai"])
+    ap.add_argument("--llm-latency-ms", type=float, default=0.0)
+    ap.add_argument("--output", type=Path, default=None)
+    ap.add_argument("--baseline", type=Path, default=None)
+    ap.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args()
+
+    report = None
+    for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        cfg = BenchConfig(iterations=args.iterations, llm=args.llm, llm_latency_ms=args.llm_latency_ms, **SIZES[size])
+        part = run_benchmark(cfg)
+        for scen in part["scenarios"]:
+            scen["name"] = f"{size}/{scen['provider']}"
+            scen["size"] = size
+        if report is None:
+            report = part
+            report["meta"]["config"] = {"sizes": {}, "iterations": args.iterations, "llm": args.llm}
+        else:
+            report["scenarios"].extend(part["scenarios"])
+        report["meta"]["config"]["sizes"][size] = SIZES[size]
+    if report is None:
+        print("No sizes selected.", file=sys.stderr)
+        return 2
+
+    for scen in report["scenarios"]:
+        lat = scen["latency_ms"]
+        print(f"{scen['name']:<20} p50={lat['p50']:8.1f}ms p95={lat['p95']:8.1f}ms rps={scen['throughput_rps']:7.2f}")
+
+    if args.output:
+        write_report(report, args.output)
+
+    if args.baseline:
+        rows = compare_reports(load_report(args.baseline), report, threshold=args.threshold)
+        regressions = [r for r in rows if r["regression"]]
+        print(json.dumps(regressions, indent=2))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
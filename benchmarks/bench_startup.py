@@ -0,0 +1,48 @@
+"""
+Import-time budget for the headless `prreviewbot review` command.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 150 --output bench/startup.json
+
+Runs `python -X importtime` in fresh interpreters and exits non-zero if the best run exceeds the budget or if
+the web stack / LLM SDK gets imported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from prreviewbot.bench.startup import REVIEW_COMMAND_MODULES, WEB_STACK_MODULES, measure_imports
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget-ms", type=float, default=250.0)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--output", type=Path, default=None)
+    args = ap.parse_args()
+
+    result = measure_imports(REVIEW_COMMAND_MODULES, runs=args.runs)
+    heavy = [m for m in WEB_STACK_MODULES if m in result["loaded"]]
+    print(f"review command imports: {result['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for row in result["top"]:
+        print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        report = {k: v for k, v in result.items() if k != "loaded"}
+        args.output.write_text(json.dumps({**report, "budget_ms": args.budget_ms, "heavy": heavy}, indent=2))
+
+    if heavy:
+        print(f"FAIL: review command imports {', '.join(heavy)}", file=sys.stderr)
+        return 1
+    if result["total_ms"] > args.budget_ms:
+        print("FAIL: import time over budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,806 @@
+from __future__ import annotations
+
+import difflib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from prreviewbot.bench.fixtures import SyntheticComment, SyntheticPR
+
+# Canonical PR links per provider. Provider API traffic for these hosts is redirected to the fake server
+# through PRREVIEWBOT_API_REDIRECT, so the real URL-building code paths are exercised.
+PROVIDER_HOSTS = {
+    "github": "github.com",
+    "gitlab": "gitlab.com",
+    "bitbucket": "bitbucket.org",
+    "azure": "dev.azure.com",
+    "gitea": "gitea.bench.local",
+}
+ALL_PROVIDERS = list(PROVIDER_HOSTS)
+
+
+def pr_link(provider: str, number: int) -> str:
+    host = PROVIDER_HOSTS[provider]
+    if provider == "github":
+        return f"https://{host}/acme/repo/pull/{number}"
+    if provider == "gitlab":
+        return f"https://{host}/acme/repo/-/merge_requests/{number}"
+    if provider == "bitbucket":
+        return f"https://{host}/acme/repo/pull-requests/{number}"
+    if provider == "azure":
+        return f"https://{host}/acme/proj/_git/repo/pullrequest/{number}"
+    if provider == "gitea":
+        return f"https://{host}/acme/repo/pulls/{number}"
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def repo_link(provider: str) -> str:
+    """Repository URL that contains every `pr_link(provider, n)`."""
+    host = PROVIDER_HOSTS[provider]
+    if provider == "azure":
+        return f"https://{host}/acme/proj/_git/repo"
+    return f"https://{host}/acme/repo"
+
+
+class FakeServer:
+    """
+    Local stand-in for GitHub, GitLab, Bitbucket Cloud, Azure DevOps and Gitea REST APIs, plus an
+    OpenAI/AzureOpenAI-compatible chat completions endpoint with configurable latency and its Batch API (files
+    upload, batches, output file download). A batch completes after `batch_polls` status polls. Chat completions
+    stream as server-sent events when asked to; with `llm_structured` off, requests with a `response_format` are
+    rejected the way models without structured outputs reject them. `api_latency_s` delays every provider API
+    response; `llm_s_per_1k_tokens` adds prompt-size dependent latency to chat completions (~4 characters a token).
+
+    All providers serve the same set of synthetic PRs, keyed by PR number.
+    """
+
+    def __init__(
+        self, *, llm_latency_s: float = 0.0, api_latency_s: float = 0.0, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.llm_latency_s = llm_latency_s
+        self.api_latency_s = api_latency_s
+        self.llm_s_per_1k_tokens = 0.0
+        self.prs: Dict[int, SyntheticPR] = {}
+        self.requests: Dict[str, int] = {}
+        self.bytes_out = 0
+        self.connections = 0  # TCP connections accepted (keep-alive clients reuse theirs)
+        self.posts: List[Tuple[str, Any]] = []  # (route, JSON body) of every POST, in arrival order
+        self.batch_polls = 1
+        self.llm_structured = True
+        self.gitea_max_items = 50  # the server's MAX_RESPONSE_ITEMS: larger `limit`s are capped to it
+        self.llm_files: Dict[str, str] = {}  # Batch API file id -> JSONL content
+        self.llm_batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_pr(self, pr: SyntheticPR) -> None:
+        self.prs[pr.number] = pr
+
+    def start(self) -> "FakeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="prreviewbot-fake-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests = {}
+            self.bytes_out = 0
+            self.connections = 0
+            self.posts = []
+
+    def _record(self, route: str, nbytes: int) -> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.bytes_out += nbytes
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+# --- routing ---------------------------------------------------------------------------------------------
+
+# status, content-type, body (dict/list -> JSON, str -> text), optionally followed by extra headers
+_Response = Tuple[Any, ...]
+_Route = Tuple[str, "re.Pattern[str]", str, Callable[..., _Response]]
+
+
+def _make_handler(server: FakeServer):
+    routes = _routes(server)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without TCP_NODELAY keep-alive clients hit the
+        # Nagle/delayed-ACK stall (~40ms per request) and the stand-in would dominate every measurement.
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):  # keep stdout clean during benchmarks
+            pass
+
+        def setup(self):
+            super().setup()
+            with server._lock:
+                server.connections += 1
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def _dispatch(self, method: str) -> None:
+            u = urlsplit(self.path)
+            query = {k: v[-1] for k, v in parse_qs(u.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body: Any = None
+            if raw:
+                try:
+                    body = json.loads(raw)
+                except ValueError:
+                    body = raw.decode("utf-8", "replace")
+
+            for m, pattern, name, fn in routes:
+                if m != method:
+                    continue
+                match = pattern.match(u.path)
+                if not match:
+                    continue
+                if method == "POST":
+                    with server._lock:
+                        server.posts.append((name, body))
+                if server.api_latency_s > 0 and not name.startswith("llm."):
+                    time.sleep(server.api_latency_s)
+                status, ctype, payload, *extra = fn(*[unquote(g) for g in match.groups()], query=query, body=body)
+                self._send(name, status, ctype, payload, *extra)
+                return
+            self._send("not_found", 404, "application/json", {"message": f"No fake route for {method} {u.path}"})
+
+        def _send(
+            self, route: str, status: int, ctype: str, payload: Any, headers: Optional[Dict[str, str]] = None
+        ) -> None:
+            data = payload if isinstance(payload, str) else json.dumps(payload)
+            raw = data.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(raw)))
+            # Counted before the reply goes out, so a client that has its response sees the request counted.
+            server._record(route, len(raw))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    return Handler
+
+
+def _routes(server: FakeServer) -> List[_Route]:
+    def pr_or_404(number: str) -> Optional[SyntheticPR]:
+        return server.prs.get(int(number))
+
+    def json_ok(payload: Any, status: int = 200) -> _Response:
+        return status, "application/json; charset=utf-8", payload
+
+    def not_found() -> _Response:
+        return json_ok({"message": "Not Found"}, 404)
+
+    def page(items: list, query: Dict[str, str], *, default_size: int = 30) -> list:
+        size = int(query.get("per_page") or default_size)
+        num = int(query.get("page") or 1)
+        return items[(num - 1) * size : num * size]
+
+    def open_prs() -> List[SyntheticPR]:
+        return [server.prs[n] for n in sorted(server.prs)]
+
+    # Posted comments join the PR's discussion, so the next fetch sees them (and their hidden markers).
+    drafts: Dict[int, List[SyntheticComment]] = {}
+    reviews: Dict[int, List[SyntheticComment]] = {}  # GitHub reviews posted, per PR
+
+    def remember(number: str, text: Optional[str], file_path: Optional[str] = None) -> None:
+        pr = pr_or_404(number)
+        if pr is not None and text:
+            with server._lock:
+                pr.discussion.append(SyntheticComment(author="prreviewbot", body=text, file_path=file_path))
+
+    # GitHub (github.com -> api.github.com, GHE -> /api/v3) --------------------------------------------
+    def gh_list(o, r, *, query, body):
+        items = [
+            {"number": pr.number, "title": pr.title, "state": "open", "head": {"sha": pr.head_sha}}
+            for pr in open_prs()
+        ]
+        return json_ok(page(items, query))
+
+    def gh_pr(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok(
+            {
+                "number": pr.number,
+                "title": pr.title,
+                "body": pr.description,
+                "state": "open",
+                "head": {"sha": pr.head_sha},
+                "base": {"sha": pr.base_sha},
+            }
+        )
+
+    def gh_files(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        files = [{"filename": f.path, "status": "modified", "patch": f.patch} for f in pr.files]
+        return json_ok(page(files, query))
+
+    def gh_issue_comments(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [
+            {
+                "user": {"login": c.author},
+                "body": c.body,
+                "html_url": f"https://github.com/{o}/{r}/pull/{n}#issuecomment-{i}",
+                "created_at": c.created_at,
+            }
+            for i, c in enumerate(pr.discussion)
+            if not c.file_path
+        ]
+        return json_ok(page(items, query))
+
+    def gh_review_comments(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [
+            {
+                "user": {"login": c.author},
+                "body": c.body,
+                "path": c.file_path,
+                "html_url": f"https://github.com/{o}/{r}/pull/{n}#discussion_r{i}",
+                "created_at": c.created_at,
+            }
+            for i, c in enumerate(pr.discussion)
+            if c.file_path
+        ]
+        return json_ok(page(items, query))
+
+    def gh_post_comment(o, r, n, *, query, body):
+        remember(n, (body or {}).get("body"))
+        return json_ok({"html_url": f"https://github.com/{o}/{r}/pull/{n}#issuecomment-new"}, 201)
+
+    def gh_post_review(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        for c in (body or {}).get("comments") or []:
+            f = pr.file(c.get("path") or "")
+            if f is None or not 1 <= int(c.get("line") or 0) <= len(f.after.splitlines()):
+                return json_ok({"message": "Unprocessable Entity", "errors": ["Line could not be resolved"]}, 422)
+        # Inline comments join the review comments, the review body is listed with the PR's reviews.
+        for c in (body or {}).get("comments") or []:
+            remember(n, c.get("body"), c.get("path"))
+        with server._lock:
+            posted = reviews.setdefault(pr.number, [])
+            posted.append(SyntheticComment(author="prreviewbot", body=(body or {}).get("body") or ""))
+            rid = len(posted)
+        return json_ok({"id": rid, "html_url": f"https://github.com/{o}/{r}/pull/{n}#pullrequestreview-{rid}"}, 200)
+
+    def gh_reviews(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [
+            {
+                "id": i + 1,
+                "user": {"login": c.author},
+                "body": c.body,
+                "state": "COMMENTED",
+                "html_url": f"https://github.com/{o}/{r}/pull/{n}#pullrequestreview-{i + 1}",
+                "submitted_at": c.created_at,
+            }
+            for i, c in enumerate(reviews.get(pr.number, []))
+        ]
+        return json_ok(page(items, query))
+
+    # GitLab -------------------------------------------------------------------------------------------
+    def gl_list(pid, *, query, body):
+        items = [{"iid": pr.number, "title": pr.title, "sha": pr.head_sha, "state": "opened"} for pr in open_prs()]
+        return json_ok(page(items, query, default_size=20))
+
+    def gl_mr(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok(
+            {
+                "iid": pr.number,
+                "title": pr.title,
+                "description": pr.description,
+                "sha": pr.head_sha,
+                "web_url": f"https://gitlab.com/{pid}/-/merge_requests/{pr.number}",
+                "diff_refs": {"base_sha": pr.base_sha, "start_sha": pr.base_sha, "head_sha": pr.head_sha},
+            }
+        )
+
+    def gl_changes(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok({"changes": [{"old_path": f.path, "new_path": f.path, "diff": f.patch} for f in pr.files]})
+
+    def gl_paged(items: list, query: Dict[str, str]) -> _Response:
+        # GitLab's offset pagination headers, which the client uses to fetch the remaining pages concurrently.
+        size = int(query.get("per_page") or 20)
+        num = int(query.get("page") or 1)
+        pages = max((len(items) + size - 1) // size, 1)
+        headers = {"X-Total": str(len(items)), "X-Total-Pages": str(pages), "X-Page": str(num)}
+        headers["X-Next-Page"] = str(num + 1) if num < pages else ""
+        return 200, "application/json; charset=utf-8", items[(num - 1) * size : num * size], headers
+
+    def gl_diffs(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [{"old_path": f.path, "new_path": f.path, "diff": f.patch, "new_file": not f.before} for f in pr.files]
+        return gl_paged(items, query)
+
+    def gl_discussions(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = []
+        for i, c in enumerate(pr.discussion):
+            note: Dict[str, Any] = {
+                "id": i + 1,
+                "author": {"username": c.author},
+                "body": c.body,
+                "created_at": c.created_at,
+                "system": False,
+            }
+            if c.file_path:
+                note["position"] = {"new_path": c.file_path, "old_path": c.file_path, "new_line": 1}
+            items.append({"id": f"d{i + 1}", "individual_note": not c.file_path, "notes": [note]})
+        return gl_paged(items, query)
+
+    def gl_notes(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [
+            {"author": {"username": c.author}, "body": c.body, "created_at": c.created_at}
+            for c in pr.discussion
+        ]
+        return json_ok(page(items, query, default_size=20))
+
+    def gl_post_draft_note(pid, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        position = (body or {}).get("position")
+        if position and pr.file(position.get("new_path") or "") is None:
+            return json_ok({"message": {"position": ["is invalid"]}}, 400)
+        drafts.setdefault(pr.number, []).append(
+            SyntheticComment(author="prreviewbot", body=body.get("note") or "", file_path=(position or {}).get("new_path"))
+        )
+        return json_ok({"id": len(server.posts), "note": body.get("note")}, 201)
+
+    def gl_bulk_publish(pid, n, *, query, body):
+        for c in drafts.pop(int(n), []):
+            remember(n, c.body, c.file_path)
+        return 204, "application/json", ""
+
+    def gl_post_note(pid, n, *, query, body):
+        remember(n, (body or {}).get("body"))
+        return json_ok({"web_url": f"https://gitlab.com/{pid}/-/merge_requests/{n}#note_new"}, 201)
+
+    # Bitbucket Cloud (api.bitbucket.org/2.0) ---------------------------------------------------------
+    def bb_list(w, r, *, query, body):
+        size = int(query.get("pagelen") or 10)
+        num = int(query.get("page") or 1)
+        prs = open_prs()
+        values = [
+            {"id": pr.number, "title": pr.title, "state": "OPEN", "source": {"commit": {"hash": pr.head_sha[:12]}}}
+            for pr in prs[(num - 1) * size : num * size]
+        ]
+        out: Dict[str, Any] = {"values": values, "pagelen": size, "page": num}
+        if num * size < len(prs):
+            out["next"] = (
+                f"https://api.bitbucket.org/2.0/repositories/{w}/{r}/pullrequests?state=OPEN&pagelen={size}&page={num + 1}"
+            )
+        return json_ok(out)
+
+    def bb_pr(w, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok(
+            {"id": pr.number, "title": pr.title, "description": pr.description, "source": {"commit": {"hash": pr.head_sha}}}
+        )
+
+    def bb_diffstat(w, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok({"values": [{"new": {"path": f.path}, "old": {"path": f.path}} for f in pr.files]})
+
+    def bb_diff(w, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return 200, "text/plain; charset=utf-8", pr.unified_diff()
+
+    def bb_comments(w, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        values = [
+            {
+                "user": {"nickname": c.author},
+                "content": {"raw": c.body},
+                "created_on": c.created_at,
+                "links": {"html": {"href": f"https://bitbucket.org/{w}/{r}/pull-requests/{n}#comment-{i}"}},
+            }
+            for i, c in enumerate(pr.discussion)
+        ]
+        return json_ok({"values": values})
+
+    def bb_post_comment(w, r, n, *, query, body):
+        remember(n, ((body or {}).get("content") or {}).get("raw"))
+        return json_ok({"links": {"html": {"href": f"https://bitbucket.org/{w}/{r}/pull-requests/{n}#comment-new"}}}, 201)
+
+    # Azure DevOps -------------------------------------------------------------------------------------
+    def az_list(org, proj, repo, *, query, body):
+        top = int(query.get("$top") or 100)
+        skip = int(query.get("$skip") or 0)
+        value = [
+            {"pullRequestId": pr.number, "title": pr.title, "status": "active", "lastMergeSourceCommit": {"commitId": pr.head_sha}}
+            for pr in open_prs()[skip : skip + top]
+        ]
+        return json_ok({"value": value, "count": len(value)})
+
+    def az_pr(org, proj, repo, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok(
+            {
+                "pullRequestId": pr.number,
+                "title": pr.title,
+                "description": pr.description,
+                "lastMergeSourceCommit": {"commitId": pr.head_sha},
+                "lastMergeTargetCommit": {"commitId": pr.base_sha},
+            }
+        )
+
+    def az_iterations(org, proj, repo, n, *, query, body):
+        return json_ok({"value": [{"id": 1}]})
+
+    def az_changes(org, proj, repo, n, it, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        entries = [
+            {"changeType": "add" if not f.before else "delete" if not f.after else "edit", "item": {"path": "/" + f.path}}
+            for f in pr.files
+        ]
+        top = int(query.get("$top") or 100)
+        skip = int(query.get("$skip") or 0)
+        return json_ok({"changeEntries": entries[skip : skip + top]})
+
+    def az_threads(org, proj, repo, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        value = []
+        for i, c in enumerate(pr.discussion):
+            thread: Dict[str, Any] = {
+                "id": i + 1,
+                "comments": [{"author": {"displayName": c.author}, "content": c.body, "publishedDate": c.created_at}],
+            }
+            if c.file_path:
+                thread["threadContext"] = {"filePath": "/" + c.file_path}
+                thread["properties"] = {"filePath": c.file_path}
+            value.append(thread)
+        return json_ok({"value": value})
+
+    def az_post_thread(org, proj, repo, n, *, query, body):
+        body = body or {}
+        path = (body.get("threadContext") or {}).get("filePath")
+        remember(n, ((body.get("comments") or [{}])[0]).get("content"), path.lstrip("/") if path else None)
+        return json_ok({"id": 999}, 200)
+
+    def az_items(org, proj, repo, *, query, body):
+        path = (query.get("path") or "").lstrip("/")
+        version = query.get("versionDescriptor.version") or ""
+        for pr in server.prs.values():
+            f = pr.file(path)
+            if f is None:
+                continue
+            if version == pr.base_sha:
+                return 200, "text/plain; charset=utf-8", f.before
+            if version == pr.head_sha:
+                return 200, "text/plain; charset=utf-8", f.after
+        return not_found()
+
+    def az_filediffs(org, proj, repo, *, query, body):
+        # Line blocks only, like the real endpoint: the client still needs item content for the text.
+        kinds = {"insert": 1, "delete": 2, "replace": 3}
+        body = body or {}
+        commits = (body.get("baseVersionCommit"), body.get("targetVersionCommit"))
+        pr = next((p for p in server.prs.values() if (p.base_sha, p.head_sha) == commits), None)
+        out = []
+        for param in body.get("fileDiffParams") or []:
+            path = (param.get("path") or "").lstrip("/")
+            f = pr.file(path) if pr else None
+            if f is None:
+                continue
+            codes = difflib.SequenceMatcher(None, f.before.splitlines(True), f.after.splitlines(True)).get_opcodes()
+            blocks = [
+                {
+                    "changeType": kinds[tag],
+                    "originalLineNumberStart": i1 + 1,
+                    "originalLinesCount": i2 - i1,
+                    "modifiedLineNumberStart": j1 + 1,
+                    "modifiedLinesCount": j2 - j1,
+                }
+                for tag, i1, i2, j1, j2 in codes
+                if tag != "equal"
+            ]
+            out.append({"path": "/" + path, "originalPath": "/" + path, "lineDiffBlocks": blocks})
+        return json_ok(out)
+
+    # Gitea (/api/v1) ----------------------------------------------------------------------------------
+    def gt_list(o, r, *, query, body):
+        size = min(int(query.get("limit") or 30), server.gitea_max_items)
+        num = int(query.get("page") or 1)
+        items = [{"number": pr.number, "title": pr.title, "state": "open", "head": {"sha": pr.head_sha}} for pr in open_prs()]
+        headers = {"X-Total-Count": str(len(items))}
+        return 200, "application/json; charset=utf-8", items[(num - 1) * size : num * size], headers
+
+    def gt_pr(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return json_ok({"number": pr.number, "title": pr.title, "body": pr.description, "head": {"sha": pr.head_sha}})
+
+    def gt_diff(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        return 200, "text/plain; charset=utf-8", pr.unified_diff()
+
+    def gt_comments(o, r, n, *, query, body):
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        items = [
+            {"user": {"login": c.author}, "body": c.body, "created_at": c.created_at, "html_url": None}
+            for c in pr.discussion
+            if not c.file_path
+        ]
+        return json_ok(items)
+
+    def gt_reviews(o, r, n, *, query, body):
+        # The PR's inline comments, as one review.
+        pr = pr_or_404(n)
+        if not pr:
+            return not_found()
+        inline = sum(1 for c in pr.discussion if c.file_path)
+        items = [{"id": 1, "user": {"login": "reviewer"}, "body": "", "comments_count": inline}] if inline else []
+        return 200, "application/json; charset=utf-8", items, {"X-Total-Count": str(len(items))}
+
+    def gt_review_comments(o, r, n, rid, *, query, body):
+        pr = pr_or_404(n)
+        if not pr or rid != "1":
+            return not_found()
+        items = [
+            {"user": {"login": c.author}, "body": c.body, "path": c.file_path, "created_at": c.created_at}
+            for c in pr.discussion
+            if c.file_path
+        ]
+        return json_ok(items)
+
+    def gt_post_comment(o, r, n, *, query, body):
+        remember(n, (body or {}).get("body"))
+        return json_ok({"html_url": f"https://gitea.bench.local/{o}/{r}/pulls/{n}#issuecomment-new"}, 201)
+
+    # OpenAI / AzureOpenAI-compatible chat completions -------------------------------------------------
+    def chat(*groups, query, body):
+        body = body if isinstance(body, dict) else {}
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages") or [] if isinstance(m, dict))
+        latency = server.llm_latency_s + server.llm_s_per_1k_tokens * len(prompt) / 4000
+        if latency > 0:
+            time.sleep(latency)
+        if body.get("response_format") and not server.llm_structured:
+            message = "Invalid parameter: 'response_format' is not supported with this model."
+            return json_ok({"error": {"message": message, "type": "invalid_request_error", "param": "response_format"}}, 400)
+        completion = _chat_completion(prompt, model=body.get("model") or (groups[0] if groups else "bench"))
+        if body.get("stream"):
+            return 200, "text/event-stream", _chat_events(completion)
+        return json_ok(completion)
+
+    # OpenAI Batch API (`/v1/...`, or `/openai/...` on Azure OpenAI) --------------------------------------
+    def llm_upload(*groups, query, body):
+        # Multipart upload: keep the JSONL request lines, drop the form boundaries and part headers.
+        text = body if isinstance(body, str) else ""
+        lines = [line for line in text.splitlines() if line.startswith("{") and '"custom_id"' in line]
+        file_id = f"file-{len(server.llm_files) + 1}"
+        server.llm_files[file_id] = "\n".join(lines) + "\n"
+        return json_ok(
+            {"id": file_id, "object": "file", "bytes": len(text), "created_at": int(time.time()),
+             "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+        )
+
+    def llm_create_batch(*groups, query, body):
+        body = body if isinstance(body, dict) else {}
+        if body.get("input_file_id") not in server.llm_files:
+            return json_ok({"error": {"message": "No such file"}}, 400)
+        batch_id = f"batch-{len(server.llm_batches) + 1}"
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": body.get("endpoint"), "errors": None,
+            "input_file_id": body["input_file_id"], "completion_window": body.get("completion_window") or "24h",
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+            "polls_left": server.batch_polls,
+        }
+        server.llm_batches[batch_id] = batch
+        return json_ok(_public_batch(batch))
+
+    def llm_get_batch(*groups, query, body):
+        batch = server.llm_batches.get(groups[-1])
+        if batch is None:
+            return not_found()
+        if batch["status"] not in {"completed", "cancelled"}:
+            batch["polls_left"] -= 1
+            batch["status"] = "in_progress"
+            if batch["polls_left"] <= 0:
+                out = []
+                for line in server.llm_files[batch["input_file_id"]].splitlines():
+                    req = json.loads(line)
+                    prompt = "\n".join(str(m.get("content") or "") for m in req["body"].get("messages") or [])
+                    completion = _chat_completion(prompt, model=req["body"].get("model") or "bench")
+                    response = {"status_code": 200, "request_id": req["custom_id"], "body": completion}
+                    out.append(json.dumps({"id": f"resp-{len(out)}", "custom_id": req["custom_id"], "response": response,
+                                           "error": None}))
+                file_id = f"file-{len(server.llm_files) + 1}"
+                server.llm_files[file_id] = "\n".join(out) + "\n"
+                batch.update(status="completed", output_file_id=file_id)
+        return json_ok(_public_batch(batch))
+
+    def llm_cancel_batch(*groups, query, body):
+        batch = server.llm_batches.get(groups[-1])
+        if batch is None:
+            return not_found()
+        batch["status"] = "cancelled"
+        return json_ok(_public_batch(batch))
+
+    def llm_file_content(*groups, query, body):
+        content = server.llm_files.get(groups[-1])
+        if content is None:
+            return not_found()
+        return 200, "application/octet-stream", content
+
+    _seg = r"([^/]+)"
+    _az = rf"^/{_seg}/{_seg}/_apis/git/repositories/{_seg}"
+    _oai = r"^(?:/v1|/openai)?"
+    return [
+        # Gitea first: it shares the /repos/ shape with GitHub but lives under /api/v1.
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/pulls$"), "gitea.list", gt_list),
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/pulls/(\d+)\.diff$"), "gitea.diff", gt_diff),
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/pulls/(\d+)$"), "gitea.pr", gt_pr),
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/issues/(\d+)/comments$"), "gitea.comments", gt_comments),
+        ("POST", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/issues/(\d+)/comments$"), "gitea.post_comment", gt_post_comment),
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/pulls/(\d+)/reviews$"), "gitea.reviews", gt_reviews),
+        ("GET", re.compile(rf"^/api/v1/repos/{_seg}/{_seg}/pulls/(\d+)/reviews/(\d+)/comments$"), "gitea.review_comments", gt_review_comments),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls$"), "github.list", gh_list),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls/(\d+)$"), "github.pr", gh_pr),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls/(\d+)/files$"), "github.files", gh_files),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/issues/(\d+)/comments$"), "github.issue_comments", gh_issue_comments),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls/(\d+)/comments$"), "github.review_comments", gh_review_comments),
+        ("POST", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/issues/(\d+)/comments$"), "github.post_comment", gh_post_comment),
+        ("POST", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls/(\d+)/reviews$"), "github.post_review", gh_post_review),
+        ("GET", re.compile(rf"^(?:/api/v3)?/repos/{_seg}/{_seg}/pulls/(\d+)/reviews$"), "github.reviews", gh_reviews),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests$"), "gitlab.list", gl_list),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)$"), "gitlab.mr", gl_mr),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/changes$"), "gitlab.changes", gl_changes),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/notes$"), "gitlab.notes", gl_notes),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/diffs$"), "gitlab.diffs", gl_diffs),
+        ("GET", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/discussions$"), "gitlab.discussions", gl_discussions),
+        ("POST", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/notes$"), "gitlab.post_note", gl_post_note),
+        ("POST", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/draft_notes$"), "gitlab.post_draft", gl_post_draft_note),
+        ("POST", re.compile(rf"^/api/v4/projects/{_seg}/merge_requests/(\d+)/draft_notes/bulk_publish$"), "gitlab.publish", gl_bulk_publish),
+        ("GET", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests$"), "bitbucket.list", bb_list),
+        ("GET", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests/(\d+)$"), "bitbucket.pr", bb_pr),
+        ("GET", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests/(\d+)/diffstat$"), "bitbucket.diffstat", bb_diffstat),
+        ("GET", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests/(\d+)/diff$"), "bitbucket.diff", bb_diff),
+        ("GET", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests/(\d+)/comments$"), "bitbucket.comments", bb_comments),
+        ("POST", re.compile(rf"^/2\.0/repositories/{_seg}/{_seg}/pullrequests/(\d+)/comments$"), "bitbucket.post_comment", bb_post_comment),
+        ("GET", re.compile(rf"{_az}/pullrequests$", re.IGNORECASE), "azure.list", az_list),
+        ("GET", re.compile(rf"{_az}/pullRequests/(\d+)$"), "azure.pr", az_pr),
+        ("GET", re.compile(rf"{_az}/pullRequests/(\d+)/iterations$"), "azure.iterations", az_iterations),
+        ("GET", re.compile(rf"{_az}/pullRequests/(\d+)/iterations/(\d+)/changes$"), "azure.changes", az_changes),
+        ("GET", re.compile(rf"{_az}/pullRequests/(\d+)/threads$"), "azure.threads", az_threads),
+        ("POST", re.compile(rf"{_az}/pullRequests/(\d+)/threads$"), "azure.post_thread", az_post_thread),
+        ("GET", re.compile(rf"{_az}/items$"), "azure.items", az_items),
+        ("POST", re.compile(rf"{_az}/filediffs$"), "azure.filediffs", az_filediffs),
+        ("POST", re.compile(rf"^/openai/deployments/{_seg}/chat/completions$"), "llm.chat", chat),
+        ("POST", re.compile(r"^(?:/v1)?/chat/completions$"), "llm.chat", chat),
+        ("POST", re.compile(rf"{_oai}/files$"), "llm.files", llm_upload),
+        ("GET", re.compile(rf"{_oai}/files/{_seg}/content$"), "llm.file_content", llm_file_content),
+        ("POST", re.compile(rf"{_oai}/batches$"), "llm.batch_create", llm_create_batch),
+        ("GET", re.compile(rf"{_oai}/batches/{_seg}$"), "llm.batch_get", llm_get_batch),
+        ("POST", re.compile(rf"{_oai}/batches/{_seg}/cancel$"), "llm.batch_cancel", llm_cancel_batch),
+    ]
+
+
+def _public_batch(batch: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in batch.items() if k != "polls_left"}
+
+
+def _chat_events(completion: Dict[str, Any], *, chunk_chars: int = 48) -> str:
+    """`completion` as a `stream=True` response: `chat.completion.chunk` events of a few characters each."""
+    content = completion["choices"][0]["message"]["content"]
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+            "model": completion["model"]}  # fmt: skip
+    deltas = [{"role": "assistant", "content": ""}]
+    deltas += [{"content": content[i : i + chunk_chars]} for i in range(0, len(content), chunk_chars)]
+    events = [{**base, "choices": [{"index": 0, "delta": d, "finish_reason": None}]} for d in deltas]
+    events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    return "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+
+
+def _chat_completion(prompt: str, *, model: str) -> Dict[str, Any]:
+    paths = re.findall(r"^FILE: (.+)$", prompt, flags=re.MULTILINE)
+    comments = [
+        {
+            "file_path": p,
+            "severity": "warn" if i % 2 == 0 else "info",
+            "message": f"Synthetic finding for {p}.",
+            "suggestion": "Consider extracting this into a helper.",
+            "code_example": None,
+            "start_line": None,
+            "end_line": None,
+            "line_side": None,
+            "related_url": None,
+            "kind": "code_suggestion",
+        }
+        for i, p in enumerate(paths[:5])
+    ]
+    content = json.dumps({"summary": [f"Reviewed {len(paths)} file(s) (fake LLM)."], "comments": comments})
+    prompt_tokens = max(len(prompt) // 4, 1)
+    completion_tokens = max(len(content) // 4, 1)
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
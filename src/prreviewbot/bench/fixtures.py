@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import difflib
+import hashlib
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Cycle through a few languages so language detection / model selection see a realistic mix.
+_EXTENSIONS = [".py", ".ts", ".go", ".java", ".py", ".yaml", ".rs", ".py"]
+
+
+@dataclass
+class SyntheticFile:
+    path: str
+    before: str
+    after: str
+    # Hunks only (what GitHub/GitLab return per file), without `diff --git` / `---` / `+++` headers.
+    patch: str
+
+    def git_block(self) -> str:
+        """This file as a `git diff` block (what Bitbucket/Gitea return in their raw diff endpoints)."""
+        return f"diff --git a/{self.path} b/{self.path}\n--- a/{self.path}\n+++ b/{self.path}\n{self.patch}"
+
+
+@dataclass
+class SyntheticComment:
+    author: str
+    body: str
+    file_path: Optional[str] = None
+    created_at: str = "2024-01-01T00:00:00Z"
+
+
+@dataclass
+class SyntheticPR:
+    number: int
+    title: str
+    description: str
+    base_sha: str
+    head_sha: str
+    files: List[SyntheticFile] = field(default_factory=list)
+    discussion: List[SyntheticComment] = field(default_factory=list)
+
+    def unified_diff(self) -> str:
+        return "".join(f.git_block() for f in self.files)
+
+    def file(self, path: str) -> Optional[SyntheticFile]:
+        for f in self.files:
+            if f.path == path:
+                return f
+        return None
+
+
+def generate_pr(
+    *,
+    number: int = 1,
+    files: int = 20,
+    hunks: int = 3,
+    hunk_lines: int = 6,
+    discussion: int = 10,
+    seed: int = 0,
+) -> SyntheticPR:
+    """
+    Build a deterministic synthetic PR.
+
+    Each file gets `hunks` separated change regions of `hunk_lines` changed lines each; unchanged filler between
+    regions is long enough that difflib never merges neighbouring hunks.
+    """
+    rng = random.Random(seed * 100_003 + number)
+    out_files: List[SyntheticFile] = []
+    for i in range(files):
+        ext = _EXTENSIONS[i % len(_EXTENSIONS)]
+        path = f"src/module_{i // 50:03d}/file_{i:05d}{ext}"
+        before, after = _file_versions(rng, i, hunks=hunks, hunk_lines=hunk_lines)
+        out_files.append(SyntheticFile(path=path, before=before, after=after, patch=_hunks_only(before, after)))
+
+    comments: List[SyntheticComment] = []
+    for j in range(discussion):
+        target = out_files[j % len(out_files)].path if out_files and j % 2 == 0 else None
+        comments.append(
+            SyntheticComment(
+                author=f"reviewer{j % 7}",
+                body=f"Comment {j}: " + " ".join(rng.choice(_WORDS) for _ in range(24)),
+                file_path=target,
+                created_at=f"2024-01-{(j % 28) + 1:02d}T12:00:00Z",
+            )
+        )
+
+    digest = hashlib.sha1(f"{seed}:{number}:{files}:{hunks}:{hunk_lines}".encode()).hexdigest()
+    return SyntheticPR(
+        number=number,
+        title=f"Synthetic PR #{number} ({files} files)",
+        description="Generated by prreviewbot bench.",
+        base_sha="b" + digest[1:],
+        head_sha="h" + digest[1:],
+        files=out_files,
+        discussion=comments,
+    )
+
+
+_WORDS = [
+    "please", "consider", "rename", "this", "helper", "why", "not", "use", "the", "existing", "cache", "here",
+    "edge", "case", "null", "retry", "timeout", "log", "test", "coverage", "nit", "LGTM", "thread", "safety",
+]
+
+_FILLER = 12  # unchanged lines between change regions (> 2x difflib context)
+
+
+def _file_versions(rng: random.Random, idx: int, *, hunks: int, hunk_lines: int) -> tuple[str, str]:
+    before: List[str] = []
+    after: List[str] = []
+    for h in range(max(hunks, 0)):
+        for k in range(_FILLER):
+            line = f"    value_{idx}_{h}_{k} = compute({k})\n"
+            before.append(line)
+            after.append(line)
+        for k in range(hunk_lines):
+            before.append(f"    old_{idx}_{h}_{k} = legacy({rng.randint(0, 999)})\n")
+            if k == 0 and h % 2 == 0:
+                after.append(f"    # TODO: revisit new_{idx}_{h}_{k}\n")
+            elif k == 1:
+                after.append(f"    print(new_{idx}_{h}_{k})\n")
+            else:
+                after.append(f"    new_{idx}_{h}_{k} = modern({rng.randint(0, 999)})\n")
+    for k in range(_FILLER):
+        line = f"    tail_{idx}_{k} = done({k})\n"
+        before.append(line)
+        after.append(line)
+    return "".join(before), "".join(after)
+
+
+def _hunks_only(before: str, after: str) -> str:
+    lines = list(difflib.unified_diff(before.splitlines(), after.splitlines(), lineterm=""))
+    # drop the ---/+++ header lines
+    return "\n".join(lines[2:]) + "\n" if len(lines) > 2 else ""
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import (
+    REPORT_VERSION,
+    bench_app_config,
+    redirect_provider_apis,
+    run_metadata,
+    summarize,
+)
+from prreviewbot.storage.config import ConfigStore
+
+
+@dataclass
+class LoadTestConfig:
+    levels: List[int] = field(default_factory=lambda: [1, 2, 4, 8, 16, 32])
+    duration_s: float = 10.0  # per concurrency level
+    mode: str = "inprocess"  # inprocess (ASGI transport) | http (uvicorn on a local port)
+    provider: str = "github"
+    files: int = 20
+    hunks: int = 3
+    discussion: int = 10
+    llm: str = "heuristic"
+    llm_latency_ms: float = 0.0
+    timeout_s: float = 120.0
+    # Stop ramping once a level breaches either limit ("latency collapse").
+    slo_p95_ms: Optional[float] = None
+    max_error_rate: float = 0.5
+
+
+def run_loadtest(cfg: LoadTestConfig) -> Dict[str, Any]:
+    """
+    Ramp concurrency against `/api/review` and report latency percentiles, error rate and throughput per level.
+
+    The app is built with `create_app` on a throwaway data dir whose config points at the local provider/LLM
+    stand-ins, so results reflect this process' request handling rather than any real upstream.
+    """
+    from prreviewbot.web.app import create_app
+
+    if cfg.mode not in {"inprocess", "http"}:
+        raise ValueError("mode must be 'inprocess' or 'http'")
+
+    with FakeServer(llm_latency_s=cfg.llm_latency_ms / 1000.0) as fake, redirect_provider_apis(fake.url):
+        fake.add_pr(generate_pr(number=1, files=cfg.files, hunks=cfg.hunks, discussion=cfg.discussion))
+        with tempfile.TemporaryDirectory(prefix="prreviewbot-loadtest-") as tmp:
+            data_dir = Path(tmp)
+            ConfigStore(data_dir=data_dir).save(bench_app_config(fake.url, llm=cfg.llm))
+            # Result cache off: every request should exercise the full fetch + LLM path.
+            app = create_app(data_dir=data_dir, result_ttl_s=0)
+            payload = {
+                "pr_link": pr_link(cfg.provider, 1),
+                "language": None,
+                "llm_provider": "openai" if cfg.llm == "openai" else "heuristic",
+                "llm_model": None,
+            }
+            if cfg.mode == "inprocess":
+                levels = asyncio.run(_ramp(cfg, payload, transport=httpx.ASGITransport(app=app), base_url="http://loadtest"))
+            else:
+                with _serve_http(app) as base_url:
+                    levels = asyncio.run(_ramp(cfg, payload, transport=None, base_url=base_url))
+
+    return {
+        "version": REPORT_VERSION,
+        "meta": run_metadata(asdict(cfg)),
+        "levels": levels,
+        "max_sustainable_concurrency": _knee(levels, cfg),
+    }
+
+
+async def _ramp(cfg: LoadTestConfig, payload: Dict[str, Any], *, transport, base_url: str) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(cfg.levels) + 8, max_keepalive_connections=max(cfg.levels) + 8)
+    out: List[Dict[str, Any]] = []
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=cfg.timeout_s, limits=limits) as client:
+        for level in cfg.levels:
+            stats = await _run_level(client, payload, concurrency=level, duration_s=cfg.duration_s)
+            out.append(stats)
+            if _breached(stats, cfg):
+                break
+    return out
+
+
+async def _run_level(client: httpx.AsyncClient, payload: Dict[str, Any], *, concurrency: int, duration_s: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration_s
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                r = await client.post("/api/review", json=payload)
+                kind = None if r.status_code == 200 else f"http_{r.status_code}"
+            except httpx.HTTPError as e:
+                kind = type(e).__name__
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            if kind:
+                errors[kind] = errors.get(kind, 0) + 1
+            else:
+                latencies.append(elapsed)
+
+    wall0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - wall0
+
+    n_err = sum(errors.values())
+    total = len(latencies) + n_err
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "latency_ms": summarize(latencies),
+        "error_rate": (n_err / total) if total else 0.0,
+        "errors": errors,
+        "throughput_rps": (len(latencies) / wall) if wall > 0 else 0.0,
+    }
+
+
+def _breached(stats: Dict[str, Any], cfg: LoadTestConfig) -> bool:
+    if stats["error_rate"] > cfg.max_error_rate:
+        return True
+    return cfg.slo_p95_ms is not None and stats["latency_ms"]["p95"] > cfg.slo_p95_ms
+
+
+def _knee(levels: List[Dict[str, Any]], cfg: LoadTestConfig) -> Optional[int]:
+    """Highest concurrency level that stayed within the SLO/error limits."""
+    best = None
+    for stats in levels:
+        if _breached(stats, cfg):
+            break
+        best = stats["concurrency"]
+    return best
+
+
+@contextmanager
+def _serve_http(app) -> Iterator[str]:
+    import uvicorn
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        port = int(s.getsockname()[1])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, name="prreviewbot-loadtest-uvicorn", daemon=True)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline or not thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.02)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from prreviewbot.bench.fake_server import ALL_PROVIDERS, PROVIDER_HOSTS, FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.providers.base import API_REDIRECT_ENV
+from prreviewbot.storage.config import AppConfig
+
+REPORT_VERSION = 1
+
+
+@dataclass
+class BenchConfig:
+    providers: List[str] = field(default_factory=lambda: list(ALL_PROVIDERS))
+    files: int = 20
+    hunks: int = 3
+    hunk_lines: int = 6
+    discussion: int = 10
+    iterations: int = 5
+    warmup: int = 1
+    concurrency: int = 1
+    llm: str = "heuristic"  # heuristic|openai (openai talks to the fake OpenAI-compatible endpoint)
+    llm_latency_ms: float = 0.0
+    seed: int = 0
+
+
+def bench_app_config(server_url: str, *, llm: str = "heuristic") -> AppConfig:
+    """An AppConfig with tokens for every fake provider host and (optionally) the fake LLM endpoint."""
+    tokens = {p: {h: ("bench:secret" if p == "bitbucket" else "bench-token")} for p, h in PROVIDER_HOSTS.items()}
+    llm_cfg: Dict[str, Any] = {"provider": "heuristic"}
+    if llm == "openai":
+        llm_cfg = {
+            "provider": "openai",
+            "default_model": "bench-model",
+            "openai_api_key": "bench-key",
+            "openai_endpoint": server_url,
+            "openai_api_version": "2024-02-15-preview",
+            "openai_deployment": "bench-model",
+        }
+    return AppConfig(tokens=tokens, llm=llm_cfg)
+
+
+@contextmanager
+def redirect_provider_apis(server_url: str) -> Iterator[None]:
+    """Route all provider API traffic in this process to the fake server."""
+    previous = os.environ.get(API_REDIRECT_ENV)
+    os.environ[API_REDIRECT_ENV] = server_url
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop(API_REDIRECT_ENV, None)
+        else:
+            os.environ[API_REDIRECT_ENV] = previous
+
+
+def run_benchmark(cfg: BenchConfig) -> Dict[str, Any]:
+    from prreviewbot.core.review_service import ReviewService
+
+    for p in cfg.providers:
+        if p not in PROVIDER_HOSTS:
+            raise ValueError(f"Unknown provider: {p} (expected one of {', '.join(ALL_PROVIDERS)})")
+
+    scenarios: List[Dict[str, Any]] = []
+    with FakeServer(llm_latency_s=cfg.llm_latency_ms / 1000.0) as server, redirect_provider_apis(server.url):
+        server.add_pr(
+            generate_pr(
+                number=1,
+                files=cfg.files,
+                hunks=cfg.hunks,
+                hunk_lines=cfg.hunk_lines,
+                discussion=cfg.discussion,
+                seed=cfg.seed,
+            )
+        )
+        service = ReviewService.from_config(bench_app_config(server.url, llm=cfg.llm))
+        llm_provider = "openai" if cfg.llm == "openai" else "heuristic"
+
+        for provider in cfg.providers:
+            link = pr_link(provider, 1)
+
+            def one(link: str = link) -> Dict[str, float]:
+                t0 = time.perf_counter()
+                result = service.review(pr_link=link, llm_provider=llm_provider)
+                timings = dict(result.timings)
+                timings["e2e"] = time.perf_counter() - t0
+                return timings
+
+            for _ in range(cfg.warmup):
+                one()
+            server.reset_stats()
+
+            wall0 = time.perf_counter()
+            if cfg.concurrency <= 1:
+                runs = [one() for _ in range(cfg.iterations)]
+            else:
+                with ThreadPoolExecutor(max_workers=cfg.concurrency) as pool:
+                    runs = list(pool.map(lambda _: one(), range(cfg.iterations)))
+            wall = time.perf_counter() - wall0
+
+            stages = sorted({k for r in runs for k in r if k != "e2e"})
+            scenarios.append(
+                {
+                    "name": provider,
+                    "provider": provider,
+                    "latency_ms": summarize([r["e2e"] * 1000.0 for r in runs]),
+                    "throughput_rps": (len(runs) / wall) if wall > 0 else 0.0,
+                    "stages_ms": {s: summarize([r.get(s, 0.0) * 1000.0 for r in runs]) for s in stages},
+                    "peak_rss_mb": peak_rss_mb(),
+                    "http_requests": sum(server.requests.values()),
+                    "http_bytes": server.bytes_out,
+                }
+            )
+
+    return {"version": REPORT_VERSION, "meta": run_metadata(asdict(cfg)), "scenarios": scenarios}
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0, "min": 0.0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "n": len(values),
+        "min": min(values),
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks (numpy's default method)."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = (len(xs) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def run_metadata(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=str(Path(__file__).resolve().parent),
+        )
+    except Exception:
+        return None
+    if out.returncode != 0:
+        return None
+    return out.stdout.strip() or None
+
+
+# --- report comparison -----------------------------------------------------------------------------------
+
+# metric path -> True if higher is better
+COMPARED_METRICS = {
+    ("latency_ms", "p50"): False,
+    ("latency_ms", "p95"): False,
+    ("throughput_rps",): True,
+    ("peak_rss_mb",): False,
+}
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], *, threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Compare two reports scenario-by-scenario. Returns one row per (scenario, metric) with the relative change
+    and a `regression` flag when the metric got worse by more than `threshold` (0.10 == 10%).
+    """
+    base_by_key = {s.get("name"): s for s in baseline.get("scenarios") or []}
+    rows: List[Dict[str, Any]] = []
+    for scen in current.get("scenarios") or []:
+        key = scen.get("name")
+        base = base_by_key.get(key)
+        if not base:
+            continue
+        for path, higher_is_better in COMPARED_METRICS.items():
+            old = _dig(base, path)
+            new = _dig(scen, path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            rows.append(
+                {
+                    "scenario": key,
+                    "metric": ".".join(path),
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                    "regression": worse > threshold,
+                }
+            )
+    return rows
+
+
+def _dig(d: Dict[str, Any], path: tuple) -> Optional[float]:
+    cur: Any = d
+    for p in path:
+        if not isinstance(cur, dict) or p not in cur:
+            return None
+        cur = cur[p]
+    return float(cur) if isinstance(cur, (int, float)) else None
+
+
+def write_report(report: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
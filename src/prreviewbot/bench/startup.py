@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+# What `prreviewbot review` imports before it starts talking to the provider: the CLI module plus the modules the
+# command body imports. Provider clients and the LLM SDK load later, and only for the provider/LLM actually used.
+REVIEW_COMMAND_MODULES = [
+    "prreviewbot.cli",
+    "prreviewbot.core.review_service",
+    "prreviewbot.storage.config",
+]
+
+# Must never be loaded by the headless `review` command.
+WEB_STACK_MODULES = ["fastapi", "starlette", "uvicorn", "jinja2", "pydantic", "openai", "httpx"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_imports(modules: Sequence[str], *, runs: int = 3) -> Dict[str, object]:
+    """
+    Import `modules` in fresh interpreters under `python -X importtime` and report the best (lowest) run.
+
+    `total_ms` is the cumulative time of the top-level imports attributable to `modules` (interpreter startup and
+    `site` are excluded); `loaded` lists every module the run imported, `top` the ten slowest.
+    """
+    best: Optional[Dict[str, object]] = None
+    for _ in range(max(1, runs)):
+        result = _measure_once(modules)
+        if best is None or result["total_ms"] < best["total_ms"]:  # type: ignore[operator]
+            best = result
+    assert best is not None
+    return best
+
+
+def _measure_once(modules: Sequence[str]) -> Dict[str, object]:
+    code = "; ".join(f"import {m}" for m in modules)
+    env = dict(os.environ)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    total_us = 0
+    loaded: List[str] = []
+    cumulative: Dict[str, int] = {}
+    seen_site = False
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cum_us, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        loaded.append(name)
+        cumulative[name] = cum_us
+        if indent == 1:  # top-level import (one space after the '|')
+            if name == "site":
+                seen_site = True
+                continue
+            if seen_site:
+                total_us += cum_us
+    top = sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {
+        "modules": list(modules),
+        "total_ms": total_us / 1000.0,
+        "loaded": loaded,
+        "top": [{"module": k, "cumulative_ms": v / 1000.0} for k, v in top],
+    }
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
+import os
 import socket
 import webbrowser
 from pathlib import Path
 from typing import Optional
 
 import typer
-import uvicorn
 from rich.console import Console
 
-from prreviewbot.web.app import create_app
+# Keep module-level imports light: every command pays for them. The web stack (FastAPI/Starlette/Jinja2/pydantic,
+# uvicorn), provider clients and the OpenAI SDK are imported inside the commands that need them.
 
 app = typer.Typer(add_completion=False, help="PRreviewBot - local PR review & suggestion bot.")
 console = Console()
@@ -32,14 +33,36 @@ def serve(
     port: int = typer.Option(8765, help="Bind port (auto-fallback if busy)"),
     open_browser: bool = typer.Option(True, "--open/--no-open", help="Open browser"),
     data_dir: Optional[Path] = typer.Option(None, help="Config dir (defaults to ~/.prreviewbot)"),
+    workers: int = typer.Option(
+        1, min=1, help="Worker processes. Workers share the result cache, job queue and metrics via the data dir."
+    ),
 ):
     """Start the local web UI."""
+    import uvicorn
+
+    from prreviewbot.web.app import DATA_DIR_ENV, create_app
+
     chosen_port = _pick_port(port)
     url = f"http://{host}:{chosen_port}"
     if open_browser:
         webbrowser.open(url, new=2)
 
     console.print(f"[bold]PRreviewBot[/bold] running at {url}")
+    if workers > 1:
+        # Multi-process mode needs an import string: uvicorn's supervisor spawns (and respawns) workers that each
+        # build the app via the factory. The data dir reaches them through the environment.
+        if data_dir is not None:
+            os.environ[DATA_DIR_ENV] = str(data_dir.expanduser().resolve())
+        console.print(f"Starting {workers} worker processes")
+        uvicorn.run(
+            "prreviewbot.web.app:create_app_from_env",
+            factory=True,
+            workers=workers,
+            host=host,
+            port=chosen_port,
+            log_level="info",
+        )
+        return
     uvicorn.run(
         create_app(data_dir=data_dir),
         host=host,
@@ -66,3 +89,284 @@ def review(
     console.print(result.as_markdown())
 
 
+@app.command("review-batch")
+def review_batch(
+    source: str = typer.Argument("-", help="File with one PR link per line, or '-' to read stdin"),
+    output: Optional[Path] = typer.Option(None, help="Write JSON Lines here instead of stdout"),
+    concurrency: int = typer.Option(8, min=1, help="Reviews in flight overall"),
+    per_host: int = typer.Option(4, min=1, help="Concurrent fetches per provider host"),
+    per_llm: int = typer.Option(4, min=1, help="Concurrent calls per LLM endpoint"),
+    language: Optional[str] = typer.Option(None, help="Language override for every PR"),
+    llm_provider: Optional[str] = typer.Option(None, help="LLM provider override (heuristic|openai)"),
+    llm_model: Optional[str] = typer.Option(None, help="Model/deployment override"),
+    llm_batch: bool = typer.Option(False, help="Send prompts through the OpenAI Batch API (cheaper; results can take hours)"),
+    data_dir: Optional[Path] = typer.Option(None, help="Config dir (defaults to ~/.prreviewbot)"),
+):
+    """Review many PRs concurrently; prints one JSON line per PR as soon as its review finishes."""
+    import asyncio
+    import json
+    import sys
+
+    from prreviewbot.core.batch import read_pr_links, review_many
+    from prreviewbot.core.limits import KeyedLimiter
+    from prreviewbot.core.review_service import ReviewService
+    from prreviewbot.llm.batch import BatchOptions
+    from prreviewbot.llm.openai_chat import aclose_llms
+    from prreviewbot.providers.registry import aclose_providers
+    from prreviewbot.storage.config import ConfigStore
+
+    if source == "-":
+        links = read_pr_links(sys.stdin)
+    else:
+        links = read_pr_links(Path(source).read_text(encoding="utf-8").splitlines())
+
+    service = ReviewService.from_config(
+        ConfigStore(data_dir=data_dir).load(),
+        host_limits=KeyedLimiter(per_host),
+        llm_limits=KeyedLimiter(per_llm),
+        llm_batch=BatchOptions.from_env() if llm_batch else None,
+    )
+    if llm_batch:
+        # Reviews only wait on their batch: let every PR's prompt join it.
+        concurrency = max(concurrency, len(links))
+    out = output.open("w", encoding="utf-8") if output else sys.stdout
+
+    async def run() -> int:
+        failed = 0
+        try:
+            async for record in review_many(
+                service, links, concurrency=concurrency, language=language, llm_provider=llm_provider, llm_model=llm_model
+            ):
+                failed += 0 if record["ok"] else 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+        finally:
+            await aclose_providers()
+            await aclose_llms()
+        return failed
+
+    try:
+        failed = asyncio.run(run())
+    finally:
+        if output:
+            out.close()
+    Console(stderr=True).print(f"Reviewed {len(links)} PR(s), {failed} failed")
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def sweep(
+    repo_url: str = typer.Argument(..., help="Repository URL (or any PR link / PR list page in it)"),
+    provider: Optional[str] = typer.Option(None, help="Provider hint for self-hosted hosts (e.g. gitea)"),
+    force: bool = typer.Option(False, help="Review PRs even if their head SHA was already reviewed"),
+    output: Optional[Path] = typer.Option(None, help="Write JSON Lines here instead of stdout"),
+    concurrency: int = typer.Option(8, min=1, help="Reviews in flight overall"),
+    per_host: int = typer.Option(4, min=1, help="Concurrent fetches per provider host"),
+    per_llm: int = typer.Option(4, min=1, help="Concurrent calls per LLM endpoint"),
+    language: Optional[str] = typer.Option(None, help="Language override for every PR"),
+    llm_provider: Optional[str] = typer.Option(None, help="LLM provider override (heuristic|openai)"),
+    llm_model: Optional[str] = typer.Option(None, help="Model/deployment override"),
+    llm_batch: bool = typer.Option(False, help="Send prompts through the OpenAI Batch API (cheaper; results can take hours)"),
+    data_dir: Optional[Path] = typer.Option(None, help="Config dir (defaults to ~/.prreviewbot)"),
+):
+    """Review every open PR of a repository whose head SHA has not been reviewed yet (JSON Lines output)."""
+    import asyncio
+    import json
+    import sys
+
+    from prreviewbot.core.limits import KeyedLimiter
+    from prreviewbot.core.review_service import ReviewService
+    from prreviewbot.core.sweep import plan_sweep, run_sweep
+    from prreviewbot.llm.batch import BatchOptions
+    from prreviewbot.llm.openai_chat import aclose_llms
+    from prreviewbot.providers.registry import aclose_providers
+    from prreviewbot.storage.config import ConfigStore
+    from prreviewbot.storage.shared_state import SharedState
+
+    store = ConfigStore(data_dir=data_dir)
+    state = SharedState(data_dir=store.data_dir)
+    service = ReviewService.from_config(
+        store.load(),
+        host_limits=KeyedLimiter(per_host),
+        llm_limits=KeyedLimiter(per_llm),
+        llm_batch=BatchOptions.from_env() if llm_batch else None,
+    )
+    out = output.open("w", encoding="utf-8") if output else sys.stdout
+    err = Console(stderr=True)
+
+    async def run() -> int:
+        try:
+            plan = await plan_sweep(service, repo_url, state=state, provider=provider, force=force)
+            err.print(f"{len(plan.listed)} open PR(s), {len(plan.skipped)} already reviewed at their head SHA")
+            failed = 0
+            async for record in run_sweep(
+                service,
+                plan,
+                state=state,
+                # With --llm-batch reviews only wait on their batch: let every PR's prompt join it.
+                concurrency=max(concurrency, len(plan.to_review)) if llm_batch else concurrency,
+                language=language,
+                llm_provider=llm_provider,
+                llm_model=llm_model,
+            ):
+                failed += 0 if record["ok"] else 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+        finally:
+            await aclose_providers()
+            await aclose_llms()
+        err.print(f"Reviewed {len(plan.to_review)} PR(s), {failed} failed")
+        return failed
+
+    try:
+        failed = asyncio.run(run())
+    finally:
+        if output:
+            out.close()
+        state.close()
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def bench(
+    providers: str = typer.Option("github,gitlab,bitbucket,azure,gitea", help="Comma-separated providers to bench"),
+    files: int = typer.Option(20, help="Changed files per synthetic PR"),
+    hunks: int = typer.Option(3, help="Hunks per file"),
+    hunk_lines: int = typer.Option(6, help="Changed lines per hunk"),
+    discussion: int = typer.Option(10, help="Existing discussion comments per PR"),
+    iterations: int = typer.Option(5, help="Measured reviews per provider"),
+    warmup: int = typer.Option(1, help="Unmeasured warmup reviews per provider"),
+    concurrency: int = typer.Option(1, help="Concurrent reviews (throughput mode when > 1)"),
+    llm: str = typer.Option("heuristic", help="heuristic|openai (openai uses the local fake endpoint)"),
+    llm_latency_ms: float = typer.Option(0.0, help="Latency injected by the fake LLM endpoint"),
+    output: Optional[Path] = typer.Option(None, help="Write the JSON report here"),
+    baseline: Optional[Path] = typer.Option(None, help="Compare against a previous JSON report"),
+    threshold: float = typer.Option(0.10, help="Relative change counted as a regression (0.10 = 10%)"),
+    fail_on_regression: bool = typer.Option(False, help="Exit non-zero when the baseline comparison regresses"),
+):
+    """Benchmark end-to-end reviews against local provider/LLM stand-ins."""
+    from rich.table import Table
+
+    from prreviewbot.bench.runner import (
+        BenchConfig,
+        compare_reports,
+        load_report,
+        run_benchmark,
+        write_report,
+    )
+
+    cfg = BenchConfig(
+        providers=[p.strip().lower() for p in providers.split(",") if p.strip()],
+        files=files,
+        hunks=hunks,
+        hunk_lines=hunk_lines,
+        discussion=discussion,
+        iterations=iterations,
+        warmup=warmup,
+        concurrency=concurrency,
+        llm=llm.strip().lower(),
+        llm_latency_ms=llm_latency_ms,
+    )
+    report = run_benchmark(cfg)
+
+    table = Table(title="PRreviewBot benchmark")
+    for col in ["scenario", "p50 ms", "p95 ms", "rps", "fetch p50", "llm p50", "peak RSS MB", "requests"]:
+        table.add_column(col)
+    for s in report["scenarios"]:
+        stages = s["stages_ms"]
+        rss = s["peak_rss_mb"]
+        table.add_row(
+            s["name"],
+            f"{s['latency_ms']['p50']:.1f}",
+            f"{s['latency_ms']['p95']:.1f}",
+            f"{s['throughput_rps']:.2f}",
+            f"{stages.get('fetch', {}).get('p50', 0.0):.1f}",
+            f"{stages.get('llm', {}).get('p50', 0.0):.1f}",
+            f"{rss:.1f}" if rss is not None else "-",
+            str(s["http_requests"]),
+        )
+    console.print(table)
+
+    if output:
+        write_report(report, output)
+        console.print(f"Report written to {output}")
+
+    if baseline:
+        rows = compare_reports(load_report(baseline), report, threshold=threshold)
+        cmp_table = Table(title=f"Compared to {baseline}")
+        for col in ["scenario", "metric", "baseline", "current", "change"]:
+            cmp_table.add_column(col)
+        regressed = False
+        for r in rows:
+            regressed = regressed or r["regression"]
+            change = f"{r['change'] * 100:+.1f}%"
+            cmp_table.add_row(
+                r["scenario"],
+                r["metric"],
+                f"{r['baseline']:.2f}",
+                f"{r['current']:.2f}",
+                f"[red]{change}[/red]" if r["regression"] else change,
+            )
+        console.print(cmp_table)
+        if regressed and fail_on_regression:
+            raise typer.Exit(code=1)
+
+
+@app.command()
+def loadtest(
+    levels: str = typer.Option("1,2,4,8,16,32", help="Comma-separated concurrency levels to ramp through"),
+    duration: float = typer.Option(10.0, help="Seconds per concurrency level"),
+    mode: str = typer.Option("inprocess", help="inprocess (ASGI, no sockets) | http (uvicorn on a local port)"),
+    provider: str = typer.Option("github", help="Provider stand-in the reviewed PR comes from"),
+    files: int = typer.Option(20, help="Changed files per synthetic PR"),
+    hunks: int = typer.Option(3, help="Hunks per file"),
+    discussion: int = typer.Option(10, help="Existing discussion comments per PR"),
+    llm: str = typer.Option("heuristic", help="heuristic|openai (openai uses the local fake endpoint)"),
+    llm_latency_ms: float = typer.Option(0.0, help="Latency injected by the fake LLM endpoint"),
+    slo_p95_ms: Optional[float] = typer.Option(None, help="Stop ramping once p95 latency exceeds this"),
+    max_error_rate: float = typer.Option(0.5, help="Stop ramping once the error rate exceeds this"),
+    output: Optional[Path] = typer.Option(None, help="Write the JSON report here"),
+):
+    """Load-test /api/review with ramping concurrency to find the capacity of one process."""
+    from rich.table import Table
+
+    from prreviewbot.bench.loadtest import LoadTestConfig, run_loadtest
+    from prreviewbot.bench.runner import write_report
+
+    cfg = LoadTestConfig(
+        levels=[int(x) for x in levels.split(",") if x.strip()],
+        duration_s=duration,
+        mode=mode.strip().lower(),
+        provider=provider.strip().lower(),
+        files=files,
+        hunks=hunks,
+        discussion=discussion,
+        llm=llm.strip().lower(),
+        llm_latency_ms=llm_latency_ms,
+        slo_p95_ms=slo_p95_ms,
+        max_error_rate=max_error_rate,
+    )
+    report = run_loadtest(cfg)
+
+    table = Table(title=f"/api/review capacity ({cfg.mode})")
+    for col in ["concurrency", "requests", "p50 ms", "p95 ms", "p99 ms", "errors", "rps"]:
+        table.add_column(col)
+    for lv in report["levels"]:
+        lat = lv["latency_ms"]
+        table.add_row(
+            str(lv["concurrency"]),
+            str(lv["requests"]),
+            f"{lat['p50']:.1f}",
+            f"{lat['p95']:.1f}",
+            f"{lat['p99']:.1f}",
+            f"{lv['error_rate'] * 100:.1f}%",
+            f"{lv['throughput_rps']:.2f}",
+        )
+    console.print(table)
+    console.print(f"Max sustainable concurrency: {report['max_sustainable_concurrency']}")
+
+    if output:
+        write_report(report, output)
+        console.print(f"Report written to {output}")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code (CLI, sync tests, thread pools).
+
+    If the calling thread already runs an event loop (sync code called from async code), the coroutine runs on
+    a helper thread with its own loop instead of failing with "asyncio.run() cannot be called from a running loop".
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)  # type: ignore[arg-type]
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()  # type: ignore[arg-type]
+
+
+async def offload(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run blocking/CPU-bound work (diffing, regex scans) off the event loop."""
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def gather_all(*aws: Awaitable[Any]) -> List[Any]:
+    """
+    Like asyncio.gather, but if one awaitable fails the others are cancelled (and awaited) before the error
+    propagates, so no request is left running against a client that is about to be closed.
+    """
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        await cancel_all(*tasks)
+        raise
+
+
+async def cancel_all(*tasks: "asyncio.Future[Any]") -> None:
+    """Cancel `tasks` and wait until they are done; their errors are dropped (nobody is left to handle them)."""
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
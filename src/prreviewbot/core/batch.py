@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from prreviewbot.core.errors import AuthRequiredError, PRReviewBotError
+from prreviewbot.core.review_service import ReviewService, review_payload
+
+
+def read_pr_links(lines: Iterable[str]) -> List[str]:
+    """One PR link per line; blank lines and `#` comments are skipped, duplicates are reviewed once."""
+    out: List[str] = []
+    seen = set()
+    for line in lines:
+        link = line.strip()
+        if not link or link.startswith("#") or link in seen:
+            continue
+        seen.add(link)
+        out.append(link)
+    return out
+
+
+async def review_many(
+    service: ReviewService,
+    pr_links: List[str],
+    *,
+    concurrency: int = 8,
+    language: Optional[str] = None,
+    llm_provider: Optional[str] = None,
+    llm_model: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Review `pr_links` with at most `concurrency` reviews in flight and yield one record per PR as it finishes
+    (completion order, not input order). A failing PR yields an error record instead of stopping the batch.
+
+    Per-host / per-LLM-endpoint limits come from the service's `host_limits` / `llm_limits`.
+    """
+    done: asyncio.Queue = asyncio.Queue()
+    pending = iter(pr_links)
+
+    async def worker() -> None:
+        for link in pending:
+            await done.put(await _review_one(service, link, language, llm_provider, llm_model))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(pr_links))))]
+    try:
+        for _ in range(len(pr_links)):
+            yield await done.get()
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _review_one(
+    service: ReviewService,
+    pr_link: str,
+    language: Optional[str],
+    llm_provider: Optional[str],
+    llm_model: Optional[str],
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    record: Dict[str, Any] = {"pr_link": pr_link}
+    try:
+        result = await service.areview(
+            pr_link=pr_link, language=language, llm_provider=llm_provider, llm_model=llm_model
+        )
+        record.update(ok=True, review=review_payload(pr_link, result))
+    except AuthRequiredError as e:
+        record.update(ok=False, error=str(e), error_type="auth_required", provider=e.provider, host=e.host)
+    except PRReviewBotError as e:
+        record.update(ok=False, error=str(e), error_type=type(e).__name__)
+    except Exception as e:
+        record.update(ok=False, error=f"Unexpected error: {e}", error_type=type(e).__name__)
+    record["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    return record
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from typing import Optional
+import hashlib
+import re
+from typing import List, Optional
+
+from prreviewbot.core.types import ReviewComment
+
+# Hidden marker carrying a comment's fingerprint, so a later run can tell it was already posted.
+_MARKER_PREFIX = "<!-- prreviewbot:fp="
+_MARKER_RE = re.compile(r"<!-- prreviewbot:fp=([0-9a-f]{16}) -->")
 
 
 def format_pr_comment_markdown(
@@ -37,6 +45,57 @@ def format_pr_comment_markdown(
         parts += ["", "**Code example**", ce]
 
     parts += ["", f"_Posted via PRreviewBot_"]
+    fingerprint = comment_fingerprint(file_path=file_path, start_line=start_line, end_line=end_line, message=message)
+    parts += [fingerprint_marker(fingerprint)]
     return "\n".join([p for p in parts if p is not None])
 
 
+def format_review_comment_markdown(pr_link: str, comment: ReviewComment) -> str:
+    return format_pr_comment_markdown(
+        pr_link=pr_link,
+        file_path=comment.file_path,
+        severity=comment.severity,
+        message=comment.message,
+        suggestion=comment.suggestion,
+        code_example=comment.code_example,
+        start_line=comment.start_line,
+        end_line=comment.end_line,
+        related_url=comment.related_url,
+    )
+
+
+def inline_lines(comment: ReviewComment) -> Optional[tuple]:
+    """`(start, end)` new/old-file lines an inline comment anchors to, or None if it cannot be anchored."""
+    if not comment.file_path or not (comment.start_line or comment.end_line):
+        return None
+    start = comment.start_line or comment.end_line
+    end = comment.end_line or comment.start_line
+    return (min(start, end), max(start, end))
+
+
+def comment_fingerprint(
+    *, file_path: Optional[str], start_line: Optional[int], end_line: Optional[int], message: str
+) -> str:
+    """Stable id of a suggestion: its file, line range and message (case and whitespace do not matter)."""
+    start = start_line or end_line or 0
+    end = end_line or start_line or 0
+    text = " ".join((message or "").lower().split())
+    key = f"{file_path or ''}\x00{min(start, end)}-{max(start, end)}\x00{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def review_comment_fingerprint(comment: ReviewComment) -> str:
+    return comment_fingerprint(
+        file_path=comment.file_path, start_line=comment.start_line, end_line=comment.end_line, message=comment.message
+    )
+
+
+def fingerprint_marker(fingerprint: str) -> str:
+    return f"{_MARKER_PREFIX}{fingerprint} -->"
+
+
+def comment_markers(text: Optional[str]) -> List[str]:
+    """Fingerprints of the PRreviewBot comments whose markers appear in `text` (a review body can hold several)."""
+    if not text or _MARKER_PREFIX not in text:
+        return []
+    return _MARKER_RE.findall(text)
@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import difflib
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Engine used when none is given; `difflib` keeps the old (quadratic on big rewrites) behaviour available.
+DIFF_ENGINE_ENV = "PRREVIEWBOT_DIFF_ENGINE"
+DEFAULT_ENGINE = "patience"
+# Wall-clock budget for one file; past it the file is shown as a single replacement hunk.
+DEFAULT_TIME_BUDGET_S = 2.0
+
+Opcode = Tuple[str, int, int, int, int]
+Engine = Callable[[Sequence[str], Sequence[str], float], List[Opcode]]
+
+
+class DiffBudgetExceeded(Exception):
+    pass
+
+
+def _intern(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    # Lines become small ints once, so the hot loops compare ints and never slice or copy lines.
+    ids: Dict[str, int] = {}
+    return [ids.setdefault(x, len(ids)) for x in a], [ids.setdefault(x, len(ids)) for x in b]
+
+
+class _Myers:
+    """
+    Myers' O(ND) diff in linear space: find the middle snake of the edit graph from both ends, split there and
+    recurse, trimming common prefixes/suffixes at every level. Works on index ranges of interned line ids.
+    """
+
+    def __init__(self, a: List[int], b: List[int], deadline: float):
+        self.a = a
+        self.b = b
+        self.deadline = deadline
+        self.blocks: List[Tuple[int, int, int]] = []  # matching (i, j, size), in order
+
+    def diff(self, alo: int, ahi: int, blo: int, bhi: int) -> None:
+        a, b = self.a, self.b
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            self._match(start, blo - (alo - start), alo - start)
+        end = ahi
+        while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        suffix = end - ahi
+        if alo < ahi and blo < bhi:
+            if ahi - alo == 1 or bhi - blo == 1:
+                self._single(alo, ahi, blo, bhi)
+            else:
+                x, y = self._bisect(alo, ahi, blo, bhi)
+                self.diff(alo, x, blo, y)
+                self.diff(x, ahi, y, bhi)
+        if suffix:
+            self._match(ahi, bhi, suffix)
+
+    def patience(self, alo: int, ahi: int, blo: int, bhi: int) -> None:
+        """
+        Anchor on lines that occur exactly once on each side (longest increasing run of them), then diff the gaps
+        between anchors; ranges without such lines go to `diff`. Near-linear for large rewrites where plain
+        Myers degrades to O(N*D).
+        """
+        a, b = self.a, self.b
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            self._match(start, blo - (alo - start), alo - start)
+        end = ahi
+        while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        suffix = end - ahi
+        anchors = self._anchors(alo, ahi, blo, bhi)
+        if anchors:
+            i, j = alo, blo
+            for ai, bj in anchors:
+                self.patience(i, ai, j, bj)
+                self._match(ai, bj, 1)
+                i, j = ai + 1, bj + 1
+            self.patience(i, ahi, j, bhi)
+        elif alo < ahi and blo < bhi:
+            self.diff(alo, ahi, blo, bhi)
+        if suffix:
+            self._match(ahi, bhi, suffix)
+
+    def _anchors(self, alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+        a, b = self.a, self.b
+        seen_a: Dict[int, int] = {}
+        for i in range(alo, ahi):
+            seen_a[a[i]] = -1 if a[i] in seen_a else i
+        seen_b: Dict[int, int] = {}
+        for j in range(blo, bhi):
+            x = b[j]
+            if seen_a.get(x, -1) >= 0:
+                seen_b[x] = -1 if x in seen_b else j
+        pairs = [(seen_a[x], j) for x, j in seen_b.items() if j >= 0]
+        if not pairs:
+            return []
+        pairs.sort()
+        # Longest increasing subsequence of b positions (patience sorting).
+        tails: List[int] = []
+        tail_idx: List[int] = []
+        prev = [-1] * len(pairs)
+        for idx, (_, j) in enumerate(pairs):
+            pos = bisect_left(tails, j)
+            if pos == len(tails):
+                tails.append(j)
+                tail_idx.append(idx)
+            else:
+                tails[pos] = j
+                tail_idx[pos] = idx
+            prev[idx] = tail_idx[pos - 1] if pos else -1
+        out: List[Tuple[int, int]] = []
+        idx = tail_idx[-1]
+        while idx >= 0:
+            out.append(pairs[idx])
+            idx = prev[idx]
+        out.reverse()
+        return out
+
+    def _match(self, i: int, j: int, size: int) -> None:
+        if self.blocks:
+            pi, pj, ps = self.blocks[-1]
+            if pi + ps == i and pj + ps == j:
+                self.blocks[-1] = (pi, pj, ps + size)
+                return
+        self.blocks.append((i, j, size))
+
+    def _single(self, alo: int, ahi: int, blo: int, bhi: int) -> None:
+        # One side is a single line (and the ends already differ): it matches at most once, anywhere in the other.
+        if ahi - alo == 1:
+            x = self.a[alo]
+            for j in range(blo, bhi):
+                if self.b[j] == x:
+                    self._match(alo, j, 1)
+                    return
+        else:
+            x = self.b[blo]
+            for i in range(alo, ahi):
+                if self.a[i] == x:
+                    self._match(i, blo, 1)
+                    return
+
+    def _bisect(self, alo: int, ahi: int, blo: int, bhi: int) -> Tuple[int, int]:
+        a, b = self.a, self.b
+        n, m = ahi - alo, bhi - blo
+        max_d = (n + m + 1) // 2
+        off = max_d + 1
+        size = 2 * max_d + 3
+        v1 = [-1] * size
+        v2 = [-1] * size
+        v1[off + 1] = 0
+        v2[off + 1] = 0
+        delta = n - m
+        front = delta % 2 != 0
+        k1start = k1end = k2start = k2end = 0
+        for d in range(max_d + 1):
+            if time.perf_counter() > self.deadline:
+                raise DiffBudgetExceeded()
+            for k1 in range(-d + k1start, d + 1 - k1end, 2):
+                k = off + k1
+                if k1 == -d or (k1 != d and v1[k - 1] < v1[k + 1]):
+                    x1 = v1[k + 1]
+                else:
+                    x1 = v1[k - 1] + 1
+                y1 = x1 - k1
+                while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                    x1 += 1
+                    y1 += 1
+                v1[k] = x1
+                if x1 > n:
+                    k1end += 2
+                elif y1 > m:
+                    k1start += 2
+                elif front:
+                    k2 = off + delta - k1
+                    if 0 <= k2 < size and v2[k2] != -1 and x1 >= n - v2[k2]:
+                        return alo + x1, blo + y1
+            for k2 in range(-d + k2start, d + 1 - k2end, 2):
+                k = off + k2
+                if k2 == -d or (k2 != d and v2[k - 1] < v2[k + 1]):
+                    x2 = v2[k + 1]
+                else:
+                    x2 = v2[k - 1] + 1
+                y2 = x2 - k2
+                while x2 < n and y2 < m and a[ahi - 1 - x2] == b[bhi - 1 - y2]:
+                    x2 += 1
+                    y2 += 1
+                v2[k] = x2
+                if x2 > n:
+                    k2end += 2
+                elif y2 > m:
+                    k2start += 2
+                elif not front:
+                    k1 = off + delta - k2
+                    if 0 <= k1 < size and v1[k1] != -1:
+                        x1 = v1[k1]
+                        y1 = x1 - (delta - k2)
+                        if x1 >= n - x2:
+                            return alo + x1, blo + y1
+        # Unreachable for non-empty ranges: the two searches always meet by d == max_d.
+        return ahi, bhi
+
+
+def _blocks_to_opcodes(blocks: List[Tuple[int, int, int]], n: int, m: int) -> List[Opcode]:
+    """Same shape as `SequenceMatcher.get_opcodes()`."""
+    codes: List[Opcode] = []
+    i = j = 0
+    for ai, bj, size in blocks + [(n, m, 0)]:
+        tag = ""
+        if i < ai and j < bj:
+            tag = "replace"
+        elif i < ai:
+            tag = "delete"
+        elif j < bj:
+            tag = "insert"
+        if tag:
+            codes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            codes.append(("equal", ai, i, bj, j))
+    return codes
+
+
+def myers_opcodes(a: Sequence[str], b: Sequence[str], deadline: float) -> List[Opcode]:
+    ia, ib = _intern(a, b)
+    engine = _Myers(ia, ib, deadline)
+    engine.diff(0, len(ia), 0, len(ib))
+    return _blocks_to_opcodes(engine.blocks, len(ia), len(ib))
+
+
+def patience_opcodes(a: Sequence[str], b: Sequence[str], deadline: float) -> List[Opcode]:
+    ia, ib = _intern(a, b)
+    engine = _Myers(ia, ib, deadline)
+    engine.patience(0, len(ia), 0, len(ib))
+    return _blocks_to_opcodes(engine.blocks, len(ia), len(ib))
+
+
+def difflib_opcodes(a: Sequence[str], b: Sequence[str], deadline: float) -> List[Opcode]:
+    # SequenceMatcher cannot be interrupted; the budget only applies to engines that can check it.
+    return difflib.SequenceMatcher(None, a, b).get_opcodes()
+
+
+_ENGINES: Dict[str, Engine] = {"myers": myers_opcodes, "patience": patience_opcodes, "difflib": difflib_opcodes}
+
+
+def register_engine(name: str, engine: Engine) -> None:
+    """Add a diff engine: `engine(a_lines, b_lines, deadline)` returns `get_opcodes()`-style opcodes."""
+    _ENGINES[name] = engine
+
+
+def engine_names() -> List[str]:
+    return sorted(_ENGINES)
+
+
+def coarse_opcodes(a: Sequence[str], b: Sequence[str]) -> List[Opcode]:
+    """Budget fallback: the common head and tail as context, everything between as one replacement."""
+    n, m = len(a), len(b)
+    lo = 0
+    while lo < n and lo < m and a[lo] == b[lo]:
+        lo += 1
+    hi = 0
+    while hi < n - lo and hi < m - lo and a[n - 1 - hi] == b[m - 1 - hi]:
+        hi += 1
+    codes: List[Opcode] = []
+    if lo:
+        codes.append(("equal", 0, lo, 0, lo))
+    if n - hi > lo or m - hi > lo:
+        tag = "replace" if n - hi > lo and m - hi > lo else ("delete" if n - hi > lo else "insert")
+        codes.append((tag, lo, n - hi, lo, m - hi))
+    if hi:
+        codes.append(("equal", n - hi, n, m - hi, m))
+    return codes
+
+
+def diff_opcodes(
+    a: Sequence[str],
+    b: Sequence[str],
+    *,
+    engine: Optional[str] = None,
+    time_budget_s: float = DEFAULT_TIME_BUDGET_S,
+) -> Tuple[List[Opcode], bool]:
+    """Opcodes from the chosen engine, and whether the time budget forced the coarse fallback."""
+    name = engine or os.environ.get(DIFF_ENGINE_ENV) or DEFAULT_ENGINE
+    if name not in _ENGINES:
+        raise ValueError(f"Unknown diff engine: {name!r} (known: {', '.join(engine_names())})")
+    try:
+        return _ENGINES[name](a, b, time.perf_counter() + time_budget_s), False
+    except DiffBudgetExceeded:
+        return coarse_opcodes(a, b), True
+
+
+def _grouped(codes: List[Opcode], n: int) -> Iterator[List[Opcode]]:
+    # `SequenceMatcher.get_grouped_opcodes`, over precomputed opcodes.
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    nn = n + n
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start if not length else start + 1},{length}"
+
+
+def unified_diff(
+    a: Sequence[str],
+    b: Sequence[str],
+    *,
+    fromfile: str = "",
+    tofile: str = "",
+    n: int = 3,
+    engine: Optional[str] = None,
+    time_budget_s: float = DEFAULT_TIME_BUDGET_S,
+) -> Iterator[str]:
+    """
+    Drop-in for `difflib.unified_diff(a, b, fromfile, tofile, n=n, lineterm="")` with a pluggable engine and a
+    time budget. Output with `engine="difflib"` is identical to difflib's.
+    """
+    codes, _ = diff_opcodes(a, b, engine=engine, time_budget_s=time_budget_s)
+    return format_unified(codes, a, b, fromfile=fromfile, tofile=tofile, n=n)
+
+
+def format_unified(
+    codes: List[Opcode], a: Sequence[str], b: Sequence[str], *, fromfile: str = "", tofile: str = "", n: int = 3
+) -> Iterator[str]:
+    """Unified diff lines for opcodes computed elsewhere (another engine, or a server-side diff)."""
+    codes = list(codes)
+    started = False
+    for group in _grouped(codes, n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}"
+            yield f"+++ {tofile}"
+        first, last = group[0], group[-1]
+        yield f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for k in range(i1, i2):
+                    yield " " + a[k]
+                continue
+            if tag != "insert":
+                for k in range(i1, i2):
+                    yield "-" + a[k]
+            if tag != "delete":
+                for k in range(j1, j2):
+                    yield "+" + b[k]
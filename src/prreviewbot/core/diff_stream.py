@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+from prreviewbot.core.types import ChangedFile
+
+# A single file's patch beyond this is cut (vendored/minified/generated files); the LLM could not use it anyway.
+DEFAULT_MAX_FILE_BYTES = 1_000_000
+# Patch bytes kept for a whole PR; files after the budget is spent are listed without a patch.
+DEFAULT_MAX_TOTAL_BYTES = 20_000_000
+
+TRUNCATED_MARKER = "\n... (diff truncated)\n"
+# Lines before the first `diff --git` header (a non-git diff) are kept as one pseudo-file, as before.
+PREAMBLE_PATH = "(diff)"
+
+_HEADER = re.compile(rb"^diff --git a/(.+?) b/(.+?)\r?$")
+
+
+class DiffSplitter:
+    """
+    Incremental `diff --git` splitter: `feed` raw bytes as they arrive, get back each file's patch as soon as the
+    next file header (or `close`) ends it.
+
+    Only the current file's kept lines are buffered, so memory stays proportional to the largest kept patch no
+    matter how large the whole diff is. Patches are cut at a line boundary once they exceed `max_file_bytes`, and
+    once `max_total_bytes` of patches have been kept, the remaining files get a partial patch or `patch=None`;
+    either way `ChangedFile.truncated` says why and `ChangedFile.diff_bytes` holds the file's full size in the diff.
+    """
+
+    def __init__(self, *, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.kept_bytes = 0
+        self.files_truncated = 0
+        self._carry = b""
+        self._skip_line = False  # inside an over-long line that has already been dropped
+        self._path: Optional[str] = PREAMBLE_PATH
+        self._lines: List[bytes] = []
+        self._file_kept = 0
+        self._size = 0  # bytes of the current file seen so far, kept or not
+        self._truncated: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[ChangedFile]:
+        out: List[ChangedFile] = []
+        buf = self._carry + chunk if self._carry else chunk
+        start = 0
+        while start < len(buf):
+            if self._truncated is not None and not self._skip_line and not buf.startswith(b"diff --git ", start):
+                # The rest of this file is dropped anyway: jump to the next header instead of walking every line.
+                nxt = buf.find(b"\ndiff --git ", start)
+                if nxt < 0:
+                    last = buf.rfind(b"\n", start)
+                    if last >= 0:
+                        self._size += last + 1 - start
+                        start = last + 1
+                    break
+                self._size += nxt + 1 - start
+                start = nxt + 1
+            nl = buf.find(b"\n", start)
+            if nl < 0:
+                break
+            if self._skip_line:
+                self._skip_line = False
+                self._size += nl + 1 - start
+            else:
+                self._line(buf[start : nl + 1], out)
+            start = nl + 1
+        self._carry = buf[start:]
+        if len(self._carry) > self.max_file_bytes:
+            # One huge line (minified code, lockfile blob): it can neither be kept nor be a file header.
+            self._size += len(self._carry)
+            self._cut("file_bytes")
+            self._carry = b""
+            self._skip_line = True
+        return out
+
+    def close(self) -> List[ChangedFile]:
+        out: List[ChangedFile] = []
+        if self._carry and not self._skip_line:
+            self._line(self._carry, out)
+        self._carry = b""
+        self._finish(out)
+        return out
+
+    def _line(self, line: bytes, out: List[ChangedFile]) -> None:
+        if line.startswith(b"diff --git "):
+            m = _HEADER.match(line.rstrip(b"\n"))
+            if m:
+                self._finish(out)
+                self._path = m.group(2).decode("utf-8", "replace")
+        self._size += len(line)
+        if self._truncated is not None:
+            return
+        if self._file_kept + len(line) > self.max_file_bytes:
+            self._cut("file_bytes")
+            return
+        if self.kept_bytes + len(line) > self.max_total_bytes:
+            self._cut("total_bytes")
+            return
+        self._lines.append(line)
+        self._file_kept += len(line)
+        self.kept_bytes += len(line)
+
+    def _cut(self, reason: str) -> None:
+        if self._truncated is None:
+            self._truncated = reason
+            self.files_truncated += 1
+
+    def _finish(self, out: List[ChangedFile]) -> None:
+        path, lines = self._path, self._lines
+        if path is not None and (path != PREAMBLE_PATH or lines):
+            patch: Optional[str] = None
+            if lines:
+                patch = b"".join(lines).decode("utf-8", "replace")
+                if self._truncated is not None:
+                    patch = patch.rstrip("\n") + TRUNCATED_MARKER
+            out.append(ChangedFile(path=path, patch=patch, truncated=self._truncated, diff_bytes=self._size))
+        self._path = None
+        self._lines = []
+        self._file_kept = 0
+        self._size = 0
+        self._truncated = None
+
+
+async def iter_diff_files(
+    chunks: AsyncIterable[bytes],
+    *,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+) -> AsyncIterator[ChangedFile]:
+    """Per-file patches of a streamed unified diff (e.g. `response.aiter_bytes()`), yielded as each file ends."""
+    splitter = DiffSplitter(max_file_bytes=max_file_bytes, max_total_bytes=max_total_bytes)
+    async for chunk in chunks:
+        for f in splitter.feed(chunk):
+            yield f
+    for f in splitter.close():
+        yield f
+
+
+def split_unified_diff(
+    diff: Iterable[bytes] | str,
+    *,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+) -> Iterator[ChangedFile]:
+    """Synchronous `iter_diff_files` over an in-memory diff or an iterable of byte chunks."""
+    splitter = DiffSplitter(max_file_bytes=max_file_bytes, max_total_bytes=max_total_bytes)
+    for chunk in [diff.encode("utf-8")] if isinstance(diff, str) else diff:
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
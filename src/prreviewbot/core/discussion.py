@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import posixpath
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from prreviewbot.core.types import ExistingDiscussionComment
+
+# Prompt budget for the discussion block of one prompt chunk (estimated tokens, see `estimate_tokens`).
+DEFAULT_DISCUSSION_TOKENS = 2000
+# Longest first comment / reply kept per thread, and how many of its latest replies are shown.
+MAX_COMMENT_CHARS = 800
+MAX_REPLY_CHARS = 300
+MAX_REPLIES = 3
+
+# Bots and CI integrations: their comments (coverage reports, build status, dependency bumps) are noise to a reviewer.
+_BOT_AUTHOR_RE = re.compile(
+    r"(\[bot\]$|-bot$|^bot$|^(dependabot|renovate|github-actions|codecov|sonarcloud|sonarqube|snyk|jenkins|"
+    r"azure-pipelines|gitlab-ci|travis|circleci|mergify|netlify|vercel)\b)",
+    re.IGNORECASE,
+)
+_CI_BODY_RE = re.compile(
+    r"^\s*(added \d+ (new )?commits?|changed the description|marked .* as (draft|ready)|"
+    r"(build|pipeline|ci|check) (succeeded|passed|failed|started)|coverage (report|increased|decreased))",
+    re.IGNORECASE,
+)
+_MARKER_RE = re.compile(r"\s*<!-- prreviewbot:fp=[0-9a-f]+ -->")
+
+# Relevance of an entry to a chunk's files; recency (0..1, newest = 1) is added on top with this weight.
+_ON_FILE, _SAME_DIR, _MENTIONS_FILE, _GENERAL = 1.0, 0.5, 0.5, 0.3
+_RECENCY_WEIGHT = 0.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and code); good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def is_noise(comment: ExistingDiscussionComment) -> bool:
+    """Bot/CI comments and empty bodies."""
+    body = (comment.body or "").strip()
+    return not body or bool(_BOT_AUTHOR_RE.search(comment.author or "")) or bool(_CI_BODY_RE.match(body))
+
+
+@dataclass
+class DiscussionEntry:
+    """One thread (or standalone comment) collapsed to a single prompt item."""
+
+    file_path: Optional[str]
+    text: str
+    tokens: int
+    order: int  # position of the thread's first comment in the discussion
+    recency: float = 0.0  # 0 (oldest activity) .. 1 (newest)
+
+
+def compact_discussion(discussion: Sequence[ExistingDiscussionComment]) -> List[DiscussionEntry]:
+    """Drop bot/CI noise and collapse each thread into one entry: its first comment plus the latest replies."""
+    threads: Dict[object, List[ExistingDiscussionComment]] = {}
+    for i, d in enumerate(discussion):
+        if is_noise(d):
+            continue
+        threads.setdefault(d.thread_id if d.thread_id else i, []).append(d)
+
+    entries: List[DiscussionEntry] = []
+    last_activity: List[str] = []
+    for order, comments in enumerate(threads.values()):
+        head, replies = comments[0], comments[1:]
+        loc = f" file={head.file_path}" if head.file_path else ""
+        loc += f":{head.line}" if head.file_path and head.line else ""
+        loc += f" thread={head.thread_id}" if head.thread_id else ""
+        url = f" url={head.url}" if head.url else ""
+        lines = [f"- [{head.kind}] author={head.author}{loc}{url}", f"  {_clip(head.body, MAX_COMMENT_CHARS)}"]
+        if len(replies) > MAX_REPLIES:
+            lines.append(f"  ↳ ({len(replies) - MAX_REPLIES} earlier replies)")
+        for r in replies[-MAX_REPLIES:]:
+            lines.append(f"  ↳ {r.author}: {_clip(r.body, MAX_REPLY_CHARS)}")
+        text = "\n".join(lines)
+        entries.append(DiscussionEntry(file_path=head.file_path, text=text, tokens=estimate_tokens(text), order=order))
+        last_activity.append(max((c.created_at or "" for c in comments), default=""))
+
+    # ISO-8601 timestamps sort as strings; entries without one keep their discussion order.
+    ranked = sorted(range(len(entries)), key=lambda i: (last_activity[i], i))
+    for rank, i in enumerate(ranked):
+        entries[i].recency = rank / (len(entries) - 1) if len(entries) > 1 else 1.0
+    return entries
+
+
+class DiscussionContext:
+    """
+    A PR's discussion, compacted once and then selected per prompt chunk: entries are ranked by relevance to the
+    chunk's files and by recency, and the best ones are kept until the token budget is spent. Selections are
+    cached per set of files, so chunks that share files (or repeated prompts) do not rank again.
+    """
+
+    def __init__(
+        self, discussion: Sequence[ExistingDiscussionComment], *, token_budget: int = DEFAULT_DISCUSSION_TOKENS
+    ):
+        self.entries = compact_discussion(discussion)
+        self.token_budget = token_budget
+        self._blocks: Dict[FrozenSet[str], str] = {}
+
+    def select(self, paths: Iterable[str]) -> List[DiscussionEntry]:
+        paths = set(paths)
+        dirs = {posixpath.dirname(p) for p in paths}
+        names = {posixpath.basename(p) for p in paths}
+
+        def score(e: DiscussionEntry) -> float:
+            if e.file_path in paths:
+                relevance = _ON_FILE
+            elif e.file_path and posixpath.dirname(e.file_path) in dirs:
+                relevance = _SAME_DIR
+            elif any(n in e.text for n in names):
+                relevance = _MENTIONS_FILE
+            else:
+                relevance = _GENERAL if not e.file_path else 0.0
+            return relevance + _RECENCY_WEIGHT * e.recency
+
+        picked: List[DiscussionEntry] = []
+        left = self.token_budget
+        for e in sorted(self.entries, key=score, reverse=True):
+            if e.tokens <= left:
+                picked.append(e)
+                left -= e.tokens
+        return sorted(picked, key=lambda e: e.order)
+
+    def block(self, paths: Iterable[str]) -> str:
+        """The prompt's discussion section for a chunk reviewing `paths` ("" when nothing is left to show)."""
+        key = frozenset(paths)
+        if key not in self._blocks:
+            picked = self.select(key)
+            text = ""
+            if picked:
+                text = "\n\nEXISTING REVIEW DISCUSSION:\n" + "\n".join(e.text for e in picked) + "\n"
+                if len(picked) < len(self.entries):
+                    text += f"({len(self.entries) - len(picked)} less relevant discussion items omitted)\n"
+            self._blocks[key] = text
+        return self._blocks[key]
+
+
+def _clip(body: Optional[str], limit: int) -> str:
+    text = _MARKER_RE.sub("", body or "").strip()
+    return text[:limit] + "…" if len(text) > limit else text
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import ssl
+from functools import lru_cache
+
+import httpx
+
+
+@lru_cache(maxsize=1)
+def shared_ssl_context() -> ssl.SSLContext:
+    """
+    One client SSLContext per process.
+
+    Building a context loads the CA bundle, which costs ~40ms of CPU. Done per request, that runs on the event loop
+    and caps async throughput far below what the network allows. Client-side contexts are safe to share.
+    """
+    return httpx.create_ssl_context()
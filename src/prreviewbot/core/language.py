@@ -1,53 +1,74 @@
 from __future__ import annotations
 
 from collections import Counter
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from prreviewbot.core.paths import CODE_CATEGORIES, GENERATED, VENDORED, classify_path
 from prreviewbot.core.types import ChangedFile
 
+# Languages with less than this share of a PR's changed lines are reviewed along with the primary language.
+MIN_LANGUAGE_SHARE = 0.05
 
-EXT_TO_LANG = {
-    ".py": "python",
-    ".ipynb": "python",
-    ".js": "javascript",
-    ".jsx": "javascript",
-    ".ts": "typescript",
-    ".tsx": "typescript",
-    ".java": "java",
-    ".kt": "kotlin",
-    ".go": "go",
-    ".rs": "rust",
-    ".cs": "csharp",
-    ".cpp": "cpp",
-    ".cc": "cpp",
-    ".cxx": "cpp",
-    ".c": "c",
-    ".h": "c",
-    ".hpp": "cpp",
-    ".php": "php",
-    ".rb": "ruby",
-    ".swift": "swift",
-    ".scala": "scala",
-    ".sql": "sql",
-    ".yaml": "yaml",
-    ".yml": "yaml",
-    ".tf": "terraform",
-    ".md": "markdown",
-}
+
+def language_of(path: str) -> Optional[str]:
+    return classify_path(path).language
+
+
+def changed_lines(f: ChangedFile) -> int:
+    """Added + removed lines of a file's diff (at least 1, so files without a patch still count)."""
+    n = 0
+    for line in (f.patch or "").splitlines():
+        if line[:1] in "+-" and not line.startswith(("+++", "---")):
+            n += 1
+    return max(n, 1)
+
+
+def language_weights(changed_files: Iterable[ChangedFile]) -> Tuple[Counter, Counter]:
+    """
+    Changed lines per language: of all files, and of code (source/test) files only. Files of unknown languages and
+    generated/vendored files are left out.
+    """
+    counts: Counter = Counter()
+    code: Counter = Counter()
+    for f in changed_files:
+        c = classify_path(f.path)
+        if c.language and c.category not in (GENERATED, VENDORED):
+            n = changed_lines(f)
+            counts[c.language] += n
+            if c.category in CODE_CATEGORIES:
+                code[c.language] += n
+    return counts, code
 
 
 def detect_language(changed_files: Iterable[ChangedFile], override: Optional[str] = None) -> str:
+    """The PR's primary language: the code language with the most changed lines."""
     if override:
         return normalize_language(override)
-    counts = Counter()
-    for f in changed_files:
-        ext = "." + f.path.split(".")[-1].lower() if "." in f.path else ""
-        lang = EXT_TO_LANG.get(ext)
-        if lang:
-            counts[lang] += 1
-    if counts:
-        return counts.most_common(1)[0][0]
-    return "general"
+    return _primary(*language_weights(changed_files))
+
+
+def group_by_language(changed_files: Iterable[ChangedFile]) -> Dict[str, List[ChangedFile]]:
+    """
+    Files per language, primary language first. Files of unknown languages, generated/vendored files and languages
+    below `MIN_LANGUAGE_SHARE` of the changed lines (or with no weight at all) go with the primary language. Groups
+    are never empty, except the primary's for a PR without files.
+    """
+    files = list(changed_files)
+    weights, code = language_weights(files)
+    primary = _primary(weights, code)
+    total = sum(weights.values())
+    groups: Dict[str, List[ChangedFile]] = {primary: []}
+    for f in files:
+        lang = language_of(f.path)
+        if not lang or not weights[lang] or weights[lang] < MIN_LANGUAGE_SHARE * total:
+            lang = primary
+        groups.setdefault(lang, []).append(f)
+    return {lang: group for lang, group in groups.items() if group} or groups
+
+
+def _primary(weights: Counter, code: Counter) -> str:
+    ranked = (code or weights).most_common(1)
+    return ranked[0][0] if ranked else "general"
 
 
 def normalize_language(lang: str) -> str:
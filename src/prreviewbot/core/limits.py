@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class KeyedLimiter:
+    """
+    One concurrency limit per key (e.g. per provider host, per LLM endpoint), created on first use.
+    Semaphores bind to the event loop that first waits on them, so use one limiter per loop.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        self.limit = limit
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, key: str) -> AsyncIterator[None]:
+        sem = self._sems.get(key)
+        if sem is None:
+            sem = self._sems[key] = asyncio.Semaphore(self.limit)
+        async with sem:
+            yield
+
+
+@asynccontextmanager
+async def limited(limiter: Optional[KeyedLimiter], key: str) -> AsyncIterator[None]:
+    """`limiter.slot(key)`, or no limit at all when `limiter` is None."""
+    if limiter is None:
+        yield
+        return
+    async with limiter.slot(key):
+        yield
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional
 from urllib.parse import urlparse
 
 
 @dataclass(frozen=True)
 class ParsedLink:
-    provider: str  # github|gitlab|bitbucket|azure
+    provider: str  # github|gitlab|bitbucket|azure|gitea, or a plugin provider name
     host: str
     owner: Optional[str] = None
     repo: Optional[str] = None
@@ -19,6 +19,15 @@ class ParsedLink:
     namespace_path: Optional[str] = None  # gitlab group/subgroup/project path
 
 
+# Parsers tried for URLs no built-in pattern matches; `providers.registry` adds the plugin providers' here.
+_fallback_parsers: List[Callable[[str], Optional[ParsedLink]]] = []
+
+
+def register_link_parser(parser: Callable[[str], Optional[ParsedLink]]) -> None:
+    if parser not in _fallback_parsers:
+        _fallback_parsers.append(parser)
+
+
 def parse_pr_link(pr_url: str) -> ParsedLink:
     u = urlparse(pr_url)
     if not u.scheme or not u.netloc:
@@ -91,6 +100,66 @@ def parse_pr_link(pr_url: str) -> ParsedLink:
             pr_number=int(m.group(3)),
         )
 
+    for parser in _fallback_parsers:
+        parsed = parser(pr_url)
+        if parsed is not None:
+            return parsed
+
     raise ValueError("Unsupported PR URL format (supported: GitHub, GitLab, Bitbucket Cloud, Azure DevOps).")
 
 
+# Trailing PR-list pages that may be pasted instead of the bare repository URL.
+_REPO_LIST_SUFFIX = re.compile(r"/(?:pulls|pull-requests|pullrequests|-/merge_requests)$")
+
+
+def parse_repo_link(repo_url: str, *, provider: Optional[str] = None) -> ParsedLink:
+    """
+    Parse a repository URL (or any PR link / PR list page inside it) into a ParsedLink without `pr_number`.
+
+    Self-hosted GitHub Enterprise and Gitea repository URLs look the same (`/{owner}/{repo}`); unknown hosts are
+    treated as GitHub unless `provider` says otherwise.
+    """
+    try:
+        return replace(parse_pr_link(repo_url), pr_number=None)
+    except ValueError:
+        pass
+
+    u = urlparse(repo_url)
+    if not u.scheme or not u.netloc:
+        raise ValueError("Invalid URL")
+    host = u.netloc
+    path = _REPO_LIST_SUFFIX.sub("", (u.path or "").rstrip("/"))
+    if path.endswith(".git"):
+        path = path[: -len(".git")]
+    segs = [s for s in path.split("/") if s]
+
+    kind = (provider or "").strip().lower() or None
+    if kind is None:
+        if host.endswith("dev.azure.com") or host.endswith("visualstudio.com") or "_git" in segs:
+            kind = "azure"
+        elif host.endswith("bitbucket.org"):
+            kind = "bitbucket"
+        elif host == "github.com":
+            kind = "github"
+        elif host == "gitlab.com" or "-" in segs or len(segs) > 2:
+            kind = "gitlab"
+        else:
+            kind = "github"
+
+    if kind == "azure":
+        m = re.match(r"^/([^/]+)/([^/]+)/_git/([^/]+)$", path)
+        if m and host.endswith("dev.azure.com"):
+            return ParsedLink(provider="azure", host=host, org=m.group(1), project=m.group(2), repo=m.group(3))
+        m = re.match(r"^/([^/]+)/_git/([^/]+)$", path)
+        if m and host.endswith("visualstudio.com"):
+            return ParsedLink(provider="azure", host=host, org=host.split(".")[0], project=m.group(1), repo=m.group(2))
+    elif kind == "gitlab":
+        ns = "/".join(segs[: segs.index("-")] if "-" in segs else segs)
+        if ns.count("/") >= 1:
+            return ParsedLink(provider="gitlab", host=host, namespace_path=ns)
+    elif kind == "bitbucket" and len(segs) == 2:
+        return ParsedLink(provider="bitbucket", host=host, workspace=segs[0], repo=segs[1])
+    elif kind in {"github", "gitea"} and len(segs) == 2:
+        return ParsedLink(provider=kind, host=host, owner=segs[0], repo=segs[1])
+
+    raise ValueError(f"Unsupported repository URL format for {kind}: {repo_url}")
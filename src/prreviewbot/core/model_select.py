@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 @dataclass(frozen=True)
 class ModelChoice:
     provider: str  # heuristic|openai
     model: str
+    # Why this model was picked, in decision order (recorded with the review as `ReviewResult.routing`).
+    reasons: Tuple[str, ...] = ()
+    estimated_cost_usd: Optional[float] = None
 
 
 DEFAULT_LANGUAGE_MODEL_MAP: Dict[str, ModelChoice] = {
@@ -30,22 +35,203 @@ def choose_model(
     llm_provider: str,
     llm_default_model: Optional[str],
     overrides: Dict[str, Dict[str, str]],
+    pr_tokens: Optional[int] = None,
+    routing: Optional["RoutingPolicy"] = None,
+    stats: Optional["ModelStats"] = None,
+) -> ModelChoice:
+    """
+    The language map's model (Settings overrides first), then, when a `routing` policy is configured and
+    `pr_tokens` is known, re-routed among the policy's models by PR size, observed latency/error rate (`stats`)
+    and price.
+    """
+    base = _language_choice(language=language, llm_provider=llm_provider, llm_default_model=llm_default_model,
+                            overrides=overrides)  # fmt: skip
+    if routing is None or pr_tokens is None or base.provider == "heuristic" or not routing.models:
+        return base
+    return routing.route(base, pr_tokens=pr_tokens, stats=stats or MODEL_STATS)
+
+
+def _language_choice(
+    *,
+    language: str,
+    llm_provider: str,
+    llm_default_model: Optional[str],
+    overrides: Dict[str, Dict[str, str]],
 ) -> ModelChoice:
     lang = language.lower()
 
     if lang in overrides:
         o = overrides[lang]
-        return ModelChoice(provider=o.get("provider", llm_provider), model=o.get("model", llm_default_model or ""))
+        return ModelChoice(
+            provider=o.get("provider", llm_provider),
+            model=o.get("model", llm_default_model or ""),
+            reasons=(f"model map override for {lang}",),
+        )
 
     # Respect the active provider. Language mapping primarily influences the model/deployment name.
     if lang in DEFAULT_LANGUAGE_MODEL_MAP:
         default = DEFAULT_LANGUAGE_MODEL_MAP[lang]
         if llm_provider in {"openai", "azure_openai"}:
-            return ModelChoice(provider=llm_provider, model=llm_default_model or default.model)
-        return ModelChoice(provider="heuristic", model="heuristic")
+            model = llm_default_model or default.model
+            why = "configured default model" if llm_default_model else f"default model for {lang}"
+            return ModelChoice(provider=llm_provider, model=model, reasons=(why,))
+        return ModelChoice(provider="heuristic", model="heuristic", reasons=("no LLM provider configured",))
 
     if llm_provider in {"openai", "azure_openai"}:
-        return ModelChoice(provider=llm_provider, model=llm_default_model or "gpt-4o-mini")
-    return ModelChoice(provider="heuristic", model="heuristic")
+        why = "configured default model" if llm_default_model else "fallback default model"
+        return ModelChoice(provider=llm_provider, model=llm_default_model or "gpt-4o-mini", reasons=(why,))
+    return ModelChoice(provider="heuristic", model="heuristic", reasons=("no LLM provider configured",))
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    name: str  # model (or gateway deployment) name
+    context_tokens: int = 128_000
+    input_per_1m: float = 0.0  # USD per million prompt tokens
+    output_per_1m: float = 0.0  # USD per million completion tokens
+
+    def cost(self, prompt_tokens: int, output_tokens: int) -> float:
+        return (prompt_tokens * self.input_per_1m + output_tokens * self.output_per_1m) / 1_000_000
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """
+    `AppConfig.model_routing`, e.g.::
+
+        {"models": {"gpt-4o-mini": {"context_tokens": 128000, "input_per_1m": 0.15, "output_per_1m": 0.6},
+                    "gpt-4.1": {"context_tokens": 1000000, "input_per_1m": 2.0, "output_per_1m": 8.0}},
+         "small_pr_tokens": 2000, "max_cost_usd": 0.5, "latency_slo_s": 60, "max_error_rate": 0.3}
+
+    A model is eligible when the prompt fits its context and it is within the cost budget, latency SLO and error
+    rate. Small PRs go to the cheapest (then fastest) eligible model; other PRs keep the language map's model if
+    it is eligible, else get the cheapest eligible one.
+    """
+
+    models: Tuple[ModelProfile, ...] = ()
+    small_pr_tokens: int = 2000
+    max_cost_usd: Optional[float] = None
+    latency_slo_s: Optional[float] = None
+    max_error_rate: float = 0.5
+    # Added to the diff's tokens: instructions and the discussion block; and the expected size of the answer.
+    prompt_overhead_tokens: int = 3000
+    output_tokens: int = 1500
+
+    @staticmethod
+    def from_config(data: Optional[Dict[str, Any]]) -> Optional["RoutingPolicy"]:
+        if not data or not data.get("models"):
+            return None
+        d = RoutingPolicy()
+        models = tuple(
+            ModelProfile(
+                name=name,
+                context_tokens=int(p.get("context_tokens") or ModelProfile.context_tokens),
+                input_per_1m=float(p.get("input_per_1m") or 0.0),
+                output_per_1m=float(p.get("output_per_1m") or 0.0),
+            )
+            for name, p in (data.get("models") or {}).items()
+        )
+        return RoutingPolicy(
+            models=models,
+            small_pr_tokens=int(data.get("small_pr_tokens") or d.small_pr_tokens),
+            max_cost_usd=float(data["max_cost_usd"]) if data.get("max_cost_usd") is not None else None,
+            latency_slo_s=float(data["latency_slo_s"]) if data.get("latency_slo_s") is not None else None,
+            max_error_rate=float(data.get("max_error_rate") or d.max_error_rate),
+            prompt_overhead_tokens=int(data.get("prompt_overhead_tokens") or d.prompt_overhead_tokens),
+            output_tokens=int(data.get("output_tokens") or d.output_tokens),
+        )
+
+    def route(self, base: ModelChoice, *, pr_tokens: int, stats: "ModelStats") -> ModelChoice:
+        prompt_tokens = pr_tokens + self.prompt_overhead_tokens
+        reasons: List[str] = list(base.reasons) + [f"~{prompt_tokens} prompt tokens"]
+        eligible: List[Tuple[float, float, ModelProfile]] = []
+        for m in self.models:
+            cost = m.cost(prompt_tokens, self.output_tokens)
+            latency, error_rate = stats.get(m.name)
+            if prompt_tokens + self.output_tokens > m.context_tokens:
+                reasons.append(f"{m.name}: context {m.context_tokens} too small")
+            elif self.max_cost_usd is not None and cost > self.max_cost_usd:
+                reasons.append(f"{m.name}: ${cost:.4f} over budget ${self.max_cost_usd:g}")
+            elif self.latency_slo_s is not None and latency is not None and latency > self.latency_slo_s:
+                reasons.append(f"{m.name}: latency {latency:.1f}s over SLO {self.latency_slo_s:g}s")
+            elif error_rate is not None and error_rate > self.max_error_rate:
+                reasons.append(f"{m.name}: error rate {error_rate:.0%} over {self.max_error_rate:.0%}")
+            else:
+                eligible.append((cost, latency if latency is not None else 0.0, m))
+
+        if not eligible:
+            # Nothing meets every constraint: take the largest context that fits, else the base model.
+            fits = [m for m in self.models if prompt_tokens + self.output_tokens <= m.context_tokens]
+            if not fits:
+                reasons.append(f"no model fits; kept {base.model}")
+                return ModelChoice(provider=base.provider, model=base.model, reasons=tuple(reasons))
+            pick = max(fits, key=lambda m: m.context_tokens)
+            reasons.append(f"no model meets budget/SLO; {pick.name} has the largest context")
+            cost = pick.cost(prompt_tokens, self.output_tokens)
+            return ModelChoice(
+                provider=base.provider, model=pick.name, reasons=tuple(reasons), estimated_cost_usd=round(cost, 6)
+            )
+
+        by_name = {m.name: (cost, m) for cost, _, m in eligible}
+        if pr_tokens > self.small_pr_tokens and base.model in by_name:
+            cost, pick = by_name[base.model]
+            reasons.append(f"kept {pick.name}")
+        else:
+            cost, _, pick = min(eligible, key=lambda e: (e[0], e[1]))
+            size = "small PR" if pr_tokens <= self.small_pr_tokens else f"{base.model} not eligible"
+            reasons.append(f"{size}: cheapest eligible model {pick.name}")
+        return ModelChoice(
+            provider=base.provider, model=pick.name, reasons=tuple(reasons), estimated_cost_usd=round(cost, 6)
+        )
+
+
+class ModelStats:
+    """
+    Recent latency (EWMA of successful calls) and error rate (EWMA) per model, observed by this process. A model's
+    stats are forgotten once it has not been called for `max_age_s`: a model excluded for being slow or failing
+    gets no calls, so this is what lets it be tried again and its stats recover.
+    """
+
+    def __init__(
+        self,
+        *,
+        alpha: float = 0.2,
+        min_calls: int = 3,
+        max_age_s: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.alpha = alpha
+        self.min_calls = min_calls
+        self.max_age_s = max_age_s
+        self._clock = clock
+        self._stats: Dict[str, List[float]] = {}  # model -> [calls, latency_ewma, error_ewma, last call]
+        self._lock = threading.Lock()
+
+    def record(self, model: str, *, ok: bool, latency_s: float) -> None:
+        now = self._clock()
+        with self._lock:
+            s = self._stats.get(model)
+            if s is None or now - s[3] > self.max_age_s:
+                self._stats[model] = [1, latency_s if ok else 0.0, 0.0 if ok else 1.0, now]
+                return
+            s[0] += 1
+            if ok:
+                s[1] = latency_s if s[1] == 0.0 else s[1] + self.alpha * (latency_s - s[1])
+            s[2] += self.alpha * ((0.0 if ok else 1.0) - s[2])
+            s[3] = now
+
+    def get(self, model: str) -> Tuple[Optional[float], Optional[float]]:
+        """(latency_s, error_rate), each None until the model has `min_calls` recent observations."""
+        now = self._clock()
+        with self._lock:
+            s = self._stats.get(model)
+            if s is None or s[0] < self.min_calls or now - s[3] > self.max_age_s:
+                return None, None
+            return (s[1] or None), s[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
 
 
+MODEL_STATS = ModelStats()
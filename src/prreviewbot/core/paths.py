@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import groupby
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# What a changed file is, beyond its language. Only "source" and "test" files decide a PR's language.
+SOURCE, TEST, CONFIG, DOCS, GENERATED, VENDORED, OTHER = (
+    "source", "test", "config", "docs", "generated", "vendored", "other",
+)  # fmt: skip
+CODE_CATEGORIES = frozenset({SOURCE, TEST})
+
+EXT_TO_LANG: Dict[str, str] = {
+    ".py": "python",
+    ".ipynb": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".go": "go",
+    ".rs": "rust",
+    ".cs": "csharp",
+    ".cpp": "cpp",
+    ".cc": "cpp",
+    ".cxx": "cpp",
+    ".c": "c",
+    ".h": "c",
+    ".hpp": "cpp",
+    ".php": "php",
+    ".rb": "ruby",
+    ".swift": "swift",
+    ".scala": "scala",
+    ".sql": "sql",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".tf": "terraform",
+    ".md": "markdown",
+}
+# Files known by name (matched case-insensitively).
+FILENAME_TO_LANG: Dict[str, str] = {
+    "dockerfile": "dockerfile",
+    "containerfile": "dockerfile",
+    "makefile": "make",
+    "gnumakefile": "make",
+    "jenkinsfile": "groovy",
+    "cmakelists.txt": "cmake",
+    "gemfile": "ruby",
+    "rakefile": "ruby",
+}
+EXT_CATEGORY: Dict[str, str] = {
+    **dict.fromkeys((".yaml", ".yml", ".json", ".toml", ".ini", ".cfg", ".conf", ".properties", ".xml"), CONFIG),
+    **dict.fromkeys((".md", ".rst", ".adoc", ".txt"), DOCS),
+}
+FILENAME_CATEGORY: Dict[str, str] = {
+    **dict.fromkeys(("dockerfile", "containerfile", "makefile", "gnumakefile", "jenkinsfile", "cmakelists.txt"), CONFIG),
+    **dict.fromkeys(("readme", "changelog", "license", "authors", "contributing"), DOCS),
+}
+
+# Glob rules, first match wins: `dir/**` matches that directory at any depth, `*` does not cross `/`.
+# fmt: off
+DEFAULT_GLOBS: Tuple[Tuple[str, str], ...] = (
+    *((f"{d}/**", VENDORED) for d in ("vendor", "third_party", "third-party", "node_modules", "bower_components")),
+    *((name, GENERATED) for name in (
+        "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "uv.lock", "Cargo.lock",
+        "go.sum", "Gemfile.lock", "composer.lock", "packages.lock.json",
+    )),
+    *((f"*{suffix}", GENERATED) for suffix in (
+        ".min.js", ".min.css", ".map", ".pb.go", "_pb2.py", "_pb2_grpc.py", ".pb.h", ".pb.cc", ".g.dart",
+        ".designer.cs", ".generated.ts", ".generated.cs", ".snap",
+    )),
+    ("__snapshots__/**", GENERATED),
+    ("__generated__/**", GENERATED),
+    *((f"{d}/**", TEST) for d in ("test", "tests", "__tests__", "spec", "testdata")),
+    *((glob, TEST) for glob in (
+        "test_*.py", "*_test.py", "*_test.go", "*.test.js", "*.test.ts", "*.test.jsx", "*.test.tsx", "*.spec.js",
+        "*.spec.ts", "*Test.java", "*Tests.java", "*Test.kt", "*Tests.cs", "*_spec.rb",
+    )),
+)
+# fmt: on
+
+
+@dataclass(frozen=True)
+class PathClass:
+    language: Optional[str]  # None when not a known language
+    category: str  # source | test | config | docs | generated | vendored | other
+
+    @property
+    def is_code(self) -> bool:
+        return self.category in CODE_CATEGORIES
+
+
+class PathClassifier:
+    """
+    Language and category of a file path in one call. Rules are compiled once: extension and file name lookups
+    are dict hits, directory globs (`dir/**`) a set intersection with the path's directories, suffix and exact
+    name globs one `str.endswith` / set lookup, and any other globs one combined regex (matched against the file
+    name, or the whole path for globs with a slash) per run of consecutive globs of the same category, so rules
+    keep their glob order. Results are memoized per path (LRU), since the same paths come back on every review.
+    """
+
+    def __init__(
+        self,
+        *,
+        extensions: Optional[Dict[str, str]] = None,
+        filenames: Optional[Dict[str, str]] = None,
+        globs: Sequence[Tuple[str, str]] = DEFAULT_GLOBS,
+        cache_size: int = 1 << 16,
+    ):
+        self.extensions = {k.lower(): v for k, v in (EXT_TO_LANG if extensions is None else extensions).items()}
+        self.filenames = {k.lower(): v for k, v in (FILENAME_TO_LANG if filenames is None else filenames).items()}
+        # Compiled glob rules, in priority order: consecutive globs of one category share a rule.
+        self._rules: List[_Rule] = []
+        for category, run in groupby(globs, key=lambda g: g[1]):
+            dirs, names, suffixes, name_res, path_res = set(), set(), [], [], []
+            for glob, _ in run:
+                if glob.endswith("/**") and not any(ch in glob[:-3] for ch in "*?[/"):
+                    dirs.add(glob[:-3])
+                elif not any(ch in glob for ch in "*?[/"):
+                    names.add(glob)
+                elif glob.startswith("*") and not any(ch in glob[1:] for ch in "*?[/"):
+                    suffixes.append(glob[1:])
+                elif "/" not in glob:
+                    name_res.append(_glob_regex(glob))
+                else:
+                    path_res.append(_glob_regex(glob.lstrip("/")))
+            self._rules.append(
+                (category, frozenset(dirs), frozenset(names), tuple(suffixes), _union(name_res), _union(path_res))
+            )
+        # Rules that look at the file name or path, with their rank (directory-only rules never need the loop).
+        self._name_rules = [(i, r) for i, r in enumerate(self._rules) if r[2] or r[3] or r[4] or r[5]]
+        self._dir_rank: Dict[str, int] = {}  # directory -> index of the first rule its directory names match
+        self._interned: Dict[Tuple[Optional[str], str], PathClass] = {}
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, path: str) -> PathClass:
+        path = path.replace("\\", "/").lstrip("/")
+        slash = path.rfind("/")
+        name = path[slash + 1 :]
+        lower = name.lower()
+        dot = lower.rfind(".")
+        ext = lower[dot:] if dot > 0 else ""
+        language = self.filenames.get(lower) or self.extensions.get(ext)
+
+        # Directory rules only depend on the directory, which many changed files share.
+        directory = path[:slash] if slash > 0 else ""
+        dir_rank = self._dir_rank.get(directory)
+        if dir_rank is None:
+            dirs = directory.split("/")
+            dir_rank = next((i for i, r in enumerate(self._rules) if r[1] and not r[1].isdisjoint(dirs)), len(self._rules))
+            if len(self._dir_rank) < 1 << 16:
+                self._dir_rank[directory] = dir_rank
+        for rank, (category, _, names, suffixes, name_re, path_re) in self._name_rules:
+            if rank >= dir_rank:
+                break
+            if (
+                name in names
+                or (suffixes and name.endswith(suffixes))
+                or (name_re is not None and name_re(name))
+                or (path_re is not None and path_re(path))
+            ):
+                return self._class(language, category)
+        if dir_rank < len(self._rules):
+            return self._class(language, self._rules[dir_rank][0])
+
+        category = FILENAME_CATEGORY.get(lower) or FILENAME_CATEGORY.get(lower[:dot] if dot > 0 else lower)
+        category = category or EXT_CATEGORY.get(ext)
+        return self._class(language, category or (SOURCE if language else OTHER))
+
+    def _class(self, language: Optional[str], category: str) -> PathClass:
+        c = self._interned.get((language, category))
+        if c is None:
+            c = self._interned[(language, category)] = PathClass(language, category)
+        return c
+
+    def classify_all(self, paths: Iterable[str]) -> List[PathClass]:
+        classify = self.classify
+        return [classify(p) for p in paths]
+
+
+# (category, directory names, file names, file name suffixes, file name matcher, path matcher)
+_Rule = Tuple[str, FrozenSet[str], FrozenSet[str], Tuple[str, ...], Optional[Callable], Optional[Callable]]
+
+
+def _union(patterns: List[str]) -> Optional[Callable]:
+    return re.compile("|".join(f"(?:{p})" for p in patterns)).match if patterns else None
+
+
+def _glob_regex(glob: str) -> str:
+    # Like .gitattributes: a pattern without a slash matches the file name, one with a slash the path from the root.
+    out = []
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif glob[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif glob[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(glob[i]))
+            i += 1
+    return "".join(out) + "$"
+
+
+DEFAULT_CLASSIFIER = PathClassifier()
+
+
+def classify_path(path: str) -> PathClass:
+    """Language and category of `path` with the default rules (memoized)."""
+    return DEFAULT_CLASSIFIER.classify(path)
@@ -1,28 +1,107 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
-
-from prreviewbot.core.language import detect_language
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.model_select import choose_model
-from prreviewbot.core.types import PullRequestInfo, ReviewResult
-from prreviewbot.llm.heuristic import HeuristicLLM
+import asyncio
+import hashlib
+import json
 import os
+import time
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence
 
-from prreviewbot.storage.config import AppConfig
-from prreviewbot.core.errors import PRReviewBotError
-from prreviewbot.core.comment_format import format_pr_comment_markdown
+from prreviewbot.core.aio import cancel_all, gather_all, offload, run_sync
+from prreviewbot.core.comment_format import (
+    comment_fingerprint,
+    format_pr_comment_markdown,
+    review_comment_fingerprint,
+)
 from prreviewbot.core.diff_hunks import validate_line_range_against_patch
+from prreviewbot.core.discussion import DiscussionContext, estimate_tokens
+from prreviewbot.core.errors import ProviderError, PRReviewBotError
+from prreviewbot.core.language import changed_lines, group_by_language, normalize_language
+from prreviewbot.core.limits import KeyedLimiter, limited
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.model_select import MODEL_STATS, RoutingPolicy, choose_model
+from prreviewbot.core.types import (
+    ChangedFile,
+    CommentPostResult,
+    PullRequestInfo,
+    PullRequestSummary,
+    ReviewComment,
+    ReviewResult,
+)
+from prreviewbot.llm.base import LLM, comment_sink
+from prreviewbot.llm.batch import BatchLLM, BatchOptions, supports_batch
+from prreviewbot.llm.breaker import FALLBACK_CIRCUIT_OPEN, BreakerLLM, FallbackLLM, breaker_for
+from prreviewbot.llm.heuristic import HeuristicLLM
+from prreviewbot.llm.openai_chat import aclose_llms
+from prreviewbot.storage.config import AppConfig
+from prreviewbot.storage.history import ReviewHistory
+from prreviewbot.storage.shared_state import SharedState, worker_id
+
+if TYPE_CHECKING:
+    from prreviewbot.providers.base import PullRequestStream
+
+# Async reviews send a chunk of files to the LLM once the fetched files add up to this many (estimated) tokens.
+PIPELINE_CHUNK_TOKENS_ENV = "PRREVIEWBOT_PIPELINE_CHUNK_TOKENS"
+DEFAULT_PIPELINE_CHUNK_TOKENS = 24_000
+
+
+def pipeline_chunk_tokens() -> int:
+    return max(1, int(os.getenv(PIPELINE_CHUNK_TOKENS_ENV) or DEFAULT_PIPELINE_CHUNK_TOKENS))
+
+
+@dataclass
+class ReviewPart:
+    """
+    Files of a PR reviewed in one prompt by one LLM: a language, or several languages whose chosen model is the
+    same (`language` then names them all, e.g. "go, yaml").
+    """
+
+    language: str
+    files: List[ChangedFile]
+    llm: LLM
+    routing: Dict[str, Any] = field(default_factory=dict)
+    # language -> its files and routing decision, for the result's per-language breakdown
+    groups: Dict[str, List[ChangedFile]] = field(default_factory=dict)
+    routings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 
 @dataclass
 class ReviewService:
     cfg: AppConfig
+    # Optional cross-process state (web server). When set, `areview` caches results keyed by PR content + model and
+    # de-duplicates identical in-flight reviews across workers; the sync `review` (CLI) never uses it.
+    state: Optional[SharedState] = None
+    result_ttl_s: float = 600.0
+    # Optional async concurrency limits (batch reviews): provider fetches per host, LLM calls per endpoint.
+    host_limits: Optional[KeyedLimiter] = None
+    llm_limits: Optional[KeyedLimiter] = None
+    # Optional review history (web server): every review `areview` computes (not cache hits) is recorded there.
+    history: Optional[ReviewHistory] = None
+    # Offline mode (nightly sweeps): OpenAI-compatible reviews go through the Batch API (see `llm.batch`).
+    llm_batch: Optional[BatchOptions] = None
 
     @staticmethod
-    def from_config(cfg: AppConfig) -> "ReviewService":
-        return ReviewService(cfg=cfg)
+    def from_config(
+        cfg: AppConfig,
+        *,
+        state: Optional[SharedState] = None,
+        result_ttl_s: float = 600.0,
+        host_limits: Optional[KeyedLimiter] = None,
+        llm_limits: Optional[KeyedLimiter] = None,
+        history: Optional[ReviewHistory] = None,
+        llm_batch: Optional[BatchOptions] = None,
+    ) -> "ReviewService":
+        return ReviewService(
+            cfg=cfg,
+            state=state,
+            result_ttl_s=result_ttl_s,
+            host_limits=host_limits,
+            llm_limits=llm_limits,
+            history=history,
+            llm_batch=llm_batch,
+        )
 
     def _get_token(self, provider: str, host: str) -> Optional[str]:
         return (self.cfg.tokens.get(provider, {}) or {}).get(host)
@@ -83,7 +162,7 @@ class ReviewService:
                 try:
                     from prreviewbot.llm.azure_openai_llm import AzureOpenAILLM
 
-                    return AzureOpenAILLM(
+                    return AzureOpenAILLM.shared(
                         endpoint=str(endpoint).strip(),
                         api_key=str(api_key).strip(),
                         api_version=str(api_version).strip(),
@@ -97,21 +176,45 @@ class ReviewService:
             try:
                 from prreviewbot.llm.openai_llm import OpenAILLM
 
-                return OpenAILLM(api_key=str(api_key).strip(), model=model)
+                return OpenAILLM.shared(api_key=str(api_key).strip(), model=model)
             except Exception as e:
                 if strict:
                     raise PRReviewBotError(f"OpenAI selected but failed to initialize: {e}") from e
                 return HeuristicLLM()
         return HeuristicLLM()
 
-    def fetch_pr(self, pr_link: str) -> PullRequestInfo:
-        parsed = parse_pr_link(pr_link)
-        from prreviewbot.providers.registry import provider_for
+    def _provider_and_context(self, pr_link: str):
         from prreviewbot.providers.base import ProviderContext
+        from prreviewbot.providers.registry import provider_for
+
+        parsed = parse_pr_link(pr_link)
 
         token = self._get_token(parsed.provider, parsed.host)
-        provider = provider_for(parsed)
-        return provider.fetch_pr(ProviderContext(pr_url=pr_link, token=token))
+        return provider_for(parsed), ProviderContext(pr_url=pr_link, token=token)
+
+    def fetch_pr(self, pr_link: str) -> PullRequestInfo:
+        provider, ctx = self._provider_and_context(pr_link)
+        pr = provider.fetch_pr(ctx)
+        provider.posted.load(pr)
+        return pr
+
+    async def afetch_pr(self, pr_link: str) -> PullRequestInfo:
+        provider, ctx = self._provider_and_context(pr_link)
+        async with limited(self.host_limits, parse_pr_link(pr_link).host):
+            pr = await provider.afetch_pr(ctx)
+        provider.posted.load(pr)
+        return pr
+
+    async def alist_open_prs(
+        self, repo_url: str, *, provider: Optional[str] = None, max_items: int = 1000
+    ) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(repo_url, provider=provider)
+        from prreviewbot.providers.base import ProviderContext
+        from prreviewbot.providers.registry import provider_for
+
+        ctx = ProviderContext(pr_url=repo_url, token=self._get_token(parsed.provider, parsed.host))
+        async with limited(self.host_limits, parsed.host):
+            return await provider_for(parsed).alist_open_prs(ctx, max_items=max_items)
 
     def post_comment(
         self,
@@ -126,12 +229,42 @@ class ReviewService:
         end_line: Optional[int] = None,
         related_url: Optional[str] = None,
     ) -> str:
-        parsed = parse_pr_link(pr_link)
-        from prreviewbot.providers.registry import provider_for
-        from prreviewbot.providers.base import ProviderContext
+        provider, ctx = self._provider_and_context(pr_link)
+        body = format_pr_comment_markdown(
+            pr_link=pr_link,
+            file_path=file_path,
+            severity=severity,
+            message=message,
+            suggestion=suggestion,
+            code_example=code_example,
+            start_line=start_line,
+            end_line=end_line,
+            related_url=related_url,
+        )
+        fingerprint = comment_fingerprint(file_path=file_path, start_line=start_line, end_line=end_line, message=message)
+        if not provider.posted.loaded(pr_link):
+            provider.posted.load_discussion(pr_link, provider.fetch_discussion(ctx))
+        existing = provider.posted.get(pr_link, fingerprint)
+        if existing is not None:
+            return existing
+        url = provider.post_comment(ctx, body_markdown=body)
+        provider.posted.add(pr_link, fingerprint, url)
+        return url
 
-        token = self._get_token(parsed.provider, parsed.host)
-        provider = provider_for(parsed)
+    async def apost_comment(
+        self,
+        *,
+        pr_link: str,
+        file_path: Optional[str],
+        severity: Optional[str],
+        message: str,
+        suggestion: Optional[str],
+        code_example: Optional[str],
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None,
+        related_url: Optional[str] = None,
+    ) -> str:
+        provider, ctx = self._provider_and_context(pr_link)
         body = format_pr_comment_markdown(
             pr_link=pr_link,
             file_path=file_path,
@@ -143,7 +276,69 @@ class ReviewService:
             end_line=end_line,
             related_url=related_url,
         )
-        return provider.post_comment(ProviderContext(pr_url=pr_link, token=token), body_markdown=body)
+        fingerprint = comment_fingerprint(file_path=file_path, start_line=start_line, end_line=end_line, message=message)
+        await self._aload_posted(provider, ctx)
+        existing = provider.posted.get(pr_link, fingerprint)
+        if existing is not None:
+            await self._count_skipped(1)
+            return existing
+        url = await provider.apost_comment(ctx, body_markdown=body)
+        provider.posted.add(pr_link, fingerprint, url)
+        return url
+
+    async def apost_comments(self, pr_link: str, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        """
+        Post several suggestions in one provider-native operation where possible; one result per comment.
+        Suggestions already on the PR (or repeated within `comments`) are not posted again: their result is
+        `skipped`, with the URL of the comment that has it.
+        """
+        provider, ctx = self._provider_and_context(pr_link)
+        try:
+            await self._aload_posted(provider, ctx)
+        except ProviderError as e:  # e.g. unknown PR: reported per comment, like a failed post
+            return [CommentPostResult(ok=False, error=str(e)) for _ in comments]
+        fingerprints = [review_comment_fingerprint(c) for c in comments]
+        first: Dict[str, int] = {}
+        todo: List[int] = []
+        for i, fingerprint in enumerate(fingerprints):
+            if provider.posted.get(pr_link, fingerprint) is None and fingerprint not in first:
+                first[fingerprint] = i
+                todo.append(i)
+
+        posted: List[CommentPostResult] = []
+        if todo:
+            async with limited(self.host_limits, parse_pr_link(pr_link).host):
+                posted = await provider.apost_comments(ctx, [comments[i] for i in todo])
+            for i, res in zip(todo, posted):
+                if res.ok:
+                    provider.posted.add(pr_link, fingerprints[i], res.comment_url)
+
+        done = dict(zip(todo, posted))
+        results: List[CommentPostResult] = []
+        for i, fingerprint in enumerate(fingerprints):
+            if i in done:
+                results.append(done[i])
+            elif fingerprint in first and not done[first[fingerprint]].ok:
+                results.append(done[first[fingerprint]])  # repeats a comment of this batch that failed
+            else:
+                existing = provider.posted.get(pr_link, fingerprint) or None
+                results.append(CommentPostResult(ok=True, comment_url=existing, skipped=True))
+        await self._count_skipped(len(comments) - len(todo))
+        return results
+
+    async def _aload_posted(self, provider, ctx) -> None:
+        """
+        Read the PR's comment markers unless this process already has (it fetched or reviewed the PR): another
+        worker, an earlier run or the CLI may have posted the same suggestions.
+        """
+        if not provider.posted.loaded(ctx.pr_url):
+            async with limited(self.host_limits, parse_pr_link(ctx.pr_url).host):
+                discussion = await provider.afetch_discussion(ctx)
+            provider.posted.load_discussion(ctx.pr_url, discussion)
+
+    async def _count_skipped(self, n: int) -> None:
+        if self.state is not None and n:
+            await offload(self.state.incr, "comments_skipped_total", n)
 
     def review(
         self,
@@ -153,9 +348,305 @@ class ReviewService:
         llm_provider: Optional[str] = None,
         llm_model: Optional[str] = None,
     ) -> ReviewResult:
+        timings = {}
+        t0 = time.perf_counter()
         pr = self.fetch_pr(pr_link)
-        detected = detect_language(pr.changed_files, override=language)
+        t1 = time.perf_counter()
+        timings["fetch"] = t1 - t0
+        parts = self._plan(pr, language=language, llm_provider=llm_provider, llm_model=llm_model)
+        t2 = time.perf_counter()
+        timings["language"] = t2 - t1
+        if len(parts) == 1:
+            part = parts[0]
+            try:
+                res = part.llm.review(
+                    pr_url=pr.pr_url, language=part.language, files=part.files, discussion=pr.existing_discussion
+                )
+            except Exception:
+                _observe(part, ok=False, latency_s=time.perf_counter() - t2)
+                raise
+            _observe(part, ok=True, latency_s=time.perf_counter() - t2)
+            result = _merge_results(pr.pr_url, parts, [res])
+        else:
+            result = run_sync(_closing_llms(self._areview_parts(pr, parts)))
+        t3 = time.perf_counter()
+        timings["llm"] = t3 - t2
+        self._sanitize_line_ranges(pr, result)
+        t4 = time.perf_counter()
+        timings["validate"] = t4 - t3
+        timings["total"] = t4 - t0
+        result.timings = timings
+        return result
+
+    async def areview(
+        self,
+        *,
+        pr_link: str,
+        language: Optional[str] = None,
+        llm_provider: Optional[str] = None,
+        llm_model: Optional[str] = None,
+        on_comment: Optional[Callable[[ReviewComment], None]] = None,
+    ) -> ReviewResult:
+        """
+        Async twin of `review`, pipelined: the provider streams the PR's files (`Provider.astream_pr`) and they are
+        reviewed in chunks of about `PIPELINE_CHUNK_TOKENS_ENV` tokens as they arrive, so LLM calls start before the
+        fetch is done. The discussion is fetched alongside the files. A PR that fits in one chunk gets one review,
+        as before. Timings overlap: `fetch` runs until the last file is in, `llm` from the first call to the last.
+
+        `on_comment` gets every comment of the result once: streamed comments as the model writes them (before
+        their line numbers are validated), the others (cached or non-streaming reviews) when the review is done.
+        """
+        timings: Dict[str, float] = {"language": 0.0}
+        t0 = time.perf_counter()
+        provider, ctx = self._provider_and_context(pr_link)
+        # The host's fetch slot is held until the PR is fetched, not for the whole review.
+        fetching = AsyncExitStack()
+        await fetching.enter_async_context(limited(self.host_limits, parse_pr_link(pr_link).host))
+        stream: Optional[PullRequestStream] = None
+        sent: Dict[int, ReviewComment] = {}
+
+        def sink(comment: ReviewComment) -> None:
+            sent[id(comment)] = comment
+            on_comment(comment)  # type: ignore[misc]
 
+        token = comment_sink.set(sink if on_comment is not None else None)
+        try:
+            stream = await provider.astream_pr(ctx)
+            pr = stream.info
+            pr.existing_discussion = await stream.discussion()
+            provider.posted.load(pr)
+            computed = []
+
+            async def run_llm() -> ReviewResult:
+                computed.append(True)
+                if self.state is not None:
+                    await offload(self.state.incr, "llm_calls_total")
+                res = await self._apipeline(
+                    stream,
+                    fetching,
+                    t0,
+                    language=language,
+                    llm_provider=llm_provider,
+                    llm_model=llm_model,
+                    timings=timings,
+                )
+                if res.fallback and self.state is not None:
+                    await offload(self.state.incr, "llm_fallbacks_total")
+                tv = time.perf_counter()
+                await offload(self._sanitize_line_ranges, pr, res)
+                timings["validate"] = time.perf_counter() - tv
+                return res
+
+            if self.state is not None and self.result_ttl_s > 0:
+                if not pr.head_sha:
+                    # Only the files identify this PR's content: fetch them all before looking for a cached review.
+                    await stream.collect()
+                key = _review_cache_key(
+                    pr, language or "", self._request_key(llm_provider, llm_model), with_files=not pr.head_sha
+                )
+                result = await self._single_flight(key, run_llm)
+            else:
+                result = await run_llm()
+        finally:
+            comment_sink.reset(token)
+            if stream is not None:
+                await stream.aclose()
+            await fetching.aclose()
+        if on_comment is not None:
+            for c in result.comments:
+                if id(c) not in sent:
+                    on_comment(c)
+        timings.setdefault("fetch", time.perf_counter() - t0)
+        timings["total"] = time.perf_counter() - t0
+        result.timings = timings
+        if self.history is not None and computed:
+            await offload(self.history.record, pr, result)
+        return result
+
+    async def _apipeline(
+        self,
+        stream: PullRequestStream,
+        fetching: AsyncExitStack,
+        t0: float,
+        *,
+        language: Optional[str],
+        llm_provider: Optional[str],
+        llm_model: Optional[str],
+        timings: Dict[str, float],
+    ) -> ReviewResult:
+        """Plan and dispatch a chunk whenever enough files are in; merge all chunks' results at the end."""
+        pr = stream.info
+        budget = pipeline_chunk_tokens()
+        chunks: List[List[ReviewPart]] = []
+        runs: List["asyncio.Future[List[ReviewResult]]"] = []
+        shared: Optional[DiscussionContext] = None
+        t_llm = 0.0
+
+        def dispatch(files: List[ChangedFile], *, last: bool) -> None:
+            nonlocal shared, t_llm
+            tp = time.perf_counter()
+            parts = self._plan_files(files, language=language, llm_provider=llm_provider, llm_model=llm_model)
+            timings["language"] += time.perf_counter() - tp
+            discussion: Any = pr.existing_discussion
+            if not (last and not runs):
+                # Several chunks: the discussion is compacted once and each prompt picks what is relevant to it.
+                shared = shared or DiscussionContext(pr.existing_discussion)
+                discussion = shared
+            t_llm = t_llm or time.perf_counter()
+            chunks.append(parts)
+            runs.append(asyncio.ensure_future(self._arun_parts(pr.pr_url, parts, discussion)))
+
+        try:
+            pending: List[ChangedFile] = []
+            tokens = 0
+            async for f in stream:
+                pending.append(f)
+                tokens += estimate_tokens(f.patch or "")
+                if tokens >= budget:
+                    dispatch(pending, last=False)
+                    pending, tokens = [], 0
+            await fetching.aclose()
+            timings["fetch"] = time.perf_counter() - t0
+            if pending or not runs:
+                dispatch(pending, last=True)
+            results = await gather_all(*runs)
+        except BaseException:
+            await cancel_all(*runs)
+            raise
+        timings["llm"] = time.perf_counter() - t_llm
+        if len(chunks) == 1:
+            return _merge_results(pr.pr_url, chunks[0], results[0])
+        order = [normalize_language(language)] if language else list(group_by_language(pr.changed_files))
+        return _merge_chunks(pr.pr_url, chunks, results, order)
+
+    async def _areview_parts(self, pr: PullRequestInfo, parts: List[ReviewPart]) -> ReviewResult:
+        """Review each language's files with its own LLM, concurrently, and merge the results."""
+        discussion: Any = pr.existing_discussion
+        if len(parts) > 1:
+            # Compacted once; each part's prompt picks the entries most relevant to its files.
+            discussion = DiscussionContext(pr.existing_discussion)
+        return _merge_results(pr.pr_url, parts, await self._arun_parts(pr.pr_url, parts, discussion))
+
+    async def _arun_parts(self, pr_url: str, parts: List[ReviewPart], discussion: Any) -> List[ReviewResult]:
+        if len(parts) > 1 and not isinstance(discussion, DiscussionContext):
+            discussion = DiscussionContext(discussion)
+
+        async def run(part: ReviewPart) -> ReviewResult:
+            llm = part.llm
+            async with limited(None if llm.queued else self.llm_limits, llm.endpoint()):
+                t0 = time.perf_counter()
+                try:
+                    res = await llm.areview(
+                        pr_url=pr_url, language=part.language, files=part.files, discussion=discussion
+                    )
+                except Exception:
+                    _observe(part, ok=False, latency_s=time.perf_counter() - t0)
+                    raise
+                _observe(part, ok=True, latency_s=time.perf_counter() - t0)
+            return res
+
+        return await gather_all(*[run(p) for p in parts])
+
+    def _request_key(self, llm_provider: Optional[str], llm_model: Optional[str]) -> str:
+        """What decides the models of a review besides the PR: the request's overrides and the LLM settings."""
+        llm_cfg = self.cfg.llm or {}
+        return json.dumps(
+            [
+                llm_provider or "",
+                llm_model or "",
+                llm_cfg.get("provider"),
+                llm_cfg.get("default_model") or llm_cfg.get("model"),
+                self.cfg.model_map,
+                self.cfg.model_routing,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    async def _single_flight(self, key: str, compute: Callable[[], Awaitable[ReviewResult]]) -> ReviewResult:
+        """
+        Return the cached result for `key`, or compute it while holding a lease so that identical reviews
+        running concurrently (in any worker process) wait for the first one instead of calling the LLM again.
+        A lease expires on its own if its holder dies, so waiters eventually take over.
+        """
+        state = self.state
+        assert state is not None
+        owner = worker_id()
+        lease_key = f"review:{key}"
+        lease_s = 300.0
+        delay = 0.05
+        waited = False
+        while True:
+            cached = await offload(state.cache_get, key)
+            if cached is not None:
+                await offload(state.incr, "review_cache_hits_total")
+                return _result_from_dict(cached)
+            if await offload(state.acquire, lease_key, owner, ttl_s=lease_s):
+                try:
+                    result = await compute()
+                    # A fallback review (e.g. the LLM's breaker was open) is not cached: the next request retries the LLM.
+                    if not result.fallback:
+                        await offload(state.cache_set, key, _result_to_dict(result), ttl_s=self.result_ttl_s)
+                    return result
+                finally:
+                    await offload(state.release, lease_key, owner)
+            if not waited:
+                waited = True
+                await offload(state.incr, "review_singleflight_waits_total")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def _plan(
+        self,
+        pr: PullRequestInfo,
+        *,
+        language: Optional[str],
+        llm_provider: Optional[str],
+        llm_model: Optional[str],
+    ) -> List[ReviewPart]:
+        """
+        Group the PR's files by language (weighted by changed lines, primary language first) and choose a model per
+        language. Languages that get the same model share one part (one prompt); the others are reviewed separately.
+        A `language` override reviews all files as that language.
+        """
+        return self._plan_files(pr.changed_files, language=language, llm_provider=llm_provider, llm_model=llm_model)
+
+    def _plan_files(
+        self,
+        files: Sequence[ChangedFile],
+        *,
+        language: Optional[str],
+        llm_provider: Optional[str],
+        llm_model: Optional[str],
+    ) -> List[ReviewPart]:
+        if language:
+            groups = {normalize_language(language): list(files)}
+        else:
+            groups = group_by_language(files)
+        parts: Dict[str, ReviewPart] = {}
+        for lang, group in groups.items():
+            part = self._plan_part(lang, group, llm_provider=llm_provider, llm_model=llm_model)
+            same = parts.get(part.llm.name())
+            if same is None:
+                parts[part.llm.name()] = part
+                continue
+            same.language += f", {lang}"
+            same.files += group
+            same.groups.update(part.groups)
+            same.routings.update(part.routings)
+        strict = bool((llm_provider or "").strip() or (llm_model or "").strip())
+        for part in parts.values():
+            part.llm = self._wrap_llm(part.llm, strict=strict)
+        return list(parts.values())
+
+    def _plan_part(
+        self,
+        language: str,
+        files: List[ChangedFile],
+        *,
+        llm_provider: Optional[str],
+        llm_model: Optional[str],
+    ) -> ReviewPart:
         cfg_provider = ((self.cfg.llm or {}).get("provider") or "heuristic").lower()
         cfg_default_model = (self.cfg.llm or {}).get("default_model") or (self.cfg.llm or {}).get("model")
         req_provider = (llm_provider or "").strip().lower() or None
@@ -163,16 +654,51 @@ class ReviewService:
         effective_provider = req_provider or cfg_provider
         effective_default_model = req_model or cfg_default_model
 
+        pr_tokens = sum(estimate_tokens(f.patch or "") for f in files)
         choice = choose_model(
-            language=detected,
+            language=language,
             llm_provider=effective_provider,
             llm_default_model=effective_default_model,
             overrides=self.cfg.model_map or {},
+            pr_tokens=pr_tokens,
+            # An explicitly requested model is used as is.
+            routing=None if req_model else RoutingPolicy.from_config(self.cfg.model_routing),
+            stats=MODEL_STATS,
         )
+        if req_model:
+            choice = replace(choice, reasons=("requested model",))
+        routing = {
+            "model": choice.model,
+            "reasons": list(choice.reasons),
+            "pr_tokens": pr_tokens,
+            "estimated_cost_usd": choice.estimated_cost_usd,
+        }
         strict = req_provider is not None or req_model is not None
-        llm = self._build_llm(choice.provider, choice.model, strict=strict)
-        result = llm.review(pr_url=pr.pr_url, language=detected, files=pr.changed_files, discussion=pr.existing_discussion)
+        return ReviewPart(
+            language=language,
+            files=list(files),
+            llm=self._build_llm(choice.provider, choice.model, strict=strict),
+            routing=routing,
+            groups={language: files},
+            routings={language: routing},
+        )
+
+    def _wrap_llm(self, llm: LLM, *, strict: bool) -> LLM:
+        if self.llm_batch is not None:
+            if supports_batch(llm):
+                llm = BatchLLM(llm, self.llm_batch)
+        elif not isinstance(llm, HeuristicLLM):
+            # While the endpoint keeps failing or timing out, reviews that did not ask for this model explicitly
+            # get a heuristic review right away instead of waiting for the client's timeouts and retries.
+            breaker = breaker_for(llm.endpoint())
+            if strict or breaker.allow():
+                llm = BreakerLLM(llm, breaker)
+            else:
+                llm = FallbackLLM(HeuristicLLM(), FALLBACK_CIRCUIT_OPEN)
+        return llm
 
+    @staticmethod
+    def _sanitize_line_ranges(pr: PullRequestInfo, result: ReviewResult) -> None:
         # Sanitize model-provided line numbers against actual diff hunks.
         patch_by_path = {f.path: f.patch for f in pr.changed_files}
         for c in result.comments:
@@ -187,6 +713,150 @@ class ReviewService:
             )
             c.start_line, c.end_line, c.line_side = start, end, side
 
+
+async def _closing_llms(coro: Awaitable[ReviewResult]) -> ReviewResult:
+    # Sync reviews run on a throwaway loop: close the LLM clients opened on it before the loop goes away.
+    try:
+        return await coro
+    finally:
+        await aclose_llms()
+
+
+def review_payload(pr_link: str, result: ReviewResult) -> Dict[str, Any]:
+    """JSON shape of a review as returned by `/api/review` (and written by `review-batch`)."""
+    parsed = parse_pr_link(pr_link)
+    return {
+        "pr_url": result.pr_url,
+        "provider": parsed.provider,
+        "host": parsed.host,
+        "language": result.language,
+        "model": result.model,
+        "summary": result.summary,
+        "fallback": result.fallback,
+        "routing": result.routing,
+        "languages": result.languages,
+        "comments": [
+            {
+                "file_path": c.file_path,
+                "severity": c.severity,
+                "message": c.message,
+                "suggestion": c.suggestion,
+                "code_example": c.code_example,
+                "start_line": c.start_line,
+                "end_line": c.end_line,
+                "line_side": c.line_side,
+                "related_url": c.related_url,
+                "kind": c.kind,
+            }
+            for c in result.comments
+        ],
+    }
+
+
+def _observe(part: ReviewPart, *, ok: bool, latency_s: float) -> None:
+    # Feeds the latency/error rate that model routing looks at; deferred (batch) and heuristic reviews say nothing
+    # about a model's online behaviour.
+    if not part.llm.queued and not isinstance(part.llm, (HeuristicLLM, FallbackLLM)):
+        MODEL_STATS.record(part.routing["model"], ok=ok, latency_s=latency_s)
+
+
+def _merge_results(pr_url: str, parts: List[ReviewPart], results: List[ReviewResult]) -> ReviewResult:
+    """
+    One result for the PR (the parts' summaries and comments combined when there are several), labelled with the
+    primary language and carrying the per-language breakdown.
+    """
+    total_lines = sum(changed_lines(f) for p in parts for f in p.files) or 1
+    breakdown = []
+    for part, res in zip(parts, results):
+        for lang, files in part.groups.items():
+            paths = {f.path for f in files}
+            lines = sum(changed_lines(f) for f in files)
+            breakdown.append(
+                {
+                    "language": lang,
+                    "files": len(files),
+                    "changed_lines": lines,
+                    "share": round(lines / total_lines, 3),
+                    "model": res.model,
+                    "comments": sum(1 for c in res.comments if c.file_path in paths),
+                    "fallback": res.fallback,
+                    "routing": part.routings[lang],
+                }
+            )
+    primary = next(iter(parts[0].groups))
+    if len(results) == 1:
+        result = results[0]
+        result.language = primary
+        result.routing = parts[0].routing
+        result.languages = breakdown
         return result
 
+    return ReviewResult(
+        pr_url=pr_url,
+        language=primary,
+        model=", ".join(dict.fromkeys(r.model for r in results)),
+        summary="\n\n".join(f"**{p.language}** ({len(p.files)} file(s)):\n{r.summary.strip()}" for p, r in zip(parts, results)),
+        comments=[c for r in results for c in r.comments],
+        fallback=next((r.fallback for r in results if r.fallback), None),
+        routing=parts[0].routing,
+        languages=breakdown,
+    )
+
+
+def _merge_chunks(
+    pr_url: str, chunks: List[List[ReviewPart]], results: List[List[ReviewResult]], order: List[str]
+) -> ReviewResult:
+    """`_merge_results` over all chunks' parts, with one breakdown entry per language (in `order`, primary first)."""
+    result = _merge_results(pr_url, [p for parts in chunks for p in parts], [r for rs in results for r in rs])
+    total_lines = sum(e["changed_lines"] for e in result.languages or []) or 1
+    merged: Dict[str, Dict[str, Any]] = {}
+    for e in result.languages or []:
+        into = merged.setdefault(e["language"], dict(e, files=0, changed_lines=0, comments=0, model=[]))
+        into["files"] += e["files"]
+        into["changed_lines"] += e["changed_lines"]
+        into["comments"] += e["comments"]
+        into["model"].append(e["model"])
+        into["fallback"] = into["fallback"] or e["fallback"]
+    rank = {lang: i for i, lang in enumerate(order)}
+    breakdown = sorted(merged.values(), key=lambda e: (rank.get(e["language"], len(rank)), -e["changed_lines"]))
+    for e in breakdown:
+        e["model"] = ", ".join(dict.fromkeys(e["model"]))
+        e["share"] = round(e["changed_lines"] / total_lines, 3)
+    result.languages = breakdown
+    if breakdown:
+        result.language = breakdown[0]["language"]
+    return result
+
+
+def _review_cache_key(pr: PullRequestInfo, language: str, model: str, *, with_files: bool = True) -> str:
+    """
+    Identity of a review's inputs. Without `with_files` the PR's content is identified by its head SHA, so the key
+    is known before the files are fetched.
+    """
+    h = hashlib.sha256()
+    for part in (pr.pr_url, language, model, pr.title, pr.description, pr.head_sha):
+        h.update((part or "").encode("utf-8", "replace") + b"\0")
+    for f in pr.changed_files if with_files else ():
+        h.update(f.path.encode("utf-8", "replace") + b"\0" + (f.patch or "").encode("utf-8", "replace") + b"\0")
+    for d in pr.existing_discussion:
+        h.update((d.url or "").encode("utf-8", "replace") + b"\0" + (d.body or "").encode("utf-8", "replace") + b"\0")
+    return h.hexdigest()
+
+
+def _result_to_dict(result: ReviewResult) -> Dict[str, Any]:
+    data = asdict(result)
+    data.pop("timings", None)
+    return data
+
 
+def _result_from_dict(data: Dict[str, Any]) -> ReviewResult:
+    return ReviewResult(
+        pr_url=data["pr_url"],
+        language=data["language"],
+        model=data["model"],
+        summary=data["summary"],
+        comments=[ReviewComment(**c) for c in data.get("comments") or []],
+        fallback=data.get("fallback"),
+        routing=data.get("routing"),
+        languages=data.get("languages"),
+    )
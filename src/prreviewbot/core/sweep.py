@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from prreviewbot.core.aio import offload
+from prreviewbot.core.batch import review_many
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.core.types import PullRequestSummary
+from prreviewbot.storage.shared_state import SharedState
+
+
+@dataclass
+class SweepPlan:
+    repo_url: str
+    listed: List[PullRequestSummary] = field(default_factory=list)
+    to_review: List[PullRequestSummary] = field(default_factory=list)
+    skipped: List[PullRequestSummary] = field(default_factory=list)  # head SHA already reviewed
+
+
+async def plan_sweep(
+    service: ReviewService,
+    repo_url: str,
+    *,
+    state: SharedState,
+    provider: Optional[str] = None,
+    force: bool = False,
+    max_items: int = 1000,
+) -> SweepPlan:
+    """List open PRs of `repo_url` and split them into ones to review and ones whose head SHA was already reviewed."""
+    plan = SweepPlan(repo_url=repo_url)
+    plan.listed = await service.alist_open_prs(repo_url, provider=provider, max_items=max_items)
+    for pr in plan.listed:
+        seen = None if force or not pr.head_sha else await offload(state.reviewed_head, pr.pr_url)
+        if seen is not None and seen == pr.head_sha:
+            plan.skipped.append(pr)
+        else:
+            plan.to_review.append(pr)
+    return plan
+
+
+async def run_sweep(
+    service: ReviewService,
+    plan: SweepPlan,
+    *,
+    state: SharedState,
+    concurrency: int = 8,
+    language: Optional[str] = None,
+    llm_provider: Optional[str] = None,
+    llm_model: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Review `plan.to_review` concurrently (see `review_many`), recording each successfully reviewed head SHA."""
+    heads = {pr.pr_url: pr.head_sha for pr in plan.to_review}
+    async for record in review_many(
+        service,
+        list(heads),
+        concurrency=concurrency,
+        language=language,
+        llm_provider=llm_provider,
+        llm_model=llm_model,
+    ):
+        head_sha = heads.get(record["pr_link"])
+        record["head_sha"] = head_sha
+        # Fallback reviews are not marked, so the next sweep reviews that head again once the LLM is back.
+        if record["ok"] and head_sha and not record["review"].get("fallback"):
+            await offload(state.mark_reviewed, record["pr_link"], head_sha)
+        yield record
@@ -1,16 +1,46 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional
 
+# PR, file and comment records are slotted, and their repeated strings (paths, authors, kinds) interned: large
+# reviews hold thousands of them, and cached results and concurrent reviews of one PR share the strings.
 
-@dataclass
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    return sys.intern(s) if type(s) is str else s
+
+
+def project(payload: Mapping[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    The `fields` of a provider payload (dotted paths into nested objects, e.g. "head.sha") that are set, keyed by
+    path. Used for `PullRequestInfo.raw` so a review keeps a few scalars rather than the whole provider JSON.
+    """
+    out: Dict[str, Any] = {}
+    for path in fields:
+        value: Any = payload
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, Mapping) else None
+        if value is not None:
+            out[path] = value
+    return out
+
+
+@dataclass(slots=True)
 class ChangedFile:
     path: str
     patch: Optional[str] = None  # unified diff for this file (if available)
+    # Set when the provider's diff was cut to fit the byte caps: "file_bytes" (this file's patch is partial) or
+    # "total_bytes" (the PR's patch budget ran out: partial patch or None). `diff_bytes` is the file's full diff size.
+    truncated: Optional[str] = None
+    diff_bytes: Optional[int] = None
 
+    def __post_init__(self) -> None:
+        self.path = _intern(self.path)
 
-@dataclass
+
+@dataclass(slots=True)
 class ExistingDiscussionComment:
     """
     Existing PR discussion pulled from the provider.
@@ -23,9 +53,16 @@ class ExistingDiscussionComment:
     file_path: Optional[str] = None
     created_at: Optional[str] = None
     kind: str = "comment"  # "review_comment" | "issue_comment" | "thread" | "comment"
+    line: Optional[int] = None
+    thread_id: Optional[str] = None  # comments of one thread share it (first comment, then replies)
 
+    def __post_init__(self) -> None:
+        self.author = _intern(self.author)
+        self.file_path = _intern(self.file_path)
+        self.kind = _intern(self.kind)
 
-@dataclass
+
+@dataclass(slots=True)
 class PullRequestInfo:
     provider: str
     host: str
@@ -34,10 +71,22 @@ class PullRequestInfo:
     description: str
     changed_files: List[ChangedFile] = field(default_factory=list)
     existing_discussion: List[ExistingDiscussionComment] = field(default_factory=list)
+    head_sha: Optional[str] = None  # commit the review is based on (None if the provider did not report it)
+    # Provider specifics: the PR payload's used fields (`project`) under "pr"/"mr", plus fetch counters.
     raw: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
+class PullRequestSummary:
+    """An open PR/MR as returned by a provider's list endpoint."""
+
+    number: int
+    pr_url: str
+    title: str
+    head_sha: Optional[str] = None
+
+
+@dataclass(slots=True)
 class ReviewComment:
     file_path: Optional[str]
     severity: str  # "info" | "warn" | "error"
@@ -53,6 +102,22 @@ class ReviewComment:
     related_url: Optional[str] = None
     kind: Optional[str] = None  # e.g. "code_suggestion" | "discussion_reply"
 
+    def __post_init__(self) -> None:
+        self.file_path = _intern(self.file_path)
+        self.severity = _intern(self.severity)
+        self.kind = _intern(self.kind)
+
+
+@dataclass(slots=True)
+class CommentPostResult:
+    """Outcome of one comment of a batch post (`Provider.apost_comments`)."""
+
+    ok: bool
+    comment_url: Optional[str] = None
+    inline: bool = False  # anchored to its file/line, not posted as a general PR comment
+    error: Optional[str] = None
+    skipped: bool = False  # already on the PR (same fingerprint), so not posted again
+
 
 @dataclass
 class ReviewResult:
@@ -61,13 +126,23 @@ class ReviewResult:
     model: str
     summary: str
     comments: List[ReviewComment] = field(default_factory=list)
+    # Wall-clock seconds spent per review stage (fetch, language, llm, validate, total).
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Set when the review was not done by the requested model, e.g. "llm_circuit_open" (see `llm.breaker`).
+    fallback: Optional[str] = None
+    # How the model was chosen: {"model", "reasons", "pr_tokens", "estimated_cost_usd"} (see `core.model_select`).
+    routing: Optional[Dict[str, Any]] = None
+    # Per-language breakdown: language, files, changed_lines, share, model, comments, fallback, routing (one entry
+    # per language reviewed separately, primary language first).
+    languages: Optional[List[Dict[str, Any]]] = None
 
     def as_markdown(self) -> str:
         lines: List[str] = []
         lines.append(f"## PR Review\n")
         lines.append(f"- **PR**: {self.pr_url}")
         lines.append(f"- **Language**: {self.language}")
-        lines.append(f"- **Model**: {self.model}\n")
+        fallback = f" (fallback: {self.fallback})" if self.fallback else ""
+        lines.append(f"- **Model**: {self.model}{fallback}\n")
         lines.append("### Summary\n")
         lines.append(self.summary.strip() + "\n")
         lines.append("### Suggestions\n")
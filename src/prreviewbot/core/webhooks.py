@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from prreviewbot.storage.shared_state import SharedState
+
+WEBHOOK_PROVIDERS = ("github", "gitlab", "bitbucket", "azure", "gitea")
+
+
+@dataclass(frozen=True)
+class WebhookEvent:
+    provider: str
+    action: str  # "review" | "close" | "ignore"
+    pr_url: Optional[str] = None
+    head_sha: Optional[str] = None
+    reason: str = ""
+
+
+def pr_job_key(pr_url: str) -> str:
+    """Dedupe key shared by every queued/running review job of one PR."""
+    return f"pr:{pr_url}"
+
+
+def verify_signature(provider: str, headers: Mapping[str, str], body: bytes, secret: str) -> bool:
+    """
+    Check the delivery against the provider's webhook secret:
+    - GitHub / Bitbucket Cloud: `X-Hub-Signature-256` / `X-Hub-Signature` = "sha256=" + HMAC-SHA256(body)
+    - Gitea: `X-Gitea-Signature` = hex HMAC-SHA256(body)
+    - GitLab: `X-Gitlab-Token` equals the secret
+    - Azure DevOps service hooks: basic auth, password equals the secret
+    """
+    h = {k.lower(): v for k, v in headers.items()}
+    if not secret:
+        return False
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    if provider == "github":
+        return hmac.compare_digest(h.get("x-hub-signature-256", ""), f"sha256={digest}")
+    if provider == "bitbucket":
+        return hmac.compare_digest(h.get("x-hub-signature", ""), f"sha256={digest}")
+    if provider == "gitea":
+        return hmac.compare_digest(h.get("x-gitea-signature", ""), digest)
+    if provider == "gitlab":
+        return hmac.compare_digest(h.get("x-gitlab-token", ""), secret)
+    if provider == "azure":
+        auth = h.get("authorization", "")
+        if not auth.lower().startswith("basic "):
+            return False
+        try:
+            _, _, password = base64.b64decode(auth[6:].strip()).decode("utf-8").partition(":")
+        except Exception:
+            return False
+        return hmac.compare_digest(password, secret)
+    return False
+
+
+def parse_event(provider: str, headers: Mapping[str, str], payload: Dict[str, Any]) -> WebhookEvent:
+    """Map a provider's PR event to: review this head, PR closed (cancel pending reviews), or ignore."""
+    h = {k.lower(): v for k, v in headers.items()}
+
+    if provider in {"github", "gitea"}:
+        event = h.get("x-github-event") if provider == "github" else (h.get("x-gitea-event") or h.get("x-github-event"))
+        if event != "pull_request":
+            return WebhookEvent(provider, "ignore", reason=f"event {event!r}")
+        pr = payload.get("pull_request") or {}
+        action = payload.get("action") or ""
+        url = pr.get("html_url")
+        head = (pr.get("head") or {}).get("sha")
+        if action == "closed":
+            return WebhookEvent(provider, "close", pr_url=url)
+        if action in {"opened", "reopened", "synchronize", "synchronized", "ready_for_review"}:
+            return WebhookEvent(provider, "review", pr_url=url, head_sha=head)
+        return WebhookEvent(provider, "ignore", pr_url=url, reason=f"action {action!r}")
+
+    if provider == "gitlab":
+        if payload.get("object_kind") != "merge_request":
+            return WebhookEvent(provider, "ignore", reason=f"object_kind {payload.get('object_kind')!r}")
+        attrs = payload.get("object_attributes") or {}
+        action = attrs.get("action") or ""
+        url = attrs.get("url")
+        head = (attrs.get("last_commit") or {}).get("id")
+        if action in {"close", "merge"}:
+            return WebhookEvent(provider, "close", pr_url=url)
+        # "update" also fires for title/label edits; only new commits (oldrev present) change the head.
+        if action in {"open", "reopen"} or (action == "update" and attrs.get("oldrev")):
+            return WebhookEvent(provider, "review", pr_url=url, head_sha=head)
+        return WebhookEvent(provider, "ignore", pr_url=url, reason=f"action {action!r}")
+
+    if provider == "bitbucket":
+        event = h.get("x-event-key") or ""
+        pr = payload.get("pullrequest") or {}
+        url = ((pr.get("links") or {}).get("html") or {}).get("href")
+        head = ((pr.get("source") or {}).get("commit") or {}).get("hash")
+        if event in {"pullrequest:fulfilled", "pullrequest:rejected"}:
+            return WebhookEvent(provider, "close", pr_url=url)
+        if event in {"pullrequest:created", "pullrequest:updated"}:
+            return WebhookEvent(provider, "review", pr_url=url, head_sha=head)
+        return WebhookEvent(provider, "ignore", pr_url=url, reason=f"event {event!r}")
+
+    if provider == "azure":
+        event = payload.get("eventType") or ""
+        res = payload.get("resource") or {}
+        remote = ((res.get("repository") or {}).get("remoteUrl") or "").rstrip("/")
+        # remoteUrl may carry the org as userinfo (https://org@dev.azure.com/...).
+        if "@" in remote.split("//", 1)[-1].split("/", 1)[0]:
+            scheme, _, rest = remote.partition("//")
+            remote = f"{scheme}//{rest.split('@', 1)[1]}"
+        url = f"{remote}/pullrequest/{res.get('pullRequestId')}" if remote and res.get("pullRequestId") else None
+        head = (res.get("lastMergeSourceCommit") or {}).get("commitId")
+        if not event.startswith("git.pullrequest."):
+            return WebhookEvent(provider, "ignore", reason=f"eventType {event!r}")
+        if res.get("status") in {"completed", "abandoned"}:
+            return WebhookEvent(provider, "close", pr_url=url)
+        if event in {"git.pullrequest.created", "git.pullrequest.updated"}:
+            return WebhookEvent(provider, "review", pr_url=url, head_sha=head)
+        return WebhookEvent(provider, "ignore", pr_url=url, reason=f"eventType {event!r}")
+
+    return WebhookEvent(provider, "ignore", reason="unknown provider")
+
+
+def schedule_review(state: SharedState, event: WebhookEvent, *, debounce_s: float) -> Dict[str, Any]:
+    """
+    Turn an event into queue operations (blocking; offload from async code):
+    - review: cancel running reviews of an older head, then queue (or re-debounce) one review of this head
+    - close: cancel everything pending or running for the PR
+    """
+    if event.action == "ignore" or not event.pr_url:
+        return {"status": "ignored", "reason": event.reason or "no PR URL in payload"}
+    key = pr_job_key(event.pr_url)
+
+    if event.action == "close":
+        jobs = state.jobs_with_key(key)
+        for job in jobs:
+            state.cancel_job(job.id)
+        return {"status": "cancelled", "pr_link": event.pr_url, "jobs": [j.id for j in jobs]}
+
+    if event.head_sha and state.reviewed_head(event.pr_url) == event.head_sha:
+        return {"status": "ignored", "reason": "head already reviewed", "pr_link": event.pr_url}
+    cancelled = []
+    for job in state.jobs_with_key(key, statuses=("running",)):
+        if event.head_sha and job.payload.get("head_sha") == event.head_sha:
+            return {"status": "running", "pr_link": event.pr_url, "job_id": job.id, "head_sha": event.head_sha}
+        state.cancel_job(job.id)
+        cancelled.append(job.id)
+    job_id = state.enqueue_job(
+        "review",
+        {"pr_link": event.pr_url, "head_sha": event.head_sha},
+        delay_s=debounce_s,
+        dedupe_key=key,
+    )
+    return {
+        "status": "queued",
+        "pr_link": event.pr_url,
+        "head_sha": event.head_sha,
+        "job_id": job_id,
+        "cancelled": cancelled,
+    }
@@ -1,15 +1,37 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
 
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, ReviewResult
+from prreviewbot.core.aio import offload
+from prreviewbot.core.discussion import DiscussionContext
+from prreviewbot.core.types import (
+    ChangedFile,
+    ExistingDiscussionComment,
+    ReviewComment,
+    ReviewResult,
+)
+
+# Set by `ReviewService.areview(on_comment=...)`: LLMs that stream their reply hand each comment to it as soon as
+# it is parsed, before the review is complete.
+comment_sink: ContextVar[Optional[Callable[[ReviewComment], None]]] = ContextVar(
+    "prreviewbot_comment_sink", default=None
+)
 
 
 class LLM(ABC):
+    # True for LLMs that queue prompts for a deferred batch (`llm.batch.BatchLLM`): per-endpoint concurrency limits
+    # do not apply to them, since queued prompts cost no connection.
+    queued = False
+
     @abstractmethod
     def name(self) -> str: ...
 
+    def endpoint(self) -> str:
+        """Identifies the backend this LLM calls, for per-endpoint concurrency limits."""
+        return self.name()
+
     @abstractmethod
     def review(
         self,
@@ -20,26 +42,35 @@ class LLM(ABC):
         discussion: List[ExistingDiscussionComment],
     ) -> ReviewResult: ...
 
+    async def areview(
+        self,
+        *,
+        pr_url: str,
+        language: str,
+        files: List[ChangedFile],
+        discussion: List[ExistingDiscussionComment],
+    ) -> ReviewResult:
+        """Async entry point. Network-bound LLMs override this; the default runs `review` in a worker thread."""
+        return await offload(self.review, pr_url=pr_url, language=language, files=files, discussion=discussion)
+
 
-def build_review_prompt(language: str, files: List[ChangedFile], discussion: List[ExistingDiscussionComment] | None = None) -> str:
+def build_review_prompt(
+    language: str,
+    files: List[ChangedFile],
+    discussion: List[ExistingDiscussionComment] | DiscussionContext | None = None,
+) -> str:
+    """
+    Prompt for reviewing `files`. Pass a `DiscussionContext` when building several prompts for one PR, so the
+    discussion is compacted once and each chunk gets the entries most relevant to its files within the budget.
+    """
     chunks: List[Tuple[str, str]] = []
     for f in files:
         if not f.patch:
             continue
         chunks.append((f.path, f.patch))
-    discussion = discussion or []
-    discussion_block = ""
-    if discussion:
-        # Keep this short to avoid token blowups.
-        items = []
-        for d in discussion[:30]:
-            loc = f" file={d.file_path}" if d.file_path else ""
-            url = f" url={d.url}" if d.url else ""
-            body = (d.body or "").strip()
-            if len(body) > 800:
-                body = body[:800] + "…"
-            items.append(f"- [{d.kind}] author={d.author}{loc}{url}\n  {body}")
-        discussion_block = "\n\nEXISTING REVIEW DISCUSSION:\n" + "\n".join(items) + "\n"
+    if not isinstance(discussion, DiscussionContext):
+        discussion = DiscussionContext(discussion or [])
+    discussion_block = discussion.block(f.path for f in files)
 
     if not chunks:
         return (
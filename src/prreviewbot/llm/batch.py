@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import weakref
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from prreviewbot.core.aio import run_sync
+from prreviewbot.core.errors import PRReviewBotError
+from prreviewbot.core.types import ChangedFile, ReviewResult
+from prreviewbot.llm.base import LLM, build_review_prompt
+
+# Tuning for `BatchOptions.from_env` (server jobs and `--llm-batch` CLI runs).
+BATCH_MAX_REQUESTS_ENV = "PRREVIEWBOT_LLM_BATCH_MAX_REQUESTS"
+BATCH_LINGER_ENV = "PRREVIEWBOT_LLM_BATCH_LINGER_S"
+BATCH_POLL_ENV = "PRREVIEWBOT_LLM_BATCH_POLL_S"
+
+# Batch statuses after which nothing changes any more.
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    max_requests: int = 500  # prompts per batch file; a full batch is submitted right away
+    linger_s: float = 10.0  # after the first prompt arrives, wait this long for more before submitting
+    poll_s: float = 30.0  # batch status poll interval
+    completion_window: str = "24h"
+    timeout_s: float = 26 * 3600.0  # give up (and cancel the batch) if it has not finished by then
+
+    @staticmethod
+    def from_env() -> "BatchOptions":
+        d = BatchOptions()
+        return BatchOptions(
+            max_requests=max(1, int(os.getenv(BATCH_MAX_REQUESTS_ENV) or d.max_requests)),
+            linger_s=float(os.getenv(BATCH_LINGER_ENV) or d.linger_s),
+            poll_s=float(os.getenv(BATCH_POLL_ENV) or d.poll_s),
+        )
+
+
+@dataclass
+class BatchJournal:
+    """
+    Which batch each of a review job's requests was sent in (custom_id -> batch id), saved with the job. A job
+    taken over after a restart waits for those batches instead of sending (and paying for) its prompts again.
+    """
+
+    batches: Dict[str, str] = field(default_factory=dict)
+    save: Optional[Callable[[Dict[str, str]], Awaitable[None]]] = None
+
+    async def record(self, custom_id: str, batch_id: str) -> None:
+        self.batches[custom_id] = batch_id
+        if self.save is not None:
+            try:
+                await self.save(dict(self.batches))
+            except Exception:  # best effort: the batch runs either way
+                pass
+
+
+# The journal of the review job running in this context (set by the server's job runner).
+batch_journal: ContextVar[Optional[BatchJournal]] = ContextVar("prreviewbot_batch_journal", default=None)
+
+
+def supports_batch(llm: LLM) -> bool:
+    """OpenAI-compatible LLMs (`OpenAILLM`, `AzureOpenAILLM`) can run through the Batch API."""
+    return bool(getattr(llm, "batch_endpoint", None))
+
+
+class BatchLLM(LLM):
+    """
+    Runs `inner`'s reviews through the OpenAI Batch API: cheaper and outside the online rate limits, but results
+    take minutes to hours. Prompts of reviews running concurrently in this process share one batch job.
+    """
+
+    queued = True
+
+    def __init__(self, inner: LLM, options: Optional[BatchOptions] = None):
+        if not supports_batch(inner):
+            raise PRReviewBotError(f"{inner.name()} does not support the Batch API")
+        self.inner = inner
+        self.options = options or BatchOptions()
+
+    def name(self) -> str:
+        return self.inner.name()
+
+    def endpoint(self) -> str:
+        return self.inner.endpoint()
+
+    def review(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        return run_sync(self.areview(pr_url=pr_url, language=language, files=files, discussion=discussion))
+
+    async def areview(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        prompt = build_review_prompt(language, files, discussion=discussion or [])
+        content = await _queue_for(self.inner, self.options).submit(self.inner._chat_body(prompt))
+        return self.inner._to_result(pr_url, language, content)
+
+
+class BatchQueue:
+    """Chat requests waiting to be sent as one batch to one LLM endpoint/model (one queue per event loop)."""
+
+    def __init__(self, llm: LLM, options: BatchOptions):
+        self.llm = llm
+        self.options = options
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future, Optional[BatchJournal]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+        self._resumed: Dict[str, asyncio.Task] = {}  # batch id -> poll of a batch sent before a restart
+
+    async def submit(self, body: Dict[str, Any]) -> str:
+        """Queue one chat completion request body; returns the model's message content once its batch is done."""
+        cid = request_id(body)
+        journal = batch_journal.get()
+        if journal is not None and cid in journal.batches:
+            return await self._resume(journal.batches[cid], cid)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((cid, body, future, journal))
+        if len(self._pending) >= self.options.max_requests:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.options.linger_s, self._flush)
+        return await future
+
+    async def _resume(self, batch_id: str, cid: str) -> str:
+        task = self._resumed.get(batch_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(await_batch(self.llm, batch_id, self.options))
+            self._resumed[batch_id] = task
+            task.add_done_callback(lambda _: self._resumed.pop(batch_id, None))
+        res = (await asyncio.shield(task)).get(cid)
+        if res is None:
+            raise PRReviewBotError(f"LLM batch {batch_id} ended without a result for this review")
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, pending: List[Tuple[str, Dict[str, Any], asyncio.Future, Optional[BatchJournal]]]) -> None:
+        live = [p for p in pending if not p[2].done()]  # reviews cancelled meanwhile
+        if not live:
+            return
+
+        async def created(batch_id: str) -> None:
+            for cid, _, _, journal in live:
+                if journal is not None:
+                    await journal.record(cid, batch_id)
+
+        # Identical prompts (e.g. two jobs for the same PR head) are sent once.
+        requests = list({cid: body for cid, body, _, _ in live}.items())
+        try:
+            results = await run_batch(self.llm, requests, self.options, on_created=created)
+        except Exception as e:
+            for _, _, fut, _ in live:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        except asyncio.CancelledError:
+            for _, _, fut, _ in live:
+                fut.cancel()
+            raise
+        for cid, _, fut, _ in live:
+            if fut.done():
+                continue
+            res = results[cid]
+            if isinstance(res, Exception):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+
+def request_id(body: Dict[str, Any]) -> str:
+    """The `custom_id` of a chat request: the same prompt gets the same id, in this and any later process."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[Any, ...], BatchQueue]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _queue_for(llm: LLM, options: BatchOptions) -> BatchQueue:
+    by_key = _queues.setdefault(asyncio.get_running_loop(), {})
+    key = (type(llm).__name__, llm.endpoint(), llm.name(), options)
+    if key not in by_key:
+        by_key[key] = BatchQueue(llm, options)
+    return by_key[key]
+
+
+async def run_batch(
+    llm: LLM,
+    requests: List[Tuple[str, Dict[str, Any]]],
+    options: BatchOptions,
+    *,
+    on_created: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> Dict[str, Union[str, Exception]]:
+    """
+    Upload `requests` ((custom_id, chat body) pairs) as a JSONL batch file, create the batch and poll it until it
+    finishes. Returns each request's message content, or the error that request (or the whole batch) ended with.
+    `on_created` gets the batch id as soon as the batch exists.
+    """
+    endpoint = llm.batch_endpoint  # type: ignore[attr-defined]
+    lines = "".join(
+        json.dumps({"custom_id": cid, "method": "POST", "url": endpoint, "body": body}) + "\n" for cid, body in requests
+    )
+    client = llm._client()  # type: ignore[attr-defined]
+    async with client:
+        uploaded = await client.files.create(file=("prreviewbot-batch.jsonl", lines.encode("utf-8")), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=uploaded.id, endpoint=endpoint, completion_window=options.completion_window
+        )
+        if on_created is not None:
+            await on_created(batch.id)
+        batch, results = await _wait(client, batch, options)
+    missing = PRReviewBotError(f"LLM batch {batch.id} ended '{batch.status}' without a result for this review")
+    return {cid: results.get(cid, missing) for cid, _ in requests}
+
+
+async def await_batch(llm: LLM, batch_id: str, options: BatchOptions) -> Dict[str, Union[str, Exception]]:
+    """Poll a batch created earlier (e.g. by a worker that has since stopped) and return every request's result."""
+    async with llm._client() as client:  # type: ignore[attr-defined]
+        _, results = await _wait(client, await client.batches.retrieve(batch_id), options)
+    return results
+
+
+async def _wait(client, batch, options: BatchOptions) -> Tuple[Any, Dict[str, Union[str, Exception]]]:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + options.timeout_s
+    while batch.status not in _FINAL_STATUSES:
+        if loop.time() > deadline:
+            await client.batches.cancel(batch.id)
+            raise PRReviewBotError(f"LLM batch {batch.id} did not finish within {options.timeout_s:.0f}s")
+        await asyncio.sleep(options.poll_s)
+        batch = await client.batches.retrieve(batch.id)
+
+    results: Dict[str, Union[str, Exception]] = {}
+    # Expired/cancelled batches still report the requests that did complete.
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            text = (await client.files.content(file_id)).text
+            results.update(_parse_output(text))
+    return batch, results
+
+
+def _parse_output(text: str) -> Dict[str, Union[str, Exception]]:
+    out: Dict[str, Union[str, Exception]] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        cid = item.get("custom_id")
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            error = item.get("error") or body.get("error") or {}
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            out[cid] = PRReviewBotError(f"LLM batch request failed ({response.get('status_code')}): {message}")
+            continue
+        try:
+            out[cid] = body["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            out[cid] = PRReviewBotError("LLM batch response has no message content")
+    return out
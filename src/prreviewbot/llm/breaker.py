@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from prreviewbot.core.types import ChangedFile, ReviewResult
+from prreviewbot.llm.base import LLM
+
+# Tuning for `BreakerOptions.from_env`.
+BREAKER_FAILURE_RATE_ENV = "PRREVIEWBOT_LLM_BREAKER_FAILURE_RATE"
+BREAKER_SLOW_CALL_ENV = "PRREVIEWBOT_LLM_BREAKER_SLOW_CALL_S"
+BREAKER_OPEN_ENV = "PRREVIEWBOT_LLM_BREAKER_OPEN_S"
+
+# `ReviewResult.fallback` of reviews answered by the heuristic reviewer because the LLM endpoint's breaker was open.
+FALLBACK_CIRCUIT_OPEN = "llm_circuit_open"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+@dataclass(frozen=True)
+class BreakerOptions:
+    window: int = 20  # outcomes of the latest calls the rates are computed over
+    min_calls: int = 5  # no verdict before this many outcomes in the window
+    failure_rate: float = 0.5  # open when at least this share of the window failed (errors and slow calls)
+    slow_call_s: float = 60.0  # a call that took longer counts as failed even if it succeeded
+    open_s: float = 30.0  # stay open this long, then let one probe call through (half-open)
+
+    @staticmethod
+    def from_env() -> "BreakerOptions":
+        d = BreakerOptions()
+        return BreakerOptions(
+            failure_rate=float(os.getenv(BREAKER_FAILURE_RATE_ENV) or d.failure_rate),
+            slow_call_s=float(os.getenv(BREAKER_SLOW_CALL_ENV) or d.slow_call_s),
+            open_s=float(os.getenv(BREAKER_OPEN_ENV) or d.open_s),
+        )
+
+
+class CircuitBreaker:
+    """
+    Error-rate/latency breaker for one LLM endpoint. Closed: calls go through and their outcomes are recorded.
+    Open: `allow` refuses calls for `open_s`. Half-open: one probe call is let through; it closes the breaker
+    if it succeeds in time and re-opens it otherwise. Thread-safe (sync reviews run on worker threads).
+    """
+
+    def __init__(self, endpoint: str, options: Optional[BreakerOptions] = None):
+        self.endpoint = endpoint
+        self.options = options or BreakerOptions()
+        self.state = CLOSED
+        self.opened_total = 0
+        self._outcomes: Deque[bool] = deque(maxlen=self.options.window)  # True = failed
+        self._latencies: Deque[float] = deque(maxlen=self.options.window)
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the endpoint now; in half-open state the caller becomes the probe."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.options.open_s:
+                self.state = HALF_OPEN
+                self._probe_at = None
+            if self.state == CLOSED:
+                return True
+            # A probe that never reported back (its review was answered from cache, or it was cancelled) does
+            # not block recovery for longer than one open period.
+            if self.state == HALF_OPEN and (self._probe_at is None or now - self._probe_at >= self.options.open_s):
+                self._probe_at = now
+                return True
+            return False
+
+    def record(self, *, ok: bool, latency_s: float) -> None:
+        failed = not ok or latency_s > self.options.slow_call_s
+        with self._lock:
+            self._latencies.append(latency_s)
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (
+                self.state == CLOSED
+                and len(self._outcomes) >= self.options.min_calls
+                and sum(self._outcomes) >= self.options.failure_rate * len(self._outcomes)
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_total += 1
+        self._opened_at = time.monotonic()
+        self._probe_at = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "endpoint": self.endpoint,
+                "state": self.state,
+                "failure_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "calls": len(self._outcomes),
+                "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "opened_total": self.opened_total,
+            }
+
+
+_breakers: Dict[Tuple[str, BreakerOptions], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint: str, options: Optional[BreakerOptions] = None) -> CircuitBreaker:
+    """The process-wide breaker of one LLM endpoint."""
+    options = options or BreakerOptions.from_env()
+    with _breakers_lock:
+        key = (endpoint, options)
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(endpoint, options)
+        return _breakers[key]
+
+
+def breaker_states() -> List[Dict[str, Any]]:
+    """Snapshots of this process's breakers (for `/metrics`)."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class BreakerLLM(LLM):
+    """Runs `inner`'s reviews and reports each call's outcome and latency to the endpoint's breaker."""
+
+    def __init__(self, inner: LLM, breaker: CircuitBreaker):
+        self.inner = inner
+        self.breaker = breaker
+
+    def name(self) -> str:
+        return self.inner.name()
+
+    def endpoint(self) -> str:
+        return self.inner.endpoint()
+
+    def review(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        t0 = time.monotonic()
+        try:
+            result = self.inner.review(pr_url=pr_url, language=language, files=files, discussion=discussion)
+        except Exception:
+            self.breaker.record(ok=False, latency_s=time.monotonic() - t0)
+            raise
+        self.breaker.record(ok=True, latency_s=time.monotonic() - t0)
+        return result
+
+    async def areview(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        t0 = time.monotonic()
+        try:
+            result = await self.inner.areview(pr_url=pr_url, language=language, files=files, discussion=discussion)
+        except Exception:
+            self.breaker.record(ok=False, latency_s=time.monotonic() - t0)
+            raise
+        self.breaker.record(ok=True, latency_s=time.monotonic() - t0)
+        return result
+
+
+class FallbackLLM(LLM):
+    """Answers with `inner` (the heuristic reviewer) and marks the results with why the LLM was skipped."""
+
+    def __init__(self, inner: LLM, reason: str):
+        self.inner = inner
+        self.reason = reason
+
+    def name(self) -> str:
+        return self.inner.name()
+
+    def review(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        result = self.inner.review(pr_url=pr_url, language=language, files=files, discussion=discussion)
+        result.fallback = self.reason
+        return result
+
+    async def areview(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        result = await self.inner.areview(pr_url=pr_url, language=language, files=files, discussion=discussion)
+        result.fallback = self.reason
+        return result
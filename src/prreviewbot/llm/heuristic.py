@@ -3,6 +3,7 @@ from __future__ import annotations
 import re
 from typing import List
 
+from prreviewbot.core.paths import GENERATED, VENDORED, classify_path
 from prreviewbot.core.types import ChangedFile, ReviewComment, ReviewResult
 from prreviewbot.llm.base import LLM
 
@@ -29,8 +30,11 @@ class HeuristicLLM(LLM):
 
         for f in files:
             p = f.patch or ""
-            if not p:
+            kind = classify_path(f.path)
+            if not p or kind.category in (GENERATED, VENDORED):
                 continue
+            # Per file: a mixed-language PR's prompt language can name several languages.
+            file_language = kind.language or language
             if re.search(r"password\s*=", p, re.IGNORECASE) or re.search(r"api[_-]?key", p, re.IGNORECASE):
                 comments.append(
                     ReviewComment(
@@ -49,7 +53,7 @@ class HeuristicLLM(LLM):
                         suggestion="Make sure TODOs are tracked or resolved before merge.",
                     )
                 )
-            if language in {"python"} and ("print(" in p):
+            if file_language in {"python"} and ("print(" in p):
                 comments.append(
                     ReviewComment(
                         file_path=f.path,
@@ -58,7 +62,7 @@ class HeuristicLLM(LLM):
                         suggestion="Consider using structured logging instead of print in production code.",
                     )
                 )
-            if language in {"javascript", "typescript"} and ("console.log" in p):
+            if file_language in {"javascript", "typescript"} and ("console.log" in p):
                 comments.append(
                     ReviewComment(
                         file_path=f.path,
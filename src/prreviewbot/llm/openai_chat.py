@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from prreviewbot.core.aio import run_sync
+from prreviewbot.core.types import ChangedFile, ReviewComment, ReviewResult
+from prreviewbot.llm.base import LLM, build_review_prompt, comment_sink
+from prreviewbot.llm.review_json import (
+    REVIEW_JSON_SCHEMA,
+    SYSTEM_PROMPT,
+    CommentStream,
+    review_result,
+)
+
+# `json_schema` (structured outputs, default), `json_object` (JSON mode) or `text` (JSON asked for in the prompt only).
+RESPONSE_FORMAT_ENV = "PRREVIEWBOT_LLM_RESPONSE_FORMAT"
+# "0" turns streamed chat completions off.
+STREAM_ENV = "PRREVIEWBOT_LLM_STREAM"
+
+_FORMATS = ("json_schema", "json_object", "text")
+# (endpoint, model) -> the strongest response format it accepted, learned from 400s; shared by all instances.
+_downgraded: Dict[Tuple[str, str], str] = {}
+
+_lock = threading.Lock()
+_instances: Dict[Tuple[Any, ...], "OpenAIChatLLM"] = {}
+
+
+class OpenAIChatLLM(LLM):
+    """
+    Reviews through an OpenAI-compatible chat completions API. The reply is requested as structured output (JSON
+    schema) where the model supports it, falling back to JSON mode and then to prose once per endpoint/model.
+    Replies are streamed and comments are parsed as their JSON objects arrive. Subclasses build the client;
+    each instance keeps one per event loop (its connections stay open for the next review). Get long-lived
+    instances through `shared`; subclasses that define `__init__` must call `super().__init__()`.
+    """
+
+    # Batch API `endpoint` for the requests `_chat_body` builds (see `llm.batch`).
+    batch_endpoint = "/v1/chat/completions"
+
+    def __init__(self) -> None:
+        self._pools: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._pools_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **settings: str) -> "OpenAIChatLLM":
+        """The long-lived instance for these settings, so reviews reuse its pooled clients."""
+        key = (cls, *sorted(settings.items()))
+        with _lock:
+            inst = _instances.get(key)
+            if inst is None:
+                inst = _instances[key] = cls(**settings)
+            return inst
+
+    def _client(self):
+        """A new API client; use `_pooled_client` to get the instance's client for the running loop."""
+        raise NotImplementedError
+
+    def _pooled_client(self):
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            # Clients of loops that have since closed (asyncio.run per CLI call) can no longer be used or closed.
+            for stale in [k for k in self._pools if k.is_closed()]:
+                del self._pools[stale]
+            client = self._pools.get(loop)
+            if client is None or client.is_closed():
+                client = self._pools[loop] = self._client()
+        return client
+
+    async def aclose(self) -> None:
+        """Close the pooled client bound to the running event loop."""
+        with self._pools_lock:
+            client = self._pools.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def _model_param(self) -> str:
+        raise NotImplementedError
+
+    def review(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        return run_sync(self._closing(pr_url=pr_url, language=language, files=files, discussion=discussion))
+
+    async def _closing(self, **kwargs) -> ReviewResult:
+        # Sync callers run on a throwaway loop: close its connections before the loop goes away.
+        try:
+            return await self.areview(**kwargs)
+        finally:
+            await self.aclose()
+
+    async def areview(self, *, pr_url: str, language: str, files: List[ChangedFile], discussion) -> ReviewResult:
+        client = self._pooled_client()
+        prompt = build_review_prompt(language, files, discussion=discussion or [])
+        while True:
+            body = self._chat_body(prompt)
+            try:
+                if os.getenv(STREAM_ENV, "1") == "0":
+                    resp = await client.chat.completions.create(**body)
+                    return self._to_result(pr_url, language, resp.choices[0].message.content or "")
+                return await self._stream(client, body, pr_url, language)
+            except Exception as e:
+                fmt = (body.get("response_format") or {}).get("type")
+                if not fmt or not _rejects_response_format(e):
+                    raise
+                self._downgrade(fmt)
+
+    async def _stream(self, client, body: dict, pr_url: str, language: str) -> ReviewResult:
+        parser = CommentStream()
+        sink = comment_sink.get()
+        stream = await client.chat.completions.create(**body, stream=True)
+        async for chunk in stream:
+            # Azure sends content-filter chunks without choices.
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                for comment in parser.feed(delta):
+                    if sink is not None:
+                        sink(comment)
+        # Nothing picked up (e.g. prose around the JSON): parse the whole reply instead.
+        return self._to_result(pr_url, language, parser.text, comments=parser.comments or None)
+
+    def _response_format(self) -> str:
+        configured = os.getenv(RESPONSE_FORMAT_ENV) or _FORMATS[0]
+        configured = configured if configured in _FORMATS else _FORMATS[0]
+        learned = _downgraded.get((self.endpoint(), self._model_param()), _FORMATS[0])
+        return max(configured, learned, key=_FORMATS.index)
+
+    def _downgrade(self, rejected: str) -> None:
+        weaker = _FORMATS[_FORMATS.index(rejected) + 1]
+        key = (self.endpoint(), self._model_param())
+        _downgraded[key] = max(weaker, _downgraded.get(key, weaker), key=_FORMATS.index)
+
+    def _chat_body(self, prompt: str) -> dict:
+        body = {
+            "model": self._model_param(),
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.2,
+        }
+        fmt = self._response_format()
+        if fmt == "json_schema":
+            body["response_format"] = REVIEW_JSON_SCHEMA
+        elif fmt == "json_object":
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    def _to_result(
+        self, pr_url: str, language: str, content: str, *, comments: Optional[List[ReviewComment]] = None
+    ) -> ReviewResult:
+        return review_result(pr_url=pr_url, language=language, model=self.name(), content=content, comments=comments)
+
+
+async def aclose_llms() -> None:
+    """Close every shared LLM's pooled client on the running event loop (server shutdown, end of a batch)."""
+    with _lock:
+        instances = list(_instances.values())
+    for inst in instances:
+        await inst.aclose()
+
+
+def _rejects_response_format(e: Exception) -> bool:
+    """A 400 from a model/deployment (or API version) that does not support the requested `response_format`."""
+    return getattr(e, "status_code", None) == 400 and "response_format" in str(e)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, List, Optional
+
+from prreviewbot.core.types import ReviewComment, ReviewResult
+
+SYSTEM_PROMPT = (
+    "You are a PR review assistant. "
+    "Output MUST be JSON with keys: summary (string), comments (array). "
+    "Each comment: {file_path|null, severity: info|warn|error, message, suggestion|null, code_example|null, start_line|null, end_line|null, line_side|null, related_url|null, kind|null}.\n"
+    "For line numbers: use NEW file line numbers derived from the diff hunks (@@ -a,b +c,d @@). If unsure, set them to null."
+    "If responding to an existing review comment thread, set kind='discussion_reply' and include related_url pointing to that thread/comment."
+)
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+_NULLABLE_INT = {"type": ["integer", "null"]}
+_COMMENT_FIELDS = {
+    "file_path": _NULLABLE_STRING,
+    "severity": {"type": "string", "enum": ["info", "warn", "error"]},
+    "message": {"type": "string"},
+    "suggestion": _NULLABLE_STRING,
+    "code_example": _NULLABLE_STRING,
+    "start_line": _NULLABLE_INT,
+    "end_line": _NULLABLE_INT,
+    "line_side": {"type": ["string", "null"], "enum": ["new", "old", None]},
+    "related_url": _NULLABLE_STRING,
+    "kind": _NULLABLE_STRING,
+}
+# `response_format` for endpoints with structured outputs. Strict mode wants every field required (nullable ones
+# can be null). `summary` comes first so a streamed response carries it before the comments.
+REVIEW_JSON_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "pr_review",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["summary", "comments"],
+            "properties": {
+                "summary": {"type": "string"},
+                "comments": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": list(_COMMENT_FIELDS),
+                        "properties": _COMMENT_FIELDS,
+                    },
+                },
+            },
+        },
+    },
+}
+
+_SEVERITIES = {
+    "info": "info", "warn": "warn", "error": "error",
+    "warning": "warn", "minor": "info", "low": "info", "medium": "warn", "major": "error", "high": "error",
+    "critical": "error",
+}  # fmt: skip
+_LINE_SIDES = {"new", "old"}
+
+
+def safe_json(s: str) -> Optional[dict]:
+    """The JSON object in a model response, tolerating a ```json fence around it; None if there is none."""
+    s = s.strip()
+    # common: model wraps json in ```json ... ```
+    if s.startswith("```"):
+        # strip the first and last fence, keep inner content
+        parts = s.split("```")
+        if len(parts) >= 3:
+            s = parts[1]
+        else:
+            s = s.strip("`")
+    s = s.strip()
+    # Remove optional language tag prefix like "json\n"
+    s = re.sub(r"^\s*json\s*\n", "", s, flags=re.IGNORECASE)
+    try:
+        return json.loads(s)
+    except Exception:
+        return None
+
+
+def _text(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = (v if isinstance(v, str) else str(v)).strip()
+    return s or None
+
+
+def _line(v: Any) -> Optional[int]:
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, int):
+        return v if v > 0 else None
+    if isinstance(v, float):
+        return int(v) if v.is_integer() and v > 0 else None
+    if isinstance(v, str) and v.strip().isdigit():
+        return int(v) or None
+    return None
+
+
+def comment_from_dict(c: Any) -> Optional[ReviewComment]:
+    """One model comment as a `ReviewComment`; None for entries that are not objects or have no message."""
+    if not isinstance(c, dict):
+        return None
+    message = _text(c.get("message"))
+    if message is None:
+        return None
+    severity = c.get("severity")
+    line_side = c.get("line_side")
+    kind = c.get("kind")
+    return ReviewComment(
+        file_path=_text(c.get("file_path")),
+        severity=_SEVERITIES.get(severity.strip().lower(), "info") if isinstance(severity, str) else "info",
+        message=message,
+        suggestion=_text(c.get("suggestion")),
+        code_example=_text(c.get("code_example")),
+        start_line=_line(c.get("start_line")),
+        end_line=_line(c.get("end_line")),
+        line_side=line_side.strip().lower() if isinstance(line_side, str) and line_side.strip().lower() in _LINE_SIDES else None,
+        related_url=_text(c.get("related_url")),
+        kind=kind.strip().lower() or None if isinstance(kind, str) else None,
+    )
+
+
+def review_result(
+    *, pr_url: str, language: str, model: str, content: str, comments: Optional[List[ReviewComment]] = None
+) -> ReviewResult:
+    """
+    The `ReviewResult` for a model response. `comments` already converted while streaming (`CommentStream`) are
+    used as they are; otherwise they are converted from the parsed response.
+    """
+    parsed = safe_json(content)
+    if not isinstance(parsed, dict):
+        # fallback: treat as plain summary
+        return ReviewResult(
+            pr_url=pr_url,
+            language=language,
+            model=model,
+            summary=content.strip() or "No content returned by model.",
+            comments=list(comments or []),
+        )
+
+    summary_val = parsed.get("summary")
+    if isinstance(summary_val, list):
+        summary_text = "\n".join([f"- {str(x).strip()}" for x in summary_val if str(x).strip()])
+    else:
+        summary_text = str(summary_val or "").strip()
+
+    if comments is None:
+        raw = parsed.get("comments")
+        comments = [c for c in map(comment_from_dict, raw if isinstance(raw, list) else []) if c is not None]
+    return ReviewResult(
+        pr_url=pr_url,
+        language=language,
+        model=model,
+        summary=summary_text or "No summary.",
+        comments=comments,
+    )
+
+
+class CommentStream:
+    """
+    Incremental parser for a streamed review object: `feed` each text delta as it arrives and get back the
+    comments whose JSON objects completed in it. Only the new text is scanned, and each comment object is decoded
+    once, on its closing brace.
+    """
+
+    def __init__(self) -> None:
+        self.comments: List[ReviewComment] = []
+        self._parts: List[str] = []
+        self._buf = ""  # text of the comment object being read, or of the key being read at the top level
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._in_comments = False
+        self._last_key = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, delta: str) -> List[ReviewComment]:
+        self._parts.append(delta)
+        out: List[ReviewComment] = []
+        for ch in delta:
+            capturing = self._in_comments and self._depth >= 3 or self._depth == 1 and self._in_string
+            if self._in_string:
+                if capturing:
+                    self._buf += ch
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = self._buf[:-1]
+                        self._buf = ""
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._in_comments and self._depth >= 3:
+                    self._buf += ch
+                continue
+            if ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and ch == "[" and self._last_key == "comments":
+                    self._in_comments = True
+                if self._in_comments and self._depth >= 3:
+                    self._buf += ch
+            elif ch in "}]":
+                if self._in_comments and self._depth >= 3:
+                    self._buf += ch
+                self._depth -= 1
+                if self._in_comments and self._depth == 2 and ch == "}":
+                    try:
+                        c = comment_from_dict(json.loads(self._buf))
+                    except ValueError:
+                        c = None
+                    self._buf = ""
+                    if c is not None:
+                        self.comments.append(c)
+                        out.append(c)
+                elif self._depth == 1 and self._in_comments:
+                    self._in_comments = False
+            elif self._in_comments and self._depth >= 3:
+                self._buf += ch
+        return out
@@ -1,23 +1,51 @@
 from __future__ import annotations
 
-import difflib
-from typing import List, Optional
-from urllib.parse import quote, urlencode, urlparse, unquote
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from urllib.parse import quote, unquote, urlencode, urlparse
 
 import httpx
-import json
 
+from prreviewbot.core.aio import cancel_all, gather_all, offload
+from prreviewbot.core.comment_format import format_review_comment_markdown, inline_lines
+from prreviewbot.core.diff_engine import Opcode, format_unified, unified_diff
 from prreviewbot.core.errors import AuthRequiredError, ProviderError
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
-from prreviewbot.providers.base import Provider, ProviderContext
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.types import (
+    ChangedFile,
+    CommentPostResult,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    ReviewComment,
+    project,
+)
+from prreviewbot.providers.base import Provider, ProviderContext, PullRequestStream, post_paced
+
+# Fields of the PR payload kept in `PullRequestInfo.raw`.
+_PR_FIELDS = (
+    "pullRequestId",
+    "status",
+    "isDraft",
+    "createdBy.uniqueName",
+    "sourceRefName",
+    "targetRefName",
+    "lastMergeSourceCommit.commitId",
+)
+
+# Azure's diff APIs return line positions but no text, so files still need item downloads; cap how many run at once.
+_FILE_DIFF_CONCURRENCY = 8
+# Files per `filediffs` request.
+_FILE_DIFFS_BATCH = 50
 
 
 class AzureDevOpsProvider(Provider):
     def name(self) -> str:
         return "azure"
 
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+    async def astream_pr(self, ctx: ProviderContext) -> PullRequestStream:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "azure" or not parsed.org or not parsed.project or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid Azure DevOps PR link")
@@ -46,113 +74,263 @@ class AzureDevOpsProvider(Provider):
         pr_api = f"{base}/_apis/git/repositories/{repo_seg}/pullRequests/{parsed.pr_number}"
         pr_url = f"{pr_api}?{urlencode({'api-version': '7.1-preview.1'})}"
 
-        with self._client(ctx) as client:
-            pr = _get_json(client, pr_url, headers=headers, auth=auth)
+        threads_url = f"{base}/_apis/git/repositories/{repo_seg}/pullRequests/{parsed.pr_number}/threads?{urlencode({'api-version': '7.1-preview.1'})}"
+        raw: Dict[str, Any] = {}
+        async with self._client(ctx) as client:
+
+            async def discussion() -> List[ExistingDiscussionComment]:
+                # Existing discussion threads
+                existing = _extract_threads(await _get_json(client, threads_url, headers=headers, auth=auth))
+                raw["threads_count"] = len(existing)
+                return existing
+
+            async def files(
+                iteration_id: int, source_commit: Optional[str], target_commit: Optional[str]
+            ) -> AsyncIterator[List[ChangedFile]]:
+                iteration_changes = await _get_iteration_changes(
+                    client,
+                    base=base,
+                    repo=repo_seg,
+                    pr_number=parsed.pr_number,
+                    iteration_id=iteration_id,
+                    headers=headers,
+                    auth=auth,
+                )
 
-            source_commit = _deep_get(pr, ["lastMergeSourceCommit", "commitId"])
-            target_commit = _deep_get(pr, ["lastMergeTargetCommit", "commitId"])
-            if not source_commit or not target_commit:
-                # fallback fields
-                source_commit = _deep_get(pr, ["sourceRefName"]) or source_commit
-                target_commit = _deep_get(pr, ["targetRefName"]) or target_commit
+                paths = _extract_paths(iteration_changes)[:30]
+                change_types = _extract_change_types(iteration_changes)
+                sem = asyncio.Semaphore(_FILE_DIFF_CONCURRENCY)
 
-            # NOTE: Git PR file changes are exposed via iteration changes, not /pullRequests/{id}/changes.
-            # Flow: list iterations -> pick latest -> list changes for that iteration.
-            iteration_id = _latest_iteration_id(
-                client,
-                base=base,
-                repo=repo_seg,
-                pr_number=parsed.pr_number,
-                headers=headers,
-                auth=auth,
-            )
-            iteration_changes = _get_iteration_changes(
-                client,
-                base=base,
-                repo=repo_seg,
-                pr_number=parsed.pr_number,
-                iteration_id=iteration_id,
-                headers=headers,
-                auth=auth,
-            )
+                # File contents at a commit SHA never change: repeat reviews of the same iteration skip the downloads.
+                immutable = _is_commit(source_commit) and _is_commit(target_commit)
+                token_key = hashlib.sha256(ctx.token.encode("utf-8")).hexdigest()[:16]
 
-            paths = _extract_paths(iteration_changes)
-            changed_files: List[ChangedFile] = []
-            for p in paths[:30]:
-                patch = None
-                if source_commit and target_commit:
-                    patch = _compute_file_diff(
+                def cache_key(p: str) -> tuple:
+                    return ("file_diff", token_key, base, repo_seg, p, target_commit, source_commit)
+
+                cached = {p: self.cache.get(cache_key(p)) for p in paths} if immutable else {}
+                # Server-side line blocks tell which side(s) of each file are worth downloading.
+                server_blocks = {}
+                if immutable:
+                    server_blocks = await _get_file_diff_blocks(
                         client,
                         base=base,
                         repo=repo_seg,
-                        path=p,
+                        paths=[p for p in paths if cached.get(p) is None],
                         base_commit=target_commit,
                         target_commit=source_commit,
                         headers=headers,
                         auth=auth,
                     )
-                changed_files.append(ChangedFile(path=p, patch=patch))
-
-            # Existing discussion threads
-            threads_url = f"{base}/_apis/git/repositories/{repo_seg}/pullRequests/{parsed.pr_number}/threads?{urlencode({'api-version': '7.1-preview.1'})}"
-            threads = _get_json(client, threads_url, headers=headers, auth=auth)
-            existing = _extract_threads(threads)
-
-        return PullRequestInfo(
-            provider="azure",
-            host=host,
-            pr_url=ctx.pr_url,
-            title=pr.get("title") or "",
-            description=pr.get("description") or "",
-            changed_files=changed_files,
-            existing_discussion=existing,
-            raw={"pr": pr, "files_count": len(changed_files), "threads_count": len(existing)},
-        )
-
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
-        parsed = parse_pr_link(ctx.pr_url)
-        if parsed.provider != "azure" or not parsed.org or not parsed.project or not parsed.repo or not parsed.pr_number:
-            raise ProviderError("Invalid Azure DevOps PR link")
 
+                async def file_diff(p: str) -> ChangedFile:
+                    patch = None
+                    hit = cached.get(p)
+                    if hit is not None:
+                        return ChangedFile(path=p, patch=hit or None)
+                    if source_commit and target_commit:
+                        async with sem:
+                            patch = await _compute_file_diff(
+                                client,
+                                base=base,
+                                repo=repo_seg,
+                                path=p,
+                                base_commit=target_commit,
+                                target_commit=source_commit,
+                                headers=headers,
+                                auth=auth,
+                                change_type=change_types.get(p, ""),
+                                blocks=server_blocks.get(p),
+                            )
+                    if immutable:
+                        self.cache.set(cache_key(p), patch or "")
+                    return ChangedFile(path=p, patch=patch)
+
+                # Diffs run concurrently; each file is handed over (in path order) as soon as its diff is done.
+                diffs = [asyncio.ensure_future(file_diff(p)) for p in paths]
+                try:
+                    for diff in diffs:
+                        yield [await diff]
+                finally:
+                    await cancel_all(*diffs)
+                raw["files_count"] = len(paths)
+
+            comments = asyncio.ensure_future(discussion())
+            try:
+                # NOTE: Git PR file changes are exposed via iteration changes, not /pullRequests/{id}/changes.
+                # Flow: list iterations -> pick latest -> list changes for that iteration.
+                pr, iteration_id = await gather_all(
+                    _get_json(client, pr_url, headers=headers, auth=auth),
+                    _latest_iteration_id(
+                        client,
+                        base=base,
+                        repo=repo_seg,
+                        pr_number=parsed.pr_number,
+                        headers=headers,
+                        auth=auth,
+                    ),
+                )
+            except BaseException:
+                await cancel_all(comments)
+                raise
+
+            source_commit = _deep_get(pr, ["lastMergeSourceCommit", "commitId"])
+            target_commit = _deep_get(pr, ["lastMergeTargetCommit", "commitId"])
+            if not source_commit or not target_commit:
+                # fallback fields
+                source_commit = _deep_get(pr, ["sourceRefName"]) or source_commit
+                target_commit = _deep_get(pr, ["targetRefName"]) or target_commit
+
+            raw["pr"] = project(pr, _PR_FIELDS)
+            info = PullRequestInfo(
+                provider="azure",
+                host=host,
+                pr_url=ctx.pr_url,
+                title=pr.get("title") or "",
+                description=pr.get("description") or "",
+                head_sha=_deep_get(pr, ["lastMergeSourceCommit", "commitId"]),
+                raw=raw,
+            )
+            return PullRequestStream(info, files(iteration_id, source_commit, target_commit), comments)
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+        url, headers, auth = _threads_request(ctx)
+        async with self._client(ctx) as client:
+            return await _post_thread(client, url, headers=headers, auth=auth, ctx=ctx, content=body_markdown)
+
+    async def apost_comments(self, ctx: ProviderContext, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        """One thread per comment (Azure has no bulk API), anchored with `threadContext`, paced."""
+        url, headers, auth = _threads_request(ctx)
+        async with self._client(ctx) as client:
+
+            async def one(c: ReviewComment) -> CommentPostResult:
+                context = _thread_context(c)
+                tid = await _post_thread(
+                    client,
+                    url,
+                    headers=headers,
+                    auth=auth,
+                    ctx=ctx,
+                    content=format_review_comment_markdown(ctx.pr_url, c),
+                    thread_context=context,
+                )
+                return CommentPostResult(ok=True, comment_url=tid, inline=context is not None)
+
+            return await post_paced(comments, one)
+
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(ctx.pr_url, provider="azure")
         u = urlparse(ctx.pr_url)
         host = u.netloc
         scheme = u.scheme
-
-        org_seg = _enc_seg(parsed.org)
-        project_seg = _enc_seg(parsed.project)
-        repo_seg = _enc_seg(parsed.repo)
-
+        project_seg = _enc_seg(parsed.project or "")
+        repo_seg = _enc_seg(parsed.repo or "")
         if host.endswith("dev.azure.com"):
-            base = f"{scheme}://{host}/{org_seg}/{project_seg}"
+            base = f"{scheme}://{host}/{_enc_seg(parsed.org or '')}/{project_seg}"
+            web_base = f"{scheme}://{host}/{parsed.org}/{parsed.project}/_git/{parsed.repo}"
         else:
             base = f"{scheme}://{host}/{project_seg}"
+            web_base = f"{scheme}://{host}/{parsed.project}/_git/{parsed.repo}"
 
         if not ctx.token:
-            raise AuthRequiredError("azure", host, "Azure DevOps PAT required to post PR comments.")
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+            raise AuthRequiredError("azure", host, "Azure DevOps PAT required to list pull requests.")
+        headers = {"Accept": "application/json"}
         auth = ("", ctx.token)
 
-        url = f"{base}/_apis/git/repositories/{repo_seg}/pullRequests/{parsed.pr_number}/threads?{urlencode({'api-version': '7.1-preview.1'})}"
-        payload = {
-            "comments": [
-                {
-                    "parentCommentId": 0,
-                    "content": body_markdown,
-                    "commentType": 1,
-                }
-            ],
-            "status": 1,
-        }
-        with self._client(ctx) as client:
-            r = client.post(url, headers=headers, auth=auth, json=payload)
-            if r.status_code in {401, 403}:
-                raise AuthRequiredError("azure", host, f"Azure DevOps auth failed ({r.status_code}).")
-            if r.status_code >= 400:
-                raise ProviderError(f"Azure DevOps comment API error {r.status_code}: {r.text[:500]}")
-            j = r.json()
-            tid = j.get("id")
-            # Best-effort link back to PR (threads deep links differ); returning PR URL is still useful.
-            return str(tid) if tid is not None else ctx.pr_url
+        out: List[PullRequestSummary] = []
+        top = 100
+        async with self._client(ctx) as client:
+            skip = 0
+            while len(out) < max_items:
+                params = {"searchCriteria.status": "active", "$top": top, "$skip": skip, "api-version": "7.1-preview.1"}
+                url = f"{base}/_apis/git/repositories/{repo_seg}/pullrequests?{urlencode(params)}"
+                data = await _get_json(client, url, headers=headers, auth=auth)
+                items = data.get("value", []) or []
+                for p in items:
+                    out.append(
+                        PullRequestSummary(
+                            number=int(p["pullRequestId"]),
+                            pr_url=f"{web_base}/pullrequest/{p['pullRequestId']}",
+                            title=p.get("title") or "",
+                            head_sha=(p.get("lastMergeSourceCommit") or {}).get("commitId"),
+                        )
+                    )
+                if len(items) < top:
+                    break
+                skip += top
+        return out[:max_items]
+
+
+def _threads_request(ctx: ProviderContext) -> tuple:
+    parsed = parse_pr_link(ctx.pr_url)
+    if parsed.provider != "azure" or not parsed.org or not parsed.project or not parsed.repo or not parsed.pr_number:
+        raise ProviderError("Invalid Azure DevOps PR link")
+
+    u = urlparse(ctx.pr_url)
+    host = u.netloc
+    scheme = u.scheme
+
+    org_seg = _enc_seg(parsed.org)
+    project_seg = _enc_seg(parsed.project)
+    repo_seg = _enc_seg(parsed.repo)
+
+    if host.endswith("dev.azure.com"):
+        base = f"{scheme}://{host}/{org_seg}/{project_seg}"
+    else:
+        base = f"{scheme}://{host}/{project_seg}"
+
+    if not ctx.token:
+        raise AuthRequiredError("azure", host, "Azure DevOps PAT required to post PR comments.")
+    headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    auth = ("", ctx.token)
+
+    url = f"{base}/_apis/git/repositories/{repo_seg}/pullRequests/{parsed.pr_number}/threads?{urlencode({'api-version': '7.1-preview.1'})}"
+    return url, headers, auth
+
+
+async def _post_thread(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: dict,
+    auth,
+    ctx: ProviderContext,
+    content: str,
+    thread_context: Optional[dict] = None,
+) -> str:
+    payload: dict = {
+        "comments": [
+            {
+                "parentCommentId": 0,
+                "content": content,
+                "commentType": 1,
+            }
+        ],
+        "status": 1,
+    }
+    if thread_context:
+        payload["threadContext"] = thread_context
+    r = await client.post(url, headers=headers, auth=auth, json=payload)
+    if r.status_code in {401, 403}:
+        raise AuthRequiredError("azure", urlparse(url).netloc, f"Azure DevOps auth failed ({r.status_code}).")
+    if r.status_code >= 400:
+        raise ProviderError(f"Azure DevOps comment API error {r.status_code}: {r.text[:500]}")
+    j = r.json()
+    tid = j.get("id")
+    # Best-effort link back to PR (threads deep links differ); returning PR URL is still useful.
+    return str(tid) if tid is not None else ctx.pr_url
+
+
+def _thread_context(c: ReviewComment) -> Optional[dict]:
+    lines = inline_lines(c)
+    if lines is None:
+        return None
+    side = "left" if c.line_side == "old" else "right"
+    return {
+        "filePath": "/" + c.file_path.lstrip("/"),
+        f"{side}FileStart": {"line": lines[0], "offset": 1},
+        f"{side}FileEnd": {"line": lines[1], "offset": 1},
+    }
 
 
 def _deep_get(d: dict, path: List[str]) -> Optional[str]:
@@ -183,6 +361,15 @@ def _extract_paths(changes_json: dict) -> List[str]:
     return uniq
 
 
+def _extract_change_types(changes_json: dict) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for c in changes_json.get("changeEntries") or changes_json.get("changes") or []:
+        p = (c.get("item") or {}).get("path")
+        if p and isinstance(p, str):
+            out[p[1:] if p.startswith("/") else p] = str(c.get("changeType") or "").lower()
+    return out
+
+
 def _extract_threads(threads_json: dict) -> List[ExistingDiscussionComment]:
     out: List[ExistingDiscussionComment] = []
     for t in threads_json.get("value", []) or []:
@@ -203,8 +390,8 @@ def _extract_threads(threads_json: dict) -> List[ExistingDiscussionComment]:
     return out
 
 
-def _latest_iteration_id(
-    client: httpx.Client,
+async def _latest_iteration_id(
+    client: httpx.AsyncClient,
     *,
     base: str,
     repo: str,
@@ -213,7 +400,7 @@ def _latest_iteration_id(
     auth,
 ) -> int:
     url = f"{base}/_apis/git/repositories/{repo}/pullRequests/{pr_number}/iterations?{urlencode({'api-version': '7.1-preview.1'})}"
-    data = _get_json(client, url, headers=headers, auth=auth)
+    data = await _get_json(client, url, headers=headers, auth=auth)
     vals = data.get("value") or []
     if not vals:
         return 1
@@ -227,8 +414,8 @@ def _latest_iteration_id(
     return max(ids) if ids else 1
 
 
-def _get_iteration_changes(
-    client: httpx.Client,
+async def _get_iteration_changes(
+    client: httpx.AsyncClient,
     *,
     base: str,
     repo: str,
@@ -244,7 +431,7 @@ def _get_iteration_changes(
     while True:
         params = {"api-version": "7.1-preview.1", "$top": str(top), "$skip": str(skip)}
         url = f"{base}/_apis/git/repositories/{repo}/pullRequests/{pr_number}/iterations/{iteration_id}/changes?{urlencode(params)}"
-        data = _get_json(client, url, headers=headers, auth=auth)
+        data = await _get_json(client, url, headers=headers, auth=auth)
         entries = data.get("changeEntries") or []
         all_entries.extend(entries)
         if len(entries) < top:
@@ -256,8 +443,108 @@ def _get_iteration_changes(
     return {"changeEntries": all_entries}
 
 
-def _compute_file_diff(
-    client: httpx.Client,
+async def _get_file_diff_blocks(
+    client: httpx.AsyncClient,
+    *,
+    base: str,
+    repo: str,
+    paths: List[str],
+    base_commit: str,
+    target_commit: str,
+    headers: dict,
+    auth,
+) -> Dict[str, List[Opcode]]:
+    """
+    Changed line ranges per file from the `filediffs` API (0-based, no "equal" entries), for up to
+    `_FILE_DIFFS_BATCH` files per call. Files the server leaves out, or all of them if the endpoint is unavailable
+    (older Azure DevOps Server), are missing from the result and take the blob-download path.
+    """
+    url = f"{base}/_apis/git/repositories/{repo}/filediffs?{urlencode({'api-version': '7.1-preview.1'})}"
+
+    async def batch(chunk: List[str]) -> list:
+        payload = {
+            "baseVersionCommit": base_commit,
+            "targetVersionCommit": target_commit,
+            "fileDiffParams": [{"path": f"/{p}", "originalPath": f"/{p}"} for p in chunk],
+        }
+        r = await client.post(url, headers={**headers, "Content-Type": "application/json"}, auth=auth, json=payload)
+        if r.status_code in {401, 403}:
+            raise AuthRequiredError("azure", urlparse(url).netloc, f"Azure DevOps auth failed ({r.status_code}).")
+        if r.status_code >= 400:
+            return []
+        try:
+            data = r.json()
+        except json.JSONDecodeError:
+            return []
+        return data.get("value", []) if isinstance(data, dict) else data if isinstance(data, list) else []
+
+    chunks = [paths[i : i + _FILE_DIFFS_BATCH] for i in range(0, len(paths), _FILE_DIFFS_BATCH)]
+    out: Dict[str, List[Opcode]] = {}
+    for diffs in await gather_all(*[batch(c) for c in chunks]):
+        for d in diffs:
+            p = (d or {}).get("path") or ""
+            changes = _block_changes(d.get("lineDiffBlocks"))
+            if p and changes is not None:
+                out[p[1:] if p.startswith("/") else p] = changes
+    return out
+
+
+def _block_changes(blocks) -> Optional[List[Opcode]]:
+    # Positions come from the side that has lines (the empty side's start differs between server versions), and
+    # the unchanged run before each block must be the same length on both sides; anything else is not trusted.
+    if not isinstance(blocks, list):
+        return None
+    out: List[Opcode] = []
+    i = j = 0
+    try:
+        for b in sorted(blocks, key=lambda b: (int(b["modifiedLineNumberStart"]), int(b["originalLineNumberStart"]))):
+            ocount, mcount = int(b["originalLinesCount"]), int(b["modifiedLinesCount"])
+            if not ocount and not mcount:
+                continue
+            i1 = int(b["originalLineNumberStart"]) - 1 if ocount else None
+            j1 = int(b["modifiedLineNumberStart"]) - 1 if mcount else None
+            i1 = i + (j1 - j) if i1 is None else i1
+            j1 = j + (i1 - i) if j1 is None else j1
+            if i1 - i != j1 - j or i1 < i:
+                return None
+            tag = "replace" if ocount and mcount else "delete" if ocount else "insert"
+            out.append((tag, i1, i1 + ocount, j1, j1 + mcount))
+            i, j = i1 + ocount, j1 + mcount
+    except (KeyError, TypeError, ValueError):
+        return None
+    return out
+
+
+def _with_equal(changes: List[Opcode], n_a: int, n_b: int) -> Optional[List[Opcode]]:
+    """Full opcodes for files of `n_a`/`n_b` lines, or None if the blocks do not fit them."""
+    out: List[Opcode] = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in changes + [("end", n_a, n_a, n_b, n_b)]:
+        if i1 - i != j1 - j or i1 < i:
+            return None
+        if i1 > i:
+            out.append(("equal", i, i1, j, j1))
+        if tag != "end":
+            out.append((tag, i1, i2, j1, j2))
+        i, j = i2, j2
+    return out
+
+
+def _other_side(lines: List[str], changes: List[Opcode], *, have_before: bool) -> List[str]:
+    # The side that was not downloaded: the one we have minus its changed lines (only called when the other side's
+    # changed ranges are empty, i.e. pure additions or pure deletions).
+    out: List[str] = []
+    pos = 0
+    for _, i1, i2, j1, j2 in changes:
+        lo, hi = (i1, i2) if have_before else (j1, j2)
+        out += lines[pos:lo]
+        pos = hi
+    out += lines[pos:]
+    return out
+
+
+async def _compute_file_diff(
+    client: httpx.AsyncClient,
     *,
     base: str,
     repo: str,
@@ -266,28 +553,48 @@ def _compute_file_diff(
     target_commit: str,
     headers: dict,
     auth,
+    change_type: str = "",
+    blocks: Optional[List[Opcode]] = None,
 ) -> Optional[str]:
-    before = _get_item_content(client, base=base, repo=repo, path=path, commit=base_commit, headers=headers, auth=auth)
-    after = _get_item_content(client, base=base, repo=repo, path=path, commit=target_commit, headers=headers, auth=auth)
+    if blocks is not None and not blocks:
+        return None  # rename/mode change only: no line changed
+    # Pure additions only need the new content and pure deletions the old; added/deleted files have one side.
+    need_before = "add" not in change_type and (blocks is None or any(tag != "insert" for tag, *_ in blocks))
+    need_after = "delete" not in change_type and (blocks is None or any(tag != "delete" for tag, *_ in blocks))
+
+    async def content(commit: str, needed: bool) -> Optional[str]:
+        if not needed:
+            return None
+        return await _get_item_content(client, base=base, repo=repo, path=path, commit=commit, headers=headers, auth=auth)
+
+    before, after = await gather_all(content(base_commit, need_before), content(target_commit, need_after))
     if before is None and after is None:
         return None
+    return await offload(_unified_diff, path, before, after, blocks)
+
+
+def _unified_diff(path: str, before: Optional[str], after: Optional[str], blocks: Optional[List[Opcode]] = None) -> str:
     before_lines = (before or "").splitlines(keepends=True)
     after_lines = (after or "").splitlines(keepends=True)
-    diff = difflib.unified_diff(
-        before_lines,
-        after_lines,
-        fromfile=f"a/{path}",
-        tofile=f"b/{path}",
-        lineterm="",
-    )
+    codes = None
+    if blocks is not None:
+        if before is None and after is not None and all(tag == "insert" for tag, *_ in blocks):
+            before_lines = _other_side(after_lines, blocks, have_before=False)
+        elif after is None and before is not None and all(tag == "delete" for tag, *_ in blocks):
+            after_lines = _other_side(before_lines, blocks, have_before=True)
+        codes = _with_equal(blocks, len(before_lines), len(after_lines))
+    if codes is not None:
+        diff = format_unified(codes, before_lines, after_lines, fromfile=f"a/{path}", tofile=f"b/{path}")
+    else:
+        diff = unified_diff(before_lines, after_lines, fromfile=f"a/{path}", tofile=f"b/{path}")
     text = "\n".join(diff) + "\n"
     if len(text) > 200_000:
         return text[:200_000] + "\n... (diff truncated)\n"
     return text
 
 
-def _get_item_content(
-    client: httpx.Client,
+async def _get_item_content(
+    client: httpx.AsyncClient,
     *,
     base: str,
     repo: str,
@@ -307,7 +614,7 @@ def _get_item_content(
     }
     # repo is already encoded segment
     url = f"{base}/_apis/git/repositories/{repo}/items?{urlencode(params)}"
-    r = client.get(url, headers=headers, auth=auth)
+    r = await client.get(url, headers=headers, auth=auth)
     if r.status_code == 404:
         return None
     if r.status_code in {401, 403}:
@@ -335,8 +642,8 @@ def _get_item_content(
     return r.text
 
 
-def _get_json(client: httpx.Client, url: str, *, headers: dict, auth) -> dict:
-    r = client.get(url, headers=headers, auth=auth)
+async def _get_json(client: httpx.AsyncClient, url: str, *, headers: dict, auth) -> dict:
+    r = await client.get(url, headers=headers, auth=auth)
     if r.status_code in {401, 403}:
         raise AuthRequiredError("azure", urlparse(url).netloc, f"Azure DevOps auth failed ({r.status_code}).")
     if r.status_code >= 400:
@@ -359,6 +666,11 @@ def _get_json(client: httpx.Client, url: str, *, headers: dict, auth) -> dict:
         raise ProviderError(f"Azure DevOps returned invalid JSON. Body: {body}")
 
 
+def _is_commit(ref: Optional[str]) -> bool:
+    # The PR's merge commits, not the `refs/heads/...` fallback, which moves with every push.
+    return bool(ref) and not (ref or "").startswith("refs/")
+
+
 def _enc_seg(seg: str) -> str:
     """
     Encode a single URL path segment safely, avoiding double-encoding.
@@ -1,12 +1,54 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import httpx
 
-from prreviewbot.core.types import PullRequestInfo
+from prreviewbot.core.aio import cancel_all, gather_all, offload, run_sync
+from prreviewbot.core.comment_format import comment_markers, format_review_comment_markdown
+from prreviewbot.core.diff_stream import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_TOTAL_BYTES
+from prreviewbot.core.errors import AuthRequiredError, PRReviewBotError
+from prreviewbot.core.http import shared_ssl_context
+from prreviewbot.core.types import (
+    ChangedFile,
+    CommentPostResult,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    ReviewComment,
+)
+
+# Testing/benchmarking only: when set (e.g. "http://127.0.0.1:9000"), every provider API request is sent to
+# this origin instead of the real host. The original Host header is kept so a local stand-in can route on it.
+API_REDIRECT_ENV = "PRREVIEWBOT_API_REDIRECT"
+
+# Longest a request waits for an exhausted rate limit to reset before being sent anyway (and likely rejected).
+MAX_RATE_LIMIT_WAIT_S = 60.0
+
+# Batch posts without a native bulk API: requests in flight at once, and the minimum gap between their starts.
+BULK_POST_CONCURRENCY = 4
+BULK_POST_INTERVAL_S = 0.2
 
 
 @dataclass(frozen=True)
@@ -14,20 +56,383 @@ class ProviderContext:
     pr_url: str
     token: Optional[str]
     timeout_s: float = 30.0
+    # Byte caps for providers that download one unified diff for the whole PR (see `core.diff_stream`).
+    max_file_diff_bytes: int = DEFAULT_MAX_FILE_BYTES
+    max_total_diff_bytes: int = DEFAULT_MAX_TOTAL_BYTES
+
+
+class RateLimitState:
+    """
+    What the host last told us about its API rate limit (`X-RateLimit-*`, GitLab's `RateLimit-*`, `Retry-After`).
+    Once the remaining budget hits zero, requests wait for the reset instead of burning retries on 403/429s.
+    """
+
+    def __init__(self) -> None:
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None  # epoch seconds
+
+    def update(self, status_code: int, headers: Mapping[str, str]) -> None:
+        now = time.time()
+        retry_after = _header_float(headers, "retry-after")
+        if status_code in {403, 429} and retry_after is not None:
+            self.remaining, self.reset_at = 0, now + retry_after
+            return
+        remaining = _header_float(headers, "x-ratelimit-remaining", "ratelimit-remaining")
+        if remaining is None:
+            return
+        self.remaining = int(remaining)
+        reset = _header_float(headers, "x-ratelimit-reset", "ratelimit-reset")
+        if reset is not None:
+            # GitHub/GitLab send an epoch timestamp; some gateways send seconds until reset.
+            self.reset_at = reset if reset > 1_000_000_000 else now + reset
+
+    def wait_s(self) -> float:
+        if self.remaining != 0 or self.reset_at is None:
+            return 0.0
+        return max(0.0, min(self.reset_at - time.time(), MAX_RATE_LIMIT_WAIT_S))
+
+
+class BoundedCache:
+    """Thread-safe LRU mapping for data that never changes once fetched (e.g. file contents at a commit SHA)."""
+
+    def __init__(self, max_items: int = 2048):
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class PostedIndex:
+    """
+    Per PR: fingerprints of the comments PRreviewBot already posted there (read from the hidden markers in the
+    fetched discussion, plus our own posts since) mapped to the comment URL. Each check is one dict lookup, however
+    long the discussion. `loaded` tells whether the PR's discussion has been read in this process; until it has,
+    the index only knows this process's own posts.
+    """
+
+    def __init__(self, max_prs: int = 512):
+        self._prs = BoundedCache(max_prs)
+        self._lock = threading.Lock()
+
+    def _seen(self, pr_url: str) -> Dict[Optional[str], str]:
+        key = pr_url.rstrip("/")
+        with self._lock:
+            seen = self._prs.get(key)
+            if seen is None:
+                seen = {}
+                self._prs.set(key, seen)
+            return seen
+
+    def load(self, pr: PullRequestInfo) -> None:
+        self.load_discussion(pr.pr_url, pr.existing_discussion)
+
+    def load_discussion(self, pr_url: str, discussion: Iterable[ExistingDiscussionComment]) -> None:
+        seen = self._seen(pr_url)
+        for d in discussion:
+            for fingerprint in comment_markers(d.body):
+                seen.setdefault(fingerprint, d.url or "")
+        seen[None] = ""  # the discussion has been read (evicted together with the fingerprints)
+
+    def loaded(self, pr_url: str) -> bool:
+        seen = self._prs.get(pr_url.rstrip("/"))
+        return seen is not None and None in seen
+
+    def get(self, pr_url: str, fingerprint: str) -> Optional[str]:
+        """URL ("" if unknown) of the comment already carrying `fingerprint`, or None if it was not posted."""
+        seen = self._prs.get(pr_url.rstrip("/"))
+        return None if seen is None else seen.get(fingerprint)
+
+    def add(self, pr_url: str, fingerprint: str, url: Optional[str]) -> None:
+        self._seen(pr_url)[fingerprint] = url or ""
+
+
+class PullRequestStream:
+    """
+    A PR whose changed files are still being fetched (see `Provider.astream_pr`). `info` has the PR's header (title,
+    description, head SHA) from the start; iterating the stream yields each `ChangedFile` as the provider gets it
+    (and adds it to `info.changed_files`), and `discussion()` returns the existing discussion, fetched alongside.
+    Fetching runs in background tasks, so it goes on while the consumer works on the files it already has.
+    """
+
+    def __init__(
+        self,
+        info: PullRequestInfo,
+        files: AsyncIterator[List[ChangedFile]],
+        discussion: Awaitable[List[ExistingDiscussionComment]],
+    ):
+        self.info = info
+        self._batches: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._producer = asyncio.ensure_future(self._produce(files))
+        self._discussion = asyncio.ensure_future(discussion)
+        self._done = False
+
+    @staticmethod
+    def ready(pr: PullRequestInfo) -> "PullRequestStream":
+        """A stream over an already fetched PR: all files in one batch."""
+
+        async def files() -> AsyncIterator[List[ChangedFile]]:
+            yield list(pr.changed_files)
+
+        async def discussion() -> List[ExistingDiscussionComment]:
+            return list(pr.existing_discussion)
+
+        return PullRequestStream(replace(pr, changed_files=[], existing_discussion=[]), files(), discussion())
+
+    async def _produce(self, files: AsyncIterator[List[ChangedFile]]) -> None:
+        try:
+            async for batch in files:
+                if batch:
+                    self._batches.put_nowait(batch)
+        except Exception as e:  # re-raised to the consumer
+            self._batches.put_nowait(e)
+        else:
+            self._batches.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[ChangedFile]:
+        while not self._done:
+            batch = await self._batches.get()
+            if batch is None or isinstance(batch, Exception):
+                self._done = True
+                if batch is not None:
+                    raise batch
+                return
+            self.info.changed_files.extend(batch)
+            for f in batch:
+                yield f
+
+    async def discussion(self) -> List[ExistingDiscussionComment]:
+        return await self._discussion
+
+    async def collect(self) -> PullRequestInfo:
+        """Wait for the remaining files and the discussion; the complete PR."""
+        async for _ in self:
+            pass
+        self.info.existing_discussion = await self.discussion()
+        return self.info
+
+    async def aclose(self) -> None:
+        """Stop fetching (no-op once everything arrived)."""
+        await cancel_all(self._producer, self._discussion)
 
 
 class Provider(ABC):
+    """
+    Providers are async-native: implement `afetch_pr` (or `astream_pr`, to stream the files) / `apost_comment` on
+    top of `self._client(ctx)`.
+    The sync `fetch_pr` / `post_comment` wrappers exist for the CLI and other synchronous callers.
+
+    A provider that only implements the sync methods still works from async code; its calls are run in a
+    worker thread.
+
+    The registry keeps one long-lived instance per (provider, host), so per-host state lives here: pooled HTTP
+    clients (one per event loop, since an httpx.AsyncClient cannot be shared across loops), the host's rate-limit
+    state, a cache for immutable API data and the index of comments already posted. Subclasses that define `__init__` must call `super().__init__()`.
+    """
+
+    def __init__(self, host: str = ""):
+        self.host = host
+        self.rate_limit = RateLimitState()
+        self.cache = BoundedCache()
+        self.posted = PostedIndex()
+        self._pools: Dict[Tuple[asyncio.AbstractEventLoop, float, str], httpx.AsyncClient] = {}
+        self._pools_lock = threading.Lock()
+
     @abstractmethod
     def name(self) -> str: ...
 
-    @abstractmethod
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo: ...
+    @classmethod
+    def parse_link(cls, url: str) -> Optional[Any]:
+        """
+        Plugin providers whose PR URLs `parse_pr_link` does not recognise (e.g. Bitbucket Server) return a
+        `ParsedLink` with `provider` set to their registered name here; built-in providers return None.
+        """
+        return None
 
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+    async def afetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+        if type(self).astream_pr is not Provider.astream_pr:
+            stream = await self.astream_pr(ctx)
+            try:
+                return await stream.collect()
+            finally:
+                await stream.aclose()
+        if type(self).fetch_pr is Provider.fetch_pr:
+            raise NotImplementedError(f"{type(self).__name__} implements neither afetch_pr nor fetch_pr")
+        return await offload(self.fetch_pr, ctx)
+
+    async def astream_pr(self, ctx: ProviderContext) -> PullRequestStream:
+        """
+        Start fetching a PR: returns once its header is in, with the changed files streamed as they arrive and the
+        discussion fetched alongside. Providers whose files take many requests override this (and then get
+        `afetch_pr` for free); the default hands over the whole `afetch_pr` result at once.
+        """
+        return PullRequestStream.ready(await self.afetch_pr(ctx))
+
+    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+        return run_sync(self._closing(self.afetch_pr(ctx)))
+
+    async def afetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        """The PR's existing discussion; stops fetching files as soon as it is in (where `astream_pr` streams)."""
+        stream = await self.astream_pr(ctx)
+        try:
+            return await stream.discussion()
+        finally:
+            await stream.aclose()
+
+    def fetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        return run_sync(self._closing(self.afetch_discussion(ctx)))
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
         """Post a general (non-inline) comment to the PR/MR. Returns a URL/id string if available."""
-        raise NotImplementedError
+        if type(self).post_comment is Provider.post_comment:
+            raise NotImplementedError
+        return await offload(self.post_comment, ctx, body_markdown=body_markdown)
+
+    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+        return run_sync(self._closing(self.apost_comment(ctx, body_markdown=body_markdown)))
+
+    async def apost_comments(self, ctx: ProviderContext, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        """
+        Post review comments in one go, with one result per comment (same order). Providers with an inline review
+        or bulk API override this; the default posts each as a general comment, a few at a time and paced.
+        """
+
+        async def one(c: ReviewComment) -> CommentPostResult:
+            url = await self.apost_comment(ctx, body_markdown=format_review_comment_markdown(ctx.pr_url, c))
+            return CommentPostResult(ok=True, comment_url=url)
+
+        return await post_paced(comments, one)
+
+    def post_comments(self, ctx: ProviderContext, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        return run_sync(self._closing(self.apost_comments(ctx, comments)))
+
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        """
+        List open PRs/MRs of a repository, following the provider's pagination up to `max_items`.
+        Here `ctx.pr_url` is the repository URL (see `parse_repo_link`).
+        """
+        if type(self).list_open_prs is Provider.list_open_prs:
+            raise NotImplementedError(f"{type(self).__name__} does not support listing pull requests")
+        return await offload(self.list_open_prs, ctx, max_items=max_items)
+
+    def list_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        return run_sync(self._closing(self.alist_open_prs(ctx, max_items=max_items)))
+
+    @asynccontextmanager
+    async def _client(self, ctx: ProviderContext) -> AsyncIterator[httpx.AsyncClient]:
+        """The pooled client for the running event loop; connections stay open for the next call."""
+        loop = asyncio.get_running_loop()
+        redirect = (os.environ.get(API_REDIRECT_ENV) or "").strip()
+        key = (loop, ctx.timeout_s, redirect)
+        with self._pools_lock:
+            # Clients of loops that have since closed (asyncio.run per CLI call) can no longer be used or closed.
+            for stale in [k for k in self._pools if k[0].is_closed()]:
+                del self._pools[stale]
+            client = self._pools.get(key)
+            if client is None or client.is_closed:
+                client = self._pools[key] = httpx.AsyncClient(
+                    timeout=ctx.timeout_s,
+                    follow_redirects=True,
+                    transport=_RedirectTransport(redirect) if redirect else None,
+                    verify=shared_ssl_context(),
+                    event_hooks={"request": [self._before_request], "response": [self._after_response]},
+                )
+        yield client
+
+    async def _before_request(self, request: httpx.Request) -> None:
+        wait = self.rate_limit.wait_s()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _after_response(self, response: httpx.Response) -> None:
+        self.rate_limit.update(response.status_code, response.headers)
+
+    async def aclose(self) -> None:
+        """Close the pooled clients bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            mine = [k for k in self._pools if k[0] is loop]
+            clients = [self._pools.pop(k) for k in mine]
+        for client in clients:
+            await client.aclose()
+
+    async def _closing(self, coro):
+        # Sync wrappers run on a throwaway loop: close its connections before the loop goes away.
+        try:
+            return await coro
+        finally:
+            await self.aclose()
+
+
+class _RedirectTransport(httpx.AsyncBaseTransport):
+    def __init__(self, origin: str):
+        u = httpx.URL(origin)
+        self._scheme = u.scheme or "http"
+        self._host = u.host
+        self._port = u.port
+        self._inner = httpx.AsyncHTTPTransport(verify=shared_ssl_context())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme=self._scheme, host=self._host, port=self._port)
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+async def post_paced(
+    items: Sequence[Any],
+    post: Callable[[Any], Awaitable[CommentPostResult]],
+    *,
+    concurrency: int = BULK_POST_CONCURRENCY,
+    interval_s: float = BULK_POST_INTERVAL_S,
+) -> List[CommentPostResult]:
+    """
+    `post(item)` for every item, at most `concurrency` in flight and starts spaced `interval_s` apart. A provider
+    error fails only its own item; auth errors propagate, since every other item would fail the same way.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    next_start = loop.time()
+
+    async def run(item: Any) -> CommentPostResult:
+        nonlocal next_start
+        async with sem:
+            start = max(loop.time(), next_start)
+            next_start = start + interval_s
+            await asyncio.sleep(start - loop.time())
+            try:
+                return await post(item)
+            except AuthRequiredError:
+                raise
+            except (PRReviewBotError, httpx.HTTPError) as e:
+                return CommentPostResult(ok=False, error=str(e) or type(e).__name__)
 
-    def _client(self, ctx: ProviderContext) -> httpx.Client:
-        return httpx.Client(timeout=ctx.timeout_s, follow_redirects=True)
+    return await gather_all(*[run(i) for i in items])
 
 
+def _header_float(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
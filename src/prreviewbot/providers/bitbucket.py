@@ -1,22 +1,41 @@
 from __future__ import annotations
 
-import re
-from typing import Dict, List
+from typing import List
 from urllib.parse import urlparse
 
 import httpx
 
+from prreviewbot.core.aio import gather_all
+from prreviewbot.core.diff_stream import iter_diff_files
 from prreviewbot.core.errors import AuthRequiredError, ProviderError
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.types import (
+    ChangedFile,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    project,
+)
 from prreviewbot.providers.base import Provider, ProviderContext
 
+# Fields of the PR payload kept in `PullRequestInfo.raw`.
+_PR_FIELDS = (
+    "id",
+    "state",
+    "author.display_name",
+    "source.branch.name",
+    "source.commit.hash",
+    "destination.branch.name",
+    "links.html.href",
+)
+_MAX_COMMENT_PAGES = 20
+
 
 class BitbucketCloudProvider(Provider):
     def name(self) -> str:
         return "bitbucket"
 
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+    async def afetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "bitbucket" or not parsed.workspace or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid Bitbucket Cloud PR link")
@@ -40,51 +59,42 @@ class BitbucketCloudProvider(Provider):
         if not auth:
             raise ProviderError("Bitbucket token must be in form username:app_password")
 
-        with self._client(ctx) as client:
-            pr = _get_json(
-                client,
-                f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}",
-                headers=headers,
-                auth=auth,
-            )
-            diffstat = _get_json(
-                client,
-                f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/diffstat",
-                headers=headers,
-                auth=auth,
-            )
-            diff_text = _get_text(
-                client,
-                f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/diff",
-                headers=headers,
-                auth=auth,
-            )
-            comments = _get_json(
-                client,
-                f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/comments",
-                headers=headers,
-                auth=auth,
+        async with self._client(ctx) as client:
+            pr, diffstat, diff_files, comments = await gather_all(
+                _get_json(
+                    client,
+                    f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}",
+                    headers=headers,
+                    auth=auth,
+                ),
+                _get_json(
+                    client,
+                    f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/diffstat",
+                    headers=headers,
+                    auth=auth,
+                ),
+                _get_diff_files(
+                    client,
+                    f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/diff",
+                    headers=headers,
+                    auth=auth,
+                    ctx=ctx,
+                ),
+                _get_comments(
+                    client,
+                    f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/comments",
+                    headers=headers,
+                    auth=auth,
+                ),
             )
 
-        file_paths = _extract_paths(diffstat)
-        per_file = _split_unified_diff(diff_text)
-        changed: List[ChangedFile] = []
-        for p in file_paths:
-            changed.append(ChangedFile(path=p, patch=per_file.get(p)))
+        # diffstat is the authoritative file list (and order); files missing from the diff get no patch.
+        by_path = {f.path: f for f in diff_files}
+        changed: List[ChangedFile] = [by_path.get(p) or ChangedFile(path=p) for p in _extract_paths(diffstat)]
         if not changed:
-            changed = [ChangedFile(path="(diff)", patch=diff_text)]
-
-        existing: List[ExistingDiscussionComment] = []
-        for c in (comments.get("values") or []) if isinstance(comments, dict) else []:
-            existing.append(
-                ExistingDiscussionComment(
-                    author=((c.get("user") or {}).get("nickname") or (c.get("user") or {}).get("display_name") or ""),
-                    body=((c.get("content") or {}).get("raw") if isinstance(c.get("content"), dict) else "") or "",
-                    url=((c.get("links") or {}).get("html") or {}).get("href") if isinstance(c.get("links"), dict) else None,
-                    created_at=c.get("created_on"),
-                    kind="comment",
-                )
-            )
+            changed = diff_files
+
+        existing = _existing_comments(comments)
 
         return PullRequestInfo(
             provider="bitbucket",
@@ -94,10 +104,45 @@ class BitbucketCloudProvider(Provider):
             description=pr.get("description") or "",
             changed_files=changed,
             existing_discussion=existing,
-            raw={"pr": pr, "files_count": len(changed), "comments_count": len(existing)},
+            head_sha=((pr.get("source") or {}).get("commit") or {}).get("hash"),
+            raw={
+                "pr": project(pr, _PR_FIELDS),
+                "files_count": len(changed),
+                "comments_count": len(existing),
+                "truncated_files_count": sum(1 for f in changed if f.truncated),
+            },
         )
 
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+    async def afetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "bitbucket" or not parsed.workspace or not parsed.repo or not parsed.pr_number:
+            raise ProviderError("Invalid Bitbucket Cloud PR link")
+
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        if not host.endswith("bitbucket.org"):
+            raise ProviderError("Bitbucket Server/Data Center is not supported in this MVP (Bitbucket Cloud only).")
+        api_base = "https://api.bitbucket.org/2.0"
+        if not ctx.token:
+            raise AuthRequiredError(
+                "bitbucket",
+                host,
+                "Bitbucket app password required. Use username:app_password as the token value.",
+            )
+        auth = tuple(ctx.token.split(":", 1)) if ":" in ctx.token else None
+        if not auth:
+            raise ProviderError("Bitbucket token must be in form username:app_password")
+
+        async with self._client(ctx) as client:
+            comments = await _get_comments(
+                client,
+                f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/comments",
+                headers={},
+                auth=auth,
+            )
+        return _existing_comments(comments)
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "bitbucket" or not parsed.workspace or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid Bitbucket Cloud PR link")
@@ -117,9 +162,9 @@ class BitbucketCloudProvider(Provider):
         if not auth:
             raise ProviderError("Bitbucket token must be in form username:app_password")
 
-        with self._client(ctx) as client:
+        async with self._client(ctx) as client:
             url = f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests/{parsed.pr_number}/comments"
-            r = client.post(url, auth=auth, json={"content": {"raw": body_markdown}})
+            r = await client.post(url, auth=auth, json={"content": {"raw": body_markdown}})
             if r.status_code in {401, 403}:
                 raise AuthRequiredError("bitbucket", host, f"Bitbucket auth failed ({r.status_code}).")
             if r.status_code >= 400:
@@ -128,6 +173,41 @@ class BitbucketCloudProvider(Provider):
             links = j.get("links") or {}
             return (links.get("html") or {}).get("href") or (links.get("self") or {}).get("href") or ""
 
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(ctx.pr_url, provider="bitbucket")
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        if not host.endswith("bitbucket.org"):
+            raise ProviderError("Bitbucket Server/Data Center is not supported in this MVP (Bitbucket Cloud only).")
+        api_base = "https://api.bitbucket.org/2.0"
+        if not ctx.token:
+            raise AuthRequiredError(
+                "bitbucket",
+                host,
+                "Bitbucket app password required to list pull requests. Use username:app_password as the token value.",
+            )
+        auth = tuple(ctx.token.split(":", 1)) if ":" in ctx.token else None
+        if not auth:
+            raise ProviderError("Bitbucket token must be in form username:app_password")
+
+        out: List[PullRequestSummary] = []
+        async with self._client(ctx) as client:
+            # Bitbucket paginates with an absolute `next` link.
+            url = f"{api_base}/repositories/{parsed.workspace}/{parsed.repo}/pullrequests?state=OPEN&pagelen=50"
+            while url and len(out) < max_items:
+                data = await _get_json(client, url, headers={}, auth=auth)
+                for p in data.get("values", []) or []:
+                    out.append(
+                        PullRequestSummary(
+                            number=int(p["id"]),
+                            pr_url=f"https://{host}/{parsed.workspace}/{parsed.repo}/pull-requests/{p['id']}",
+                            title=p.get("title") or "",
+                            head_sha=((p.get("source") or {}).get("commit") or {}).get("hash"),
+                        )
+                    )
+                url = data.get("next")
+        return out[:max_items]
+
 
 def _extract_paths(diffstat_json: dict) -> List[str]:
     out: List[str] = []
@@ -145,25 +225,8 @@ def _extract_paths(diffstat_json: dict) -> List[str]:
     return uniq
 
 
-def _split_unified_diff(diff_text: str) -> Dict[str, str]:
-    """
-    Best-effort split by `diff --git a/... b/...` blocks.
-    """
-    blocks: Dict[str, List[str]] = {}
-    current_path = None
-    for line in diff_text.splitlines():
-        m = re.match(r"^diff --git a/(.+?) b/(.+?)$", line)
-        if m:
-            current_path = m.group(2)
-            blocks.setdefault(current_path, []).append(line)
-            continue
-        if current_path is not None:
-            blocks[current_path].append(line)
-    return {k: "\n".join(v) + "\n" for k, v in blocks.items()}
-
-
-def _get_json(client: httpx.Client, url: str, *, headers: dict, auth) -> dict:
-    r = client.get(url, headers=headers, auth=auth)
+async def _get_json(client: httpx.AsyncClient, url: str, *, headers: dict, auth) -> dict:
+    r = await client.get(url, headers=headers, auth=auth)
     if r.status_code in {401, 403}:
         raise AuthRequiredError("bitbucket", urlparse(url).netloc, f"Bitbucket auth failed ({r.status_code}).")
     if r.status_code >= 400:
@@ -171,12 +234,48 @@ def _get_json(client: httpx.Client, url: str, *, headers: dict, auth) -> dict:
     return r.json()
 
 
-def _get_text(client: httpx.Client, url: str, *, headers: dict, auth) -> str:
-    r = client.get(url, headers=headers, auth=auth)
-    if r.status_code in {401, 403}:
-        raise AuthRequiredError("bitbucket", urlparse(url).netloc, f"Bitbucket auth failed ({r.status_code}).")
-    if r.status_code >= 400:
-        raise ProviderError(f"Bitbucket diff error {r.status_code}: {r.text[:500]}")
-    return r.text
+async def _get_comments(client: httpx.AsyncClient, url: str, *, headers: dict, auth) -> List[dict]:
+    # Comments are paged (10 per page by default): follow `next` so markers on later pages are seen too.
+    out: List[dict] = []
+    page = await _get_json(client, url + "?pagelen=100", headers=headers, auth=auth)
+    for _ in range(_MAX_COMMENT_PAGES):
+        out.extend((page.get("values") or []) if isinstance(page, dict) else [])
+        nxt = page.get("next") if isinstance(page, dict) else None
+        if not nxt:
+            break
+        page = await _get_json(client, nxt, headers=headers, auth=auth)
+    return out
+
+
+def _existing_comments(comments: List[dict]) -> List[ExistingDiscussionComment]:
+    return [
+        ExistingDiscussionComment(
+            author=((c.get("user") or {}).get("nickname") or (c.get("user") or {}).get("display_name") or ""),
+            body=((c.get("content") or {}).get("raw") if isinstance(c.get("content"), dict) else "") or "",
+            url=((c.get("links") or {}).get("html") or {}).get("href") if isinstance(c.get("links"), dict) else None,
+            created_at=c.get("created_on"),
+            kind="comment",
+        )
+        for c in comments
+    ]
+
+
+async def _get_diff_files(
+    client: httpx.AsyncClient, url: str, *, headers: dict, auth, ctx: ProviderContext
+) -> List[ChangedFile]:
+    # Streamed and split per file as it arrives: a huge (vendored) diff is never held in memory as a whole.
+    async with client.stream("GET", url, headers=headers, auth=auth) as r:
+        if r.status_code >= 400:
+            await r.aread()
+        if r.status_code in {401, 403}:
+            raise AuthRequiredError("bitbucket", urlparse(url).netloc, f"Bitbucket auth failed ({r.status_code}).")
+        if r.status_code >= 400:
+            raise ProviderError(f"Bitbucket diff error {r.status_code}: {r.text[:500]}")
+        return [
+            f
+            async for f in iter_diff_files(
+                r.aiter_bytes(), max_file_bytes=ctx.max_file_diff_bytes, max_total_bytes=ctx.max_total_diff_bytes
+            )
+        ]
 
 
@@ -1,16 +1,27 @@
 from __future__ import annotations
 
-import re
-from typing import Dict, List
+from typing import List, Optional
 from urllib.parse import urlparse
 
 import httpx
 
+from prreviewbot.core.aio import gather_all
+from prreviewbot.core.diff_stream import iter_diff_files
 from prreviewbot.core.errors import AuthRequiredError, ProviderError
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.types import (
+    ChangedFile,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    project,
+)
 from prreviewbot.providers.base import Provider, ProviderContext
 
+# Fields of the PR payload kept in `PullRequestInfo.raw`.
+_PR_FIELDS = ("number", "state", "merged", "user.login", "head.ref", "head.sha", "base.ref", "base.sha", "html_url")
+_MAX_REVIEW_PAGES = 20
+
 
 class GiteaProvider(Provider):
     """
@@ -21,7 +32,7 @@ class GiteaProvider(Provider):
     def name(self) -> str:
         return "gitea"
 
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+    async def afetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "gitea" or not parsed.owner or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid Gitea PR link")
@@ -35,36 +46,19 @@ class GiteaProvider(Provider):
 
         headers = {"Authorization": f"token {ctx.token}"}
 
-        with self._client(ctx) as client:
-            pr = _get_json(client, f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}", headers=headers)
-            # Prefer diff endpoint when available
-            diff_text = _get_text(
-                client, f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}.diff", headers=headers
-            )
-            comments = _get_json(
-                client,
-                f"{api_base}/repos/{parsed.owner}/{parsed.repo}/issues/{parsed.pr_number}/comments",
-                headers=headers,
-            )
-
-        per_file = _split_unified_diff(diff_text)
-        changed: List[ChangedFile] = []
-        if per_file:
-            for path, patch in per_file.items():
-                changed.append(ChangedFile(path=path, patch=patch))
-        else:
-            changed = [ChangedFile(path="(diff)", patch=diff_text)]
-
-        existing: List[ExistingDiscussionComment] = []
-        for c in (comments or []):
-            existing.append(
-                ExistingDiscussionComment(
-                    author=((c.get("user") or {}).get("login") or ""),
-                    body=c.get("body") or "",
-                    url=c.get("html_url"),
-                    created_at=c.get("created_at"),
-                    kind="comment",
-                )
+        async with self._client(ctx) as client:
+            pr, changed, existing = await gather_all(
+                _get_json(client, f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}", headers=headers),
+                # Prefer diff endpoint when available
+                _get_diff_files(
+                    client,
+                    f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}.diff",
+                    headers=headers,
+                    ctx=ctx,
+                ),
+                _get_discussion(
+                    client, f"{api_base}/repos/{parsed.owner}/{parsed.repo}", parsed.pr_number, headers=headers
+                ),
             )
 
         return PullRequestInfo(
@@ -75,10 +69,32 @@ class GiteaProvider(Provider):
             description=pr.get("body") or "",
             changed_files=changed,
             existing_discussion=existing,
-            raw={"pr": pr, "files_count": len(changed), "comments_count": len(existing)},
+            head_sha=(pr.get("head") or {}).get("sha"),
+            raw={
+                "pr": project(pr, _PR_FIELDS),
+                "files_count": len(changed),
+                "comments_count": len(existing),
+                "truncated_files_count": sum(1 for f in changed if f.truncated),
+            },
         )
 
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+    async def afetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "gitea" or not parsed.owner or not parsed.repo or not parsed.pr_number:
+            raise ProviderError("Invalid Gitea PR link")
+
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = f"{u.scheme}://{host}/api/v1"
+        if not ctx.token:
+            raise AuthRequiredError("gitea", host, "Gitea token required for this PR/repo.")
+        headers = {"Authorization": f"token {ctx.token}"}
+
+        async with self._client(ctx) as client:
+            repo_api = f"{api_base}/repos/{parsed.owner}/{parsed.repo}"
+            return await _get_discussion(client, repo_api, parsed.pr_number, headers=headers)
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "gitea" or not parsed.owner or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid Gitea PR link")
@@ -90,10 +106,10 @@ class GiteaProvider(Provider):
             raise AuthRequiredError("gitea", host, "Gitea token required to post PR comments.")
         headers = {"Authorization": f"token {ctx.token}"}
 
-        with self._client(ctx) as client:
+        async with self._client(ctx) as client:
             # In Gitea, PRs are issues; PR number is the index.
             url = f"{api_base}/repos/{parsed.owner}/{parsed.repo}/issues/{parsed.pr_number}/comments"
-            r = client.post(url, headers=headers, json={"body": body_markdown})
+            r = await client.post(url, headers=headers, json={"body": body_markdown})
             if r.status_code in {401, 403}:
                 raise AuthRequiredError("gitea", host, f"Gitea auth failed ({r.status_code}).")
             if r.status_code >= 400:
@@ -101,23 +117,53 @@ class GiteaProvider(Provider):
             j = r.json()
             return j.get("html_url") or ""
 
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(ctx.pr_url, provider="gitea")
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = f"{u.scheme}://{host}/api/v1"
+        if not ctx.token:
+            raise AuthRequiredError("gitea", host, "Gitea token required to list pull requests.")
+        headers = {"Authorization": f"token {ctx.token}"}
 
-def _split_unified_diff(diff_text: str) -> Dict[str, str]:
-    blocks: Dict[str, List[str]] = {}
-    current_path = None
-    for line in diff_text.splitlines():
-        m = re.match(r"^diff --git a/(.+?) b/(.+?)$", line)
-        if m:
-            current_path = m.group(2)
-            blocks.setdefault(current_path, []).append(line)
-            continue
-        if current_path is not None:
-            blocks[current_path].append(line)
-    return {k: "\n".join(v) + "\n" for k, v in blocks.items()}
-
-
-def _get_json(client: httpx.Client, url: str, *, headers: dict) -> dict:
-    r = client.get(url, headers=headers)
+        out: List[PullRequestSummary] = []
+        async with self._client(ctx) as client:
+            url = f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls"
+            page = 1
+            while len(out) < max_items:
+                # Gitea caps `limit` at the server's MAX_RESPONSE_ITEMS (50 by default, often lower), so a short page
+                # is not the last one: stop on an empty page or once X-Total-Count items are in.
+                r = await client.get(url, headers=headers, params={"state": "open", "limit": 50, "page": page})
+                if r.status_code in {401, 403}:
+                    raise AuthRequiredError("gitea", host, f"Gitea auth failed ({r.status_code}).")
+                if r.status_code >= 400:
+                    raise ProviderError(f"Gitea pulls API error {r.status_code}: {r.text[:500]}")
+                items = r.json() or []
+                for p in items:
+                    out.append(
+                        PullRequestSummary(
+                            number=int(p["number"]),
+                            pr_url=f"{u.scheme}://{host}/{parsed.owner}/{parsed.repo}/pulls/{p['number']}",
+                            title=p.get("title") or "",
+                            head_sha=(p.get("head") or {}).get("sha"),
+                        )
+                    )
+                total = _int_header(r, "X-Total-Count")
+                if not items or (total is not None and len(out) >= total):
+                    break
+                page += 1
+        return out[:max_items]
+
+
+def _int_header(r: httpx.Response, name: str) -> Optional[int]:
+    try:
+        return int((r.headers.get(name) or "").strip())
+    except ValueError:
+        return None
+
+
+async def _get_json(client: httpx.AsyncClient, url: str, *, headers: dict) -> dict:
+    r = await client.get(url, headers=headers)
     if r.status_code in {401, 403}:
         raise AuthRequiredError("gitea", urlparse(url).netloc, f"Gitea auth failed ({r.status_code}).")
     if r.status_code >= 400:
@@ -125,12 +171,72 @@ def _get_json(client: httpx.Client, url: str, *, headers: dict) -> dict:
     return r.json()
 
 
-def _get_text(client: httpx.Client, url: str, *, headers: dict) -> str:
-    r = client.get(url, headers=headers)
-    if r.status_code in {401, 403}:
-        raise AuthRequiredError("gitea", urlparse(url).netloc, f"Gitea auth failed ({r.status_code}).")
-    if r.status_code >= 400:
-        raise ProviderError(f"Gitea diff error {r.status_code}: {r.text[:500]}")
-    return r.text
+async def _get_discussion(
+    client: httpx.AsyncClient, repo_api: str, number: str, *, headers: dict
+) -> List[ExistingDiscussionComment]:
+    """Issue comments (general discussion), then each review's body and inline comments."""
+    comments, reviews = await gather_all(
+        _get_json(client, f"{repo_api}/issues/{number}/comments", headers=headers),
+        _get_reviews(client, f"{repo_api}/pulls/{number}/reviews", headers=headers),
+    )
+    inline = await gather_all(
+        *[
+            _get_json(client, f"{repo_api}/pulls/{number}/reviews/{rv['id']}/comments", headers=headers)
+            for rv in reviews
+            if rv.get("comments_count")
+        ]
+    )
+
+    def entry(c: dict, kind: str, **extra) -> ExistingDiscussionComment:
+        return ExistingDiscussionComment(
+            author=((c.get("user") or {}).get("login") or ""),
+            body=c.get("body") or "",
+            url=c.get("html_url"),
+            created_at=c.get("created_at") or c.get("submitted_at"),
+            kind=kind,
+            **extra,
+        )
+
+    existing = [entry(c, "comment") for c in comments or []]
+    existing += [entry(rv, "review") for rv in reviews if rv.get("body")]
+    for rc in inline:
+        existing += [entry(c, "review_comment", file_path=c.get("path")) for c in rc or []]
+    return existing
+
+
+async def _get_reviews(client: httpx.AsyncClient, url: str, *, headers: dict) -> List[dict]:
+    # Paged like the PR list (`limit` capped by the server); Gitea before 1.12 has no reviews API (404).
+    out: List[dict] = []
+    for page in range(1, _MAX_REVIEW_PAGES + 1):
+        r = await client.get(url, headers=headers, params={"limit": 50, "page": page})
+        if r.status_code == 404:
+            break
+        if r.status_code in {401, 403}:
+            raise AuthRequiredError("gitea", urlparse(url).netloc, f"Gitea auth failed ({r.status_code}).")
+        if r.status_code >= 400:
+            raise ProviderError(f"Gitea reviews API error {r.status_code}: {r.text[:500]}")
+        items = r.json() or []
+        out.extend(items)
+        total = _int_header(r, "X-Total-Count")
+        if not items or (total is not None and len(out) >= total):
+            break
+    return out
+
+
+async def _get_diff_files(client: httpx.AsyncClient, url: str, *, headers: dict, ctx: ProviderContext) -> List[ChangedFile]:
+    # Streamed and split per file as it arrives: a huge (vendored) diff is never held in memory as a whole.
+    async with client.stream("GET", url, headers=headers) as r:
+        if r.status_code >= 400:
+            await r.aread()
+        if r.status_code in {401, 403}:
+            raise AuthRequiredError("gitea", urlparse(url).netloc, f"Gitea auth failed ({r.status_code}).")
+        if r.status_code >= 400:
+            raise ProviderError(f"Gitea diff error {r.status_code}: {r.text[:500]}")
+        return [
+            f
+            async for f in iter_diff_files(
+                r.aiter_bytes(), max_file_bytes=ctx.max_file_diff_bytes, max_total_bytes=ctx.max_total_diff_bytes
+            )
+        ]
 
 
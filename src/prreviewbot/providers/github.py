@@ -1,21 +1,49 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 import httpx
 
+from prreviewbot.core.aio import cancel_all, gather_all
+from prreviewbot.core.comment_format import format_review_comment_markdown, inline_lines
 from prreviewbot.core.errors import AuthRequiredError, ProviderError
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
-from prreviewbot.providers.base import Provider, ProviderContext
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.types import (
+    ChangedFile,
+    CommentPostResult,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    ReviewComment,
+    project,
+)
+from prreviewbot.providers.base import Provider, ProviderContext, PullRequestStream
+
+# Fields of the PR payload kept in `PullRequestInfo.raw`.
+_PR_FIELDS = (
+    "number",
+    "state",
+    "draft",
+    "merged",
+    "user.login",
+    "head.ref",
+    "head.sha",
+    "base.ref",
+    "base.sha",
+    "html_url",
+)
+# The files API pages 100 files at a time and lists at most 3000 files (we read up to 2000).
+_FILES_PER_PAGE = 100
+_MAX_FILE_PAGES = 20
 
 
 class GitHubProvider(Provider):
     def name(self) -> str:
         return "github"
 
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+    async def astream_pr(self, ctx: ProviderContext) -> PullRequestStream:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "github" or not parsed.owner or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid GitHub PR link")
@@ -27,71 +55,68 @@ class GitHubProvider(Provider):
         if not ctx.token:
             raise AuthRequiredError("github", host, "GitHub token required for this PR/repo.")
         headers["Authorization"] = f"Bearer {ctx.token}"
+        repo_api = f"{api_base}/repos/{parsed.owner}/{parsed.repo}"
+        files_url = f"{repo_api}/pulls/{parsed.pr_number}/files"
+        raw: Dict[str, Any] = {}
 
-        with self._client(ctx) as client:
-            pr = _get_json(
-                client,
-                f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}",
-                headers=headers,
-            )
-            files = _get_all_files(
-                client,
-                f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}/files",
-                headers=headers,
-            )
-            # Existing discussion context:
-            # - Issue comments (general discussion)
-            issue_comments = _get_all(
-                client,
-                f"{api_base}/repos/{parsed.owner}/{parsed.repo}/issues/{parsed.pr_number}/comments",
-                headers=headers,
-            )
-            # - Review comments (inline comments)
-            review_comments = _get_all(
-                client,
-                f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}/comments",
-                headers=headers,
-            )
+        async with self._client(ctx) as client:
 
-        changed: List[ChangedFile] = []
-        for f in files:
-            changed.append(ChangedFile(path=f.get("filename") or "unknown", patch=f.get("patch")))
-
-        existing: List[ExistingDiscussionComment] = []
-        for c in issue_comments:
-            existing.append(
-                ExistingDiscussionComment(
-                    author=((c.get("user") or {}).get("login") or ""),
-                    body=c.get("body") or "",
-                    url=c.get("html_url") or c.get("url"),
-                    created_at=c.get("created_at"),
-                    kind="issue_comment",
-                )
-            )
-        for c in review_comments:
-            existing.append(
-                ExistingDiscussionComment(
-                    author=((c.get("user") or {}).get("login") or ""),
-                    body=c.get("body") or "",
-                    url=c.get("html_url") or c.get("url"),
-                    file_path=c.get("path"),
-                    created_at=c.get("created_at"),
-                    kind="review_comment",
+            async def discussion() -> List[ExistingDiscussionComment]:
+                existing, counts = await _get_discussion(client, repo_api, parsed.pr_number, headers=headers)
+                raw.update(counts)
+                return existing
+
+            async def files(first: list) -> AsyncIterator[List[ChangedFile]]:
+                items, page, count = first, 1, 0
+                while items:
+                    yield [ChangedFile(path=f.get("filename") or "unknown", patch=f.get("patch")) for f in items]
+                    count += len(items)
+                    if len(items) < _FILES_PER_PAGE or page >= _MAX_FILE_PAGES:
+                        break
+                    page += 1
+                    items = await _get_files_page(client, files_url, headers=headers, page=page)
+                raw["files_count"] = count
+
+            # The discussion is fetched while the header and the file pages come in.
+            comments = asyncio.ensure_future(discussion())
+            try:
+                pr, first = await gather_all(
+                    _get_json(client, f"{repo_api}/pulls/{parsed.pr_number}", headers=headers),
+                    _get_files_page(client, files_url, headers=headers, page=1),
                 )
+            except BaseException:
+                await cancel_all(comments)
+                raise
+            raw["pr"] = project(pr, _PR_FIELDS)
+            info = PullRequestInfo(
+                provider="github",
+                host=host,
+                pr_url=ctx.pr_url,
+                title=pr.get("title") or "",
+                description=pr.get("body") or "",
+                head_sha=(pr.get("head") or {}).get("sha"),
+                raw=raw,
             )
+            return PullRequestStream(info, files(first), comments)
 
-        return PullRequestInfo(
-            provider="github",
-            host=host,
-            pr_url=ctx.pr_url,
-            title=pr.get("title") or "",
-            description=pr.get("body") or "",
-            changed_files=changed,
-            existing_discussion=existing,
-            raw={"pr": pr, "files_count": len(files), "issue_comments_count": len(issue_comments), "review_comments_count": len(review_comments)},
-        )
+    async def afetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "github" or not parsed.owner or not parsed.repo or not parsed.pr_number:
+            raise ProviderError("Invalid GitHub PR link")
 
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = "https://api.github.com" if host == "github.com" else f"{u.scheme}://{host}/api/v3"
+        if not ctx.token:
+            raise AuthRequiredError("github", host, "GitHub token required for this PR/repo.")
+        headers = {"Accept": "application/vnd.github+json", "Authorization": f"Bearer {ctx.token}"}
+
+        async with self._client(ctx) as client:
+            repo_api = f"{api_base}/repos/{parsed.owner}/{parsed.repo}"
+            existing, _ = await _get_discussion(client, repo_api, parsed.pr_number, headers=headers)
+        return existing
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "github" or not parsed.owner or not parsed.repo or not parsed.pr_number:
             raise ProviderError("Invalid GitHub PR link")
@@ -103,9 +128,9 @@ class GitHubProvider(Provider):
             raise AuthRequiredError("github", host, "GitHub token required to post PR comments.")
         headers = {"Accept": "application/vnd.github+json", "Authorization": f"Bearer {ctx.token}"}
 
-        with self._client(ctx) as client:
+        async with self._client(ctx) as client:
             url = f"{api_base}/repos/{parsed.owner}/{parsed.repo}/issues/{parsed.pr_number}/comments"
-            r = client.post(url, headers=headers, json={"body": body_markdown})
+            r = await client.post(url, headers=headers, json={"body": body_markdown})
             if r.status_code in {401, 403}:
                 raise AuthRequiredError("github", host, f"GitHub auth failed ({r.status_code}).")
             if r.status_code >= 400:
@@ -113,9 +138,84 @@ class GitHubProvider(Provider):
             j = r.json()
             return j.get("html_url") or j.get("url") or ""
 
+    async def apost_comments(self, ctx: ProviderContext, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        """One review (one notification): anchored comments inline, the rest in the review body."""
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "github" or not parsed.owner or not parsed.repo or not parsed.pr_number:
+            raise ProviderError("Invalid GitHub PR link")
+
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = "https://api.github.com" if host == "github.com" else f"{u.scheme}://{host}/api/v3"
+        if not ctx.token:
+            raise AuthRequiredError("github", host, "GitHub token required to post PR comments.")
+        headers = {"Accept": "application/vnd.github+json", "Authorization": f"Bearer {ctx.token}"}
+
+        bodies = [format_review_comment_markdown(ctx.pr_url, c) for c in comments]
+        inline = [_review_comment(c, body) for c, body in zip(comments, bodies)]
+
+        def review(anchored: bool) -> dict:
+            general = [body for body, ic in zip(bodies, inline) if not (anchored and ic)]
+            return {
+                "event": "COMMENT",
+                "body": "\n\n---\n\n".join(general) or f"{len(comments)} inline suggestion(s) from PRreviewBot",
+                "comments": [ic for ic in inline if anchored and ic],
+            }
+
+        url = f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls/{parsed.pr_number}/reviews"
+        anchored = any(inline)
+        async with self._client(ctx) as client:
+            r = await client.post(url, headers=headers, json=review(anchored))
+            if r.status_code == 422 and anchored:
+                # A line outside the PR's diff rejects the whole review: post everything in the body instead.
+                anchored = False
+                r = await client.post(url, headers=headers, json=review(anchored))
+            if r.status_code in {401, 403}:
+                raise AuthRequiredError("github", host, f"GitHub auth failed ({r.status_code}).")
+            if r.status_code >= 400:
+                error = f"GitHub review API error {r.status_code}: {r.text[:500]}"
+                return [CommentPostResult(ok=False, error=error) for _ in comments]
+            j = r.json()
+        review_url = j.get("html_url") or ""
+        return [CommentPostResult(ok=True, comment_url=review_url, inline=anchored and bool(ic)) for ic in inline]
+
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(ctx.pr_url, provider="github")
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = "https://api.github.com" if host == "github.com" else f"{u.scheme}://{host}/api/v3"
+        if not ctx.token:
+            raise AuthRequiredError("github", host, "GitHub token required to list pull requests.")
+        headers = {"Accept": "application/vnd.github+json", "Authorization": f"Bearer {ctx.token}"}
+
+        out: List[PullRequestSummary] = []
+        async with self._client(ctx) as client:
+            url = f"{api_base}/repos/{parsed.owner}/{parsed.repo}/pulls"
+            page = 1
+            while len(out) < max_items:
+                r = await client.get(url, headers=headers, params={"state": "open", "per_page": 100, "page": page})
+                if r.status_code in {401, 403}:
+                    raise AuthRequiredError("github", host, f"GitHub auth failed ({r.status_code}).")
+                if r.status_code >= 400:
+                    raise ProviderError(f"GitHub pulls API error {r.status_code}: {r.text[:500]}")
+                items = r.json() or []
+                for p in items:
+                    out.append(
+                        PullRequestSummary(
+                            number=int(p["number"]),
+                            pr_url=f"{u.scheme}://{host}/{parsed.owner}/{parsed.repo}/pull/{p['number']}",
+                            title=p.get("title") or "",
+                            head_sha=(p.get("head") or {}).get("sha"),
+                        )
+                    )
+                if len(items) < 100:
+                    break
+                page += 1
+        return out[:max_items]
 
-def _get_json(client: httpx.Client, url: str, *, headers: dict) -> dict:
-    r = client.get(url, headers=headers)
+
+async def _get_json(client: httpx.AsyncClient, url: str, *, headers: dict) -> dict:
+    r = await client.get(url, headers=headers)
     if r.status_code in {401, 403}:
         raise AuthRequiredError("github", urlparse(url).netloc, f"GitHub auth failed ({r.status_code}).")
     if r.status_code >= 400:
@@ -123,32 +223,74 @@ def _get_json(client: httpx.Client, url: str, *, headers: dict) -> dict:
     return r.json()
 
 
-def _get_all_files(client: httpx.Client, url: str, *, headers: dict) -> list:
-    out = []
-    page = 1
-    while True:
-        r = client.get(url, headers=headers, params={"per_page": 100, "page": page})
-        if r.status_code in {401, 403}:
-            raise AuthRequiredError("github", urlparse(url).netloc, f"GitHub auth failed ({r.status_code}).")
-        if r.status_code >= 400:
-            raise ProviderError(f"GitHub files API error {r.status_code}: {r.text[:500]}")
-        items = r.json()
-        if not items:
-            break
-        out.extend(items)
-        if len(items) < 100:
-            break
-        page += 1
-        if page > 20:
-            break
-    return out
+async def _get_discussion(
+    client: httpx.AsyncClient, repo_api: str, number: str, *, headers: dict
+) -> Tuple[List[ExistingDiscussionComment], Dict[str, int]]:
+    """
+    Issue comments (general discussion), review comments (inline) and review bodies, where `apost_comments` puts
+    the suggestions it cannot anchor. Also returns their counts for `PullRequestInfo.raw`.
+    """
+    issue_comments, review_comments, reviews = await gather_all(
+        _get_all(client, f"{repo_api}/issues/{number}/comments", headers=headers),
+        _get_all(client, f"{repo_api}/pulls/{number}/comments", headers=headers),
+        _get_all(client, f"{repo_api}/pulls/{number}/reviews", headers=headers),
+    )
+    existing: List[ExistingDiscussionComment] = []
+    for c in issue_comments:
+        existing.append(
+            ExistingDiscussionComment(
+                author=((c.get("user") or {}).get("login") or ""),
+                body=c.get("body") or "",
+                url=c.get("html_url") or c.get("url"),
+                created_at=c.get("created_at"),
+                kind="issue_comment",
+            )
+        )
+    for c in review_comments:
+        existing.append(
+            ExistingDiscussionComment(
+                author=((c.get("user") or {}).get("login") or ""),
+                body=c.get("body") or "",
+                url=c.get("html_url") or c.get("url"),
+                file_path=c.get("path"),
+                created_at=c.get("created_at"),
+                kind="review_comment",
+            )
+        )
+    for rv in reviews:
+        if not rv.get("body"):
+            continue  # reviews that only approve or carry inline comments
+        existing.append(
+            ExistingDiscussionComment(
+                author=((rv.get("user") or {}).get("login") or ""),
+                body=rv["body"],
+                url=rv.get("html_url"),
+                created_at=rv.get("submitted_at"),
+                kind="review",
+            )
+        )
+    counts = {
+        "issue_comments_count": len(issue_comments),
+        "review_comments_count": len(review_comments),
+        "reviews_count": len(reviews),
+    }
+    return existing, counts
 
 
-def _get_all(client: httpx.Client, url: str, *, headers: dict) -> list:
+async def _get_files_page(client: httpx.AsyncClient, url: str, *, headers: dict, page: int) -> list:
+    r = await client.get(url, headers=headers, params={"per_page": _FILES_PER_PAGE, "page": page})
+    if r.status_code in {401, 403}:
+        raise AuthRequiredError("github", urlparse(url).netloc, f"GitHub auth failed ({r.status_code}).")
+    if r.status_code >= 400:
+        raise ProviderError(f"GitHub files API error {r.status_code}: {r.text[:500]}")
+    return r.json()
+
+
+async def _get_all(client: httpx.AsyncClient, url: str, *, headers: dict) -> list:
     out = []
     page = 1
     while True:
-        r = client.get(url, headers=headers, params={"per_page": 100, "page": page})
+        r = await client.get(url, headers=headers, params={"per_page": 100, "page": page})
         if r.status_code in {401, 403}:
             raise AuthRequiredError("github", urlparse(url).netloc, f"GitHub auth failed ({r.status_code}).")
         if r.status_code >= 400:
@@ -165,3 +307,12 @@ def _get_all(client: httpx.Client, url: str, *, headers: dict) -> list:
     return out
 
 
+def _review_comment(c: ReviewComment, body: str) -> Optional[dict]:
+    lines = inline_lines(c)
+    if lines is None:
+        return None
+    side = "LEFT" if c.line_side == "old" else "RIGHT"
+    out = {"path": c.file_path, "body": body, "line": lines[1], "side": side}
+    if lines[0] != lines[1]:
+        out.update(start_line=lines[0], start_side=side)
+    return out
@@ -1,21 +1,41 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+from typing import List, Optional, Sequence
 from urllib.parse import quote, urlparse
 
 import httpx
 
+from prreviewbot.core.aio import gather_all
+from prreviewbot.core.comment_format import format_review_comment_markdown, inline_lines
 from prreviewbot.core.errors import AuthRequiredError, ProviderError
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
-from prreviewbot.providers.base import Provider, ProviderContext
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
+from prreviewbot.core.types import (
+    ChangedFile,
+    CommentPostResult,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    PullRequestSummary,
+    ReviewComment,
+    project,
+)
+from prreviewbot.providers.base import Provider, ProviderContext, post_paced
+
+# Fields of the MR payload kept in `PullRequestInfo.raw`.
+_MR_FIELDS = ("iid", "state", "draft", "author.username", "source_branch", "target_branch", "sha", "web_url")
+
+# Page sizes keep each response bounded; pages after the first are fetched concurrently.
+_DIFFS_PER_PAGE = 50
+_DISCUSSIONS_PER_PAGE = 100
+_PAGE_CONCURRENCY = 4
+_MAX_PAGES = 200
 
 
 class GitLabProvider(Provider):
     def name(self) -> str:
         return "gitlab"
 
-    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+    async def afetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "gitlab" or not parsed.namespace_path or not parsed.pr_number:
             raise ProviderError("Invalid GitLab MR link")
@@ -30,35 +50,29 @@ class GitLabProvider(Provider):
         headers = {"PRIVATE-TOKEN": ctx.token}
         project_id = quote(parsed.namespace_path, safe="")
 
-        with self._client(ctx) as client:
-            mr = _get_json(client, f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}", headers=headers)
-            changes = _get_json(
-                client,
-                f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}/changes",
-                headers=headers,
-            )
-            notes = _get_json(
-                client,
-                f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}/notes",
-                headers=headers,
+        mr_api = f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}"
+        async with self._client(ctx) as client:
+            mr, diffs, discussions = await gather_all(
+                _get_json(client, mr_api, headers=headers),
+                _get_diffs(client, mr_api, headers=headers),
+                _get_pages(client, f"{mr_api}/discussions", headers=headers, per_page=_DISCUSSIONS_PER_PAGE),
             )
 
         changed: List[ChangedFile] = []
-        for c in changes.get("changes", []) or []:
-            changed.append(ChangedFile(path=c.get("new_path") or c.get("old_path") or "unknown", patch=c.get("diff")))
-
-        existing: List[ExistingDiscussionComment] = []
-        for n in (notes or []):
-            existing.append(
-                ExistingDiscussionComment(
-                    author=((n.get("author") or {}).get("username") or (n.get("author") or {}).get("name") or ""),
-                    body=n.get("body") or "",
-                    url=n.get("web_url") or n.get("url"),
-                    created_at=n.get("created_at"),
-                    kind="comment",
+        for c in diffs:
+            patch = c.get("diff") or None
+            # GitLab drops the text of files over its diff limits and flags them instead.
+            too_large = patch is None and bool(c.get("too_large") or c.get("collapsed"))
+            changed.append(
+                ChangedFile(
+                    path=c.get("new_path") or c.get("old_path") or "unknown",
+                    patch=patch,
+                    truncated="file_bytes" if too_large else None,
                 )
             )
 
+        existing = _existing_notes(discussions or [], mr.get("web_url") or ctx.pr_url)
+
         return PullRequestInfo(
             provider="gitlab",
             host=host,
@@ -67,10 +81,38 @@ class GitLabProvider(Provider):
             description=mr.get("description") or "",
             changed_files=changed,
             existing_discussion=existing,
-            raw={"mr": mr, "changes_count": len(changed), "notes_count": len(existing)},
+            head_sha=mr.get("sha"),
+            raw={
+                "mr": project(mr, _MR_FIELDS),
+                "changes_count": len(changed),
+                "notes_count": len(existing),
+                "discussions_count": len(discussions or []),
+            },
         )
 
-    def post_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
+    async def afetch_discussion(self, ctx: ProviderContext) -> List[ExistingDiscussionComment]:
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "gitlab" or not parsed.namespace_path or not parsed.pr_number:
+            raise ProviderError("Invalid GitLab MR link")
+
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = f"{u.scheme}://{host}/api/v4"
+        if not ctx.token:
+            raise AuthRequiredError("gitlab", host, "GitLab token required for this MR/project.")
+        headers = {"PRIVATE-TOKEN": ctx.token}
+        project_id = quote(parsed.namespace_path, safe="")
+
+        mr_api = f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}"
+        async with self._client(ctx) as client:
+            # The header only for the note URLs; the diffs are not fetched.
+            mr, discussions = await gather_all(
+                _get_json(client, mr_api, headers=headers),
+                _get_pages(client, f"{mr_api}/discussions", headers=headers, per_page=_DISCUSSIONS_PER_PAGE),
+            )
+        return _existing_notes(discussions or [], mr.get("web_url") or ctx.pr_url)
+
+    async def apost_comment(self, ctx: ProviderContext, *, body_markdown: str) -> str:
         parsed = parse_pr_link(ctx.pr_url)
         if parsed.provider != "gitlab" or not parsed.namespace_path or not parsed.pr_number:
             raise ProviderError("Invalid GitLab MR link")
@@ -83,9 +125,9 @@ class GitLabProvider(Provider):
         headers = {"PRIVATE-TOKEN": ctx.token}
         project_id = quote(parsed.namespace_path, safe="")
 
-        with self._client(ctx) as client:
+        async with self._client(ctx) as client:
             url = f"{api_base}/projects/{project_id}/merge_requests/{parsed.pr_number}/notes"
-            r = client.post(url, headers=headers, json={"body": body_markdown})
+            r = await client.post(url, headers=headers, json={"body": body_markdown})
             if r.status_code in {401, 403}:
                 raise AuthRequiredError("gitlab", host, f"GitLab auth failed ({r.status_code}).")
             if r.status_code >= 400:
@@ -93,13 +135,190 @@ class GitLabProvider(Provider):
             j = r.json()
             return j.get("web_url") or j.get("url") or ""
 
+    async def apost_comments(self, ctx: ProviderContext, comments: Sequence[ReviewComment]) -> List[CommentPostResult]:
+        """
+        Draft notes (anchored ones with a diff position), then one bulk publish: a single notification. Note that
+        the publish also releases drafts the token's user had left on the MR.
+        """
+        parsed = parse_pr_link(ctx.pr_url)
+        if parsed.provider != "gitlab" or not parsed.namespace_path or not parsed.pr_number:
+            raise ProviderError("Invalid GitLab MR link")
+
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        if not ctx.token:
+            raise AuthRequiredError("gitlab", host, "GitLab token required to post MR comments.")
+        headers = {"PRIVATE-TOKEN": ctx.token}
+        project_id = quote(parsed.namespace_path, safe="")
+        mr_api = f"{u.scheme}://{host}/api/v4/projects/{project_id}/merge_requests/{parsed.pr_number}"
 
-def _get_json(client: httpx.Client, url: str, *, headers: dict) -> dict:
-    r = client.get(url, headers=headers)
+        async with self._client(ctx) as client:
+            mr = await _get_json(client, mr_api, headers=headers)
+            refs = mr.get("diff_refs") or {}
+            web_url = mr.get("web_url") or ctx.pr_url
+
+            async def draft(c: ReviewComment) -> CommentPostResult:
+                note = {"note": format_review_comment_markdown(ctx.pr_url, c)}
+                position = _position(c, refs)
+                if position:
+                    r = await client.post(f"{mr_api}/draft_notes", headers=headers, json={**note, "position": position})
+                    if r.status_code < 400:
+                        return CommentPostResult(ok=True, comment_url=web_url, inline=True)
+                    if r.status_code in {401, 403}:
+                        raise AuthRequiredError("gitlab", host, f"GitLab auth failed ({r.status_code}).")
+                    # Position outside the diff: keep the comment, unanchored.
+                _check(await client.post(f"{mr_api}/draft_notes", headers=headers, json=note))
+                return CommentPostResult(ok=True, comment_url=web_url)
+
+            results = await post_paced(comments, draft)
+            if any(res.ok for res in results):
+                r = await client.post(f"{mr_api}/draft_notes/bulk_publish", headers=headers)
+                if r.status_code in {401, 403}:
+                    raise AuthRequiredError("gitlab", host, f"GitLab auth failed ({r.status_code}).")
+                if r.status_code >= 400:
+                    error = f"GitLab draft notes publish error {r.status_code}: {r.text[:500]}"
+                    return [CommentPostResult(ok=False, error=res.error or error) for res in results]
+        return results
+
+    async def alist_open_prs(self, ctx: ProviderContext, *, max_items: int = 1000) -> List[PullRequestSummary]:
+        parsed = parse_repo_link(ctx.pr_url, provider="gitlab")
+        u = urlparse(ctx.pr_url)
+        host = u.netloc
+        api_base = f"{u.scheme}://{host}/api/v4"
+        if not ctx.token:
+            raise AuthRequiredError("gitlab", host, "GitLab token required to list merge requests.")
+        headers = {"PRIVATE-TOKEN": ctx.token}
+        project_id = quote(parsed.namespace_path or "", safe="")
+
+        out: List[PullRequestSummary] = []
+        async with self._client(ctx) as client:
+            url = f"{api_base}/projects/{project_id}/merge_requests"
+            page = 1
+            while len(out) < max_items:
+                r = await client.get(url, headers=headers, params={"state": "opened", "per_page": 100, "page": page})
+                if r.status_code in {401, 403}:
+                    raise AuthRequiredError("gitlab", host, f"GitLab auth failed ({r.status_code}).")
+                if r.status_code >= 400:
+                    raise ProviderError(f"GitLab merge requests API error {r.status_code}: {r.text[:500]}")
+                items = r.json() or []
+                for mr in items:
+                    out.append(
+                        PullRequestSummary(
+                            number=int(mr["iid"]),
+                            pr_url=f"{u.scheme}://{host}/{parsed.namespace_path}/-/merge_requests/{mr['iid']}",
+                            title=mr.get("title") or "",
+                            head_sha=mr.get("sha"),
+                        )
+                    )
+                # X-Next-Page is empty on the last page (and omitted for very large result sets).
+                next_page = r.headers.get("X-Next-Page")
+                if (next_page is not None and not next_page.strip()) or len(items) < 100:
+                    break
+                page += 1
+        return out[:max_items]
+
+
+def _existing_notes(discussions: List[dict], web_url: str) -> List[ExistingDiscussionComment]:
+    existing: List[ExistingDiscussionComment] = []
+    for d in discussions:
+        for n in d.get("notes") or []:
+            if n.get("system"):
+                continue  # "added 1 commit", "changed the description", ...
+            position = n.get("position") or {}
+            existing.append(
+                ExistingDiscussionComment(
+                    author=((n.get("author") or {}).get("username") or (n.get("author") or {}).get("name") or ""),
+                    body=n.get("body") or "",
+                    url=f"{web_url}#note_{n['id']}" if n.get("id") is not None else None,
+                    file_path=position.get("new_path") or position.get("old_path"),
+                    line=position.get("new_line") or position.get("old_line"),
+                    thread_id=None if d.get("individual_note") else d.get("id"),
+                    created_at=n.get("created_at"),
+                    kind="comment" if d.get("individual_note") else "thread",
+                )
+            )
+    return existing
+
+
+async def _get(client: httpx.AsyncClient, url: str, *, headers: dict, params: Optional[dict] = None) -> httpx.Response:
+    return _check(await client.get(url, headers=headers, params=params))
+
+
+def _check(r: httpx.Response) -> httpx.Response:
     if r.status_code in {401, 403}:
-        raise AuthRequiredError("gitlab", urlparse(url).netloc, f"GitLab auth failed ({r.status_code}).")
+        raise AuthRequiredError("gitlab", urlparse(str(r.url)).netloc, f"GitLab auth failed ({r.status_code}).")
     if r.status_code >= 400:
         raise ProviderError(f"GitLab API error {r.status_code}: {r.text[:500]}")
-    return r.json()
+    return r
+
+
+async def _get_json(client: httpx.AsyncClient, url: str, *, headers: dict) -> dict:
+    return (await _get(client, url, headers=headers)).json()
+
+
+async def _get_diffs(client: httpx.AsyncClient, mr_api: str, *, headers: dict) -> List[dict]:
+    diffs = await _get_pages(client, f"{mr_api}/diffs", headers=headers, per_page=_DIFFS_PER_PAGE, missing_ok=True)
+    if diffs is not None:
+        return diffs
+    # GitLab < 15.7 has no /diffs: the deprecated /changes returns every file at once (truncated on large MRs).
+    return (await _get_json(client, f"{mr_api}/changes", headers=headers)).get("changes") or []
+
+
+async def _get_pages(
+    client: httpx.AsyncClient, url: str, *, headers: dict, per_page: int, missing_ok: bool = False
+) -> Optional[List[dict]]:
+    """
+    Every item of a paginated list endpoint. Page 1 reports `X-Total-Pages`, so the remaining pages are fetched
+    concurrently; GitLab omits the total for very large lists, and then `X-Next-Page` is followed one at a time.
+    With `missing_ok`, a 404 on page 1 (endpoint not available) returns None.
+    """
+    first = await client.get(url, headers=headers, params={"per_page": per_page, "page": 1})
+    if missing_ok and first.status_code == 404:
+        return None
+    _check(first)
+    items: List[dict] = list(first.json() or [])
+    total = _int_header(first, "X-Total-Pages")
+    if total is not None:
+        sem = asyncio.Semaphore(_PAGE_CONCURRENCY)
+
+        async def page(n: int) -> List[dict]:
+            async with sem:
+                r = await _get(client, url, headers=headers, params={"per_page": per_page, "page": n})
+                return r.json() or []
+
+        for batch in await gather_all(*[page(n) for n in range(2, min(total, _MAX_PAGES) + 1)]):
+            items.extend(batch)
+        return items
+
+    r, n = first, 1
+    while n < _MAX_PAGES:
+        nxt = _int_header(r, "X-Next-Page")
+        if nxt is None:
+            break
+        r = await _get(client, url, headers=headers, params={"per_page": per_page, "page": nxt})
+        items.extend(r.json() or [])
+        n += 1
+    return items
+
+
+def _int_header(r: httpx.Response, name: str) -> Optional[int]:
+    try:
+        return int((r.headers.get(name) or "").strip())
+    except ValueError:
+        return None
 
 
+def _position(c: ReviewComment, refs: dict) -> Optional[dict]:
+    lines = inline_lines(c)
+    if lines is None or not all(refs.get(k) for k in ("base_sha", "start_sha", "head_sha")):
+        return None
+    side = "old_line" if c.line_side == "old" else "new_line"
+    return {
+        "position_type": "text",
+        "base_sha": refs["base_sha"],
+        "start_sha": refs["start_sha"],
+        "head_sha": refs["head_sha"],
+        "old_path": c.file_path,
+        "new_path": c.file_path,
+        side: lines[1],
+    }
@@ -1,24 +1,112 @@
 from __future__ import annotations
 
-from prreviewbot.core.link_parser import ParsedLink
-from prreviewbot.providers.azure_devops import AzureDevOpsProvider
-from prreviewbot.providers.bitbucket import BitbucketCloudProvider
-from prreviewbot.providers.gitea import GiteaProvider
-from prreviewbot.providers.github import GitHubProvider
-from prreviewbot.providers.gitlab import GitLabProvider
-
-
-def provider_for(parsed: ParsedLink):
-    if parsed.provider == "github":
-        return GitHubProvider()
-    if parsed.provider == "gitlab":
-        return GitLabProvider()
-    if parsed.provider == "bitbucket":
-        return BitbucketCloudProvider()
-    if parsed.provider == "azure":
-        return AzureDevOpsProvider()
-    if parsed.provider == "gitea":
-        return GiteaProvider()
-    raise ValueError(f"Unknown provider: {parsed.provider}")
+import importlib
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
+from prreviewbot.core.link_parser import ParsedLink, register_link_parser
 
+if TYPE_CHECKING:
+    from prreviewbot.providers.base import Provider
+
+# Third-party/internal providers register here, e.g. in the plugin's pyproject.toml:
+#   [project.entry-points."prreviewbot.providers"]
+#   bitbucket_server = "corp_prreviewbot.bitbucket_server:BitbucketServerProvider"
+PLUGIN_GROUP = "prreviewbot.providers"
+
+# Built-ins are imported on first use: a review only pays for the provider it talks to.
+_BUILTIN = {
+    "github": "prreviewbot.providers.github:GitHubProvider",
+    "gitlab": "prreviewbot.providers.gitlab:GitLabProvider",
+    "bitbucket": "prreviewbot.providers.bitbucket:BitbucketCloudProvider",
+    "azure": "prreviewbot.providers.azure_devops:AzureDevOpsProvider",
+    "gitea": "prreviewbot.providers.gitea:GiteaProvider",
+}
+
+_lock = threading.RLock()
+_factories: Dict[str, Callable[..., "Provider"]] = {}
+_plugins: Optional[Dict[str, Any]] = None  # entry-point name -> EntryPoint, discovered once
+_instances: Dict[Tuple[str, str], "Provider"] = {}
+
+
+def register_provider(name: str, factory: Callable[..., "Provider"]) -> None:
+    """Register a provider programmatically (takes precedence over built-ins and entry points)."""
+    with _lock:
+        _factories[name] = factory
+        for key in [k for k in _instances if k[0] == name]:
+            del _instances[key]
+
+
+def provider_names() -> List[str]:
+    with _lock:
+        return sorted(set(_BUILTIN) | set(_plugin_entry_points()) | set(_factories))
+
+
+def provider_for(parsed: ParsedLink) -> "Provider":
+    """The long-lived provider instance for this link's (provider, host)."""
+    key = (parsed.provider, parsed.host)
+    with _lock:
+        inst = _instances.get(key)
+        if inst is None:
+            inst = _instances[key] = _factory(parsed.provider)(host=parsed.host)
+        return inst
+
+
+def parse_plugin_link(url: str) -> Optional[ParsedLink]:
+    """Offer a URL that no built-in provider recognised to each plugin provider's `parse_link`."""
+    with _lock:
+        names = [n for n in sorted(set(_plugin_entry_points()) | set(_factories)) if n not in _BUILTIN]
+    for name in names:
+        parse = getattr(_factory(name), "parse_link", None)
+        parsed = parse(url) if parse is not None else None
+        if parsed is not None:
+            return parsed
+    return None
+
+
+# Providers installed through the "prreviewbot.providers" entry-point group may own other URL shapes.
+register_link_parser(parse_plugin_link)
+
+
+async def aclose_providers() -> None:
+    """Close every cached provider's pooled clients on the running event loop (server shutdown, end of a batch)."""
+    with _lock:
+        instances = list(_instances.values())
+    for inst in instances:
+        await inst.aclose()
+
+
+def reset_registry() -> None:
+    """Forget cached instances, loaded factories and discovered entry points (tests, after installing a plugin)."""
+    global _plugins
+    with _lock:
+        _instances.clear()
+        _factories.clear()
+        _plugins = None
+
+
+def _factory(name: str) -> Callable[..., "Provider"]:
+    with _lock:
+        factory = _factories.get(name)
+        if factory is not None:
+            return factory
+        if name in _BUILTIN:
+            module, _, attr = _BUILTIN[name].partition(":")
+            factory = getattr(importlib.import_module(module), attr)
+        else:
+            ep = _plugin_entry_points().get(name)
+            if ep is None:
+                raise ValueError(f"Unknown provider: {name}")
+            factory = ep.load()
+        _factories[name] = factory
+        return factory
+
+
+def _plugin_entry_points() -> Dict[str, Any]:
+    global _plugins
+    with _lock:
+        if _plugins is None:
+            from importlib.metadata import entry_points
+
+            _plugins = {ep.name: ep for ep in entry_points(group=PLUGIN_GROUP)}
+        return _plugins
@@ -21,6 +21,10 @@ class AppConfig:
     llm: Dict[str, Any] = field(default_factory=dict)
     # per-language model mapping override
     model_map: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # size/latency/cost-aware model routing: model profiles, budgets, SLOs (see `core.model_select.RoutingPolicy`)
+    model_routing: Dict[str, Any] = field(default_factory=dict)
+    # webhook signing secrets keyed by provider
+    webhook_secrets: Dict[str, str] = field(default_factory=dict)
 
 
 class ConfigStore:
@@ -36,6 +40,8 @@ class ConfigStore:
             tokens=data.get("tokens", {}) or {},
             llm=data.get("llm", {}) or {},
             model_map=data.get("model_map", {}) or {},
+            model_routing=data.get("model_routing", {}) or {},
+            webhook_secrets=data.get("webhook_secrets", {}) or {},
         )
         # Migration: normalize provider keys + host keys so pasted URLs like "https://dev.azure.com" don't
         # create confusing duplicates and don't break token lookup.
@@ -55,7 +61,13 @@ class ConfigStore:
         tmp = self.path.with_suffix(".json.tmp")
         tmp.write_text(
             json.dumps(
-                {"tokens": cfg.tokens, "llm": cfg.llm, "model_map": cfg.model_map},
+                {
+                    "tokens": cfg.tokens,
+                    "llm": cfg.llm,
+                    "model_map": cfg.model_map,
+                    "model_routing": cfg.model_routing,
+                    "webhook_secrets": cfg.webhook_secrets,
+                },
                 indent=2,
                 sort_keys=True,
             ),
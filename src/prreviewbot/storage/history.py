@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from prreviewbot.core.link_parser import ParsedLink, parse_pr_link, parse_repo_link
+from prreviewbot.core.types import PullRequestInfo, ReviewResult
+from prreviewbot.storage.config import default_data_dir
+
+SEVERITIES = ("info", "warn", "error")  # stored as their index
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    pr_url TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    host TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    head_sha TEXT,
+    language TEXT NOT NULL,
+    model TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    timings TEXT NOT NULL,
+    n_info INTEGER NOT NULL,
+    n_warn INTEGER NOT NULL,
+    n_error INTEGER NOT NULL,
+    max_severity INTEGER NOT NULL,
+    compacted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reviews_pr ON reviews(pr_url);
+CREATE INDEX IF NOT EXISTS reviews_repo ON reviews(repo);
+CREATE INDEX IF NOT EXISTS reviews_host ON reviews(host);
+CREATE INDEX IF NOT EXISTS reviews_created ON reviews(created_at);
+CREATE INDEX IF NOT EXISTS reviews_repo_created ON reviews(repo, created_at);
+CREATE INDEX IF NOT EXISTS reviews_severity ON reviews(max_severity);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    review_id INTEGER NOT NULL,
+    repo TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    file_path TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    line_side TEXT,
+    message TEXT NOT NULL,
+    suggestion TEXT,
+    code_example TEXT,
+    related_url TEXT,
+    kind TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_review ON comments(review_id);
+CREATE INDEX IF NOT EXISTS comments_repo ON comments(repo);
+CREATE INDEX IF NOT EXISTS comments_repo_severity ON comments(repo, severity);
+CREATE INDEX IF NOT EXISTS comments_file ON comments(file_path);
+CREATE INDEX IF NOT EXISTS comments_severity ON comments(severity);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+_REVIEW_COLUMNS = (
+    "id, created_at, pr_url, provider, host, repo, head_sha, language, model, summary, timings, "
+    "n_info, n_warn, n_error, max_severity, compacted"
+)
+_COMMENT_COLUMNS = (
+    "id, review_id, repo, severity, file_path, start_line, end_line, line_side, message, suggestion, code_example, "
+    "related_url, kind"
+)
+# Rows deleted per transaction while pruning, so other workers' writes are never blocked for long.
+_PRUNE_BATCH = 5000
+
+
+def repo_key(parsed: ParsedLink) -> str:
+    """`host/path` of the repository a PR link belongs to, e.g. `github.com/owner/repo`."""
+    parts = [parsed.org, parsed.project, parsed.workspace, parsed.namespace_path, parsed.owner, parsed.repo]
+    return "/".join([parsed.host] + [p for p in parts if p])
+
+
+class ReviewHistory:
+    """
+    Every review the server computed, with its comments, timings, model and head SHA (`history.sqlite3` in the
+    data dir, WAL mode, shared by all worker processes).
+
+    Old data is maintained by `maybe_prune`, which the server runs in the background: after `compact_after_days` a
+    review's comment rows are dropped (its per-severity counts stay), after `retention_days` the review itself is
+    deleted. All methods are blocking; call them through `offload` from async code.
+    """
+
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        *,
+        retention_days: float = 180.0,
+        compact_after_days: float = 30.0,
+        prune_interval_s: float = 3600.0,
+    ):
+        self.data_dir = data_dir or default_data_dir()
+        self.path = self.data_dir / "history.sqlite3"
+        self.retention_days = retention_days
+        self.compact_after_days = compact_after_days
+        self.prune_interval_s = prune_interval_s
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+        # Only takes effect on a new file: lets pruning hand freed pages back to the OS without a full VACUUM.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+            self._conns.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._conns.clear()
+        self._local = threading.local()
+
+    # --- writes ---
+
+    def record(self, pr: PullRequestInfo, result: ReviewResult, *, now: Optional[float] = None) -> int:
+        """Store one review and its comments; returns the review id."""
+        now = time.time() if now is None else now
+        try:
+            repo = repo_key(parse_pr_link(pr.pr_url))
+        except ValueError:
+            repo = pr.host
+        sev = [_severity(c.severity) for c in result.comments]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT INTO reviews (created_at, pr_url, provider, host, repo, head_sha, language, model, summary, "
+                "timings, n_info, n_warn, n_error, max_severity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    now,
+                    pr.pr_url,
+                    pr.provider,
+                    pr.host,
+                    repo,
+                    pr.head_sha,
+                    result.language,
+                    result.model,
+                    result.summary,
+                    json.dumps(result.timings),
+                    sev.count(0),
+                    sev.count(1),
+                    sev.count(2),
+                    max(sev, default=0),
+                ),
+            )
+            review_id = int(cur.lastrowid)
+            conn.executemany(
+                "INSERT INTO comments (review_id, repo, severity, file_path, start_line, end_line, line_side, message, "
+                "suggestion, code_example, related_url, kind) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        review_id,
+                        repo,
+                        s,
+                        c.file_path,
+                        c.start_line,
+                        c.end_line,
+                        c.line_side,
+                        c.message,
+                        c.suggestion,
+                        c.code_example,
+                        c.related_url,
+                        c.kind,
+                    )
+                    for c, s in zip(result.comments, sev)
+                ],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return review_id
+
+    def maybe_prune(self, *, now: Optional[float] = None) -> bool:
+        """Run `prune` if no worker process has done so within `prune_interval_s`."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('last_prune_at', 0)")
+        claimed = conn.execute(
+            "UPDATE meta SET value = ? WHERE key = 'last_prune_at' AND value <= ?", (now, now - self.prune_interval_s)
+        ).rowcount
+        if not claimed:
+            return False
+        self.prune(now=now)
+        return True
+
+    def prune(self, *, now: Optional[float] = None) -> Dict[str, int]:
+        """Delete reviews past retention and compact (drop the comment rows of) reviews past `compact_after_days`."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        deleted = self._in_batches(
+            "SELECT id FROM reviews WHERE created_at < ? LIMIT ?", now - self.retention_days * 86400, delete_reviews=True
+        )
+        compacted = self._in_batches(
+            "SELECT id FROM reviews WHERE created_at < ? AND compacted = 0 LIMIT ?",
+            now - self.compact_after_days * 86400,
+            delete_reviews=False,
+        )
+        if deleted or compacted:
+            conn.execute("PRAGMA incremental_vacuum")
+        return {"deleted": deleted, "compacted": compacted}
+
+    def _in_batches(self, select_ids: str, cutoff: float, *, delete_reviews: bool) -> int:
+        conn = self._conn()
+        total = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row[0] for row in conn.execute(select_ids, (cutoff, _PRUNE_BATCH))]
+                if ids:
+                    marks = ",".join("?" * len(ids))
+                    conn.execute(f"DELETE FROM comments WHERE review_id IN ({marks})", ids)
+                    if delete_reviews:
+                        conn.execute(f"DELETE FROM reviews WHERE id IN ({marks})", ids)
+                    else:
+                        conn.execute(f"UPDATE reviews SET compacted = 1 WHERE id IN ({marks})", ids)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            total += len(ids)
+            if len(ids) < _PRUNE_BATCH:
+                return total
+
+    # --- queries ---
+
+    def get(self, review_id: int) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        row = conn.execute(f"SELECT {_REVIEW_COLUMNS} FROM reviews WHERE id = ?", (review_id,)).fetchone()
+        if row is None:
+            return None
+        review = _review_row(row)
+        review["comments"] = [
+            _comment_row(r)
+            for r in conn.execute(f"SELECT {_COMMENT_COLUMNS} FROM comments WHERE review_id = ? ORDER BY id", (review_id,))
+        ]
+        return review
+
+    def reviews(
+        self,
+        *,
+        pr_url: Optional[str] = None,
+        repo: Optional[str] = None,
+        host: Optional[str] = None,
+        provider: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Newest first. `severity` keeps reviews with at least one comment of that severity or worse; `repo` is a
+        repository URL or a `repo_key`. Returns (items, next_cursor); pass `next_cursor` back to get the next page.
+        """
+        # A time window is paged along the created_at index: ids follow insertion order, not necessarily time.
+        timed = since is not None or until is not None
+        where, args = _filters(
+            [
+                ("pr_url = ?", pr_url),
+                ("repo = ?", _normalize_repo(repo)),
+                ("host = ?", host),
+                ("provider = ?", provider),
+                ("created_at >= ?", since),
+                ("created_at < ?", until),
+                ("id < ?", None if timed else cursor),
+            ]
+        )
+        if timed and cursor is not None:
+            row = self._conn().execute("SELECT created_at FROM reviews WHERE id = ?", (cursor,)).fetchone()
+            if row is not None:
+                where.append("created_at <= ? AND (created_at < ? OR id < ?)")
+                args += [row[0], row[0], cursor]
+            else:  # pruned meanwhile
+                where.append("id < ?")
+                args.append(cursor)
+        if severity and _severity(severity) > 0:
+            where.append(f"max_severity IN ({','.join(str(s) for s in range(_severity(severity), len(SEVERITIES)))})")
+        order = "created_at DESC, id DESC" if timed else "id DESC"
+        rows = self._page(f"SELECT {_REVIEW_COLUMNS} FROM reviews", where, args, limit, order=order)
+        items = [_review_row(r) for r in rows[:limit]]
+        return items, (items[-1]["id"] if len(rows) > limit else None)
+
+    def comments(
+        self,
+        *,
+        repo: Optional[str] = None,
+        severity: Optional[str] = None,
+        review_id: Optional[int] = None,
+        file_path: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Comments of non-compacted reviews, newest first; `severity` matches exactly here."""
+        where, args = _filters(
+            [
+                ("repo = ?", _normalize_repo(repo)),
+                ("severity = ?", _severity(severity) if severity else None),
+                ("review_id = ?", review_id),
+                ("file_path = ?", file_path),
+                ("id < ?", cursor),
+            ]
+        )
+        rows = self._page(f"SELECT {_COMMENT_COLUMNS} FROM comments", where, args, limit)
+        items = [_comment_row(r) for r in rows[:limit]]
+        return items, (items[-1]["id"] if len(rows) > limit else None)
+
+    def _page(
+        self, select: str, where: List[str], args: List[Any], limit: int, *, order: str = "id DESC"
+    ) -> List[tuple]:
+        # Keyset pagination: entries of an index on one column (or on equality-filtered columns) are ordered by
+        # rowid, so an equality filter with such an index plus `id < cursor ORDER BY id DESC` is a range scan however
+        # deep the page is. Filters without one (e.g. only `provider`) scan; time windows use `created_at`.
+        sql = select + (" WHERE " + " AND ".join(where) if where else "") + f" ORDER BY {order} LIMIT ?"
+        return self._conn().execute(sql, [*args, max(1, limit) + 1]).fetchall()
+
+    def explain(self, sql: str, args: Tuple[Any, ...] = ()) -> str:
+        """SQLite's query plan for `sql` (used to check that history queries stay on an index)."""
+        return "\n".join(row[-1] for row in self._conn().execute("EXPLAIN QUERY PLAN " + sql, args))
+
+
+def _severity(value: Optional[str]) -> int:
+    v = (value or "info").strip().lower()
+    if v in {"warning", "warn"}:
+        return 1
+    return SEVERITIES.index(v) if v in SEVERITIES else 0
+
+
+def _normalize_repo(repo: Optional[str]) -> Optional[str]:
+    if not repo:
+        return None
+    if "://" not in repo:
+        return repo.strip("/")
+    try:
+        return repo_key(parse_repo_link(repo))
+    except ValueError:
+        return repo
+
+
+def _filters(pairs: List[Tuple[str, Any]]) -> Tuple[List[str], List[Any]]:
+    where = [clause for clause, value in pairs if value is not None]
+    return where, [value for _, value in pairs if value is not None]
+
+
+def _review_row(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "created_at": row[1],
+        "pr_url": row[2],
+        "provider": row[3],
+        "host": row[4],
+        "repo": row[5],
+        "head_sha": row[6],
+        "language": row[7],
+        "model": row[8],
+        "summary": row[9],
+        "timings": json.loads(row[10]),
+        "counts": {"info": row[11], "warn": row[12], "error": row[13]},
+        "max_severity": SEVERITIES[row[14]] if row[11] + row[12] + row[13] else None,
+        "compacted": bool(row[15]),
+    }
+
+
+def _comment_row(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "review_id": row[1],
+        "repo": row[2],
+        "severity": SEVERITIES[row[3]],
+        "file_path": row[4],
+        "start_line": row[5],
+        "end_line": row[6],
+        "line_side": row[7],
+        "message": row[8],
+        "suggestion": row[9],
+        "code_example": row[10],
+        "related_url": row[11],
+        "kind": row[12],
+    }
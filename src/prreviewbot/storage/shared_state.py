@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from prreviewbot.storage.config import default_data_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache(expires_at);
+
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reviewed_heads (
+    pr_url TEXT PRIMARY KEY,
+    head_sha TEXT NOT NULL,
+    reviewed_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    dedupe_key TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, run_after);
+"""
+
+# Columns added after the first release of the jobs table: (name, DDL) applied to older state files.
+_JOB_COLUMNS = [
+    ("dedupe_key", "ALTER TABLE jobs ADD COLUMN dedupe_key TEXT"),
+    ("cancel_requested", "ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0"),
+]
+_JOB_INDEXES = "CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs(dedupe_key, status);"
+
+
+def worker_id() -> str:
+    """Identifies this process (and instance) as the owner of leases and claimed jobs."""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    status: str  # queued | running | done | failed | cancelled
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+
+class SharedState:
+    """
+    Cross-process state for the web server: result cache, single-flight leases, metric counters and a job queue.
+
+    Everything lives in one SQLite file in the data dir (WAL mode), so `serve --workers N` processes see the same
+    state without an external service. Connections are per thread; all methods are blocking and short, call them
+    through `offload` from async code.
+    """
+
+    def __init__(self, data_dir: Optional[Path] = None):
+        self.data_dir = data_dir or default_data_dir()
+        self.path = self.data_dir / "state.sqlite3"
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: autocommit; multi-statement updates use explicit BEGIN IMMEDIATE.
+        conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                _migrate_jobs(conn)
+                self._initialized = True
+            self._conns.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._conns:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._conns.clear()
+        self._local = threading.local()
+
+    # --- result cache ---
+
+    def cache_get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cache_set(self, key: str, value: Any, *, ttl_s: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO cache(key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value), now + ttl_s),
+        )
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    # --- single-flight leases ---
+
+    def acquire(self, key: str, owner: str, *, ttl_s: float) -> bool:
+        """Take the lease on `key` unless another owner holds an unexpired one. Re-acquiring extends it."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO leases(key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at <= ? OR leases.owner = excluded.owner",
+            (key, owner, now + ttl_s, now),
+        )
+        return cur.rowcount == 1
+
+    def release(self, key: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    # --- metrics ---
+
+    def incr(self, name: str, by: float = 1.0) -> None:
+        self._conn().execute(
+            "INSERT INTO counters(name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, by),
+        )
+
+    def counters(self) -> Dict[str, float]:
+        return {name: value for name, value in self._conn().execute("SELECT name, value FROM counters ORDER BY name")}
+
+    # --- reviewed head SHAs (repository sweeps) ---
+
+    def reviewed_head(self, pr_url: str) -> Optional[str]:
+        row = self._conn().execute("SELECT head_sha FROM reviewed_heads WHERE pr_url = ?", (pr_url,)).fetchone()
+        return row[0] if row else None
+
+    def mark_reviewed(self, pr_url: str, head_sha: str) -> None:
+        self._conn().execute(
+            "INSERT INTO reviewed_heads(pr_url, head_sha, reviewed_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(pr_url) DO UPDATE SET head_sha = excluded.head_sha, reviewed_at = excluded.reviewed_at",
+            (pr_url, head_sha, time.time()),
+        )
+
+    # --- job queue ---
+
+    def enqueue_job(
+        self, kind: str, payload: Dict[str, Any], *, delay_s: float = 0.0, dedupe_key: Optional[str] = None
+    ) -> str:
+        """
+        Queue a job to run after `delay_s`. With `dedupe_key`, a job with the same key that is still queued is
+        updated in place instead (new payload, start pushed back to now + `delay_s`), i.e. a trailing debounce.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = None
+            if dedupe_key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status = 'queued' LIMIT 1", (dedupe_key,)
+                ).fetchone()
+            if row is not None:
+                job_id = row[0]
+                conn.execute(
+                    "UPDATE jobs SET payload = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(payload), now + delay_s, now, job_id),
+                )
+            else:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs(id, kind, payload, status, run_after, created_at, updated_at, dedupe_key) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(payload), now + delay_s, now, now, dedupe_key),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def jobs_with_key(self, dedupe_key: str, *, statuses: Sequence[str] = ("queued", "running")) -> List[Job]:
+        rows = self._conn().execute(
+            f"SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ({','.join('?' for _ in statuses)})",
+            (dedupe_key, *statuses),
+        ).fetchall()
+        return [j for j in (self.get_job(r[0]) for r in rows) if j is not None]
+
+    def cancel_job(self, job_id: str) -> None:
+        """Cancel a queued job outright; a running job is flagged and stopped by its runner (`cancel_requested`)."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'", (now, job_id)
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'", (now, job_id)
+        )
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def claim_job(self, owner: str, *, kinds: Optional[Sequence[str]] = None, lease_s: float = 600.0) -> Optional[Job]:
+        """
+        Atomically claim the oldest runnable job. Jobs whose claimant died (lease expired while running) are
+        claimed again.
+        """
+        now = time.time()
+        kind_sql = ""
+        params: List[Any] = [now, now]
+        if kinds:
+            kind_sql = f" AND kind IN ({','.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE ((status = 'queued' AND run_after <= ?) "
+                "OR (status = 'running' AND lease_expires_at <= ?))" + kind_sql + " ORDER BY run_after LIMIT 1",
+                params,
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (owner, now + lease_s, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get_job(row[0])
+
+    def renew_lease(self, job_id: str, owner: str, *, lease_s: float) -> bool:
+        """
+        Extend a running job's lease while its runner works on it. False if `owner` no longer holds the job (its
+        lease expired and another runner claimed it).
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (now + lease_s, now, job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def update_job_payload(self, job_id: str, owner: str, payload: Dict[str, Any]) -> bool:
+        """Replace a running job's payload (e.g. to remember the LLM batch its prompts went to); owner only."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET payload = ?, updated_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (json.dumps(payload), time.time(), job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def requeue_job(self, job_id: str, owner: str) -> None:
+        """Put a running job back in the queue (its runner is shutting down before it finished)."""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ? AND owner = ? AND status = 'running'",
+            (time.time(), job_id, owner),
+        )
+
+    def finish_job(
+        self, job_id: str, owner: str, *, result: Any = None, error: Optional[str] = None, cancelled: bool = False
+    ) -> bool:
+        """Record a job's outcome; ignored (False) if `owner` lost the job to another runner."""
+        status = "cancelled" if cancelled else "failed" if error is not None else "done"
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ? AND owner = ?",
+            (status, json.dumps(result), error, time.time(), job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        row = self._conn().execute(
+            "SELECT id, kind, payload, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return Job(
+            id=row[0],
+            kind=row[1],
+            payload=json.loads(row[2]),
+            status=row[3],
+            result=json.loads(row[4]) if row[4] is not None else None,
+            error=row[5],
+            attempts=int(row[6]),
+            created_at=float(row[7]),
+            updated_at=float(row[8]),
+        )
+
+    def job_counts(self) -> Dict[str, int]:
+        return {status: int(n) for status, n in self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")}
+
+
+def _migrate_jobs(conn: sqlite3.Connection) -> None:
+    have = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for name, ddl in _JOB_COLUMNS:
+        if name not in have:
+            try:
+                conn.execute(ddl)
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+    conn.executescript(_JOB_INDEXES)
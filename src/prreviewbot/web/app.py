@@ -1,21 +1,39 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 
-from prreviewbot.core.errors import AuthRequiredError, PRReviewBotError, ProviderError
+from prreviewbot.core.aio import offload
+from prreviewbot.core.errors import AuthRequiredError, ProviderError, PRReviewBotError
 from prreviewbot.core.host import normalize_host
-from prreviewbot.core.link_parser import parse_pr_link
-from prreviewbot.core.review_service import ReviewService
+from prreviewbot.core.review_service import ReviewService, review_payload
+from prreviewbot.core.sweep import plan_sweep
+from prreviewbot.core.types import ReviewComment
+from prreviewbot.core.webhooks import (
+    WEBHOOK_PROVIDERS,
+    parse_event,
+    pr_job_key,
+    schedule_review,
+    verify_signature,
+)
+from prreviewbot.llm.batch import BatchJournal, BatchOptions, batch_journal
+from prreviewbot.llm.breaker import breaker_states
+from prreviewbot.llm.openai_chat import aclose_llms
+from prreviewbot.providers.registry import aclose_providers
 from prreviewbot.storage.config import AppConfig, ConfigStore
+from prreviewbot.storage.history import ReviewHistory
+from prreviewbot.storage.shared_state import SharedState, worker_id
 from prreviewbot.web.branding import app_name, app_tagline
 
 
@@ -26,6 +44,16 @@ class ReviewRequest(BaseModel):
     llm_model: Optional[str] = Field(None, description="Override model/deployment for this request")
 
 
+class SweepRequest(BaseModel):
+    repo_url: str = Field(..., description="Repository URL (or any PR link / PR list page in it)")
+    provider: Optional[str] = Field(None, description="Provider hint for self-hosted hosts (e.g. gitea)")
+    force: bool = Field(False, description="Review PRs even if their head SHA was already reviewed")
+    language: Optional[str] = None
+    llm_provider: Optional[str] = None
+    llm_model: Optional[str] = None
+    llm_batch: bool = Field(False, description="Run the LLM calls through the Batch API (cheaper, slower)")
+
+
 class SettingsUpsert(BaseModel):
     # auth: store token for provider+host
     provider: str
@@ -33,6 +61,11 @@ class SettingsUpsert(BaseModel):
     token: str
 
 
+class WebhookSecretUpsert(BaseModel):
+    provider: str
+    secret: str
+
+
 class SettingsDelete(BaseModel):
     provider: str
     host: str
@@ -65,23 +98,114 @@ class PostCommentRequest(BaseModel):
     related_url: Optional[str] = None
 
 
-def create_app(*, data_dir: Optional[Path] = None) -> FastAPI:
+class BatchCommentItem(BaseModel):
+    file_path: Optional[str] = None
+    severity: Optional[str] = None
+    message: str
+    suggestion: Optional[str] = None
+    code_example: Optional[str] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    line_side: Optional[str] = None
+    related_url: Optional[str] = None
+
+
+class PostCommentsBatchRequest(BaseModel):
+    pr_link: str
+    comments: List[BatchCommentItem] = Field(..., min_length=1, max_length=200)
+
+
+# `serve --workers N` passes the data dir to worker processes through this env var (see `create_app_from_env`).
+DATA_DIR_ENV = "PRREVIEWBOT_DATA_DIR"
+# Seconds a review result stays cached in the shared state; 0 disables the cache and single-flight de-duplication.
+RESULT_TTL_ENV = "PRREVIEWBOT_RESULT_TTL"
+# Review jobs (`/api/review/jobs`) each worker process runs concurrently.
+JOB_CONCURRENCY_ENV = "PRREVIEWBOT_JOB_CONCURRENCY"
+# Webhook-triggered reviews start this many seconds after the last push to the PR (default 30).
+WEBHOOK_DEBOUNCE_ENV = "PRREVIEWBOT_WEBHOOK_DEBOUNCE_S"
+# Fallback webhook secret for providers without one in Settings.
+WEBHOOK_SECRET_ENV = "PRREVIEWBOT_WEBHOOK_SECRET"
+# Review history: reviews older than this many days are deleted (default 180) ...
+HISTORY_RETENTION_ENV = "PRREVIEWBOT_HISTORY_RETENTION_DAYS"
+# ... and their individual comments are dropped after this many days, keeping per-severity counts (default 30).
+HISTORY_COMPACT_ENV = "PRREVIEWBOT_HISTORY_COMPACT_DAYS"
+# Lease of a running review job. Its runner renews it every quarter lease, so a job whose worker died is claimed
+# again after at most this many seconds, while a long review is never run twice.
+JOB_LEASE_S = 120.0
+
+
+def create_app(
+    *,
+    data_dir: Optional[Path] = None,
+    result_ttl_s: Optional[float] = None,
+    webhook_debounce_s: Optional[float] = None,
+) -> FastAPI:
     # When deployed behind a reverse proxy under a path prefix (e.g. /pr-review),
     # set PRREVIEWBOT_ROOT_PATH=/pr-review so url_for() generates correct links.
     root_path = (os.getenv("PRREVIEWBOT_ROOT_PATH") or "").rstrip("/")
-    app = FastAPI(title=app_name(), version="0.1.0", root_path=root_path)
+
+    store = ConfigStore(data_dir=data_dir)
+    # Shared by every worker process serving this data dir. Settings are not cached in-process: each request
+    # re-reads config.json, so a change saved by one worker is what the next request in any worker sees.
+    state = SharedState(data_dir=store.data_dir)
+    if result_ttl_s is None:
+        result_ttl_s = float(os.getenv(RESULT_TTL_ENV) or 600)
+    job_concurrency = max(1, int(os.getenv(JOB_CONCURRENCY_ENV) or 4))
+    if webhook_debounce_s is None:
+        webhook_debounce_s = float(os.getenv(WEBHOOK_DEBOUNCE_ENV) or 30)
+
+    history = ReviewHistory(
+        data_dir=store.data_dir,
+        retention_days=float(os.getenv(HISTORY_RETENTION_ENV) or 180),
+        compact_after_days=float(os.getenv(HISTORY_COMPACT_ENV) or 30),
+    )
+
+    def service(*, llm_batch: bool = False) -> ReviewService:
+        return ReviewService.from_config(
+            store.load(),
+            state=state,
+            result_ttl_s=result_ttl_s,
+            history=history,
+            llm_batch=BatchOptions.from_env() if llm_batch else None,
+        )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        stop = asyncio.Event()
+        runners = [asyncio.create_task(_run_review_jobs(state, service, stop)) for _ in range(job_concurrency)]
+        runners.append(asyncio.create_task(_prune_history(history, stop)))
+        try:
+            yield
+        finally:
+            stop.set()
+            await asyncio.gather(*runners, return_exceptions=True)
+            await aclose_providers()
+            await aclose_llms()
+            state.close()
+            history.close()
+
+    app = FastAPI(title=app_name(), version="0.1.0", root_path=root_path, lifespan=lifespan)
 
     templates_dir = Path(__file__).parent / "templates"
     static_dir = Path(__file__).parent / "static"
     templates = Jinja2Templates(directory=str(templates_dir))
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
-    store = ConfigStore(data_dir=data_dir)
-
     @app.get("/healthz")
     def healthz():
         return {"ok": True}
 
+    @app.get("/metrics")
+    def metrics():
+        # Aggregated across all worker processes sharing this data dir.
+        # LLM circuit breakers are per process.
+        return {
+            "pid": os.getpid(),
+            "counters": state.counters(),
+            "jobs": state.job_counts(),
+            "llm_breakers": breaker_states(),
+        }
+
     @app.get("/favicon.ico")
     def favicon(request: Request):
         # avoid 404 spam; browsers will accept SVG too
@@ -141,6 +265,19 @@ def create_app(*, data_dir: Optional[Path] = None) -> FastAPI:
         store.save(cfg)
         return {"ok": True, "host": host}
 
+    @app.post("/api/settings/webhook")
+    def set_webhook_secret(payload: WebhookSecretUpsert):
+        provider = (payload.provider or "").strip().lower()
+        if provider not in WEBHOOK_PROVIDERS:
+            raise HTTPException(status_code=400, detail={"error": f"Unknown provider: {payload.provider}"})
+        cfg = store.load()
+        if payload.secret:
+            cfg.webhook_secrets[provider] = payload.secret
+        else:
+            cfg.webhook_secrets.pop(provider, None)
+        store.save(cfg)
+        return {"ok": True}
+
     @app.post("/api/settings/token/delete")
     def delete_token(payload: SettingsDelete):
         cfg = store.load()
@@ -175,44 +312,21 @@ def create_app(*, data_dir: Optional[Path] = None) -> FastAPI:
         store.save(cfg)
         return {"ok": True}
 
+    # Review/comment routes are async: provider and LLM calls are awaited on the event loop, so in-flight reviews
+    # are not capped by the threadpool size. CPU-bound steps (diffing, heuristic scans) are offloaded explicitly.
     @app.post("/api/review")
-    def review(payload: ReviewRequest, request: Request):
-        cfg = store.load()
-        service = ReviewService.from_config(cfg)
+    async def review(payload: ReviewRequest, request: Request):
+        await offload(state.incr, "reviews_total")
         try:
-            result = service.review(
+            result = await service().areview(
                 pr_link=payload.pr_link,
                 language=payload.language,
                 llm_provider=payload.llm_provider,
                 llm_model=payload.llm_model,
             )
-            parsed = parse_pr_link(payload.pr_link)
-            return JSONResponse(
-                {
-                    "pr_url": result.pr_url,
-                    "provider": parsed.provider,
-                    "host": parsed.host,
-                    "language": result.language,
-                    "model": result.model,
-                    "summary": result.summary,
-                    "comments": [
-                        {
-                            "file_path": c.file_path,
-                            "severity": c.severity,
-                            "message": c.message,
-                            "suggestion": c.suggestion,
-                            "code_example": c.code_example,
-                            "start_line": c.start_line,
-                            "end_line": c.end_line,
-                            "line_side": c.line_side,
-                            "related_url": c.related_url,
-                            "kind": c.kind,
-                        }
-                        for c in result.comments
-                    ],
-                }
-            )
+            return JSONResponse(review_payload(payload.pr_link, result))
         except AuthRequiredError as e:
+            await offload(state.incr, "review_errors_total")
             raise HTTPException(
                 status_code=401,
                 detail={
@@ -223,16 +337,156 @@ def create_app(*, data_dir: Optional[Path] = None) -> FastAPI:
                 },
             )
         except PRReviewBotError as e:
+            await offload(state.incr, "review_errors_total")
             raise HTTPException(status_code=400, detail={"error": str(e)})
         except Exception as e:
+            await offload(state.incr, "review_errors_total")
             raise HTTPException(status_code=500, detail={"error": f"Unexpected error: {e}"})
 
+    @app.post("/api/review/jobs", status_code=202)
+    async def enqueue_review(payload: ReviewRequest):
+        """Queue a review; any worker process picks it up. Poll `GET /api/review/jobs/{job_id}` for the result."""
+        job_id = await offload(state.enqueue_job, "review", payload.model_dump())
+        return {"job_id": job_id, "status": "queued"}
+
+    @app.get("/api/review/jobs/{job_id}")
+    async def get_review_job(job_id: str):
+        job = await offload(state.get_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail={"error": "Unknown job"})
+        return {"job_id": job.id, "status": job.status, "result": job.result, "error": job.error}
+
+    @app.get("/api/history")
+    async def review_history(
+        pr_url: Optional[str] = None,
+        repo: Optional[str] = None,
+        host: Optional[str] = None,
+        provider: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[int] = None,
+        limit: int = Query(50, ge=1, le=500),
+    ):
+        """
+        Past reviews, newest first. `severity` keeps reviews with a comment of at least that severity; `since` /
+        `until` are Unix timestamps. Pass `next_cursor` back as `cursor` for the next page.
+        """
+        items, next_cursor = await offload(
+            history.reviews,
+            pr_url=pr_url,
+            repo=repo,
+            host=host,
+            provider=provider,
+            severity=severity,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    @app.get("/api/history/comments")
+    async def review_history_comments(
+        repo: Optional[str] = None,
+        severity: Optional[str] = None,
+        review_id: Optional[int] = None,
+        file_path: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = Query(50, ge=1, le=500),
+    ):
+        """Comments of recorded reviews (not yet compacted), newest first; `severity` matches exactly."""
+        items, next_cursor = await offload(
+            history.comments,
+            repo=repo,
+            severity=severity,
+            review_id=review_id,
+            file_path=file_path,
+            cursor=cursor,
+            limit=limit,
+        )
+        return {"items": items, "next_cursor": next_cursor}
+
+    @app.get("/api/history/{review_id}")
+    async def review_history_item(review_id: int):
+        review = await offload(history.get, review_id)
+        if review is None:
+            raise HTTPException(status_code=404, detail={"error": "Unknown review"})
+        return review
+
+    @app.post("/api/sweep", status_code=202)
+    async def sweep(payload: SweepRequest, request: Request):
+        """
+        List the repository's open PRs and queue a review job for each one whose head SHA has not been reviewed
+        yet. Job results are polled through `/api/review/jobs/{job_id}`.
+        """
+        try:
+            plan = await plan_sweep(
+                service(), payload.repo_url, state=state, provider=payload.provider, force=payload.force
+            )
+        except AuthRequiredError as e:
+            raise HTTPException(
+                status_code=401,
+                detail={
+                    "error": str(e),
+                    "provider": e.provider,
+                    "host": e.host,
+                    "settings_url": str(request.url_for("settings_page")),
+                },
+            )
+        except (PRReviewBotError, ValueError) as e:
+            raise HTTPException(status_code=400, detail={"error": str(e)})
+        jobs = []
+        for pr in plan.to_review:
+            job_id = await offload(
+                state.enqueue_job,
+                "review",
+                {
+                    "pr_link": pr.pr_url,
+                    "language": payload.language,
+                    "llm_provider": payload.llm_provider,
+                    "llm_model": payload.llm_model,
+                    "llm_batch": payload.llm_batch,
+                    "head_sha": pr.head_sha,
+                },
+                dedupe_key=pr_job_key(pr.pr_url),
+            )
+            jobs.append({"pr_link": pr.pr_url, "head_sha": pr.head_sha, "job_id": job_id})
+        return {
+            "repo_url": payload.repo_url,
+            "listed": len(plan.listed),
+            "skipped": [{"pr_link": pr.pr_url, "head_sha": pr.head_sha} for pr in plan.skipped],
+            "jobs": jobs,
+        }
+
+    @app.post("/webhooks/{provider}", status_code=202)
+    async def webhook(provider: str, request: Request):
+        """
+        PR events from GitHub/GitLab/Bitbucket/Azure DevOps/Gitea. Reviews are debounced per PR (a burst of pushes
+        yields one review of the final head) and running reviews of a superseded head are cancelled.
+        """
+        provider = provider.strip().lower()
+        if provider not in WEBHOOK_PROVIDERS:
+            raise HTTPException(status_code=404, detail={"error": f"Unknown provider: {provider}"})
+        secret = store.load().webhook_secrets.get(provider) or os.getenv(WEBHOOK_SECRET_ENV) or ""
+        if not secret:
+            raise HTTPException(status_code=403, detail={"error": f"No webhook secret configured for {provider}"})
+        body = await request.body()
+        if not verify_signature(provider, request.headers, body, secret):
+            await offload(state.incr, "webhooks_rejected_total")
+            raise HTTPException(status_code=401, detail={"error": "Invalid webhook signature"})
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPException(status_code=400, detail={"error": "Webhook body is not JSON"})
+        event = parse_event(provider, request.headers, data if isinstance(data, dict) else {})
+        await offload(state.incr, "webhooks_received_total")
+        return await offload(schedule_review, state, event, debounce_s=webhook_debounce_s)
+
     @app.post("/api/pr/comment")
-    def post_comment(payload: PostCommentRequest, request: Request):
-        cfg = store.load()
-        service = ReviewService.from_config(cfg)
+    async def post_comment(payload: PostCommentRequest, request: Request):
         try:
-            url = service.post_comment(
+            url = await service().apost_comment(
                 pr_link=payload.pr_link,
                 file_path=payload.file_path,
                 severity=payload.severity,
@@ -259,9 +513,168 @@ def create_app(*, data_dir: Optional[Path] = None) -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=500, detail={"error": f"Unexpected error: {e}"})
 
+    @app.post("/api/pr/comments/batch")
+    async def post_comments_batch(payload: PostCommentsBatchRequest, request: Request):
+        """
+        Post the selected suggestions together: a GitHub review with inline comments, GitLab draft notes published
+        at once, Azure DevOps threads anchored to lines; other providers get paced general comments.
+        `results[i]` is the outcome of `comments[i]`.
+        """
+        comments = [
+            ReviewComment(
+                file_path=c.file_path,
+                severity=c.severity or "info",
+                message=c.message,
+                suggestion=c.suggestion,
+                code_example=c.code_example,
+                start_line=c.start_line,
+                end_line=c.end_line,
+                line_side=c.line_side,
+                related_url=c.related_url,
+            )
+            for c in payload.comments
+        ]
+        try:
+            results = await service().apost_comments(payload.pr_link, comments)
+        except AuthRequiredError as e:
+            raise HTTPException(
+                status_code=401,
+                detail={
+                    "error": str(e),
+                    "provider": e.provider,
+                    "host": e.host,
+                    "settings_url": str(request.url_for("settings_page")),
+                },
+            )
+        except (PRReviewBotError, ProviderError) as e:
+            raise HTTPException(status_code=400, detail={"error": str(e)})
+        return {"ok": all(r.ok for r in results), "results": [asdict(r) for r in results]}
+
     return app
 
 
+def create_app_from_env() -> FastAPI:
+    """App factory for multi-process serving (`uvicorn --factory`); every worker process builds its own app."""
+    data_dir = os.getenv(DATA_DIR_ENV)
+    return create_app(data_dir=Path(data_dir) if data_dir else None)
+
+
+async def _prune_history(history: ReviewHistory, stop: asyncio.Event, *, check_s: float = 300.0) -> None:
+    """Prune the review history off the request path; `maybe_prune` runs it once per interval across workers."""
+    while not stop.is_set():
+        try:
+            await offload(history.maybe_prune)
+        except Exception:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=min(check_s, history.prune_interval_s))
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _run_review_jobs(
+    state: SharedState,
+    service,
+    stop: asyncio.Event,
+    *,
+    poll_s: float = 0.5,
+    cancel_poll_s: float = 0.5,
+    lease_s: float = JOB_LEASE_S,
+) -> None:
+    owner = worker_id()
+    # Batch API reviews wait for their batch (minutes to hours): they run detached, so this runner keeps claiming
+    # jobs and their prompts join the same batch.
+    batched: set = set()
+    max_batched = BatchOptions.from_env().max_requests
+    try:
+        while not stop.is_set():
+            if len(batched) >= max_batched:
+                await asyncio.wait(batched, timeout=poll_s, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                job = await offload(state.claim_job, owner, kinds=["review"], lease_s=lease_s)
+            except Exception:
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=poll_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            run = _run_review_job(state, service, job, owner, cancel_poll_s=cancel_poll_s, lease_s=lease_s)
+            if job.payload.get("llm_batch"):
+                task = asyncio.create_task(run)
+                batched.add(task)
+                task.add_done_callback(batched.discard)
+                continue
+            await run
+    finally:
+        for task in list(batched):
+            task.cancel()
+        await asyncio.gather(*batched, return_exceptions=True)
+
+
+async def _run_review_job(state: SharedState, service, job, owner: str, *, cancel_poll_s: float, lease_s: float) -> None:
+    journal = None
+    if job.payload.get("llm_batch"):
+        # Batch ids are kept with the job: if this worker stops, the next runner waits for the same batch.
+        async def save(batches: Dict[str, str]) -> None:
+            await offload(state.update_job_payload, job.id, owner, {**job.payload, "llm_batches": batches})
+
+        journal = BatchJournal(dict(job.payload.get("llm_batches") or {}), save)
+    token = batch_journal.set(journal)
+    try:
+        task = asyncio.ensure_future(
+            service(llm_batch=bool(job.payload.get("llm_batch"))).areview(
+                pr_link=job.payload["pr_link"],
+                language=job.payload.get("language"),
+                llm_provider=job.payload.get("llm_provider"),
+                llm_model=job.payload.get("llm_model"),
+            )
+        )
+    finally:
+        batch_journal.reset(token)
+    # Stop spending provider/LLM capacity on a review once it is superseded (e.g. a newer push arrived). The lease
+    # is renewed while the review runs, so a long review is not claimed and run again by another runner.
+    cancelled = False
+    loop = asyncio.get_running_loop()
+    renew_at = loop.time() + lease_s / 4
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=cancel_poll_s)
+            if task.done():
+                break
+            if loop.time() >= renew_at:
+                renew_at = loop.time() + lease_s / 4
+                if not await offload(state.renew_lease, job.id, owner, lease_s=lease_s):
+                    # The lease expired (e.g. the event loop was blocked) and another runner has the job now.
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await offload(state.incr, "review_jobs_lost_total")
+                    return
+            if await offload(state.cancel_requested, job.id):
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                cancelled = True
+    except asyncio.CancelledError:
+        # The worker is shutting down: hand the job back so another runner (or the next start) picks it up.
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await offload(state.requeue_job, job.id, owner)
+        raise
+    if cancelled:
+        await offload(state.finish_job, job.id, owner, cancelled=True)
+        await offload(state.incr, "review_jobs_cancelled_total")
+        return
+    try:
+        result = task.result()
+        if job.payload.get("head_sha") and not result.fallback:
+            await offload(state.mark_reviewed, job.payload["pr_link"], job.payload["head_sha"])
+        await offload(state.finish_job, job.id, owner, result=review_payload(job.payload["pr_link"], result))
+    except Exception as e:
+        await offload(state.finish_job, job.id, owner, error=str(e) or type(e).__name__)
+
+
 def _safe_settings(cfg: AppConfig) -> Dict[str, Any]:
     def mask(tok: str) -> str:
         if not tok:
@@ -285,6 +698,7 @@ def _safe_settings(cfg: AppConfig) -> Dict[str, Any]:
             "openai_deployment": (cfg.llm or {}).get("openai_deployment") or "",
         },
         "model_map": cfg.model_map or {},
+        "webhook_secrets": {p: mask(sec) for p, sec in (cfg.webhook_secrets or {}).items()},
     }
 
 
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.aio import run_sync
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.core.types import PullRequestInfo
+from prreviewbot.providers.base import Provider, ProviderContext
+
+
+def test_concurrent_areviews_overlap_llm_latency():
+    pytest.importorskip("openai")
+    with FakeServer(llm_latency_s=0.5) as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=3, discussion=2))
+        svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+
+        async def main():
+            return await asyncio.gather(
+                *[svc.areview(pr_link=pr_link("github", 1), llm_provider="openai") for _ in range(30)]
+            )
+
+        t0 = time.perf_counter()
+        results = asyncio.run(main())
+        wall = time.perf_counter() - t0
+
+    assert len(results) == 30
+    assert all(r.comments and r.model.startswith("openai:") for r in results)
+    # 30 x 0.5s of LLM latency run sequentially would take 15s.
+    assert wall < 6.0
+
+
+class _SyncOnlyProvider(Provider):
+    def name(self) -> str:
+        return "sync"
+
+    def fetch_pr(self, ctx: ProviderContext) -> PullRequestInfo:
+        return PullRequestInfo(provider="sync", host="h", pr_url=ctx.pr_url, title="t", description="")
+
+
+class _NoFetchProvider(Provider):
+    def name(self) -> str:
+        return "none"
+
+
+def test_sync_only_provider_is_usable_from_async_code():
+    info = asyncio.run(_SyncOnlyProvider().afetch_pr(ProviderContext(pr_url="u", token=None)))
+    assert info.title == "t"
+    with pytest.raises(NotImplementedError):
+        asyncio.run(_NoFetchProvider().afetch_pr(ProviderContext(pr_url="u", token=None)))
+
+
+def test_run_sync_works_inside_a_running_loop():
+    async def inner():
+        return 42
+
+    async def outer():
+        return run_sync(inner())
+
+    assert asyncio.run(outer()) == 42
@@ -30,6 +30,14 @@ def test_azure_items_invalid_json_becomes_provider_error():
         "https://dev.azure.com/org/proj/_apis/git/repositories/repo/pullRequests/42/iterations/1/changes",
         params__contains={"api-version": "7.1-preview.1"},
     ).respond(200, json={"changeEntries": [{"item": {"path": "/a.txt"}}]})
+    # threads (fetched concurrently with the PR metadata)
+    respx.get(
+        "https://dev.azure.com/org/proj/_apis/git/repositories/repo/pullRequests/42/threads",
+        params__contains={"api-version": "7.1-preview.1"},
+    ).respond(200, json={"value": []})
+
+    # no server-side diffs (older Azure DevOps Server): falls back to downloading items
+    respx.post("https://dev.azure.com/org/proj/_apis/git/repositories/repo/filediffs").respond(404)
 
     # items endpoint claims JSON but returns invalid body -> should not crash as JSONDecodeError
     respx.get(
@@ -0,0 +1,64 @@
+import difflib
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import SyntheticFile, generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.providers.azure_devops import _block_changes, _unified_diff
+from prreviewbot.providers.base import ProviderContext
+from prreviewbot.providers.registry import provider_for, reset_registry
+
+
+def _expected(path, before, after):
+    lines = difflib.unified_diff(
+        before.splitlines(True), after.splitlines(True), fromfile=f"a/{path}", tofile=f"b/{path}", lineterm=""
+    )
+    return "\n".join(lines) + "\n"
+
+
+def _big(n):
+    return "".join(f"line {i}\n" for i in range(n))
+
+
+def test_fetch_uses_server_blocks_and_skips_unneeded_downloads():
+    reset_registry()
+    pr = generate_pr(number=1, files=3, hunks=3)
+    pr.files += [
+        SyntheticFile(path="big_append.py", before=_big(5000), after=_big(5000) + "tail()\n", patch=""),
+        SyntheticFile(path="big_trim.py", before=_big(5000), after=_big(4990), patch=""),
+        SyntheticFile(path="new.py", before="", after="x = 1\n", patch=""),
+        SyntheticFile(path="moved.py", before=_big(50), after=_big(50), patch=""),
+    ]
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(pr)
+        link = pr_link("azure", 1)
+        token = bench_app_config(server.url).tokens["azure"][parse_pr_link(link).host]
+        server.reset_stats()
+        fetched = provider_for(parse_pr_link(link)).fetch_pr(ProviderContext(pr_url=link, token=token))
+        requests, bytes_out = dict(server.requests), server.bytes_out
+
+    patches = {f.path: f.patch for f in fetched.changed_files}
+    for f in pr.files:
+        if f.before == f.after:
+            assert patches[f.path] is None
+        else:
+            assert patches[f.path] == _expected(f.path, f.before, f.after), f.path
+    assert requests["azure.filediffs"] == 1
+    # Both sides for the 3 edited files, one side for the append/trim/new file, nothing for the rename.
+    assert requests["azure.items"] == 3 * 2 + 3
+    # Downloading both versions of the two big files alone would be 4x.
+    assert bytes_out < 3 * len(_big(5000))
+
+
+def test_untrusted_blocks_fall_back_to_local_diff():
+    before, after = "a\nb\nc\n", "a\nB\nc\nd\n"
+    assert _block_changes([{"changeType": 3, "originalLineNumberStart": 2, "originalLinesCount": 1}]) is None
+    # A block past the end of the file (e.g. the server split lines differently): diffed locally instead.
+    past_end = _block_changes(
+        [{"changeType": 1, "originalLineNumberStart": 0, "originalLinesCount": 0, "modifiedLineNumberStart": 40,
+          "modifiedLinesCount": 1}]
+    )
+    assert past_end == [("insert", 39, 39, 39, 40)]
+    assert _unified_diff("f.py", before, after, past_end) == _expected("f.py", before, after)
+    # Pure deletion: the new content is rebuilt from the old one.
+    assert _unified_diff("f.py", before, None, [("delete", 1, 3, 1, 1)]) == _expected("f.py", before, "a\n")
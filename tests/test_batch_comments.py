@@ -0,0 +1,122 @@
+import time
+
+import httpx
+import pytest
+import respx
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.types import ReviewComment
+from prreviewbot.providers.base import BULK_POST_INTERVAL_S, ProviderContext
+from prreviewbot.providers.gitea import GiteaProvider
+from prreviewbot.providers.registry import reset_registry
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.web.app import create_app
+
+
+@pytest.fixture
+def env(tmp_path):
+    reset_registry()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        pr = generate_pr(number=1, files=3)
+        server.add_pr(pr)
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        with TestClient(create_app(data_dir=tmp_path, result_ttl_s=0)) as client:
+            yield server, pr, client
+
+
+def _comments(pr, *, bad_path=False):
+    return [
+        {"file_path": pr.files[0].path, "severity": "warn", "message": "m0", "start_line": 2, "end_line": 3},
+        {"file_path": "missing.py" if bad_path else pr.files[1].path, "severity": "info", "message": "m1", "end_line": 5},
+        {"file_path": None, "severity": "info", "message": "general"},
+    ]
+
+
+def _post(client, provider, comments):
+    r = client.post("/api/pr/comments/batch", json={"pr_link": pr_link(provider, 1), "comments": comments})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_github_posts_one_review_with_inline_comments(env):
+    server, pr, client = env
+    out = _post(client, "github", _comments(pr))
+    assert out["ok"] and [r["inline"] for r in out["results"]] == [True, True, False]
+    assert server.requests["github.post_review"] == 1 and "github.post_comment" not in server.requests
+    [(_, review)] = server.posts
+    assert [(c["path"], c.get("start_line"), c["line"]) for c in review["comments"]] == [
+        (pr.files[0].path, 2, 3),
+        (pr.files[1].path, None, 5),
+    ]
+    assert "general" in review["body"]
+
+
+def test_github_falls_back_to_review_body_when_a_line_is_outside_the_diff(env):
+    server, pr, client = env
+    out = _post(client, "github", _comments(pr, bad_path=True))
+    assert out["ok"] and [r["inline"] for r in out["results"]] == [False, False, False]
+    assert server.requests["github.post_review"] == 2
+    assert server.posts[-1][1]["comments"] == [] and "m1" in server.posts[-1][1]["body"]
+
+
+def test_gitlab_drafts_then_publishes_once(env):
+    server, pr, client = env
+    out = _post(client, "gitlab", _comments(pr, bad_path=True))
+    assert out["ok"] and [r["inline"] for r in out["results"]] == [True, False, False]
+    assert server.requests["gitlab.publish"] == 1 and "gitlab.post_note" not in server.requests
+    drafts = [body for route, body in server.posts if route == "gitlab.post_draft"]
+    assert drafts[0]["position"]["new_line"] == 3 and drafts[0]["position"]["head_sha"] == pr.head_sha
+    assert sum(1 for d in drafts if "position" not in d) == 2  # the general one and the rejected position
+
+
+def test_azure_threads_carry_thread_context(env):
+    server, pr, client = env
+    out = _post(client, "azure", _comments(pr))
+    assert out["ok"] and [r["inline"] for r in out["results"]] == [True, True, False]
+    contexts = [body.get("threadContext") for route, body in server.posts]
+    assert server.requests["azure.post_thread"] == 3
+    assert {"filePath": "/" + pr.files[0].path, "rightFileStart": {"line": 2, "offset": 1},
+            "rightFileEnd": {"line": 3, "offset": 1}} in contexts
+    assert None in contexts
+
+
+def test_other_providers_post_each_comment_paced(env):
+    server, pr, client = env
+    t0 = time.perf_counter()
+    comments = _comments(pr) + [{**c, "message": c["message"] + " again"} for c in _comments(pr)]
+    out = _post(client, "gitea", comments)
+    assert time.perf_counter() - t0 >= 5 * BULK_POST_INTERVAL_S * 0.9
+    assert out["ok"] and len(out["results"]) == 6 and not any(r["inline"] for r in out["results"])
+    assert server.requests["gitea.post_comment"] == 6
+
+
+@respx.mock
+def test_each_comment_reports_its_own_failure():
+    url = "https://gitea.example.com/api/v1/repos/o/r/issues/1/comments"
+    calls = iter([httpx.Response(201, json={"html_url": "u1"}), httpx.Response(500, text="boom"),
+                  httpx.Response(201, json={"html_url": "u3"})])
+    respx.post(url).mock(side_effect=lambda request: next(calls))
+    ctx = ProviderContext(pr_url="https://gitea.example.com/o/r/pulls/1", token="t")
+    results = GiteaProvider(host="gitea.example.com").post_comments(
+        ctx, [ReviewComment(file_path=None, severity="info", message=f"m{i}") for i in range(3)]
+    )
+    assert [(r.ok, r.comment_url) for r in results] == [(True, "u1"), (False, None), (True, "u3")]
+    assert "500" in results[1].error
+
+
+def test_auth_and_validation_errors(env):
+    server, _, client = env
+    # No token saved for this host.
+    r = client.post(
+        "/api/pr/comments/batch",
+        json={"pr_link": "https://ghe.corp/o/r/pull/1", "comments": [{"message": "x"}]},
+    )
+    assert r.status_code == 401 and r.json()["detail"]["host"] == "ghe.corp"
+    # Unknown PR: the provider error is reported per comment.
+    r = client.post("/api/pr/comments/batch", json={"pr_link": pr_link("github", 99), "comments": [{"message": "x"}]})
+    assert r.status_code == 200 and not r.json()["ok"] and "404" in r.json()["results"][0]["error"]
+    assert client.post("/api/pr/comments/batch", json={"pr_link": pr_link("github", 1), "comments": []}).status_code == 422
+    assert server.posts == []  # nothing reached the provider
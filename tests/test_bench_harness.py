@@ -0,0 +1,42 @@
+from prreviewbot.bench.fake_server import ALL_PROVIDERS, FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import (
+    BenchConfig,
+    bench_app_config,
+    compare_reports,
+    redirect_provider_apis,
+    run_benchmark,
+)
+from prreviewbot.core.review_service import ReviewService
+
+
+def test_fake_server_serves_every_provider():
+    pr = generate_pr(number=3, files=4, hunks=2, discussion=4)
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(pr)
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        for provider in ALL_PROVIDERS:
+            info = svc.fetch_pr(pr_link(provider, 3))
+            assert info.title == pr.title, provider
+            assert [f.path for f in info.changed_files] == [f.path for f in pr.files], provider
+            assert all(f.patch and "@@" in f.patch for f in info.changed_files), provider
+            assert len(info.existing_discussion) == 4, provider
+
+
+def test_run_benchmark_report_shape():
+    report = run_benchmark(BenchConfig(providers=["github", "azure"], files=3, iterations=2, warmup=0))
+    assert report["version"] == 1
+    assert [s["name"] for s in report["scenarios"]] == ["github", "azure"]
+    for s in report["scenarios"]:
+        assert s["latency_ms"]["n"] == 2
+        assert {"fetch", "llm", "total"} <= set(s["stages_ms"])
+        assert s["http_requests"] > 0
+
+
+def test_compare_reports_flags_regressions():
+    base = {"scenarios": [{"name": "github", "latency_ms": {"p50": 100.0, "p95": 120.0}, "throughput_rps": 10.0}]}
+    cur = {"scenarios": [{"name": "github", "latency_ms": {"p50": 130.0, "p95": 121.0}, "throughput_rps": 9.5}]}
+    rows = {r["metric"]: r for r in compare_reports(base, cur, threshold=0.10)}
+    assert rows["latency_ms.p50"]["regression"] is True
+    assert rows["latency_ms.p95"]["regression"] is False
+    assert rows["throughput_rps"]["regression"] is False
@@ -0,0 +1,21 @@
+import os
+
+from prreviewbot.bench.startup import REVIEW_COMMAND_MODULES, WEB_STACK_MODULES, measure_imports
+
+# Generous enough for slow CI machines; the review path measures ~80-130 ms locally (the web stack alone is ~450 ms).
+BUDGET_MS = float(os.environ.get("PRREVIEWBOT_IMPORT_BUDGET_MS", "400"))
+
+
+def test_review_command_does_not_import_web_stack_or_llm_sdk():
+    result = measure_imports(REVIEW_COMMAND_MODULES, runs=1)
+    assert [m for m in WEB_STACK_MODULES if m in result["loaded"]] == []
+
+
+def test_review_command_import_time_within_budget():
+    result = measure_imports(REVIEW_COMMAND_MODULES, runs=3)
+    assert result["total_ms"] <= BUDGET_MS, result["top"]
+
+
+def test_serve_still_loads_web_stack_on_demand():
+    result = measure_imports(["prreviewbot.web.app"], runs=1)
+    assert "fastapi" in result["loaded"]
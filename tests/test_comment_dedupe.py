@@ -0,0 +1,128 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.comment_format import (
+    comment_fingerprint,
+    comment_markers,
+    fingerprint_marker,
+    format_pr_comment_markdown,
+)
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.core.types import ExistingDiscussionComment, PullRequestInfo
+from prreviewbot.providers.base import PostedIndex
+from prreviewbot.providers.registry import reset_registry
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.web.app import create_app
+
+
+@pytest.fixture
+def env(tmp_path):
+    reset_registry()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=3, discussion=0))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        with TestClient(create_app(data_dir=tmp_path, result_ttl_s=0)) as client:
+            yield server, client
+
+
+def _writes(server):
+    return sum(1 for route, _ in server.posts if route != "azure.filediffs")
+
+
+def _comment(path, message="Use a context manager.", **extra):
+    return {"file_path": path, "severity": "warn", "message": message, "start_line": 2, "end_line": 3, **extra}
+
+
+def test_fingerprint_is_stable_and_embedded_as_a_marker():
+    fp = comment_fingerprint(file_path="a.py", start_line=2, end_line=3, message="Use a  context manager.")
+    assert fp == comment_fingerprint(file_path="a.py", start_line=3, end_line=2, message=" use a context\nmanager. ")
+    assert fp != comment_fingerprint(file_path="b.py", start_line=2, end_line=3, message="Use a context manager.")
+    assert fp != comment_fingerprint(file_path="a.py", start_line=2, end_line=4, message="Use a context manager.")
+    body = format_pr_comment_markdown(
+        pr_link="x", file_path="a.py", severity="warn", message="Use a context manager.", suggestion=None,
+        code_example=None, start_line=2, end_line=3,
+    )
+    assert comment_markers(body) == [fp] and fingerprint_marker(fp) in body
+    assert comment_markers("a review body\n" + fingerprint_marker(fp) + "\n---\n" + fingerprint_marker("0" * 16)) == [
+        fp,
+        "0" * 16,
+    ]
+
+
+def test_index_over_a_large_discussion():
+    fps = [comment_fingerprint(file_path=f"f{i}.py", start_line=1, end_line=1, message="m") for i in range(5000)]
+    discussion = [
+        ExistingDiscussionComment(author="u", body=f"note {i}" + (fingerprint_marker(fp) if i % 2 else ""), url=f"u{i}")
+        for i, fp in enumerate(fps)
+    ]
+    pr = PullRequestInfo(provider="github", host="h", pr_url="https://h/o/r/pull/1", title="", description="",
+                         existing_discussion=discussion)
+    index = PostedIndex()
+    index.load(pr)
+    assert [index.get("https://h/o/r/pull/1/", fp) for fp in fps[:4]] == [None, "u1", None, "u3"]
+    assert index.get("https://h/o/r/pull/2", fps[1]) is None
+
+
+def test_rerun_skips_comments_already_posted(env):
+    server, client = env
+    pr = server.prs[1]
+    link = pr_link("gitea", 1)
+    comments = [_comment(pr.files[0].path), _comment(None, "General note."), _comment(pr.files[0].path)]
+    first = client.post("/api/pr/comments/batch", json={"pr_link": link, "comments": comments}).json()
+    assert [r["skipped"] for r in first["results"]] == [False, False, True]
+    assert server.requests["gitea.post_comment"] == 2
+
+    # A fresh process only knows what the PR's discussion says: its markers are read before posting.
+    reset_registry()
+    again = client.post("/api/pr/comments/batch", json={"pr_link": link, "comments": comments[:2]}).json()
+    assert again["ok"] and all(r["skipped"] for r in again["results"])
+    r = client.post("/api/pr/comment", json={"pr_link": link, **_comment(pr.files[0].path, "use A context manager.")})
+    assert r.json()["ok"]
+    assert server.requests["gitea.post_comment"] == 2
+    assert client.get("/metrics").text.count("comments_skipped_total") >= 1
+
+
+def test_cli_post_after_a_restart_is_not_duplicated(env):
+    server, _ = env
+    link = pr_link("github", 1)
+    comment = {k: v for k, v in _comment(None, "General note.").items() if k != "severity"}
+    svc = ReviewService.from_config(bench_app_config(server.url))
+    first = svc.post_comment(pr_link=link, severity="warn", suggestion=None, code_example=None, **comment)
+    reset_registry()
+    again = svc.post_comment(pr_link=link, severity="warn", suggestion=None, code_example=None, **comment)
+    assert server.requests["github.post_comment"] == 1 and again and first
+
+
+@pytest.mark.parametrize("provider", ["github", "gitlab", "azure", "bitbucket"])
+def test_inline_and_single_posts_are_idempotent(env, provider):
+    server, client = env
+    pr = server.prs[1]
+    link = pr_link(provider, 1)
+    batch = {"pr_link": link, "comments": [_comment(pr.files[0].path), _comment(pr.files[1].path, "Other.")]}
+    assert not any(r["skipped"] for r in client.post("/api/pr/comments/batch", json=batch).json()["results"])
+    posts = _writes(server)
+
+    reset_registry()  # a restart, another worker or the CLI: nothing posted is known in-process
+    assert all(r["skipped"] for r in client.post("/api/pr/comments/batch", json=batch).json()["results"])
+    assert client.post("/api/pr/comment", json={"pr_link": link, **batch["comments"][1]}).json()["ok"]
+    assert _writes(server) == posts
+
+
+@pytest.mark.parametrize("provider", ["github", "gitlab", "bitbucket", "gitea"])
+def test_fresh_process_reads_only_the_discussion(env, provider):
+    server, client = env
+    pr = server.prs[1]
+    # On GitHub both end up in the review body: the general note always, the unanchorable one after the 422.
+    comments = [_comment(None, "General note."), _comment(pr.files[0].path, "Off the diff.", start_line=900, end_line=900)]
+    batch = {"pr_link": pr_link(provider, 1), "comments": comments}
+    assert not any(r["skipped"] for r in client.post("/api/pr/comments/batch", json=batch).json()["results"])
+
+    reset_registry()
+    server.reset_stats()
+    assert all(r["skipped"] for r in client.post("/api/pr/comments/batch", json=batch).json()["results"])
+    assert _writes(server) == 0
+    diffs = (".files", ".diff", ".diffs", ".changes", ".diffstat")
+    assert not [route for route in server.requests if route.endswith(diffs)]
@@ -0,0 +1,51 @@
+import pytest
+import respx
+
+from prreviewbot.core.types import (
+    ChangedFile,
+    ExistingDiscussionComment,
+    PullRequestInfo,
+    ReviewComment,
+    project,
+)
+from prreviewbot.providers.base import ProviderContext
+from prreviewbot.providers.github import GitHubProvider
+
+
+def test_records_are_slotted_and_share_strings():
+    a = ChangedFile(path="".join(["src/", "app.py"]))
+    b = ChangedFile(path="".join(["src/app", ".py"]))
+    assert a.path is b.path
+    assert not hasattr(a, "__dict__")
+    with pytest.raises(AttributeError):
+        a.extra = 1  # type: ignore[attr-defined]
+
+    c1 = ExistingDiscussionComment(author="".join(["al", "ice"]), body="x")
+    c2 = ExistingDiscussionComment(author="".join(["ali", "ce"]), body="y")
+    assert c1.author is c2.author
+    r = ReviewComment(file_path="".join(["src/", "app.py"]), severity="warn", message="m")
+    assert r.file_path is a.path
+    assert not hasattr(PullRequestInfo(provider="p", host="h", pr_url="u", title="", description=""), "__dict__")
+
+
+def test_project_keeps_set_fields_only():
+    payload = {"number": 3, "draft": False, "head": {"sha": "abc", "repo": {"big": "x" * 1000}}, "user": None}
+    assert project(payload, ("number", "draft", "head.sha", "user.login", "base.ref")) == {
+        "number": 3,
+        "draft": False,
+        "head.sha": "abc",
+    }
+
+
+@respx.mock
+def test_github_raw_is_projected():
+    pr = {"title": "T", "number": 1, "state": "open", "head": {"sha": "abc", "repo": {"owner": {}}}, "_links": {}}
+    respx.get("https://api.github.com/repos/acme/repo/pulls/1").respond(200, json=pr)
+    respx.get("https://api.github.com/repos/acme/repo/pulls/1/files").respond(200, json=[{"filename": "a.py"}])
+    respx.get("https://api.github.com/repos/acme/repo/issues/1/comments").respond(200, json=[])
+    respx.get("https://api.github.com/repos/acme/repo/pulls/1/comments").respond(200, json=[])
+    respx.get("https://api.github.com/repos/acme/repo/pulls/1/reviews").respond(200, json=[])
+
+    info = GitHubProvider().fetch_pr(ProviderContext(pr_url="https://github.com/acme/repo/pull/1", token="t"))
+    assert info.raw["pr"] == {"number": 1, "state": "open", "head.sha": "abc"}
+    assert info.raw["files_count"] == 1
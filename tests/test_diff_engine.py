@@ -0,0 +1,116 @@
+import difflib
+import random
+import time
+
+import pytest
+
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.core.diff_engine import diff_opcodes, engine_names, unified_diff
+from prreviewbot.providers.azure_devops import _unified_diff
+
+
+def _edit(rng, lines, edits):
+    out = list(lines)
+    for _ in range(edits):
+        p = rng.randint(0, len(out))
+        op = rng.random()
+        if op < 0.4:
+            out[p:p] = [f"added {rng.randint(0, 9)}\n" for _ in range(rng.randint(1, 4))]
+        elif op < 0.8:
+            del out[p : p + rng.randint(1, 4)]
+        else:
+            out[p : p + 1] = ["changed\n"]
+    return out
+
+
+def _corpus():
+    rng = random.Random(7)
+    pr = generate_pr(files=8, hunks=4, hunk_lines=6)
+    cases = [(f.before.splitlines(keepends=True), f.after.splitlines(keepends=True)) for f in pr.files]
+    cases += [([], []), ([], ["a\n"]), (["a\n"], []), (["a\n", "b\n"], ["b\n", "a\n"])]
+    for _ in range(300):
+        # Few distinct lines, so duplicates (braces, blank lines) are everywhere.
+        a = [f"{rng.choice('{}xyz ')}\n" for _ in range(rng.randint(0, 60))]
+        cases.append((a, _edit(rng, a, rng.randint(0, 6))))
+    return cases
+
+
+def _apply(a, b, codes):
+    out = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            out += a[i1:i2]
+        else:
+            out += b[j1:j2]
+    return out
+
+
+def _cost(codes):
+    return sum(i2 - i1 + j2 - j1 for tag, i1, i2, j1, j2 in codes if tag != "equal")
+
+
+def test_difflib_engine_output_is_byte_identical():
+    for a, b in _corpus():
+        ours = list(unified_diff(a, b, fromfile="a/x", tofile="b/x", engine="difflib"))
+        assert ours == list(difflib.unified_diff(a, b, fromfile="a/x", tofile="b/x", lineterm=""))
+
+
+@pytest.mark.parametrize("engine", ["myers", "patience"])
+def test_engines_produce_valid_edit_scripts_no_longer_than_difflib(engine):
+    for a, b in _corpus():
+        codes, coarse = diff_opcodes(a, b, engine=engine)
+        assert not coarse
+        assert _apply(a, b, codes) == b
+        reference, _ = diff_opcodes(a, b, engine="difflib")
+        if engine == "myers":
+            assert _cost(codes) <= _cost(reference)  # Myers is minimal
+
+
+@pytest.mark.parametrize("engine", engine_names())
+def test_fixture_prs_diff_the_same_as_difflib(engine):
+    for f in generate_pr(files=10, hunks=5, hunk_lines=8).files:
+        a, b = f.before.splitlines(keepends=True), f.after.splitlines(keepends=True)
+        assert list(unified_diff(a, b, engine=engine)) == list(difflib.unified_diff(a, b, lineterm=""))
+
+
+def test_budget_falls_back_to_one_replacement_hunk():
+    rng = random.Random(1)
+    a = [f"{rng.randint(0, 50)}\n" for _ in range(20_000)]
+    b = [f"{rng.randint(0, 50)}\n" for _ in range(20_000)]
+    a[0] = b[0] = "head\n"
+    a[-1] = b[-1] = "tail\n"
+    t0 = time.perf_counter()
+    codes, coarse = diff_opcodes(a, b, engine="myers", time_budget_s=0.05)
+    assert time.perf_counter() - t0 < 1.0
+    assert coarse
+    assert codes == [("equal", 0, 1, 0, 1), ("replace", 1, 19_999, 1, 19_999), ("equal", 19_999, 20_000, 19_999, 20_000)]
+    hunks = [line for line in unified_diff(a, b, engine="myers", time_budget_s=0.05) if line.startswith("@@")]
+    assert hunks == ["@@ -1,20000 +1,20000 @@"]
+
+
+def test_large_rewrite_is_fast_with_default_engine():
+    a = [f"line {i}\n" for i in range(20_000)]
+    b = [line if i % 3 else f"changed {i}\n" for i, line in enumerate(a)]
+    t0 = time.perf_counter()
+    codes, coarse = diff_opcodes(a, b)
+    assert time.perf_counter() - t0 < 1.0
+    assert not coarse and _apply(a, b, codes) == b
+    assert _cost(codes) == 2 * len(range(0, 20_000, 3))
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        diff_opcodes(["a"], ["b"], engine="nope")
+
+
+def test_azure_file_diff_uses_engine(monkeypatch):
+    monkeypatch.setenv("PRREVIEWBOT_DIFF_ENGINE", "difflib")
+    before = "a\nb\nc\n"
+    after = "a\nB\nc\n"
+    expected = "\n".join(
+        difflib.unified_diff(before.splitlines(True), after.splitlines(True), "a/f.py", "b/f.py", lineterm="")
+    )
+    assert _unified_diff("f.py", before, after) == expected + "\n"
+    monkeypatch.setenv("PRREVIEWBOT_DIFF_ENGINE", "patience")
+    assert _unified_diff("f.py", before, after) == expected + "\n"
@@ -0,0 +1,120 @@
+import re
+import tracemalloc
+
+import pytest
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.diff_stream import TRUNCATED_MARKER, split_unified_diff
+from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.providers.base import ProviderContext
+from prreviewbot.providers.registry import provider_for
+
+
+def _file_diff(path, lines):
+    body = "".join(f"+line {i} of {path}\n" for i in range(lines))
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n@@ -0,0 +1,{lines} @@\n{body}"
+
+
+def _legacy_split(diff_text):
+    # The splitter this module replaced (whole text in memory, regex per line).
+    blocks, current = {}, None
+    for line in diff_text.splitlines():
+        m = re.match(r"^diff --git a/(.+?) b/(.+?)$", line)
+        if m:
+            current = m.group(2)
+            blocks.setdefault(current, []).append(line)
+            continue
+        if current is not None:
+            blocks[current].append(line)
+    return {k: "\n".join(v) + "\n" for k, v in blocks.items()}
+
+
+def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 10**9])
+def test_matches_legacy_split_for_any_chunking(chunk_size):
+    diff = generate_pr(files=12, hunks=3).unified_diff()
+    files = list(split_unified_diff(_chunks(diff.encode(), chunk_size)))
+    assert {f.path: f.patch for f in files} == _legacy_split(diff)
+    assert all(f.truncated is None for f in files)
+    assert sum(f.diff_bytes for f in files) == len(diff.encode())
+
+
+def test_per_file_cap_cuts_at_line_boundary():
+    diff = _file_diff("small.py", 3) + _file_diff("vendor/big.js", 5000) + _file_diff("after.py", 2)
+    files = {f.path: f for f in split_unified_diff(diff, max_file_bytes=2000)}
+
+    big = files["vendor/big.js"]
+    assert big.truncated == "file_bytes"
+    assert big.patch.endswith(TRUNCATED_MARKER)
+    assert len(big.patch.encode()) <= 2000 + len(TRUNCATED_MARKER)
+    assert big.patch[: -len(TRUNCATED_MARKER)].splitlines()[-1].startswith("+line ")
+    assert big.diff_bytes == len(_file_diff("vendor/big.js", 5000))
+    assert files["small.py"].truncated is None and files["after.py"].truncated is None
+    assert files["after.py"].patch == _file_diff("after.py", 2)
+
+
+def test_total_cap_lists_remaining_files_without_patch():
+    diff = "".join(_file_diff(f"f{i}.py", 50) for i in range(10))
+    files = list(split_unified_diff(diff, max_total_bytes=3 * len(_file_diff("f0.py", 50))))
+    assert [f.path for f in files] == [f"f{i}.py" for i in range(10)]
+    assert [f.truncated for f in files[:3]] == [None, None, None]
+    assert all(f.truncated == "total_bytes" and f.patch is None for f in files[3:])
+
+
+def test_overlong_line_is_dropped_without_buffering():
+    huge = b"+" + b"x" * 5_000_000  # one minified line, no newline for megabytes
+    diff = _file_diff("a.min.js", 1).encode() + huge + b"\n" + _file_diff("b.py", 1).encode()
+    files = {f.path: f for f in split_unified_diff(_chunks(diff, 65536), max_file_bytes=100_000)}
+    assert files["a.min.js"].truncated == "file_bytes"
+    assert files["a.min.js"].diff_bytes == len(_file_diff("a.min.js", 1)) + len(huge) + 1
+    assert files["b.py"].patch == _file_diff("b.py", 1)
+
+
+def test_non_git_diff_kept_as_single_pseudo_file():
+    diff = "--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n"
+    assert [(f.path, f.patch) for f in split_unified_diff(diff)] == [("(diff)", diff)]
+
+
+def test_peak_memory_tracks_largest_kept_file_not_diff_size():
+    block = _file_diff("vendor/generated.js", 2000).encode()  # ~60 KB per file
+    chunk = block * 16
+
+    def stream():
+        for _ in range(64):  # ~60 MB streamed
+            yield chunk
+
+    tracemalloc.start()
+    try:
+        files = 0
+        for _ in split_unified_diff(stream(), max_file_bytes=len(block), max_total_bytes=2_000_000):
+            files += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert files == 64 * 16
+    assert peak < 8 * 1024 * 1024
+
+
+@pytest.mark.parametrize("provider", ["bitbucket", "gitea"])
+def test_providers_stream_diff_with_caps(provider):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        pr = generate_pr(number=1, files=6, hunks=4, hunk_lines=10)
+        server.add_pr(pr)
+        link = pr_link(provider, 1)
+        parsed = parse_pr_link(link)
+        token = bench_app_config(server.url).tokens[provider][parsed.host]
+        client = provider_for(parsed)
+
+        full = client.fetch_pr(ProviderContext(pr_url=link, token=token))
+        capped = client.fetch_pr(ProviderContext(pr_url=link, token=token, max_file_diff_bytes=300))
+
+    assert [f.path for f in full.changed_files] == [f.path for f in pr.files]
+    assert {f.path: f.patch for f in full.changed_files} == _legacy_split(pr.unified_diff())
+    assert all(f.truncated == "file_bytes" for f in capped.changed_files)
+    assert capped.raw["truncated_files_count"] == len(pr.files)
@@ -0,0 +1,64 @@
+from prreviewbot.core.discussion import DiscussionContext, compact_discussion, estimate_tokens
+from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment
+from prreviewbot.llm.base import build_review_prompt
+
+
+def _c(author, body, *, file_path=None, thread_id=None, created_at="2024-01-01T00:00:00Z", **extra):
+    return ExistingDiscussionComment(
+        author=author, body=body, file_path=file_path, thread_id=thread_id, created_at=created_at, **extra
+    )
+
+
+def test_bots_and_ci_are_dropped_and_threads_collapsed():
+    discussion = [
+        _c("dependabot[bot]", "Bumps requests from 2.31 to 2.32."),
+        _c("codecov", "Coverage report: 81%"),
+        _c("alice", "Build succeeded"),
+        _c("alice", "Why a global here?", file_path="a.py", thread_id="t1", line=4, kind="thread"),
+        *[_c(f"u{i}", f"reply {i}", file_path="a.py", thread_id="t1") for i in range(5)],
+        _c("bob", "LGTM <!-- prreviewbot:fp=0123456789abcdef -->"),
+    ]
+    entries = compact_discussion(discussion)
+    assert len(entries) == 2
+    thread = entries[0].text
+    assert thread.startswith("- [thread] author=alice file=a.py:4 thread=t1")
+    assert "(2 earlier replies)" in thread and "reply 1" not in thread and "u4: reply 4" in thread
+    assert entries[1].text.endswith("  LGTM")
+
+
+def test_chunk_gets_relevant_and_recent_entries_within_budget():
+    discussion = [
+        _c("old", "general, old", created_at="2024-01-01T00:00:00Z"),
+        _c("x", "about b.py " + "x" * 300, file_path="pkg/b.py", created_at="2024-01-02T00:00:00Z"),
+        _c("y", "about other " + "y" * 300, file_path="other/c.py", created_at="2024-01-05T00:00:00Z"),
+        _c("z", "sibling " + "z" * 300, file_path="pkg/d.py", created_at="2024-01-03T00:00:00Z"),
+        _c("new", "general, new", created_at="2024-01-04T00:00:00Z"),
+    ]
+    ctx = DiscussionContext(discussion, token_budget=120)
+    picked = ctx.select(["pkg/b.py"])
+    assert sum(e.tokens for e in picked) <= 120
+    assert [e.text.split()[2] for e in picked] == ["author=old", "author=x", "author=new"]
+    # Another chunk ranks the same entries differently.
+    assert "author=y" in ctx.block(["other/c.py"]) and "author=x" not in ctx.block(["other/c.py"])
+    assert "less relevant discussion items omitted" in ctx.block(["other/c.py"])
+
+
+def test_selection_is_cached_per_file_set(monkeypatch):
+    ctx = DiscussionContext([_c("a", "hi", file_path="a.py")])
+    calls = []
+    select = ctx.select
+    monkeypatch.setattr(ctx, "select", lambda paths: calls.append(paths) or select(paths))
+    first = ctx.block(["a.py", "b.py"])
+    assert ctx.block(["b.py", "a.py"]) == first and len(calls) == 1
+    ctx.block(["c.py"])
+    assert len(calls) == 2
+
+
+def test_prompt_discussion_block_fits_budget_on_huge_discussions():
+    discussion = [_c(f"r{i}", f"comment {i} " + "w" * 900, file_path=f"f{i % 50}.py") for i in range(2000)]
+    files = [ChangedFile(path="f7.py", patch="@@ -1 +1 @@\n-a\n+b\n")]
+    prompt = build_review_prompt("python", files, discussion=DiscussionContext(discussion, token_budget=1500))
+    block = prompt.split("EXISTING REVIEW DISCUSSION:\n", 1)[1]
+    assert estimate_tokens(block) <= 1500 + 20
+    assert "file=f7.py" in block and "file=f8.py" not in block
+    assert "w" * 801 not in block
@@ -14,6 +14,7 @@ def test_github_provider_fetch_pr():
     )
     respx.get("https://api.github.com/repos/acme/repo/issues/1/comments").respond(200, json=[])
     respx.get("https://api.github.com/repos/acme/repo/pulls/1/comments").respond(200, json=[])
+    respx.get("https://api.github.com/repos/acme/repo/pulls/1/reviews").respond(200, json=[])
 
     p = GitHubProvider()
     info = p.fetch_pr(
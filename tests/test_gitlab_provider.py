@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import respx
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.providers.base import ProviderContext
+from prreviewbot.providers.gitlab import GitLabProvider
+
+MR_API = "https://gitlab.com/api/v4/projects/g%2Fp/merge_requests/1"
+CTX = ProviderContext(pr_url="https://gitlab.com/g/p/-/merge_requests/1", token="t")
+
+
+def _note(i, body, **extra):
+    return {"id": i, "author": {"username": f"u{i}"}, "body": body, "created_at": "2024-01-01T00:00:00Z", **extra}
+
+
+def test_fetch_reads_all_diff_pages_and_discussions():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        pr = generate_pr(number=1, files=130, hunks=1, discussion=12)
+        server.add_pr(pr)
+        link = pr_link("gitlab", 1)
+        token = bench_app_config(server.url).tokens["gitlab"][parse_pr_link(link).host]
+        fetched = GitLabProvider(host="gitlab.com").fetch_pr(ProviderContext(pr_url=link, token=token))
+
+    assert [f.path for f in fetched.changed_files] == [f.path for f in pr.files]
+    assert [f.patch for f in fetched.changed_files] == [f.patch for f in pr.files]
+    assert server.requests["gitlab.diffs"] == 3  # 50 per page
+    assert "gitlab.changes" not in server.requests and "gitlab.notes" not in server.requests
+    assert [d.body for d in fetched.existing_discussion] == [c.body for c in pr.discussion]
+    on_file = [d for d in fetched.existing_discussion if d.file_path]
+    assert on_file and all(d.kind == "thread" and d.thread_id and d.line == 1 for d in on_file)
+
+
+@respx.mock
+def test_remaining_pages_are_fetched_concurrently():
+    in_flight = peak = 0
+
+    async def diffs_page(request):
+        nonlocal in_flight, peak
+        page = int(request.url.params["page"])
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        files = [{"new_path": f"f{page}_{i}.py", "diff": "@@ -1 +1 @@\n-a\n+b\n"} for i in range(2)]
+        headers = {"X-Total-Pages": "6", "X-Next-Page": str(page + 1) if page < 6 else ""}
+        return httpx.Response(200, json=files, headers=headers)
+
+    respx.get(MR_API).respond(200, json={"title": "t", "sha": "abc"})
+    respx.get(f"{MR_API}/diffs").mock(side_effect=diffs_page)
+    respx.get(f"{MR_API}/discussions").respond(200, json=[])
+
+    pr = GitLabProvider(host="gitlab.com").fetch_pr(CTX)
+    assert [f.path for f in pr.changed_files] == [f"f{p}_{i}.py" for p in range(1, 7) for i in range(2)]
+    assert peak > 1
+
+
+@respx.mock
+def test_older_gitlab_falls_back_to_changes_and_follows_next_page():
+    respx.get(MR_API).respond(200, json={"title": "t", "sha": "abc", "web_url": CTX.pr_url})
+    respx.get(f"{MR_API}/diffs").respond(404, json={"message": "404 Not Found"})
+    respx.get(f"{MR_API}/changes").respond(200, json={"changes": [{"new_path": "a.py", "diff": "@@ -1 +1 @@\n-a\n+b\n"}]})
+    thread = {
+        "id": "abc123",
+        "individual_note": False,
+        "notes": [
+            _note(1, "why?", position={"new_path": "a.py", "new_line": 7}),
+            _note(2, "because", position={"new_path": "a.py", "new_line": 7}),
+        ],
+    }
+    single = {"id": "x", "individual_note": True, "notes": [_note(3, "added 1 commit", system=True), _note(4, "LGTM")]}
+    # No X-Total-Pages (GitLab omits it for very large lists): X-Next-Page is followed instead.
+    pages = {"1": ([thread], "2"), "2": ([single], "")}
+
+    def discussions_page(request):
+        items, nxt = pages[request.url.params["page"]]
+        return httpx.Response(200, json=items, headers={"X-Next-Page": nxt})
+
+    respx.get(f"{MR_API}/discussions").mock(side_effect=discussions_page)
+
+    pr = GitLabProvider(host="gitlab.com").fetch_pr(CTX)
+    assert [f.path for f in pr.changed_files] == ["a.py"]
+    assert [(d.body, d.kind, d.thread_id, d.file_path, d.line) for d in pr.existing_discussion] == [
+        ("why?", "thread", "abc123", "a.py", 7),
+        ("because", "thread", "abc123", "a.py", 7),
+        ("LGTM", "comment", None, None, None),
+    ]
+    assert pr.existing_discussion[0].url == "https://gitlab.com/g/p/-/merge_requests/1#note_1"
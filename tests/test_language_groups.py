@@ -0,0 +1,59 @@
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.language import detect_language, group_by_language
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.core.types import ChangedFile
+from prreviewbot.providers.registry import reset_registry
+
+
+def _file(path, changed):
+    return ChangedFile(path=path, patch="@@ -1 +1 @@\n" + "+x\n" * changed)
+
+
+def test_language_is_weighted_by_changed_lines_and_code_wins_over_manifests():
+    manifests = [_file(f"deploy/m{i}.yaml", 20) for i in range(30)]
+    assert detect_language([_file("cmd/main.go", 40), *manifests]) == "go"
+    assert detect_language([_file("a.py", 100), *[_file(f"t{i}.ts", 2) for i in range(3)]]) == "python"
+    assert detect_language(manifests) == "yaml"
+    assert detect_language([_file("a.py", 1)], override="Type-Script") == "typescript"
+
+
+def test_groups_fold_unknown_files_and_tiny_languages_into_the_primary():
+    files = [_file("main.go", 60), _file("tools/run.sh", 5), _file("x.yaml", 30), _file("y.py", 2)]
+    groups = group_by_language(files)
+    assert list(groups) == ["go", "yaml"]
+    assert [f.path for f in groups["go"]] == ["main.go", "tools/run.sh", "y.py"]
+
+
+
+def test_groups_without_weighted_languages_stay_in_one_nonempty_group():
+    files = [_file("vendor/a.go", 10), _file("package-lock.json", 50)]
+    assert list(group_by_language(files).items()) == [("general", files)]
+    assert list(group_by_language([_file("main.py", 10), _file("vendor/a.go", 500)])) == ["python"]
+    assert group_by_language([]) == {"general": []}
+
+
+def test_languages_with_different_models_are_reviewed_concurrently_and_merged():
+    reset_registry()
+    with FakeServer(llm_latency_s=0.3) as server, redirect_provider_apis(server.url):
+        # .py .ts .go .java .py .yaml
+        server.add_pr(generate_pr(number=1, files=6, discussion=4))
+        cfg = bench_app_config(server.url, llm="openai")
+        cfg.llm.pop("openai_deployment")
+        cfg.model_map = {
+            "go": {"provider": "openai", "model": "go-model"},
+            "yaml": {"provider": "heuristic", "model": "heuristic"},
+        }
+        result = ReviewService.from_config(cfg).review(pr_link=pr_link("github", 1))
+
+    assert sorted(b["model"] for route, b in server.posts if route == "llm.chat") == ["bench-model", "go-model"]
+    assert result.timings["llm"] < 0.55
+    assert result.language == "python"
+    assert result.model == "openai:bench-model@custom, openai:go-model@custom, heuristic"
+    assert "**python, typescript, java** (4 file(s)):" in result.summary and "**yaml** (1 file(s)):" in result.summary
+    breakdown = {b["language"]: b for b in result.languages}
+    assert set(breakdown) == {"python", "typescript", "go", "java", "yaml"}
+    assert breakdown["python"]["files"] == 2 and breakdown["go"]["model"] == "openai:go-model@custom"
+    assert abs(sum(b["share"] for b in result.languages) - 1.0) < 0.01
+    assert sum(b["comments"] for b in result.languages) == len([c for c in result.comments if c.file_path])
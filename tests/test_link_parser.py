@@ -1,6 +1,6 @@
 import pytest
 
-from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.core.link_parser import parse_pr_link, parse_repo_link
 
 
 @pytest.mark.parametrize(
@@ -24,3 +24,21 @@ def test_parse_pr_link_unsupported():
         parse_pr_link("https://example.com/something")
 
 
+@pytest.mark.parametrize(
+    "url,kwargs,expected",
+    [
+        ("https://github.com/acme/repo", {}, ("github", "acme", "repo")),
+        ("https://github.com/acme/repo/pulls", {}, ("github", "acme", "repo")),
+        ("https://github.com/acme/repo/pull/5", {}, ("github", "acme", "repo")),
+        ("https://git.example.com/acme/repo.git", {"provider": "gitea"}, ("gitea", "acme", "repo")),
+        ("https://gitlab.example.com/grp/sub/proj/-/merge_requests", {}, ("gitlab", "grp/sub/proj", None)),
+        ("https://bitbucket.org/ws/repo/pull-requests", {}, ("bitbucket", "ws", "repo")),
+        ("https://dev.azure.com/org/proj/_git/repo", {}, ("azure", "org", "repo")),
+        ("https://org.visualstudio.com/proj/_git/repo/pullrequests", {}, ("azure", "org", "repo")),
+    ],
+)
+def test_parse_repo_link(url, kwargs, expected):
+    p = parse_repo_link(url, **kwargs)
+    owner = p.owner or p.namespace_path or p.workspace or p.org
+    assert (p.provider, owner, p.repo) == expected
+    assert p.pr_number is None
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link, repo_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.errors import PRReviewBotError
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.llm.batch import (
+    BATCH_LINGER_ENV,
+    BATCH_POLL_ENV,
+    BatchJournal,
+    BatchLLM,
+    BatchOptions,
+    _parse_output,
+    batch_journal,
+    run_batch,
+)
+from prreviewbot.providers.registry import reset_registry
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.storage.shared_state import SharedState
+from prreviewbot.web.app import create_app
+
+FAST = BatchOptions(linger_s=0.2, poll_s=0.05)
+
+
+@pytest.fixture
+def server():
+    reset_registry()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (1, 2, 3):
+            server.add_pr(generate_pr(number=n, files=3, discussion=2))
+        yield server
+
+
+def test_concurrent_reviews_share_one_batch(server):
+    server.batch_polls = 3
+    cfg = bench_app_config(server.url, llm="openai")
+    links = [pr_link("github", n) for n in (1, 2, 3)]
+
+    async def run(svc):
+        return await asyncio.gather(*[svc.areview(pr_link=link) for link in links])
+
+    batched = asyncio.run(run(ReviewService.from_config(cfg, llm_batch=FAST)))
+    assert server.requests["llm.batch_create"] == 1 and server.requests["llm.batch_get"] == 3
+    assert "llm.chat" not in server.requests
+    online = asyncio.run(run(ReviewService.from_config(cfg)))
+    assert [(r.summary, r.comments) for r in batched] == [(r.summary, r.comments) for r in online]
+    assert batched[0].model == online[0].model
+
+
+def test_heuristic_reviews_are_not_batched(server):
+    svc = ReviewService.from_config(bench_app_config(server.url), llm_batch=FAST)
+    parts = svc._plan(svc.fetch_pr(pr_link("github", 1)), language=None, llm_provider=None, llm_model=None)
+    assert not any(isinstance(p.llm, BatchLLM) for p in parts)
+    assert svc.review(pr_link=pr_link("github", 1)).model == "heuristic"
+
+
+def test_unfinished_batch_is_cancelled_after_timeout(server):
+    server.batch_polls = 10_000
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+    llm = svc._build_llm("openai", "gpt-4o-mini")
+    with pytest.raises(PRReviewBotError, match="did not finish"):
+        asyncio.run(run_batch(llm, [("a", llm._chat_body("x"))], BatchOptions(poll_s=0.01, timeout_s=0.1)))
+    assert server.requests["llm.batch_cancel"] == 1
+
+
+def test_review_picked_up_again_waits_for_its_earlier_batch(server):
+    server.batch_polls = 10_000
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"), llm_batch=FAST)
+    journal = BatchJournal()
+
+    async def stopped_worker():
+        batch_journal.set(journal)
+        task = asyncio.ensure_future(svc.areview(pr_link=pr_link("github", 1)))
+        while not journal.batches:
+            await asyncio.sleep(0.02)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(stopped_worker())
+    (batch_id,) = set(journal.batches.values())
+    server.llm_batches[batch_id]["polls_left"] = 1
+
+    async def next_worker():
+        batch_journal.set(BatchJournal(dict(journal.batches)))
+        return await svc.areview(pr_link=pr_link("github", 1))
+
+    result = asyncio.run(next_worker())
+    assert "fake LLM" in result.summary
+    assert server.requests["llm.batch_create"] == 1 and "llm.batch_cancel" not in server.requests
+
+
+def test_failed_requests_fail_only_their_review():
+    ok = '{"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "{}"}}]}}}'
+    bad = '{"custom_id": "b", "response": {"status_code": 429, "body": {"error": {"message": "quota"}}}}'
+    out = _parse_output(ok + "\n" + bad + "\n")
+    assert out["a"] == "{}"
+    assert isinstance(out["b"], PRReviewBotError) and "quota" in str(out["b"])
+
+
+def test_sweep_jobs_are_filled_in_from_one_batch(server, tmp_path, monkeypatch):
+    monkeypatch.setenv(BATCH_LINGER_ENV, "0.5")
+    monkeypatch.setenv(BATCH_POLL_ENV, "0.05")
+    ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url, llm="openai"))
+    with TestClient(create_app(data_dir=tmp_path, result_ttl_s=0)) as client:
+        r = client.post("/api/sweep", json={"repo_url": repo_link("gitlab"), "llm_batch": True})
+        jobs = [j["job_id"] for j in r.json()["jobs"]]
+        assert len(jobs) == 3
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            statuses = [client.get(f"/api/review/jobs/{j}").json() for j in jobs]
+            if all(s["status"] == "done" for s in statuses):
+                break
+            time.sleep(0.1)
+    assert [s["status"] for s in statuses] == ["done"] * 3
+    assert all("fake LLM" in s["result"]["summary"] for s in statuses)
+    assert server.requests["llm.batch_create"] == 1
+    # Each job remembers the batch its prompts went to, for a runner that takes it over.
+    state = SharedState(data_dir=tmp_path)
+    assert all(set(state.get_job(j).payload["llm_batches"].values()) == {"batch-1"} for j in jobs)
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.llm.breaker import (
+    BREAKER_OPEN_ENV,
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BreakerOptions,
+    CircuitBreaker,
+    breaker_for,
+    reset_breakers,
+)
+from prreviewbot.providers.registry import reset_registry
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.web.app import create_app
+
+
+@pytest.fixture
+def server():
+    reset_registry()
+    reset_breakers()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=3))
+        yield server
+    reset_breakers()
+
+
+def test_breaker_opens_on_error_rate_and_recovers_through_one_probe():
+    b = CircuitBreaker("e", BreakerOptions(window=10, min_calls=4, failure_rate=0.5, open_s=0.05))
+    for ok in (True, False, True):
+        b.record(ok=ok, latency_s=0.1)
+    assert b.state == CLOSED and b.allow()
+    b.record(ok=False, latency_s=0.1)
+    assert b.state == OPEN and not b.allow()
+    time.sleep(0.06)
+    assert b.allow() and b.state == HALF_OPEN and not b.allow()  # one probe at a time
+    b.record(ok=False, latency_s=0.1)
+    assert b.state == OPEN and b.opened_total == 2
+    time.sleep(0.06)
+    assert b.allow()
+    b.record(ok=True, latency_s=0.1)
+    assert b.state == CLOSED and b.snapshot()["calls"] == 0
+
+
+def test_slow_calls_count_as_failures():
+    b = CircuitBreaker("e", BreakerOptions(min_calls=2, slow_call_s=1.0))
+    b.record(ok=True, latency_s=5.0)
+    b.record(ok=True, latency_s=0.2)
+    assert b.state == OPEN and b.snapshot()["p50_latency_s"] == 5.0
+
+
+def test_open_breaker_falls_back_to_heuristic_except_for_explicit_requests(server):
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+    endpoint = svc._build_llm("openai", "gpt-4o-mini").endpoint()
+    for _ in range(5):
+        breaker_for(endpoint).record(ok=False, latency_s=1.0)
+
+    result = svc.review(pr_link=pr_link("github", 1))
+    assert (result.model, result.fallback) == ("heuristic", "llm_circuit_open")
+    assert "llm.chat" not in server.requests
+    explicit = svc.review(pr_link=pr_link("github", 1), llm_provider="openai")
+    assert explicit.fallback is None and server.requests["llm.chat"] == 1
+
+
+def test_breaker_state_on_metrics_and_recovery(server, tmp_path, monkeypatch):
+    monkeypatch.setenv(BREAKER_OPEN_ENV, "0.2")
+    ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url, llm="openai"))
+    with TestClient(create_app(data_dir=tmp_path, result_ttl_s=0)) as client:
+        assert client.post("/api/review", json={"pr_link": pr_link("gitlab", 1)}).json()["fallback"] is None
+        (state,) = client.get("/metrics").json()["llm_breakers"]
+        for _ in range(5):
+            breaker_for(state["endpoint"]).record(ok=False, latency_s=1.0)
+        assert client.post("/api/review", json={"pr_link": pr_link("gitlab", 1)}).json()["fallback"] == "llm_circuit_open"
+        metrics = client.get("/metrics").json()
+        assert metrics["llm_breakers"][0]["state"] == "open" and metrics["counters"]["llm_fallbacks_total"] == 1
+        time.sleep(0.25)
+        assert client.post("/api/review", json={"pr_link": pr_link("gitlab", 1)}).json()["fallback"] is None
+        assert client.get("/metrics").json()["llm_breakers"][0]["state"] == "closed"
+
+
+def test_fallback_reviews_are_not_cached_or_marked_reviewed(server, tmp_path, monkeypatch):
+    monkeypatch.setenv(BREAKER_OPEN_ENV, "0.2")
+    ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url, llm="openai"))
+    with TestClient(create_app(data_dir=tmp_path)) as client:  # default result TTL
+        svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+        for _ in range(5):
+            breaker_for(svc._build_llm("openai", "gpt-4o-mini").endpoint()).record(ok=False, latency_s=1.0)
+        assert client.post("/api/review", json={"pr_link": pr_link("github", 1)}).json()["fallback"] == "llm_circuit_open"
+        time.sleep(0.25)
+        assert client.post("/api/review", json={"pr_link": pr_link("github", 1)}).json()["fallback"] is None
+        assert server.requests["llm.chat"] == 1
+        # Cached now: a third review is answered without calling the LLM.
+        assert client.post("/api/review", json={"pr_link": pr_link("github", 1)}).json()["fallback"] is None
+        assert server.requests["llm.chat"] == 1
@@ -0,0 +1,18 @@
+from prreviewbot.bench.loadtest import LoadTestConfig, run_loadtest
+
+
+def test_loadtest_inprocess_ramp_reports_each_level():
+    report = run_loadtest(LoadTestConfig(levels=[1, 2], duration_s=0.3, files=3, discussion=2))
+    levels = report["levels"]
+    assert [lv["concurrency"] for lv in levels] == [1, 2]
+    for lv in levels:
+        assert lv["requests"] > 0
+        assert lv["error_rate"] == 0.0
+        assert lv["latency_ms"]["p99"] >= lv["latency_ms"]["p50"] > 0
+    assert report["max_sustainable_concurrency"] == 2
+
+
+def test_loadtest_stops_ramping_when_slo_breached():
+    report = run_loadtest(LoadTestConfig(levels=[1, 2, 4], duration_s=0.2, files=2, discussion=0, slo_p95_ms=0.001))
+    assert [lv["concurrency"] for lv in report["levels"]] == [1]
+    assert report["max_sustainable_concurrency"] is None
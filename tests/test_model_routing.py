@@ -0,0 +1,94 @@
+import pytest
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.model_select import MODEL_STATS, ModelStats, RoutingPolicy, choose_model
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.providers.registry import reset_registry
+
+ROUTING = {
+    "models": {
+        "mini": {"context_tokens": 16000, "input_per_1m": 0.15, "output_per_1m": 0.6},
+        "std": {"context_tokens": 128000, "input_per_1m": 2.5, "output_per_1m": 10.0},
+        "long": {"context_tokens": 1000000, "input_per_1m": 2.0, "output_per_1m": 8.0},
+    },
+    "small_pr_tokens": 2000,
+    "latency_slo_s": 20,
+    "max_error_rate": 0.3,
+}
+
+
+def _choose(pr_tokens, *, stats=None, routing=ROUTING, default="std"):
+    return choose_model(
+        language="python",
+        llm_provider="openai",
+        llm_default_model=default,
+        overrides={},
+        pr_tokens=pr_tokens,
+        routing=RoutingPolicy.from_config(routing),
+        stats=stats or ModelStats(),
+    )
+
+
+def test_routes_by_pr_size():
+    small = _choose(500)
+    assert small.model == "mini" and "small PR: cheapest eligible model mini" in small.reasons
+    assert small.estimated_cost_usd == pytest.approx((3500 * 0.15 + 1500 * 0.6) / 1e6)
+    medium = _choose(30_000)
+    assert medium.model == "std" and medium.reasons[0] == "configured default model"
+    huge = _choose(400_000)
+    assert huge.model == "long" and "std: context 128000 too small" in huge.reasons
+
+
+def test_slow_or_failing_models_and_budget_are_avoided():
+    stats = ModelStats(min_calls=2)
+    for _ in range(3):
+        stats.record("mini", ok=True, latency_s=45.0)
+        stats.record("std", ok=False, latency_s=1.0)
+    assert _choose(500, stats=stats).model == "long"
+    assert _choose(30_000, stats=stats).model == "long"
+    assert _choose(10_000, routing={**ROUTING, "max_cost_usd": 0.01}).model == "mini"
+    over = _choose(200_000, routing={**ROUTING, "max_cost_usd": 0.01})
+    assert over.model == "long" and "no model meets budget/SLO; long has the largest context" in over.reasons
+
+
+
+def test_excluded_models_are_tried_again_once_their_stats_are_stale():
+    now = [0.0]
+    stats = ModelStats(max_age_s=300, clock=lambda: now[0])
+    for _ in range(3):
+        stats.record("mini", ok=True, latency_s=45.0)
+    assert _choose(500, stats=stats).model == "long"
+    now[0] = 301.0
+    assert _choose(500, stats=stats).model == "mini"
+    stats.record("mini", ok=True, latency_s=2.0)
+    assert stats._stats["mini"][:2] == [1, 2.0]
+    for _ in range(2):
+        stats.record("mini", ok=True, latency_s=2.0)
+    assert _choose(500, stats=stats).model == "mini"
+
+
+def test_without_a_policy_the_language_map_decides():
+    assert _choose(500, routing={}).model == "std"
+    assert choose_model(language="python", llm_provider="heuristic", llm_default_model=None, overrides={}).model == (
+        "heuristic"
+    )
+
+
+def test_review_records_routing_and_feeds_stats():
+    reset_registry()
+    MODEL_STATS.clear()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=2, hunk_lines=4))
+        cfg = bench_app_config(server.url, llm="openai")
+        cfg.llm.pop("openai_deployment")
+        cfg.model_routing = ROUTING
+        svc = ReviewService.from_config(cfg)
+        result = svc.review(pr_link=pr_link("github", 1))
+        assert result.routing["model"] == "mini" and result.routing["pr_tokens"] < 2000
+        assert [b["model"] for route, b in server.posts if route == "llm.chat"] == ["mini"]
+        explicit = svc.review(pr_link=pr_link("github", 1), llm_model="std")
+        assert explicit.routing["reasons"] == ["requested model"] and explicit.model.startswith("openai:std")
+    assert MODEL_STATS._stats["mini"][0] == 1 and MODEL_STATS._stats["std"][0] == 1
+    MODEL_STATS.clear()
@@ -0,0 +1,63 @@
+import time
+
+from prreviewbot.core.paths import PathClass, PathClassifier, classify_path
+from prreviewbot.core.types import ChangedFile
+from prreviewbot.llm.heuristic import HeuristicLLM
+
+
+def test_language_and_category_in_one_call():
+    cases = {
+        "svc/handler.go": ("go", "source"),
+        "svc/handler_test.go": ("go", "test"),
+        "pkg/tests/helpers.py": ("python", "test"),
+        "web/src/App.test.tsx": ("typescript", "test"),
+        "notebooks/eda.ipynb": ("python", "source"),
+        "Dockerfile": ("dockerfile", "config"),
+        "build/Makefile": ("make", "config"),
+        "deploy/values.yml": ("yaml", "config"),
+        "README.md": ("markdown", "docs"),
+        "LICENSE": (None, "docs"),
+        "vendor/github.com/x/y.go": ("go", "vendored"),
+        "web/node_modules/react/index.js": ("javascript", "vendored"),
+        "static/app.min.js": ("javascript", "generated"),
+        "api/v1/api.pb.go": ("go", "generated"),
+        "package-lock.json": (None, "generated"),
+        "tools/run.sh": (None, "other"),
+    }
+    for path, expected in cases.items():
+        c = classify_path(path)
+        assert (c.language, c.category) == expected, path
+    assert classify_path("a\\b\\c.py") == PathClass("python", "source")
+
+
+def test_custom_globs_and_priority():
+    classifier = PathClassifier(globs=[("gen/**", "generated"), ("/src/legacy/*.py", "vendored"), ("*_gen.*", "generated")])
+    assert classifier.classify("src/legacy/old.py").category == "vendored"
+    assert classifier.classify("lib/src/legacy/old.py").category == "source"  # slash globs start at the root
+    assert classifier.classify("x/model_gen.go").category == "generated"
+    assert classifier.classify("gen/tests/a_test.go").category == "generated"
+    assert classifier.classify("src/legacy/old_gen.py").category == "vendored"  # glob order, not category order
+
+
+def test_classification_is_cached_and_fast():
+    classifier = PathClassifier()
+    paths = [f"services/s{i % 500}/{'tests/' if i % 3 else ''}mod_{i}.{('py', 'go', 'ts', 'yaml')[i % 4]}" for i in range(50_000)]
+    t0 = time.perf_counter()
+    classes = classifier.classify_all(paths)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    assert classifier.classify_all(paths) == classes
+    warm = time.perf_counter() - t0
+    assert cold < 1.0 and warm < cold
+    assert classifier.classify.cache_info().hits == 50_000
+
+
+def test_heuristic_checks_use_each_files_language():
+    files = [
+        ChangedFile(path="a.py", patch="@@ -1 +1 @@\n+print(x)\n"),
+        ChangedFile(path="b.ts", patch="@@ -1 +1 @@\n+console.log(x)\n"),
+        ChangedFile(path="vendor/c.py", patch="@@ -1 +1 @@\n+print(x)  # TODO\n"),
+    ]
+    result = HeuristicLLM().review(pr_url="u", language="python, typescript", files=files, discussion=[])
+    flagged = sorted((c.file_path, c.message) for c in result.comments if c.file_path)
+    assert flagged == [("a.py", "Debug prints added/modified."), ("b.ts", "console.log added/modified.")]
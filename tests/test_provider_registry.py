@@ -0,0 +1,170 @@
+import asyncio
+import subprocess
+import sys
+import textwrap
+import time
+
+import httpx
+import pytest
+import respx
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.providers import registry
+from prreviewbot.providers.base import ProviderContext, RateLimitState
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    registry.reset_registry()
+    yield
+    registry.reset_registry()
+
+
+def test_provider_modules_are_imported_on_first_use():
+    code = textwrap.dedent(
+        """
+        import sys
+        from prreviewbot.core.link_parser import parse_pr_link
+        from prreviewbot.providers.registry import provider_for
+        loaded = lambda: sorted(m for m in sys.modules if m.startswith("prreviewbot.providers."))
+        print(loaded())
+        provider_for(parse_pr_link("https://gitlab.com/g/p/-/merge_requests/1"))
+        print(loaded())
+        """
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.splitlines()
+    assert out[0] == "['prreviewbot.providers.registry']"
+    assert out[1] == "['prreviewbot.providers.base', 'prreviewbot.providers.gitlab', 'prreviewbot.providers.registry']"
+
+
+def test_one_instance_per_provider_and_host():
+    a = registry.provider_for(parse_pr_link("https://github.com/o/r/pull/1"))
+    b = registry.provider_for(parse_pr_link("https://github.com/o/other/pull/2"))
+    ghe = registry.provider_for(parse_pr_link("https://ghe.corp/o/r/pull/1"))
+    assert a is b
+    assert a is not ghe
+    assert (a.host, ghe.host) == ("github.com", "ghe.corp")
+
+
+def test_pooled_client_reuses_connections_across_fetches():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (1, 2, 3):
+            server.add_pr(generate_pr(number=n, files=3))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+
+        async def run():
+            for n in (1, 2, 3):
+                await svc.afetch_pr(pr_link("github", n))
+            await registry.aclose_providers()
+
+        asyncio.run(run())
+        fetched = sum(v for k, v in server.requests.items() if k.startswith("github."))
+        # Five concurrent endpoints per fetch: connections are opened once, not per PR.
+        assert fetched >= 15
+        assert server.connections <= 5
+
+
+def test_sync_fetch_closes_its_loop_clients():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=2))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        svc.fetch_pr(pr_link("gitea", 1))
+        inst = registry.provider_for(parse_pr_link(pr_link("gitea", 1)))
+        assert inst._pools == {}
+
+
+def test_azure_file_contents_cached_per_instance():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=4))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        first = svc.fetch_pr(pr_link("azure", 1))
+        items = server.requests["azure.items"]
+        second = svc.fetch_pr(pr_link("azure", 1))
+
+    assert server.requests["azure.items"] == items
+    assert [f.patch for f in first.changed_files] == [f.patch for f in second.changed_files]
+
+
+def test_rate_limit_state_parses_headers():
+    state = RateLimitState()
+    state.update(200, httpx.Headers({"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(int(time.time()) + 30)}))
+    assert state.wait_s() == 0
+    state.update(200, httpx.Headers({"RateLimit-Remaining": "0", "RateLimit-Reset": str(int(time.time()) + 30)}))
+    assert 25 < state.wait_s() <= 30
+    state.update(429, httpx.Headers({"Retry-After": "2"}))
+    assert 1 < state.wait_s() <= 2
+
+
+@respx.mock
+def test_requests_wait_for_exhausted_rate_limit_to_reset():
+    pr = {"number": 1, "title": "t", "body": "", "head": {"sha": "h"}, "base": {"sha": "b"}}
+    respx.get("https://api.github.com/repos/o/r/pulls/1").mock(
+        side_effect=lambda request: httpx.Response(
+            200, json=pr, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 0.5)}
+        )
+    )
+    for path in ("pulls/1/files", "issues/1/comments", "pulls/1/comments", "pulls/1/reviews"):
+        respx.get(f"https://api.github.com/repos/o/r/{path}").mock(return_value=httpx.Response(200, json=[]))
+    parsed = parse_pr_link("https://github.com/o/r/pull/1")
+    provider = registry.provider_for(parsed)
+    ctx = ProviderContext(pr_url="https://github.com/o/r/pull/1", token="t")
+
+    provider.fetch_pr(ctx)
+    t0 = time.time()
+    provider.fetch_pr(ctx)
+    assert time.time() - t0 >= 0.3
+
+
+def test_entry_point_plugin_provider(tmp_path, monkeypatch):
+    (tmp_path / "bbserver_plugin.py").write_text(
+        textwrap.dedent(
+            """
+            import re
+            from prreviewbot.core.link_parser import ParsedLink
+            from prreviewbot.core.types import PullRequestInfo
+            from prreviewbot.providers.base import Provider
+
+
+            class BitbucketServerProvider(Provider):
+                def name(self):
+                    return "bitbucket_server"
+
+                @classmethod
+                def parse_link(cls, url):
+                    m = re.match(r"^https://([^/]+)/projects/([^/]+)/repos/([^/]+)/pull-requests/(\\d+)", url)
+                    if not m:
+                        return None
+                    return ParsedLink(
+                        provider="bitbucket_server", host=m.group(1), project=m.group(2), repo=m.group(3),
+                        pr_number=int(m.group(4)),
+                    )
+
+                async def afetch_pr(self, ctx):
+                    return PullRequestInfo(
+                        provider="bitbucket_server", host=self.host, pr_url=ctx.pr_url, title="from plugin",
+                        description="", changed_files=[], existing_discussion=[],
+                    )
+            """
+        )
+    )
+    dist = tmp_path / "bbserver_plugin-0.1.dist-info"
+    dist.mkdir()
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: bbserver-plugin\nVersion: 0.1\n")
+    (dist / "entry_points.txt").write_text(
+        "[prreviewbot.providers]\nbitbucket_server = bbserver_plugin:BitbucketServerProvider\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry.reset_registry()
+
+    link = "https://bitbucket.corp/projects/KEY/repos/app/pull-requests/7"
+    assert "bitbucket_server" in registry.provider_names()
+    parsed = parse_pr_link(link)
+    assert (parsed.provider, parsed.host, parsed.pr_number) == ("bitbucket_server", "bitbucket.corp", 7)
+    pr = ReviewService.from_config(bench_app_config("http://unused")).fetch_pr(link)
+    assert (pr.title, pr.host) == ("from plugin", "bitbucket.corp")
+    with pytest.raises(ValueError):
+        parse_pr_link("https://bitbucket.corp/something/else")
@@ -46,10 +46,10 @@ def test_review_requires_auth(client, monkeypatch):
     from prreviewbot.core.errors import AuthRequiredError
     from prreviewbot.core.review_service import ReviewService
 
-    def boom(self, *, pr_link: str, language=None, **_kwargs):
+    async def boom(self, *, pr_link: str, language=None, **_kwargs):
         raise AuthRequiredError("github", "github.com", "token required")
 
-    monkeypatch.setattr(ReviewService, "review", boom)
+    monkeypatch.setattr(ReviewService, "areview", boom)
 
     r = client.post(
         "/api/review",
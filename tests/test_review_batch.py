@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from typer.testing import CliRunner
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.cli import app
+from prreviewbot.core.batch import read_pr_links
+from prreviewbot.core.limits import KeyedLimiter
+from prreviewbot.storage.config import ConfigStore
+
+
+def test_review_batch_streams_jsonl_and_isolates_failures(tmp_path):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (1, 2, 3):
+            server.add_pr(generate_pr(number=n, files=2))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        links = [pr_link("github", 1), pr_link("gitlab", 2), "https://example.com/not/a/pr", pr_link("azure", 3),
+                 pr_link("github", 99), "# comment", "", pr_link("github", 1)]
+        result = CliRunner().invoke(
+            app, ["review-batch", "-", "--data-dir", str(tmp_path), "--per-host", "1"], input="\n".join(links)
+        )
+
+    assert result.exit_code == 1, result.output
+    records = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    by_link = {r["pr_link"]: r for r in records}
+    assert len(records) == 5
+    assert all(by_link[pr_link(p, n)]["ok"] for p, n in [("github", 1), ("gitlab", 2), ("azure", 3)])
+    assert by_link[pr_link("gitlab", 2)]["review"]["provider"] == "gitlab"
+    assert by_link["https://example.com/not/a/pr"]["ok"] is False
+    assert by_link[pr_link("github", 99)]["ok"] is False
+
+
+def test_keyed_limiter_caps_each_key_separately():
+    limiter = KeyedLimiter(2)
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def job(key):
+        async with limiter.slot(key):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+            await asyncio.sleep(0.01)
+            active[key] -= 1
+
+    async def main():
+        await asyncio.gather(*[job("a") for _ in range(6)], *[job("b") for _ in range(3)])
+
+    asyncio.run(main())
+    assert peak == {"a": 2, "b": 2}
+
+
+def test_read_pr_links_skips_blanks_comments_and_duplicates():
+    assert read_pr_links(["a\n", "  \n", "# x\n", "b", "a"]) == ["a", "b"]
@@ -0,0 +1,145 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link, repo_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.types import PullRequestInfo, ReviewComment, ReviewResult
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.storage.history import ReviewHistory
+from prreviewbot.web.app import create_app
+
+
+def _record(history, n, *, severities=("warn",), repo="o/r", now=None):
+    url = f"https://github.com/{repo}/pull/{n}"
+    pr = PullRequestInfo(provider="github", host="github.com", pr_url=url, title="", description="", head_sha=f"h{n}")
+    result = ReviewResult(
+        pr_url=url,
+        language="python",
+        model="m",
+        summary=f"review {n}",
+        comments=[ReviewComment(file_path="a.py", severity=s, message=f"{s} {i}") for i, s in enumerate(severities)],
+        timings={"total": 0.1},
+    )
+    return history.record(pr, result, now=now)
+
+
+def test_api_records_reviews_and_paginates(tmp_path):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (1, 2, 3):
+            server.add_pr(generate_pr(number=n, files=3))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        with TestClient(create_app(data_dir=tmp_path, result_ttl_s=0)) as client:
+            for n in (1, 2, 3):
+                assert client.post("/api/review", json={"pr_link": pr_link("gitlab", n)}).status_code == 200
+
+            page1 = client.get("/api/history", params={"repo": repo_link("gitlab"), "limit": 2}).json()
+            page2 = client.get("/api/history", params={"repo": repo_link("gitlab"), "cursor": page1["next_cursor"]}).json()
+            assert [i["pr_url"] for i in page1["items"] + page2["items"]] == [pr_link("gitlab", n) for n in (3, 2, 1)]
+            assert page2["next_cursor"] is None
+            newest = page1["items"][0]
+            assert newest["head_sha"] == server.prs[3].head_sha
+            assert set(newest["timings"]) >= {"fetch", "llm", "total"}
+
+            detail = client.get(f"/api/history/{newest['id']}").json()
+            assert len(detail["comments"]) == sum(newest["counts"].values())
+            assert client.get("/api/history/999").status_code == 404
+            assert client.get("/api/history", params={"host": "github.com"}).json()["items"] == []
+
+
+def test_filters_by_pr_severity_and_time(tmp_path):
+    history = ReviewHistory(data_dir=tmp_path)
+    t0 = time.time()
+    _record(history, 1, severities=("info",), now=t0 - 100)
+    _record(history, 2, severities=("info", "error"), now=t0 - 50)
+    _record(history, 3, severities=(), repo="o/other", now=t0)
+
+    ids = lambda items: [i["summary"] for i in items]
+    assert ids(history.reviews(severity="warn")[0]) == ["review 2"]
+    assert ids(history.reviews(repo="https://github.com/o/r")[0]) == ["review 2", "review 1"]
+    assert ids(history.reviews(repo="github.com/o/other")[0]) == ["review 3"]
+    assert ids(history.reviews(pr_url="https://github.com/o/r/pull/1")[0]) == ["review 1"]
+    assert ids(history.reviews(since=t0 - 60, until=t0 - 1)[0]) == ["review 2"]
+    errors, _ = history.comments(severity="error")
+    assert [c["message"] for c in errors] == ["error 1"]
+
+
+def test_prune_compacts_then_deletes(tmp_path):
+    history = ReviewHistory(data_dir=tmp_path, retention_days=10, compact_after_days=2, prune_interval_s=30 * 86400)
+    day = 86400.0
+    now = time.time()
+    old = _record(history, 1, now=now - 11 * day)
+    aging = _record(history, 2, now=now - 3 * day)
+    fresh = _record(history, 3, now=now)
+
+    assert history.prune(now=now) == {"deleted": 1, "compacted": 1}
+    assert history.get(old) is None
+    compacted = history.get(aging)
+    assert compacted["compacted"] and compacted["comments"] == [] and compacted["counts"]["warn"] == 1
+    assert len(history.get(fresh)["comments"]) == 1
+
+
+def test_prune_runs_at_most_once_per_interval_and_not_on_record(tmp_path):
+    history = ReviewHistory(data_dir=tmp_path, retention_days=1, prune_interval_s=3600)
+    now = time.time()
+    old = _record(history, 1, now=now - 2 * 86400)  # past retention: recording never prunes
+    assert history.get(old) is not None
+    assert history.maybe_prune(now=now) and history.get(old) is None
+    old = _record(history, 2, now=now - 2 * 86400)
+    assert not history.maybe_prune(now=now + 10)  # a prune just ran
+    assert history.get(old) is not None
+    assert history.maybe_prune(now=now + 3601) and history.get(old) is None
+
+
+def test_time_window_pages_in_time_order(tmp_path):
+    history = ReviewHistory(data_dir=tmp_path)
+    t0 = time.time()
+    for n, age in enumerate((5, 50, 1, 30, 10, 100)):  # ids out of time order, e.g. back-filled reviews
+        _record(history, n, now=t0 - age)
+    seen, cursor = [], None
+    while True:
+        items, cursor = history.reviews(since=t0 - 60, cursor=cursor, limit=2)
+        seen += [round(t0 - i["created_at"]) for i in items]
+        if cursor is None:
+            break
+    assert seen == [1, 5, 10, 30, 50]
+
+
+def test_queries_stay_on_indexes(tmp_path):
+    history = ReviewHistory(data_dir=tmp_path)
+    for n in range(200):
+        _record(history, n, severities=("info", "warn", "error"), repo=f"o/r{n % 7}")
+
+    plans = [
+        history.explain("SELECT * FROM reviews WHERE pr_url = ? AND id < ? ORDER BY id DESC LIMIT 51", ("u", 10**9)),
+        history.explain("SELECT * FROM reviews WHERE repo = ? AND id < ? ORDER BY id DESC LIMIT 51", ("r", 10**9)),
+        history.explain("SELECT * FROM reviews WHERE host = ? ORDER BY id DESC LIMIT 51", ("h",)),
+        history.explain(
+            "SELECT * FROM comments WHERE repo = ? AND severity = ? AND id < ? ORDER BY id DESC LIMIT 51",
+            ("r", 2, 10**9),
+        ),
+        history.explain("SELECT * FROM comments WHERE review_id = ? ORDER BY id", (1,)),
+        history.explain("SELECT * FROM comments WHERE repo = ? AND id < ? ORDER BY id DESC LIMIT 51", ("r", 10**9)),
+        history.explain("SELECT * FROM comments WHERE file_path = ? ORDER BY id DESC LIMIT 51", ("a.py",)),
+        history.explain(
+            "SELECT * FROM reviews WHERE created_at >= ? AND created_at <= ? AND (created_at < ? OR id < ?) "
+            "ORDER BY created_at DESC, id DESC LIMIT 51",
+            (0.0, 1.0, 1.0, 10**9),
+        ),
+        history.explain(
+            "SELECT * FROM reviews WHERE repo = ? AND created_at >= ? ORDER BY created_at DESC, id DESC LIMIT 51",
+            ("r", 0.0),
+        ),
+    ]
+    for plan in plans:
+        assert "USING INDEX" in plan and "TEMP B-TREE" not in plan, plan
+
+    # Deep pages cost the same as the first one: 200 reviews x 3 comments, walked 50 at a time.
+    seen, cursor = [], None
+    while True:
+        items, cursor = history.comments(severity="error", cursor=cursor)
+        seen += items
+        if cursor is None:
+            break
+    assert len(seen) == 200 and len({c["id"] for c in seen}) == 200
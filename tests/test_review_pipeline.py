@@ -0,0 +1,115 @@
+import asyncio
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.review_service import PIPELINE_CHUNK_TOKENS_ENV, ReviewService
+from prreviewbot.core.types import ChangedFile, ExistingDiscussionComment, PullRequestInfo
+from prreviewbot.llm.heuristic import HeuristicLLM
+from prreviewbot.providers.base import Provider, ProviderContext, PullRequestStream
+from prreviewbot.storage.config import AppConfig
+
+PATCH = "@@ -1 +1,2 @@\n-x = 1\n+x = 2\n+print(x)\n"
+
+
+class _RecordingLLM(HeuristicLLM):
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def areview(self, *, pr_url, language, files, discussion):
+        self.calls.append([f.path for f in files])
+        return await super().areview(pr_url=pr_url, language=language, files=files, discussion=discussion)
+
+
+class _SlowFilesProvider(Provider):
+    """Hands over one file, then holds the rest back until the first LLM call has started."""
+
+    def __init__(self, llm_started: asyncio.Event):
+        super().__init__()
+        self.llm_started = llm_started
+
+    def name(self) -> str:
+        return "slow"
+
+    async def astream_pr(self, ctx: ProviderContext) -> PullRequestStream:
+        async def files():
+            yield [ChangedFile(path="a.py", patch=PATCH)]
+            await asyncio.wait_for(self.llm_started.wait(), timeout=5)
+            yield [ChangedFile(path="b.py", patch=PATCH)]
+
+        async def discussion():
+            return [ExistingDiscussionComment(author="bob", body="why?", file_path="a.py")]
+
+        info = PullRequestInfo(provider="slow", host="h", pr_url=ctx.pr_url, title="t", description="", head_sha="abc")
+        return PullRequestStream(info, files(), discussion())
+
+
+def test_github_stream_yields_pages_and_fetches_discussion_alongside():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=230, discussion=4))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        provider, ctx = svc._provider_and_context(pr_link("github", 1))
+
+        async def main():
+            stream = await provider.astream_pr(ctx)
+            seen = []
+            async for f in stream:
+                seen.append((f.path, len(stream.info.changed_files)))
+            return stream.info, seen, await stream.discussion()
+
+        info, seen, discussion = asyncio.run(main())
+        fetched = svc.fetch_pr(pr_link("github", 1))
+
+    assert [p for p, _ in seen] == [f.path for f in fetched.changed_files]
+    # Files are handed over page by page (100 per page), not after the last page.
+    assert seen[0][1] == 100 and seen[-1][1] == 230
+    assert len(discussion) == len(fetched.existing_discussion) == 4
+    assert info.raw["files_count"] == 230 and info.head_sha == fetched.head_sha
+
+
+def test_llm_call_starts_before_fetch_completes(monkeypatch):
+    monkeypatch.setenv(PIPELINE_CHUNK_TOKENS_ENV, "1")
+    calls = []
+
+    async def main():
+        started = asyncio.Event()
+
+        class _Signalling(_RecordingLLM):
+            async def areview(self, **kw):
+                started.set()
+                return await super().areview(**kw)
+
+        provider = _SlowFilesProvider(started)
+        svc = ReviewService.from_config(AppConfig(llm={"provider": "heuristic"}))
+        ctx = ProviderContext(pr_url="https://github.com/acme/repo/pull/1", token=None)
+        monkeypatch.setattr(svc, "_provider_and_context", lambda link: (provider, ctx))
+        monkeypatch.setattr(svc, "_build_llm", lambda *a, **kw: _Signalling(calls))
+        return await svc.areview(pr_link="https://github.com/acme/repo/pull/1")
+
+    result = asyncio.run(main())
+    assert calls == [["a.py"], ["b.py"]]
+    assert result.timings["fetch"] > 0 and result.timings["llm"] > 0
+    assert {c.file_path for c in result.comments} >= {"a.py", "b.py"}
+
+
+def test_chunked_review_merges_languages(monkeypatch):
+    monkeypatch.setenv(PIPELINE_CHUNK_TOKENS_ENV, "200")
+    calls = []
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=12, discussion=3))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        monkeypatch.setattr(svc, "_build_llm", lambda *a, **kw: _RecordingLLM(calls))
+        chunked = asyncio.run(svc.areview(pr_link=pr_link("github", 1)))
+        monkeypatch.setenv(PIPELINE_CHUNK_TOKENS_ENV, "1000000")
+        calls_before = len(calls)
+        whole = asyncio.run(svc.areview(pr_link=pr_link("github", 1)))
+
+    assert calls_before > 1 and len(calls) == calls_before + 1
+    assert sorted(p for c in calls[:calls_before] for p in c) == sorted(calls[-1])
+    assert chunked.language == whole.language
+    assert [e["language"] for e in chunked.languages] == [e["language"] for e in whole.languages]
+    assert [e["files"] for e in chunked.languages] == [e["files"] for e in whole.languages]
+    assert abs(sum(e["share"] for e in chunked.languages) - 1.0) < 0.01
+    # The heuristic reviewer adds its general remarks once per call; the per-file comments are the same.
+    per_file = lambda r: sorted((c.file_path, c.message) for c in r.comments if c.file_path)
+    assert per_file(chunked) == per_file(whole)
@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.types import ReviewResult
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.storage.shared_state import SharedState
+from prreviewbot.web.app import _run_review_jobs, create_app
+
+
+def _bump(data_dir, n):
+    state = SharedState(data_dir=data_dir)
+    for _ in range(n):
+        state.incr("hits")
+
+
+def test_counters_are_shared_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_bump, args=(tmp_path, 50)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert SharedState(data_dir=tmp_path).counters()["hits"] == 200
+
+
+def test_leases_and_job_claims(tmp_path):
+    state = SharedState(data_dir=tmp_path)
+    assert state.acquire("k", "a", ttl_s=60)
+    assert not state.acquire("k", "b", ttl_s=60)
+    state.release("k", "a")
+    assert state.acquire("k", "b", ttl_s=0.01)
+    time.sleep(0.02)
+    assert state.acquire("k", "a", ttl_s=60)  # expired lease is taken over
+
+    job_id = state.enqueue_job("review", {"pr_link": "x"})
+    job = state.claim_job("w1", lease_s=0.01)
+    assert job is not None and job.id == job_id and job.status == "running"
+    time.sleep(0.02)
+    again = state.claim_job("w2")  # w1 "died": lease expired
+    assert again is not None and again.id == job_id and again.attempts == 2
+    assert state.claim_job("w3") is None
+    # The stale runner can neither keep, requeue nor finish the job it lost.
+    assert not state.renew_lease(job_id, "w1", lease_s=60) and state.renew_lease(job_id, "w2", lease_s=60)
+    state.requeue_job(job_id, "w1")
+    assert not state.update_job_payload(job_id, "w1", {"pr_link": "y"})
+    assert state.update_job_payload(job_id, "w2", {"pr_link": "x", "llm_batches": {"c": "b"}})
+    assert state.get_job(job_id).payload["llm_batches"] == {"c": "b"}
+    assert not state.finish_job(job_id, "w1", result={"ok": False})
+    assert state.get_job(job_id).status == "running"
+    assert state.finish_job(job_id, "w2", result={"ok": True})
+    assert state.get_job(job_id).result == {"ok": True}
+    assert state.job_counts() == {"done": 1}
+
+
+def test_identical_reviews_across_workers_call_llm_once(tmp_path):
+    pytest.importorskip("openai")
+    with FakeServer(llm_latency_s=0.3) as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=3))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url, llm="openai"))
+        # Two app instances on one data dir stand in for two worker processes.
+        apps = [create_app(data_dir=tmp_path), create_app(data_dir=tmp_path)]
+        payload = {"pr_link": pr_link("github", 1), "llm_provider": "openai"}
+
+        async def main():
+            clients = [httpx.AsyncClient(transport=httpx.ASGITransport(app=a), base_url="http://t") for a in apps]
+            try:
+                rs = await asyncio.gather(*[clients[i % 2].post("/api/review", json=payload) for i in range(6)])
+                metrics = (await clients[0].get("/metrics")).json()
+            finally:
+                for c in clients:
+                    await c.aclose()
+            return rs, metrics
+
+        responses, metrics = asyncio.run(main())
+        llm_requests = server.requests.get("llm.chat", 0)
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.text for r in responses}) == 1
+    assert llm_requests == 1
+    assert metrics["counters"]["llm_calls_total"] == 1
+    assert metrics["counters"]["reviews_total"] == 6
+    assert metrics["counters"]["review_cache_hits_total"] == 5
+
+
+def test_settings_change_is_visible_to_other_workers(tmp_path):
+    a = TestClient(create_app(data_dir=tmp_path))
+    b = TestClient(create_app(data_dir=tmp_path))
+    a.post("/api/settings/token", json={"provider": "github", "host": "github.com", "token": "abc12345"})
+    assert "github.com" in b.get("/api/settings").json()["tokens"]["github"]
+    b.post("/api/settings/token/delete", json={"provider": "github", "host": "github.com"})
+    assert a.get("/api/settings").json()["tokens"] == {}
+
+
+def test_review_job_queue(tmp_path):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=2, files=2))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        with TestClient(create_app(data_dir=tmp_path)) as client:
+            r = client.post("/api/review/jobs", json={"pr_link": pr_link("gitlab", 2)})
+            assert r.status_code == 202
+            job_id = r.json()["job_id"]
+            deadline = time.monotonic() + 10
+            while True:
+                job = client.get(f"/api/review/jobs/{job_id}").json()
+                if job["status"] in {"done", "failed"} or time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+        assert job["status"] == "done", job
+        assert job["result"]["provider"] == "gitlab"
+        assert job["result"]["comments"]
+        assert client.get("/api/review/jobs/nope").status_code == 404
+
+
+def test_long_review_job_keeps_its_lease(tmp_path):
+    state = SharedState(data_dir=tmp_path)
+    job_id = state.enqueue_job("review", {"pr_link": pr_link("github", 1)})
+
+    class _SlowReview:
+        def __init__(self, **_):
+            pass
+
+        async def areview(self, *, pr_link, **_):
+            await asyncio.sleep(0.8)
+            return ReviewResult(pr_url=pr_link, language="python", model="heuristic", summary="ok")
+
+    async def main():
+        stop = asyncio.Event()
+        runner = asyncio.create_task(_run_review_jobs(state, _SlowReview, stop, cancel_poll_s=0.02, lease_s=0.2))
+        await asyncio.sleep(0.5)  # past the claim's lease: only renewals keep the job with the runner
+        stolen = state.claim_job("other-worker", lease_s=0.2)
+        while state.get_job(job_id).status == "running":
+            await asyncio.sleep(0.05)
+        stop.set()
+        await runner
+        return stolen
+
+    assert asyncio.run(main()) is None
+    job = state.get_job(job_id)
+    assert (job.status, job.attempts, job.result["summary"]) == ("done", 1, "ok")
+
+
+def test_serve_with_multiple_workers(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cmd = [sys.executable, "-c", "from prreviewbot.cli import app; app()", "serve", "--no-open", "--workers", "2",
+           "--port", str(port), "--data-dir", str(tmp_path)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=dict(os.environ))
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                r = httpx.post(f"http://127.0.0.1:{port}/api/settings/token",
+                               json={"provider": "gitlab", "host": "gitlab.com", "token": "tok123456"}, timeout=2)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise
+                time.sleep(0.2)
+        assert r.status_code == 200
+        for _ in range(10):
+            s = httpx.get(f"http://127.0.0.1:{port}/api/settings", timeout=2).json()
+            assert "gitlab.com" in s["tokens"]["gitlab"]
+        assert "counters" in httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=2).json()
+    finally:
+        proc.terminate()
+        proc.wait(15)
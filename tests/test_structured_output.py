@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.llm import openai_chat
+from prreviewbot.llm.azure_openai_llm import AzureOpenAILLM
+from prreviewbot.llm.base import comment_sink
+from prreviewbot.llm.openai_chat import STREAM_ENV, aclose_llms
+from prreviewbot.llm.review_json import CommentStream, comment_from_dict, review_result
+from prreviewbot.providers.registry import reset_registry
+
+REPLY = {
+    "summary": "Looks fine.",
+    "comments": [
+        {"file_path": "a.py", "severity": "warning", "message": 'Quote " and brace } in text', "start_line": "12",
+         "end_line": 12.0, "line_side": "NEW", "kind": "Code_Suggestion", "suggestion": "  ", "related_url": None},
+        {"file_path": "b.py", "severity": "bogus", "message": "  second  ", "start_line": -3, "end_line": True},
+        {"file_path": "c.py", "message": ""},
+        "not an object",
+    ],
+}  # fmt: skip
+
+
+@pytest.fixture
+def server():
+    reset_registry()
+    openai_chat._downgraded.clear()
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=3))
+        yield server
+    openai_chat._downgraded.clear()
+
+
+def test_comments_are_validated_in_one_pass():
+    first, second = comment_from_dict(REPLY["comments"][0]), comment_from_dict(REPLY["comments"][1])
+    assert (first.severity, first.start_line, first.end_line, first.line_side, first.kind, first.suggestion) == (
+        "warn", 12, 12, "new", "code_suggestion", None,
+    )
+    assert (second.severity, second.message, second.start_line, second.end_line) == ("info", "second", None, None)
+    assert comment_from_dict(REPLY["comments"][2]) is None and comment_from_dict("x") is None
+
+
+def test_stream_emits_comments_as_their_objects_complete():
+    text = "```json\n" + json.dumps(REPLY) + "\n```"
+    parser, emitted_at = CommentStream(), []
+    for i in range(0, len(text), 7):
+        emitted_at += [i] * len(parser.feed(text[i : i + 7]))
+    assert len(emitted_at) == 2 and emitted_at[0] < text.index('"b.py"') < emitted_at[1] < len(text) - 10
+    streamed = review_result(pr_url="u", language="python", model="m", content=parser.text, comments=parser.comments)
+    assert streamed == review_result(pr_url="u", language="python", model="m", content=text)
+    assert streamed.summary == "Looks fine."
+
+
+def test_review_streams_structured_output(server, monkeypatch):
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+    streamed = svc.review(pr_link=pr_link("github", 1))
+    body = [b for route, b in server.posts if route == "llm.chat"][-1]
+    assert body["stream"] is True and body["response_format"]["type"] == "json_schema"
+    monkeypatch.setenv(STREAM_ENV, "0")
+    whole = svc.review(pr_link=pr_link("github", 1))
+    assert "stream" not in [b for route, b in server.posts if route == "llm.chat"][-1]
+    assert (streamed.summary, streamed.comments) == (whole.summary, whole.comments) and len(whole.comments) == 3
+
+
+def test_unsupported_response_format_falls_back_once(server):
+    server.llm_structured = False
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+    assert len(svc.review(pr_link=pr_link("github", 1)).comments) == 3
+    formats = [(b.get("response_format") or {}).get("type") for route, b in server.posts if route == "llm.chat"]
+    assert formats == ["json_schema", "json_object", None]
+    svc.review(pr_link=pr_link("github", 1))
+    assert server.requests["llm.chat"] == 4
+
+
+def test_areview_hands_over_each_comment_once(server):
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+
+    async def run(**kwargs):
+        seen = []  # (comment, handed over while the LLM call was running)
+        try:
+            result = await svc.areview(
+                pr_link=pr_link("github", 1), on_comment=lambda c: seen.append((c, comment_sink.get() is not None)),
+                **kwargs,
+            )
+            return seen, result
+        finally:
+            await aclose_llms()
+
+    streamed, result = asyncio.run(run())
+    assert [(c, True) for c in result.comments] == streamed and len(streamed) == 3
+    whole, heuristic = asyncio.run(run(llm_provider="heuristic"))
+    assert [(c, False) for c in heuristic.comments] == whole != []  # non-streaming LLMs: delivered with the result
+
+
+def test_llm_client_is_reused_across_reviews(server, monkeypatch):
+    svc = ReviewService.from_config(bench_app_config(server.url, llm="openai"))
+    built = []
+    new_client = AzureOpenAILLM._client
+    monkeypatch.setattr(AzureOpenAILLM, "_client", lambda self: built.append(self) or new_client(self))
+
+    async def reviews():
+        try:
+            for _ in range(3):
+                await svc.areview(pr_link=pr_link("github", 1))
+        finally:
+            await aclose_llms()
+
+    asyncio.run(reviews())
+    assert server.requests["llm.chat"] == 3 and len(built) == 1
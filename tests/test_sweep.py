@@ -0,0 +1,92 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from typer.testing import CliRunner
+
+from prreviewbot.bench.fake_server import ALL_PROVIDERS, FakeServer, repo_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.cli import app
+from prreviewbot.core.aio import run_sync
+from prreviewbot.core.link_parser import parse_pr_link
+from prreviewbot.core.review_service import ReviewService
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.web.app import create_app
+
+
+@pytest.mark.parametrize("provider", ALL_PROVIDERS)
+def test_list_open_prs_paginates(provider):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in range(1, 131):
+            server.add_pr(generate_pr(number=n, files=1, hunks=1, discussion=0))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        prs = run_sync(svc.alist_open_prs(repo_link(provider), provider=provider))
+        listed_pages = server.requests.get(f"{provider}.list", 0)
+
+    assert [p.number for p in prs] == list(range(1, 131))
+    assert listed_pages > 1
+    assert all(p.head_sha for p in prs)
+    # Listed links are canonical PR links the rest of the pipeline understands.
+    assert {parse_pr_link(p.pr_url).provider for p in prs} == {provider}
+    assert parse_pr_link(prs[6].pr_url).pr_number == 7
+
+
+def test_gitea_listing_follows_total_count_when_pages_are_capped():
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.gitea_max_items = 20
+        for n in range(1, 56):
+            server.add_pr(generate_pr(number=n, files=1, hunks=1, discussion=0))
+        svc = ReviewService.from_config(bench_app_config(server.url))
+        prs = run_sync(svc.alist_open_prs(repo_link("gitea"), provider="gitea"))
+        listed_pages = server.requests.get("gitea.list", 0)
+
+    assert [p.number for p in prs] == list(range(1, 56))
+    assert listed_pages == 3
+
+
+def test_sweep_cli_skips_already_reviewed_heads(tmp_path):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (1, 2, 3):
+            server.add_pr(generate_pr(number=n, files=2))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        args = ["sweep", repo_link("gitlab"), "--data-dir", str(tmp_path)]
+
+        first = CliRunner().invoke(app, args)
+        assert first.exit_code == 0, first.output
+        records = [json.loads(line) for line in first.stdout.splitlines() if line.startswith("{")]
+        assert sorted(r["pr_link"].rsplit("/", 1)[1] for r in records) == ["1", "2", "3"]
+        assert all(r["ok"] and r["head_sha"] for r in records)
+
+        second = CliRunner().invoke(app, args)
+        assert [line for line in second.stdout.splitlines() if line.startswith("{")] == []
+
+        server.prs[2].head_sha = "h-new-push"
+        third = CliRunner().invoke(app, args)
+        records = [json.loads(line) for line in third.stdout.splitlines() if line.startswith("{")]
+        assert [r["pr_link"].rsplit("/", 1)[1] for r in records] == ["2"]
+
+
+def test_sweep_api_queues_review_jobs(tmp_path):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        for n in (4, 5):
+            server.add_pr(generate_pr(number=n, files=2))
+        ConfigStore(data_dir=tmp_path).save(bench_app_config(server.url))
+        with TestClient(create_app(data_dir=tmp_path)) as client:
+            r = client.post("/api/sweep", json={"repo_url": repo_link("github")})
+            assert r.status_code == 202, r.text
+            body = r.json()
+            assert body["listed"] == 2 and body["skipped"] == []
+            deadline = time.monotonic() + 10
+            for job in body["jobs"]:
+                while client.get(f"/api/review/jobs/{job['job_id']}").json()["status"] != "done":
+                    assert time.monotonic() < deadline
+                    time.sleep(0.05)
+
+            again = client.post("/api/sweep", json={"repo_url": repo_link("github")}).json()
+            assert again["jobs"] == [] and len(again["skipped"]) == 2
+            forced = client.post("/api/sweep", json={"repo_url": repo_link("github"), "force": True}).json()
+            assert len(forced["jobs"]) == 2
+
+            assert client.post("/api/sweep", json={"repo_url": "not a url"}).status_code == 400
@@ -0,0 +1,176 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from prreviewbot.bench.fake_server import FakeServer, pr_link
+from prreviewbot.bench.fixtures import generate_pr
+from prreviewbot.bench.runner import bench_app_config, redirect_provider_apis
+from prreviewbot.core.webhooks import parse_event, verify_signature
+from prreviewbot.storage.config import ConfigStore
+from prreviewbot.web.app import create_app
+
+SECRET = "s3cret"
+
+
+def _gh_event(number: int, head: str, action: str = "synchronize"):
+    body = json.dumps(
+        {"action": action, "pull_request": {"html_url": pr_link("github", number), "head": {"sha": head}}}
+    ).encode()
+    sig = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return body, {"X-GitHub-Event": "pull_request", "X-Hub-Signature-256": sig, "Content-Type": "application/json"}
+
+
+def _wait(client, job_id, statuses=("done", "failed", "cancelled"), timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/review/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        assert time.monotonic() < deadline, job
+        time.sleep(0.05)
+
+
+def test_verify_signature_per_provider():
+    body = b'{"x": 1}'
+    digest = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    basic = "Basic " + base64.b64encode(f"hook:{SECRET}".encode()).decode()
+    good = {
+        "github": {"X-Hub-Signature-256": f"sha256={digest}"},
+        "bitbucket": {"X-Hub-Signature": f"sha256={digest}"},
+        "gitea": {"X-Gitea-Signature": digest},
+        "gitlab": {"X-Gitlab-Token": SECRET},
+        "azure": {"Authorization": basic},
+    }
+    for provider, headers in good.items():
+        assert verify_signature(provider, headers, body, SECRET), provider
+        if provider in {"github", "bitbucket", "gitea"}:  # body is signed (GitLab/Azure send the secret itself)
+            assert not verify_signature(provider, headers, body + b" ", SECRET), provider
+        assert not verify_signature(provider, headers, body, "other"), provider
+        assert not verify_signature(provider, {}, body, SECRET), provider
+
+
+def test_parse_event_per_provider():
+    gl = parse_event(
+        "gitlab",
+        {"X-Gitlab-Event": "Merge Request Hook"},
+        {
+            "object_kind": "merge_request",
+            "object_attributes": {
+                "action": "update",
+                "oldrev": "a",
+                "url": pr_link("gitlab", 3),
+                "last_commit": {"id": "c3"},
+            },
+        },
+    )
+    assert (gl.action, gl.pr_url, gl.head_sha) == ("review", pr_link("gitlab", 3), "c3")
+    gl_edit = parse_event(
+        "gitlab", {}, {"object_kind": "merge_request", "object_attributes": {"action": "update", "url": "u"}}
+    )
+    assert gl_edit.action == "ignore"
+
+    bb = parse_event(
+        "bitbucket",
+        {"X-Event-Key": "pullrequest:updated"},
+        {"pullrequest": {"links": {"html": {"href": pr_link("bitbucket", 4)}}, "source": {"commit": {"hash": "b4"}}}},
+    )
+    assert (bb.action, bb.head_sha) == ("review", "b4")
+
+    az = parse_event(
+        "azure",
+        {},
+        {
+            "eventType": "git.pullrequest.updated",
+            "resource": {
+                "pullRequestId": 5,
+                "status": "active",
+                "repository": {"remoteUrl": "https://acme@dev.azure.com/acme/proj/_git/repo"},
+                "lastMergeSourceCommit": {"commitId": "a5"},
+            },
+        },
+    )
+    assert (az.action, az.pr_url, az.head_sha) == ("review", pr_link("azure", 5), "a5")
+
+    gt = parse_event(
+        "gitea",
+        {"X-Gitea-Event": "pull_request"},
+        {"action": "closed", "pull_request": {"html_url": pr_link("gitea", 6)}},
+    )
+    assert (gt.action, gt.pr_url) == ("close", pr_link("gitea", 6))
+
+
+@pytest.fixture()
+def webhook_env(tmp_path):
+    def make(server, **cfg_kwargs):
+        cfg = bench_app_config(server.url, **cfg_kwargs)
+        cfg.webhook_secrets = {"github": SECRET}
+        ConfigStore(data_dir=tmp_path).save(cfg)
+        return tmp_path
+
+    return make
+
+
+def test_webhook_rejects_bad_or_unconfigured_requests(tmp_path):
+    client = TestClient(create_app(data_dir=tmp_path))
+    body, headers = _gh_event(1, "h1")
+    assert client.post("/webhooks/nope", content=body, headers=headers).status_code == 404
+    assert client.post("/webhooks/github", content=body, headers=headers).status_code == 403
+    client.post("/api/settings/webhook", json={"provider": "github", "secret": SECRET})
+    assert client.get("/api/settings").json()["webhook_secrets"]["github"] == "******"
+    bad = dict(headers, **{"X-Hub-Signature-256": "sha256=00"})
+    assert client.post("/webhooks/github", content=body, headers=bad).status_code == 401
+    ignored = client.post("/webhooks/github", content=body, headers=dict(headers, **{"X-GitHub-Event": "push"}))
+    assert ignored.json()["status"] == "ignored"
+
+
+def test_burst_of_pushes_is_debounced_into_one_review(webhook_env):
+    with FakeServer() as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=1, files=2))
+        data_dir = webhook_env(server)
+        with TestClient(create_app(data_dir=data_dir, webhook_debounce_s=0.5)) as client:
+            job_ids = set()
+            for i in range(5):
+                body, headers = _gh_event(1, f"h{i}")
+                r = client.post("/webhooks/github", content=body, headers=headers)
+                assert r.status_code == 202, r.text
+                job_ids.add(r.json()["job_id"])
+            assert len(job_ids) == 1
+            job = _wait(client, job_ids.pop())
+            assert job["status"] == "done"
+            assert server.requests.get("github.pr") == 1
+
+            # Redelivery of the reviewed head does not queue another review.
+            body, headers = _gh_event(1, "h4")
+            assert client.post("/webhooks/github", content=body, headers=headers).json()["status"] == "ignored"
+
+            # Closing the PR cancels a pending review.
+            body, headers = _gh_event(1, "h5")
+            queued = client.post("/webhooks/github", content=body, headers=headers).json()
+            body, headers = _gh_event(1, "h5", action="closed")
+            assert client.post("/webhooks/github", content=body, headers=headers).json()["status"] == "cancelled"
+            assert client.get(f"/api/review/jobs/{queued['job_id']}").json()["status"] == "cancelled"
+
+
+def test_new_push_cancels_stale_in_flight_review(webhook_env):
+    pytest.importorskip("openai")
+    with FakeServer(llm_latency_s=3.0) as server, redirect_provider_apis(server.url):
+        server.add_pr(generate_pr(number=2, files=2))
+        data_dir = webhook_env(server, llm="openai")
+        with TestClient(create_app(data_dir=data_dir, webhook_debounce_s=0)) as client:
+            body, headers = _gh_event(2, "old")
+            first = client.post("/webhooks/github", content=body, headers=headers).json()
+            _wait(client, first["job_id"], statuses=("running",))
+            time.sleep(0.3)  # let it reach the (slow) LLM call
+
+            server.llm_latency_s = 0.0
+            body, headers = _gh_event(2, "new")
+            second = client.post("/webhooks/github", content=body, headers=headers).json()
+            assert second["cancelled"] == [first["job_id"]]
+            assert _wait(client, first["job_id"])["status"] == "cancelled"
+            assert _wait(client, second["job_id"])["status"] == "done"
+            assert client.get("/metrics").json()["counters"]["review_jobs_cancelled_total"] == 1